@@ -11,9 +11,34 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15 #minutes
+
+    # Token revocation (in-process filter in front of the revoked_tokens table)
+    REVOCATION_FILTER_CAPACITY: int = 100000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 30
     
     # Database Configuration
     DB_URL: str
+
+    # Connection pool (shared by every engine built in app_v2/databases/engine.py)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # 0 disables the server-side limit
+    DB_SCRIPT_STATEMENT_TIMEOUT_MS: int = 0  # cron / maintenance scripts (get_script_engine)
+    DB_SLOW_CHECKOUT_MS: int = 250
+
+    # Per-request SQL profiler (admin diagnostics). Off by default: when False
+    # no listeners or middleware are installed.
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD: int = 5
+    SQL_PROFILER_HISTORY: int = 1000
+
+    # Event-loop lag monitor
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 100
+    LOOP_LAG_THRESHOLD_MS: int = 150
     
     # Mail Configuration
     MAIL_USERNAME: str = os.getenv("MAIL_USERNAME")
@@ -37,6 +62,134 @@ class Settings(BaseSettings):
     
     # ElevenLabs Configuration
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY")
+    # Point both at fake_elevenlabs_server.py for load tests
+    ELEVENLABS_BASE_URL: str = "https://api.elevenlabs.io/v1"
+    ELEVENLABS_WS_URL: str = "wss://api.elevenlabs.io/v1/convai/conversation"
+    # Shared keep-alive HTTP pool for the ElevenLabs REST client
+    ELEVENLABS_MAX_CONNECTIONS: int = 100
+    ELEVENLABS_MAX_CONNECTIONS_PER_HOST: int = 50
+    ELEVENLABS_KEEPALIVE_SECONDS: int = 30
+    ELEVENLABS_CONNECT_TIMEOUT_SECONDS: int = 10
+    ELEVENLABS_READ_TIMEOUT_SECONDS: int = 30
+    ELEVENLABS_UPLOAD_TIMEOUT_SECONDS: int = 60
+    # Retry backoff and per-endpoint circuit breaker
+    ELEVENLABS_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    ELEVENLABS_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    ELEVENLABS_BREAKER_FAILURE_THRESHOLD: int = 5
+    ELEVENLABS_BREAKER_RESET_SECONDS: int = 30
+    # Read-through cache for agent / tool / voice / KB document lookups
+    ELEVENLABS_CACHE_ENABLED: bool = True
+    ELEVENLABS_CACHE_TTL_SECONDS: int = 300
+    ELEVENLABS_CACHE_DOC_STATUS_TTL_SECONDS: int = 10
+    ELEVENLABS_CACHE_MAX_ENTRIES: int = 2000
+    # On-disk cache of conversation recordings (LRU, bounded by total size)
+    AUDIO_CACHE_DIR: str = "uploads/audio_cache"
+    AUDIO_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    # Post-call webhook ingestion; unset secret = poll at session end instead
+    ELEVENLABS_WEBHOOK_SECRET: str = os.getenv("ELEVENLABS_WEBHOOK_SECRET")
+    ELEVENLABS_WEBHOOK_TOLERANCE_SECONDS: int = 1800
+    ELEVENLABS_INGEST_FALLBACK_AFTER_SECONDS: int = 120
+    ELEVENLABS_INGEST_SWEEP_INTERVAL_SECONDS: int = 60
+    ELEVENLABS_INGEST_MAX_ATTEMPTS: int = 10
+    # Reconciler: lists each agent's conversations past its high-water mark
+    ELEVENLABS_RECONCILE_INTERVAL_SECONDS: int = 300
+    ELEVENLABS_RECONCILE_LOOKBACK_SECONDS: int = 86400
+    ELEVENLABS_RECONCILE_PAGE_SIZE: int = 100
+    ELEVENLABS_RECONCILE_CONCURRENCY: int = 4
+    ELEVENLABS_RECONCILE_AGENTS_PER_BATCH: int = 20
+    ELEVENLABS_RECONCILE_STALE_SECONDS: int = 6 * 3600
+    # Debounced KB / tool sync of agents to ElevenLabs
+    AGENT_SYNC_DEBOUNCE_SECONDS: float = 1.0
+    AGENT_SYNC_MAX_DELAY_SECONDS: float = 5.0
+    AGENT_SYNC_MAX_ATTEMPTS: int = 4
+    AGENT_SYNC_RETRY_BASE_SECONDS: float = 2.0
+    # Outbox worker for ElevenLabs mutations (async-mode endpoints)
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 20
+    OUTBOX_CONCURRENCY: int = 4
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: float = 2.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 300.0
+    OUTBOX_LEASE_SECONDS: int = 120
+    # Uploaded file storage: "local" (sharded under STORAGE_LOCAL_ROOT) or "s3"
+    STORAGE_BACKEND: str = "local"
+    STORAGE_LOCAL_ROOT: str = "uploads"
+    STORAGE_S3_BUCKET: str = ""
+    STORAGE_S3_ENDPOINT_URL: str = ""  # MinIO / S3-compatible stand-in; empty = AWS
+    STORAGE_S3_REGION: str = ""
+    STORAGE_S3_ACCESS_KEY_ID: str = ""  # empty = boto3's default credential chain
+    STORAGE_S3_SECRET_ACCESS_KEY: str = ""
+    STORAGE_ORPHAN_GRACE_SECONDS: int = 86400
+    # release_file() keeps a file this recently committed: an upload of the same bytes may not have its row yet
+    STORAGE_RELEASE_GRACE_SECONDS: int = 3600
+    # Voice clone samples: mono, resampled, silence-trimmed, loudness-normalized
+    VOICE_PREPROCESS_ENABLED: bool = True
+    VOICE_PREPROCESS_WORKERS: int = 1
+    VOICE_PREPROCESS_TIMEOUT_SECONDS: float = 60.0
+    VOICE_PREPROCESS_SAMPLE_RATE: int = 24000
+    VOICE_PREPROCESS_SILENCE_DBFS: float = -45.0
+    VOICE_PREPROCESS_PAD_MS: int = 150
+    VOICE_PREPROCESS_TARGET_DBFS: float = -20.0
+    VOICE_PREPROCESS_PEAK_DBFS: float = -1.0
+    VOICE_PREPROCESS_MAX_GAIN_DB: float = 20.0
+    VOICE_PREPROCESS_BITRATE: str = "96k"
+    FFMPEG_BINARY: str = "ffmpeg"
+    # Cached voice preview clips (fetched or synthesized once, served locally)
+    VOICE_PREVIEW_ENABLED: bool = True
+    VOICE_PREVIEW_TEXT: str = "Hi, I'm {voice_name}. This is how I sound when I talk to your customers."
+    VOICE_PREVIEW_MODEL_ID: str = "eleven_flash_v2_5"
+    VOICE_PREVIEW_OUTPUT_FORMAT: str = "mp3_22050_32"
+    VOICE_PREVIEW_MAX_BYTES: int = 2 * 1024 * 1024
+    VOICE_PREVIEW_CONCURRENCY: int = 2
+    VOICE_PREVIEW_BATCH_SIZE: int = 10
+    VOICE_PREVIEW_POLL_INTERVAL_SECONDS: float = 5.0
+    VOICE_PREVIEW_SWEEP_INTERVAL_SECONDS: int = 600
+    VOICE_PREVIEW_MAX_ATTEMPTS: int = 5
+    VOICE_PREVIEW_RETRY_BASE_SECONDS: float = 30.0
+    VOICE_PREVIEW_RETRY_MAX_SECONDS: float = 3600.0
+    VOICE_PREVIEW_LEASE_SECONDS: int = 120
+    VOICE_PREVIEW_CACHE_MAX_AGE: int = 365 * 86400
+    # Preview URLs are signed and expire after one to two of these windows (constant within a window, so browsers cache them)
+    VOICE_PREVIEW_URL_TTL_SECONDS: int = 7 * 86400
+    # Voice list: in-process cache of the global voices, keyset-paginated pages
+    VOICE_CATALOG_CHECK_SECONDS: float = 10.0
+    VOICE_CATALOG_MAX_PAGE_SIZE: int = 100
+    # Knowledge base file uploads (streamed to disk, pushed in parallel)
+    KB_UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    KB_UPLOAD_CONCURRENCY: int = 4
+    # Text extraction of uploaded documents (process pool; OCR for scanned PDF pages)
+    KB_EXTRACT_WORKERS: int = 2
+    KB_EXTRACT_TIMEOUT_SECONDS: float = 120.0
+    KB_EXTRACT_OCR_MIN_CHARS: int = 20
+    KB_EXTRACT_OCR_DPI: int = 200
+    KB_EXTRACT_MAX_OCR_PAGES: int = 50
+    KB_MAX_DOCUMENT_TOKENS: int = 0  # 0 = no limit
+    # URL title / metadata lookups for knowledge base URLs
+    URL_SCRAPE_TIMEOUT_SECONDS: float = 10.0
+    URL_SCRAPE_MAX_BYTES: int = 256 * 1024
+    URL_SCRAPE_MAX_REDIRECTS: int = 5
+    URL_SCRAPE_CONCURRENCY: int = 8
+    URL_SCRAPE_CACHE_TTL_SECONDS: int = 3600
+    URL_SCRAPE_ERROR_TTL_SECONDS: int = 60
+    URL_SCRAPE_CACHE_MAX_ENTRIES: int = 2048
+    # Bulk URL / sitemap knowledge base imports
+    KB_BULK_MAX_URLS: int = 500
+    KB_BULK_MAX_SITEMAPS: int = 20  # sitemap index fan-out
+    KB_BULK_MAX_SITEMAP_BYTES: int = 10 * 1024 * 1024
+    KB_BULK_PER_HOST_CONCURRENCY: int = 2
+    KB_BULK_SUBMIT_CONCURRENCY: int = 4
+    KB_BULK_BATCH_SIZE: int = 25
+    KB_BULK_JOB_CONCURRENCY: int = 2
+    KB_BULK_POLL_INTERVAL_SECONDS: float = 2.0
+    KB_BULK_LEASE_SECONDS: int = 300
+    # Background RAG indexing of knowledge base documents
+    KB_INDEX_POLL_INTERVAL_SECONDS: float = 2.0
+    KB_INDEX_BATCH_SIZE: int = 20
+    KB_INDEX_CONCURRENCY: int = 4
+    KB_INDEX_RETRY_BASE_SECONDS: float = 2.0
+    KB_INDEX_RETRY_MAX_SECONDS: float = 60.0
+    KB_INDEX_MAX_ATTEMPTS: int = 40
+    KB_INDEX_LEASE_SECONDS: int = 120
 
     # Frontend Configuration
     FRONTEND_URL: str = os.getenv("FRONTEND_URL")
@@ -16,7 +16,7 @@ from app_v2.core.config import VoiceSettings
 # ============================================================================
 
 ELEVENLABS_API_KEY = VoiceSettings.ELEVENLABS_API_KEY
-BASE_URL = "https://api.elevenlabs.io/v1"
+BASE_URL = VoiceSettings.ELEVENLABS_BASE_URL.rstrip("/")
 
 # ============================================================================
 # Default Configuration
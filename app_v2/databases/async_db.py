@@ -0,0 +1,113 @@
+"""
+Async database access for the latency-sensitive async paths.
+
+The rest of the app keeps using the sync engine through fastapi_sqlalchemy's
+``with db():`` blocks. Code running directly on the event loop (websocket
+bridges, webhooks, the public API auth dependency) uses this module instead,
+so a slow query no longer parks the loop and stalls every other call on the
+worker.
+
+Both engines point at the same database and share the same models, so the
+two styles can be mixed freely while call sites migrate one by one.
+
+Usage:
+
+    async with async_db() as session:
+        agent = await session.scalar(select(AgentModel).where(...))
+        await session.commit()
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.engine import async_engine_kwargs, register_pool
+
+logger = setup_logger(__name__)
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def _to_async_url(url: str) -> str:
+    """
+    Rewrite a sync Postgres URL (psycopg2 / bare postgres://) to asyncpg.
+    asyncpg does not understand libpq's ``sslmode`` query param, so it is
+    translated to the ``ssl`` argument the asyncpg dialect expects.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+    parsed = parsed.set(query=query)
+
+    return parsed.render_as_string(hide_password=False)
+
+
+def init_async_engine() -> AsyncEngine:
+    """Create the async engine and session factory. Safe to call twice."""
+    global async_engine, AsyncSessionLocal
+
+    if async_engine is None:
+        kwargs, metrics = async_engine_kwargs("async")
+        async_engine = create_async_engine(_to_async_url(VoiceSettings.DB_URL), **kwargs)
+        register_pool("async", async_engine.sync_engine, metrics)
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        logger.info("Async database engine initialised")
+    return async_engine
+
+
+async def dispose_async_engine() -> None:
+    """Close all pooled async connections. Called on app shutdown."""
+    global async_engine, AsyncSessionLocal
+
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+        AsyncSessionLocal = None
+        logger.info("Async database engine disposed")
+
+
+@asynccontextmanager
+async def async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Async counterpart of ``with db():``. Yields a session that is rolled back
+    on error and always closed. Commits are explicit, as with the sync session.
+    """
+    if AsyncSessionLocal is None:
+        init_async_engine()
+
+    session: AsyncSession = AsyncSessionLocal()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding an AsyncSession for the request."""
+    async with async_db() as session:
+        yield session
@@ -0,0 +1,279 @@
+"""
+Single source of truth for SQLAlchemy engines.
+
+Every sync engine in the process (the request middleware, models.engine,
+background workers) comes from get_engine(), and the async engine in
+async_db uses the same settings via async_engine_kwargs(). Cron and
+maintenance scripts use get_script_engine(), which differs only in its
+pool size and DB_SCRIPT_STATEMENT_TIMEOUT_MS. Pool
+size, overflow, checkout timeout, recycle and the server-side statement
+timeout are all driven by the DB_* settings in app_v2/core/config.py.
+
+Pools are instrumented: every checkout records how long the caller waited
+for a connection, plus the pool's in-use count and peak. Waits longer than
+DB_SLOW_CHECKOUT_MS are logged as warnings. pool_stats() returns a snapshot
+for the admin diagnostics route.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, exc as sa_exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Upper bounds (ms) of the checkout-wait histogram buckets; the last bucket is +Inf.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Checkout-wait histogram and usage counters for one pool."""
+
+    def __init__(self, name: str, slow_checkout_ms: int):
+        self.name = name
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+
+    def record_checkout(self, wait_ms: float, in_use: int) -> None:
+        index = len(WAIT_BUCKETS_MS)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            slow = wait_ms >= self.slow_checkout_ms
+            if slow:
+                self.slow_checkouts += 1
+
+        if slow:
+            logger.warning(
+                f"Slow DB connection checkout on '{self.name}' pool: "
+                f"waited {wait_ms:.1f} ms ({in_use} connections in use)"
+            )
+
+    def record_timeout(self, wait_ms: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+        logger.error(f"DB connection checkout timed out on '{self.name}' pool after {wait_ms:.0f} ms")
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            histogram = {
+                f"le_{bound}ms": count
+                for bound, count in zip(WAIT_BUCKETS_MS, self.bucket_counts)
+            }
+            histogram["le_inf"] = self.bucket_counts[-1]
+            data = {
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 2) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 2),
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "peak_in_use": self.peak_in_use,
+                "wait_histogram": histogram,
+            }
+
+        data.update({
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": getattr(pool, "_max_overflow", None),
+        })
+        return data
+
+
+class _TimedPoolMixin:
+    """
+    Times QueuePool._do_get, the call that blocks when the pool is exhausted.
+    The metrics object is a class attribute so it survives pool.recreate(),
+    which rebuilds the pool through self.__class__ on engine.dispose().
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.metrics.record_timeout((time.perf_counter() - start) * 1000)
+            raise
+        self.metrics.record_checkout((time.perf_counter() - start) * 1000, self.checkedout())
+        return conn
+
+
+_metrics_registry: Dict[str, tuple] = {}
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_script_engine: Optional[Engine] = None
+_script_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+
+def _timed_pool_class(name: str, base):
+    metrics = PoolMetrics(name, VoiceSettings.DB_SLOW_CHECKOUT_MS)
+    pool_class = type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"metrics": metrics})
+    return pool_class, metrics
+
+
+def _pool_kwargs(pool_size: Optional[int], max_overflow: Optional[int]) -> dict:
+    return {
+        "pool_pre_ping": True,
+        "pool_size": VoiceSettings.DB_POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": VoiceSettings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_timeout": VoiceSettings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": VoiceSettings.DB_POOL_RECYCLE_SECONDS,
+    }
+
+
+def engine_kwargs(
+    name: str = "sync",
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+) -> tuple:
+    """
+    create_engine() arguments for a psycopg2 engine with an instrumented pool.
+    statement_timeout_ms defaults to DB_STATEMENT_TIMEOUT_MS (0 = no limit).
+    Returns (kwargs, PoolMetrics).
+    """
+    pool_class, metrics = _timed_pool_class(name, QueuePool)
+    kwargs = _pool_kwargs(pool_size, max_overflow)
+    kwargs["poolclass"] = pool_class
+
+    timeout_ms = VoiceSettings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    if timeout_ms > 0:
+        kwargs["connect_args"] = {
+            "options": f"-c statement_timeout={timeout_ms}"
+        }
+    return kwargs, metrics
+
+
+def async_engine_kwargs(name: str = "async") -> tuple:
+    """
+    create_async_engine() arguments for an asyncpg engine with an instrumented
+    pool. Returns (kwargs, PoolMetrics).
+    """
+    pool_class, metrics = _timed_pool_class(name, AsyncAdaptedQueuePool)
+    kwargs = _pool_kwargs(None, None)
+    kwargs["poolclass"] = pool_class
+
+    if VoiceSettings.DB_STATEMENT_TIMEOUT_MS > 0:
+        kwargs["connect_args"] = {
+            "server_settings": {"statement_timeout": str(VoiceSettings.DB_STATEMENT_TIMEOUT_MS)}
+        }
+    return kwargs, metrics
+
+
+def register_pool(name: str, engine, metrics: PoolMetrics) -> None:
+    """Make an engine's pool visible in pool_stats()."""
+    _metrics_registry[name] = (engine, metrics)
+
+
+def create_db_engine(
+    name: str = "sync",
+    url: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+) -> Engine:
+    """
+    Build a new instrumented engine. Most code should use get_engine();
+    this is for processes that need a differently sized pool or statement
+    timeout.
+    """
+    kwargs, metrics = engine_kwargs(name, pool_size, max_overflow, statement_timeout_ms)
+    timeout_ms = VoiceSettings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    engine = create_engine(url or VoiceSettings.DB_URL, **kwargs)
+    register_pool(name, engine, metrics)
+
+    url_obj = make_url(url or VoiceSettings.DB_URL)
+    logger.info(
+        f"DB engine '{name}' created for {url_obj.host}/{url_obj.database} "
+        f"(pool_size={kwargs['pool_size']}, max_overflow={kwargs['max_overflow']}, "
+        f"timeout={kwargs['pool_timeout']}s, recycle={kwargs['pool_recycle']}s, "
+        f"statement_timeout={timeout_ms}ms)"
+    )
+    return engine
+
+
+def get_engine() -> Engine:
+    """The process-wide sync engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine("sync")
+    return _engine
+
+
+def get_session_factory() -> sessionmaker:
+    """sessionmaker bound to the shared engine, for workers."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(bind=get_engine())
+    return _session_factory
+
+
+def get_script_engine() -> Engine:
+    """
+    Engine for cron and maintenance scripts: a small pool with
+    DB_SCRIPT_STATEMENT_TIMEOUT_MS (0 = no limit) instead of the request-sized
+    DB_STATEMENT_TIMEOUT_MS, so long backfills and cleanups are not cancelled.
+    """
+    global _script_engine
+    if _script_engine is None:
+        with _engine_lock:
+            if _script_engine is None:
+                _script_engine = create_db_engine(
+                    "script",
+                    pool_size=1,
+                    max_overflow=2,
+                    statement_timeout_ms=VoiceSettings.DB_SCRIPT_STATEMENT_TIMEOUT_MS,
+                )
+    return _script_engine
+
+
+def get_script_session_factory() -> sessionmaker:
+    """sessionmaker bound to get_script_engine(), for cron and maintenance scripts."""
+    global _script_session_factory
+    if _script_session_factory is None:
+        _script_session_factory = sessionmaker(bind=get_script_engine())
+    return _script_session_factory
+
+
+def pool_stats() -> dict:
+    """Snapshot of every registered pool's telemetry."""
+    return {
+        name: metrics.snapshot(engine.pool)
+        for name, (engine, metrics) in _metrics_registry.items()
+    }
+
+
+def reset_pool_stats() -> None:
+    for _, metrics in _metrics_registry.values():
+        metrics.reset()
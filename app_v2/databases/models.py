@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Table, create_engine, Enum, Text, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Table, Enum, Text, Index, UniqueConstraint, LargeBinary, BigInteger
 from sqlalchemy.orm import relationship,Mapped,mapped_column
 from app_v2.schemas.enum_types import RequestMethodEnum, GenderEnum, PhoneNumberAssignStatus,ChannelEnum,CallStatusEnum, WidgetPosition, BillingPeriodEnum, PlanIconEnum, PaymentProviderEnum, SubscriptionStatusEnum, PaymentStatusEnum, PaymentTypeEnum, CoinTransactionTypeEnum, ScheduledDowngradeStatusEnum, ScheduledDowngradeTriggerEnum
 from sqlalchemy.sql import func
@@ -11,12 +11,13 @@ import bcrypt
 import os
 from datetime import datetime, timezone, timezone
 from app_v2.core.config import VoiceSettings
+from app_v2.databases.engine import get_engine
 import uuid
 
 
 # Database configuration
 DB_URL = VoiceSettings.DB_URL
-engine = create_engine(DB_URL, pool_pre_ping=True)
+engine = get_engine()
 Base = declarative_base()
 
 class UserModel(Base):
@@ -140,6 +141,8 @@ class UnifiedAuthModel(Base):
     google_user_id = Column(String, nullable=True, default="")
     is_suspended = Column(Boolean, default=False,server_default="false")
     suspension_reason = Column(String, nullable=True)
+    # Bumped on "logout everywhere"; tokens carrying an older "gen" claim are rejected
+    token_generation = Column(Integer, default=0, server_default="0", nullable=False)
     last_login = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
@@ -227,6 +230,17 @@ class TokensToConsume(Base):
 
 class VoiceModel(Base):
     __tablename__ = "custom_voices"
+    __table_args__ = (
+        # Keyset pages of a user's voices (app_v2/utils/voice_catalog.py)
+        Index("ix_custom_voices_user_id_id", "user_id", "id"),
+        # ILIKE '%name%' search; needs pg_trgm, which migrations/env.py creates
+        Index(
+            "ix_custom_voices_voice_name_trgm",
+            "voice_name",
+            postgresql_using="gin",
+            postgresql_ops={"voice_name": "gin_trgm_ops"},
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     voice_name = Column(String, nullable=False)
     is_custom_voice = Column(Boolean, default=False)
@@ -241,6 +255,38 @@ class VoiceModel(Base):
     user = relationship("UnifiedAuthModel", back_populates="voices")
     agents = relationship("AgentModel",back_populates="voice")
     traits = relationship("VoiceTraitsModel", back_populates="voice", uselist=False, cascade="all, delete-orphan")
+    preview = relationship("VoicePreviewModel", back_populates="voice", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+
+
+class VoicePreviewModel(Base):
+    """
+    Cached preview clip of a voice (app_v2/utils/voice_previews.py).
+
+    One row per voice, generated or fetched once by the preview worker and
+    served from file storage. fingerprint hashes everything the clip depends
+    on; a row whose fingerprint no longer matches its voice is stale and is
+    re-queued. etag is the sha256 of the stored clip.
+    """
+    __tablename__ = "voice_previews"
+    __table_args__ = (
+        Index("ix_voice_previews_due", "status", "next_attempt_at"),
+    )
+
+    voice_id: Mapped[int] = mapped_column(Integer, ForeignKey("custom_voices.id", ondelete="CASCADE"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    # pending | ready | failed
+    fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    file_path: Mapped[str | None] = mapped_column(String, nullable=True)  # file_storage ref
+    etag: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    content_type: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    size_bytes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    source: Mapped[str | None] = mapped_column(String(20), nullable=True)  # elevenlabs_preview | tts
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    generated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    voice = relationship("VoiceModel", back_populates="preview")
 
 
 
@@ -260,6 +306,13 @@ class AgentModel(Base):
     modified_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     built_in_tools: Mapped[dict] = mapped_column(MutableDict.as_mutable(JSONB), nullable=True, default={})
     is_enabled: Mapped[bool] = mapped_column(Boolean, default=True,server_default="true")
+    # ElevenLabs KB/tool sync (see app_v2/utils/agent_sync.py)
+    elevenlabs_sync_status: Mapped[str] = mapped_column(String(20), nullable=False, default="synced", server_default="synced")
+    # synced | pending | failed
+    elevenlabs_sync_state: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # last pushed tool_ids / knowledge_base
+    elevenlabs_sync_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")  # bumped on each sync_state write
+    elevenlabs_sync_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    elevenlabs_synced_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     
     user = relationship("UnifiedAuthModel",back_populates="agents")
 
@@ -427,8 +480,18 @@ class KnowledgeBaseModel(Base):
     content_path: Mapped[str] = mapped_column(String, nullable=True) # file path or url
     content_text: Mapped[str] = mapped_column(Text, nullable=True) # for text type
     file_size: Mapped[float] = mapped_column(Float, nullable=True)
+    content_sha256: Mapped[str] = mapped_column(String(64), nullable=True, index=True) # file content hash, for dedup
+    extracted_text: Mapped[bytes] = mapped_column(LargeBinary, nullable=True, deferred=True) # zlib-compressed file text
+    page_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    extraction_stats: Mapped[dict | None] = mapped_column(JSONB, nullable=True) # pages, OCR pages, per-stage timings
     elevenlabs_document_id: Mapped[str] = mapped_column(String, nullable=True, index=True)
     rag_index_id: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    # RAG indexing (kb_indexer): pending / indexing / ready / failed; NULL for entries indexed inline
+    indexing_status: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    indexing_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    indexing_next_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    indexing_error: Mapped[str] = mapped_column(Text, nullable=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     modified_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -541,6 +604,153 @@ class ConversationsModel(Base):
     agent = relationship("AgentModel",back_populates="conversations")
     user = relationship("UnifiedAuthModel",back_populates="conversations")
     lead = relationship("WebAgentLeadModel", back_populates="conversation", uselist=False)
+    transcript_record = relationship("ConversationTranscriptModel", back_populates="conversation", uselist=False, cascade="all, delete-orphan")
+
+
+class ConversationTranscriptModel(Base):
+    """
+    Full transcript captured at ingest so conversation details never go back
+    to ElevenLabs. The message list (with tool calls/results and RAG info) is
+    stored gzip-compressed JSON; the analysis block is small and kept as JSONB.
+    """
+    __tablename__ = "conversation_transcripts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    conversation_id: Mapped[int] = mapped_column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    elevenlabs_conv_id: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    encoding: Mapped[str] = mapped_column(String(16), nullable=False, default="gzip")
+    transcript: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    raw_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    analysis: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    conversation = relationship("ConversationsModel", back_populates="transcript_record")
+
+
+class ConversationIngestModel(Base):
+    """
+    One row per ElevenLabs conversation we expect to bill.
+
+    Written when a session ends (with the channel / lead / billing context
+    only the session knows) or by the first post-call webhook for a
+    conversation nobody registered. status moves pending → ingested exactly
+    once; the row is locked while ingesting so the webhook and the fallback
+    poller cannot both create the conversation.
+    """
+    __tablename__ = "conversation_ingests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    elevenlabs_conv_id: Mapped[str] = mapped_column(String, nullable=False, unique=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("unified_auth.id", ondelete="CASCADE"), nullable=False, index=True)
+    agent_id: Mapped[int] = mapped_column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
+    channel: Mapped[ChannelEnum] = mapped_column(Enum(ChannelEnum), nullable=True)
+    reference_type: Mapped[str] = mapped_column(String(50), nullable=False, default="conversation")
+    force_debit: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    lead_id: Mapped[int] = mapped_column(Integer, ForeignKey("web_agent_leads.id", ondelete="SET NULL"), nullable=True)
+    context: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending", index=True)
+    # pending | ingested | failed
+    source: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # webhook | poll | reconcile
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    conversation_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    last_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    ingested_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ConversationSyncCursorModel(Base):
+    """
+    Per-agent high-water mark for the conversation reconciler.
+
+    high_water_mark is a call start time (unix seconds): every conversation
+    of this agent that started before it has been seen in a terminal state
+    and ingested. next_run_at doubles as a lease so several workers can
+    reconcile without scanning the same agent.
+    """
+    __tablename__ = "conversation_sync_cursors"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    agent_id: Mapped[int] = mapped_column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False, unique=True)
+    high_water_mark: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    next_run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True, default=lambda: datetime.now(timezone.utc))
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_ingested: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class ElevenLabsOutboxModel(Base):
+    """
+    Transactional outbox of ElevenLabs mutations.
+
+    Rows are added in the same transaction as the local change and drained
+    by the outbox worker (app_v2/utils/outbox.py), oldest first and one at a
+    time per (resource_type, resource_id). Failed rows are retried with
+    backoff until max attempts, then left as "dead" for an admin to retry.
+    Also the status resource behind async-mode 202 responses.
+    """
+    __tablename__ = "elevenlabs_outbox"
+    __table_args__ = (
+        Index("ix_elevenlabs_outbox_resource", "resource_type", "resource_id", "id"),
+        Index("ix_elevenlabs_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("unified_auth.id", ondelete="SET NULL"), nullable=True, index=True)
+    resource_type: Mapped[str] = mapped_column(String(30), nullable=False)  # agent | tool | kb_document
+    resource_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    operation: Mapped[str] = mapped_column(String(30), nullable=False)  # create | update | delete
+    payload: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    # pending | processing | done | dead
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class KBIngestJobModel(Base):
+    """
+    Bulk URL / sitemap knowledge base import (app_v2/utils/kb_bulk_ingest.py).
+
+    Created by the bulk endpoints and worked on by the ingest worker, which
+    leases it through locked_until; the row is also the job resource that
+    clients poll for progress. results maps each URL to its outcome.
+    """
+    __tablename__ = "kb_ingest_jobs"
+    __table_args__ = (
+        Index("ix_kb_ingest_jobs_due", "status", "locked_until"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("unified_auth.id", ondelete="CASCADE"), nullable=False, index=True)
+    agent_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("agents.id", ondelete="SET NULL"), nullable=True)
+    sitemap_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    urls: Mapped[list | None] = mapped_column(JSONB, nullable=True)  # normalized, deduplicated
+    results: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # url -> {status, kb_id, title, error}
+
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    # queued | running | done | failed
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    succeeded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
 
 class WebAgentModel(Base):
     __tablename__ = "web_agents"
@@ -1035,4 +1245,24 @@ class ScheduledDowngradeModel(Base):
     executed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Relationships
-    user = relationship("UnifiedAuthModel", back_populates="scheduled_downgrades")
\ No newline at end of file
+    user = relationship("UnifiedAuthModel", back_populates="scheduled_downgrades")
+
+
+class RevokedTokenModel(Base):
+    """
+    Denylist of revoked JWTs, keyed by their jti claim.
+
+    • Rows are only needed until the token would have expired anyway, so
+      expires_at is indexed and purged by scripts/cron/cleanup_revoked_tokens.py.
+    • Hot-path checks go through the in-process filter in
+      app_v2.utils.token_revocation; this table is the source of truth.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    jti: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("unified_auth.id", ondelete="CASCADE"), nullable=True, index=True)
+    token_type: Mapped[str] = mapped_column(String(20), nullable=False, default="refresh")
+    # "access" | "refresh"
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
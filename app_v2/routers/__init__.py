@@ -7,7 +7,7 @@ from app_v2.routers.profile import router as profile_router
 from .agents import router as agent_router
 from .ai_model import router as ai_model_router
 from .language import router as lang_router
-from .voice import router as voice_router
+from .voice import router as voice_router, public_router as voice_public_router
 from .functions import router as function_router
 from .knowledge_base import router as knowledge_base_router
 from .phone_router import router as phone_router
@@ -20,5 +20,5 @@ from .admin_dashboard import router as admin_dashboard_router
 from .subscriptions import router as subscription_router
 from .coin_purchase import router as coin_purchase_router
 from .payment_insights import router as payment_insights_router
-__all__ = ['otp_router', 'health_router', 'google_auth_router', 'profile_router', "agent_router", "ai_model_router", "lang_router", "voice_router", "function_router", "knowledge_base_router", "phone_router", "web_agent_router", "websocket_router","conversation_router","web_agent_config_router", "user_dashboard_router","admin_dashboard_router", "subscription_router", "coin_purchase_router", "payment_insights_router"]
+__all__ = ['otp_router', 'health_router', 'google_auth_router', 'profile_router', "agent_router", "ai_model_router", "lang_router", "voice_router", "voice_public_router", "function_router", "knowledge_base_router", "phone_router", "web_agent_router", "websocket_router","conversation_router","web_agent_config_router", "user_dashboard_router","admin_dashboard_router", "subscription_router", "coin_purchase_router", "payment_insights_router"]
 
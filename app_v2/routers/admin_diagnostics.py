@@ -0,0 +1,246 @@
+"""Admin-only runtime diagnostics (database pools, profiling, event loop, ElevenLabs, reconciler, outbox, KB indexer)."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app_v2.constants import HTTP_200_OK, STATUS_SUCCESS
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.engine import pool_stats, reset_pool_stats
+from app_v2.utils.agent_sync import agent_sync
+from app_v2.utils.conversation_reconciler import reconciler_stats
+from app_v2.utils.elevenlabs.cache import response_cache
+from app_v2.utils.elevenlabs.resilience import breakers
+from app_v2.utils.jwt_utils import HTTPBearer, is_admin
+from app_v2.utils.loop_monitor import loop_monitor
+from app_v2.utils.outbox import operation_status, outbox_worker, requeue_dead
+from app_v2.utils.kb_indexer import kb_indexer
+from app_v2.utils.kb_bulk_ingest import kb_ingest_worker
+from app_v2.utils.voice_catalog import voice_catalog
+from app_v2.utils.voice_previews import voice_preview_worker
+from app_v2.utils.sql_profiler import is_sql_profiler_enabled, profile_history
+
+logger = setup_logger(__name__)
+security = HTTPBearer()
+router = APIRouter(
+    prefix="/api/v2/admin/diagnostics",
+    tags=["Admin Diagnostics"],
+    dependencies=[Depends(security), Depends(is_admin)],
+)
+
+
+@router.get("/db-pool", openapi_extra={"security": [{"BearerAuth": []}]})
+def get_db_pool_stats():
+    """
+    Connection pool telemetry for every engine in this worker: checkout-wait
+    histogram, in-use / peak / overflow gauges, slow checkouts and timeouts.
+    Numbers are per process; with several workers, query each one.
+    """
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Database pool stats fetched successfully",
+        "data": {
+            "config": {
+                "pool_size": VoiceSettings.DB_POOL_SIZE,
+                "max_overflow": VoiceSettings.DB_MAX_OVERFLOW,
+                "pool_timeout_seconds": VoiceSettings.DB_POOL_TIMEOUT_SECONDS,
+                "pool_recycle_seconds": VoiceSettings.DB_POOL_RECYCLE_SECONDS,
+                "statement_timeout_ms": VoiceSettings.DB_STATEMENT_TIMEOUT_MS,
+                "slow_checkout_ms": VoiceSettings.DB_SLOW_CHECKOUT_MS,
+            },
+            "pools": pool_stats(),
+        },
+    }
+
+
+@router.post("/db-pool/reset", openapi_extra={"security": [{"BearerAuth": []}]})
+def reset_db_pool_stats():
+    """Zero the pool counters, e.g. before a load test."""
+    reset_pool_stats()
+    logger.info("DB pool stats reset")
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Database pool stats reset",
+    }
+
+
+@router.get("/sql-profile", openapi_extra={"security": [{"BearerAuth": []}]})
+def get_sql_profile(limit: int = Query(20, ge=1, le=100)):
+    """
+    Slowest endpoints and statements over the last SQL_PROFILER_HISTORY
+    requests on this worker, plus repeated-statement (N+1) suspects.
+    Empty unless SQL_PROFILER_ENABLED is set.
+    """
+    enabled = is_sql_profiler_enabled()
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "SQL profile fetched successfully" if enabled else "SQL profiler is disabled",
+        "data": {
+            "enabled": enabled,
+            "n_plus_one_threshold": VoiceSettings.SQL_PROFILER_N_PLUS_ONE_THRESHOLD,
+            **profile_history.summary(limit),
+        },
+    }
+
+
+@router.post("/sql-profile/reset", openapi_extra={"security": [{"BearerAuth": []}]})
+def reset_sql_profile():
+    """Drop the recorded request history."""
+    profile_history.clear()
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "SQL profile history cleared",
+    }
+
+
+@router.get("/event-loop", openapi_extra={"security": [{"BearerAuth": []}]})
+def get_event_loop_stats(limit: int = Query(10, ge=1, le=50)):
+    """
+    Event-loop lag on this worker and the call sites that blocked it the
+    most, each with the route/websocket it ran under and a sample stack.
+    """
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Event loop stats fetched successfully",
+        "data": loop_monitor.stats(limit),
+    }
+
+
+@router.post("/event-loop/reset", openapi_extra={"security": [{"BearerAuth": []}]})
+def reset_event_loop_stats():
+    """Zero the lag counters and offender table."""
+    loop_monitor.reset()
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Event loop stats reset",
+    }
+
+
+@router.get("/elevenlabs", openapi_extra={"security": [{"BearerAuth": []}]})
+def get_elevenlabs_stats():
+    """
+    Per-endpoint ElevenLabs circuit breaker state, retry and short-circuit
+    counts, response status breakdown, read-through cache hit/miss stats
+    and agent KB/tool sync coalescing for this worker.
+    """
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "ElevenLabs client stats fetched successfully",
+        "data": {**breakers.stats(), "cache": response_cache.stats(), "agent_sync": agent_sync.stats()},
+    }
+
+
+@router.post("/elevenlabs/reset", openapi_extra={"security": [{"BearerAuth": []}]})
+def reset_elevenlabs_stats():
+    """Zero the ElevenLabs counters (breaker states and cached entries are kept)."""
+    breakers.reset()
+    response_cache.reset_stats()
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "ElevenLabs client stats reset",
+    }
+
+
+@router.get("/reconciler", openapi_extra={"security": [{"BearerAuth": []}]})
+def get_reconciler_stats():
+    """
+    Conversation reconciler throughput (listed/s, ingested/min), ingest lag
+    from call end, and how far each agent's high-water mark trails now,
+    for recent passes on this worker.
+    """
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Reconciler stats fetched successfully",
+        "data": reconciler_stats.stats(),
+    }
+
+
+@router.post("/reconciler/reset", openapi_extra={"security": [{"BearerAuth": []}]})
+def reset_reconciler_stats():
+    """Drop the recorded passes and lag table (cursors are kept)."""
+    reconciler_stats.reset()
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Reconciler stats reset",
+    }
+
+
+@router.get("/outbox", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_outbox_stats():
+    """
+    ElevenLabs outbox: rows by status, age of the oldest unfinished row, and
+    this worker's batch / success / retry / dead-letter / coalesce counters.
+    """
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Outbox stats fetched successfully",
+        "data": await outbox_worker.stats(),
+    }
+
+
+@router.post("/outbox/{operation_id}/retry", openapi_extra={"security": [{"BearerAuth": []}]})
+async def retry_outbox_operation(operation_id: int):
+    """Put a dead-lettered outbox row back in the queue with fresh attempts."""
+    entry = await requeue_dead(operation_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No dead-lettered operation with this id")
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Operation re-queued",
+        "data": operation_status(entry),
+    }
+
+
+@router.get("/kb-indexer", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_kb_indexer_stats():
+    """Knowledge base RAG indexing: entries by indexing status and this worker's poll / ready / failed counters."""
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "KB indexer stats fetched successfully",
+        "data": await kb_indexer.stats(),
+    }
+
+
+@router.get("/kb-ingest", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_kb_ingest_stats():
+    """Bulk URL / sitemap knowledge base imports by job status."""
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "KB ingest stats fetched successfully",
+        "data": await kb_ingest_worker.stats(),
+    }
+
+
+@router.get("/voice-previews", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_voice_preview_stats():
+    """Cached voice preview clips by status, and what the worker fetched / generated."""
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Voice preview stats fetched successfully",
+        "data": await voice_preview_worker.stats(),
+    }
+
+
+@router.get("/voice-catalog", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_voice_catalog_stats():
+    """Cached global voice catalog: size, version and rebuilds."""
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Voice catalog stats fetched successfully",
+        "data": voice_catalog.stats(),
+    }
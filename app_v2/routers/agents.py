@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from fastapi_sqlalchemy import db
@@ -7,10 +7,14 @@ from app_v2.schemas.pagination import PaginatedResponse
 from app_v2.schemas.enum_types import PhoneNumberAssignStatus
 import math
 from app_v2.utils.llm_utils import generate_system_prompt_async
-from app_v2.utils.elevenlabs.agent_utils import ElevenLabsAgent
+from app_v2.utils.elevenlabs.agent_utils import AsyncElevenLabsAgent
+from app_v2.utils.kb_indexer import INDEX_READY
+from app_v2.utils.agent_sync import remember_pushed_state, schedule_agent_sync
+from app_v2.utils.outbox import OutboxDeadLetter, accepted_response, enqueue_outbox, has_unfinished_outbox, outbox_handler
 from app_v2.utils.feature_access import check_can_enable_resource
 
 from app_v2.utils.jwt_utils import HTTPBearer,require_active_user
+from app_v2.databases.async_db import async_db
 from app_v2.databases.models import (
     AdminTokenModel,
     VoiceTraitsModel,
@@ -219,6 +223,7 @@ def transform_built_in_tools(built_in_tools_params, session: Session, user_id: i
 )
 async def create_agent(
     agent_in: AgentCreate,
+    async_mode: bool = Query(False, description="Return 202 and create the ElevenLabs agent in the background"),
     current_user: UnifiedAuthModel = Depends(RequireFeature("ai_voice_agents")),
 ):
     user_id = current_user.id
@@ -355,6 +360,10 @@ async def create_agent(
         # 5. Construct ElevenLabs list in the original order using the map
         for kb_id in kb_ids_ordered:
             kb = kb_map[kb_id]
+            if kb.indexing_status not in (None, INDEX_READY):
+                continue  # attached by the agent sync once kb_indexer marks it ready
+            if any(entry["id"] == kb.elevenlabs_document_id for entry in el_kb_list):
+                continue  # identical content already attached through another entry
             el_kb_list.append({
                 "id": kb.elevenlabs_document_id,
                 "type": "file", # ElevenLabs conversational AI usually treats them as files
@@ -401,44 +410,47 @@ async def create_agent(
     # Create agent in ElevenLabs (only after validation)
     # -------------------------------------------------
     elevenlabs_agent_id = None
-    el_client = ElevenLabsAgent()
+    el_client = AsyncElevenLabsAgent()
+    el_create_params = {
+        "name": agent_in.agent_name,
+        "voice_id": voice.elevenlabs_voice_id,
+        "prompt": agent_in.system_prompt,
+        "first_message": agent_in.first_message or "Hello! How can I help you?",
+        "language": language.lang_code,
+        "llm_model": ai_model.model_name,
+        "tool_ids": el_tool_ids,
+        "knowledge_base": el_kb_list,
+        "dynamic_variables": agent_in.variables,
+        "built_in_tools": transform_built_in_tools(agent_in.built_in_tools, db.session, user_id),
+    }
+
+    # In async mode the outbox worker creates it once the agent row is committed
+    if not async_mode:
+        try:
+            logger.info(
+                f"Creating agent '{agent_in.agent_name}' in ElevenLabs for user {user_id}"
+            )
 
-    try:
-        logger.info(
-            f"Creating agent '{agent_in.agent_name}' in ElevenLabs for user {user_id}"
-        )
+            el_response = await el_client.create_agent(**el_create_params)
 
-        el_response = el_client.create_agent(
-            name=agent_in.agent_name,
-            voice_id=voice.elevenlabs_voice_id,
-            prompt=agent_in.system_prompt,
-            first_message=agent_in.first_message or "Hello! How can I help you?",
-            language=language.lang_code,
-            llm_model=ai_model.model_name,
-            tool_ids=el_tool_ids,
-            knowledge_base=el_kb_list,
-            dynamic_variables=agent_in.variables,
-            built_in_tools=transform_built_in_tools(agent_in.built_in_tools, db.session, user_id)
-        )
+            if not el_response.status:
+                raise HTTPException(
+                    status_code=424,
+                    detail=el_response.error_message or "Failed to create agent in ElevenLabs",
+                )
 
-        if not el_response.status:
+            elevenlabs_agent_id = el_response.data.get("agent_id")
+            logger.info(f"✅ ElevenLabs agent created: {elevenlabs_agent_id}")
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Unexpected ElevenLabs error")
             raise HTTPException(
                 status_code=424,
-                detail=el_response.error_message or "Failed to create agent in ElevenLabs",
+                detail=f"Unexpected error while creating agent in ElevenLabs {str(e)}",
             )
 
-        elevenlabs_agent_id = el_response.data.get("agent_id")
-        logger.info(f"✅ ElevenLabs agent created: {elevenlabs_agent_id}")
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception("Unexpected ElevenLabs error")
-        raise HTTPException(
-            status_code=424,
-            detail=f"Unexpected error while creating agent in ElevenLabs {str(e)}",
-        )
-
     # -------------------------------------------------
     # Database creation (atomic)
     # -------------------------------------------------
@@ -450,12 +462,19 @@ async def create_agent(
             user_id=user_id,
             agent_voice=voice.id,
             elevenlabs_agent_id=elevenlabs_agent_id,
-            built_in_tools=agent_in.built_in_tools.model_dump() if agent_in.built_in_tools else {}
+            built_in_tools=agent_in.built_in_tools.model_dump() if agent_in.built_in_tools else {},
+            elevenlabs_sync_state=None if async_mode else {"tool_ids": el_tool_ids, "knowledge_base": el_kb_list}
         )
 
         db.session.add(new_agent)
         db.session.flush()
 
+        outbox_entry = None
+        if async_mode:
+            outbox_entry = enqueue_outbox(
+                db.session, "agent", new_agent.id, "create", el_create_params, user_id=user_id
+            )
+
         # Bridge: AI Model
         db.session.add(
             AgentAIModelBridge(
@@ -504,7 +523,7 @@ async def create_agent(
         db.session.rollback()
         if elevenlabs_agent_id:
             try:
-                el_client.delete_agent(elevenlabs_agent_id)
+                await el_client.delete_agent(elevenlabs_agent_id)
                 logger.info(f"Cleaned up ElevenLabs agent {elevenlabs_agent_id} after DB failure")
             except Exception as cleanup_err:
                 logger.warning(f"Failed to delete orphan ElevenLabs agent {elevenlabs_agent_id}: {cleanup_err}")
@@ -513,6 +532,13 @@ async def create_agent(
             detail=f"Failed to save agent: {str(db_error)}",
         )
 
+    if outbox_entry is not None:
+        return accepted_response(
+            outbox_entry,
+            "Agent saved; ElevenLabs creation queued",
+            f"/api/v2/operations/{outbox_entry.id}",
+            {"agent": agent_to_read(new_agent)},
+        )
     return agent_to_read(new_agent)
 
 # -------------------- GET ALL --------------------
@@ -624,6 +650,7 @@ async def get_agent_by_id(
 async def update_agent(
     agent_id: int,
     agent_in: AgentUpdate,
+    async_mode: bool = Query(False, description="Return 202 and push the change to ElevenLabs in the background"),
     current_user: UnifiedAuthModel = Depends(require_active_user()),
 ):
     agent = (
@@ -796,6 +823,10 @@ async def update_agent(
         el_kb_list = []
         for kb_id in kb_ids_ordered:
             kb = kb_map[kb_id]
+            if kb.indexing_status not in (None, INDEX_READY):
+                continue  # attached by the agent sync once kb_indexer marks it ready
+            if any(entry["id"] == kb.elevenlabs_document_id for entry in el_kb_list):
+                continue  # identical content already attached through another entry
             el_kb_list.append({
                 "id": kb.elevenlabs_document_id,
                 "type": "file",
@@ -872,11 +903,24 @@ async def update_agent(
         el_update_params["built_in_tools"] = transform_built_in_tools(agent_in.built_in_tools, db.session, current_user.id)
 
     # ---- Sync with ElevenLabs ----
-    if el_update_params and agent.elevenlabs_agent_id:
+    outbox_entry = None
+    if el_update_params and (async_mode or has_unfinished_outbox(db.session, "agent", agent.id)):
+        # Queued behind any unfinished create/update of this agent, so they
+        # apply in order and no EL id is needed yet
+        outbox_entry = enqueue_outbox(
+            db.session, "agent", agent.id, "update", el_update_params, user_id=current_user.id
+        )
+    elif el_update_params and not agent.elevenlabs_agent_id:
+        db.session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Agent has not been created in ElevenLabs; it cannot be updated until it is"
+        )
+    elif el_update_params:
         try:
             logger.info(f"Updating agent '{agent.elevenlabs_agent_id}' in ElevenLabs")
-            el_client = ElevenLabsAgent()
-            el_response = el_client.update_agent(
+            el_client = AsyncElevenLabsAgent()
+            el_response = await el_client.update_agent(
                 agent_id=agent.elevenlabs_agent_id,
                 **el_update_params
             )
@@ -888,6 +932,7 @@ async def update_agent(
                     status_code=424,
                     detail=f"Failed to update agent in ElevenLabs: {el_response.error_message}"
                 )
+            remember_pushed_state(agent, el_update_params)
             logger.info(f"✅ ElevenLabs agent '{agent.elevenlabs_agent_id}' updated successfully")
         except HTTPException:
             raise
@@ -909,6 +954,13 @@ async def update_agent(
         metadata={"agent_id": agent.id, "elevenlabs_agent_id": agent.elevenlabs_agent_id}
     )
 
+    if outbox_entry is not None:
+        return accepted_response(
+            outbox_entry,
+            "Agent saved; ElevenLabs update queued",
+            f"/api/v2/operations/{outbox_entry.id}",
+            {"agent": agent_to_read(agent)},
+        )
     return agent_to_read(agent)
 
 
@@ -951,8 +1003,8 @@ async def delete_agent(
     if agent.elevenlabs_agent_id:
         try:
             logger.info(f"Deleting agent from ElevenLabs: {agent.elevenlabs_agent_id}")
-            el_client = ElevenLabsAgent()
-            el_response = el_client.delete_agent(agent.elevenlabs_agent_id)
+            el_client = AsyncElevenLabsAgent()
+            el_response = await el_client.delete_agent(agent.elevenlabs_agent_id)
             
             if el_response.status:
                 logger.info(f"✅ Agent deleted from ElevenLabs: {agent.elevenlabs_agent_id}")
@@ -1006,4 +1058,55 @@ async def generate_system_prompt_for_agent(agent_config:AgentConfigGenerator):
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"failed to generate system prompt at the moment: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+# -------------------- OUTBOX HANDLERS --------------------
+
+async def _record_agent_created(session, entry, result):
+    agent = await session.get(AgentModel, entry.resource_id)
+    if agent is None:
+        logger.warning(f"Agent {entry.resource_id} was deleted while ElevenLabs created it ({result['elevenlabs_agent_id']})")
+        return
+    if agent.elevenlabs_agent_id:
+        return
+    agent.elevenlabs_agent_id = result["elevenlabs_agent_id"]
+    remember_pushed_state(agent, entry.payload)
+    # KB / tool bindings may have changed while the create was queued
+    schedule_agent_sync(agent.id)
+
+
+@outbox_handler("agent", "create", record=_record_agent_created)
+async def _outbox_create_agent(entry):
+    async with async_db() as session:
+        agent = await session.get(AgentModel, entry.resource_id)
+        if agent is None:
+            raise OutboxDeadLetter("Agent was deleted before it reached ElevenLabs")
+        if agent.elevenlabs_agent_id:
+            return {"elevenlabs_agent_id": agent.elevenlabs_agent_id}
+
+    el_response = await AsyncElevenLabsAgent().create_agent(**entry.payload)
+    if not el_response.status:
+        raise RuntimeError(el_response.error_message or "Failed to create agent in ElevenLabs")
+    return {"elevenlabs_agent_id": el_response.data.get("agent_id")}
+
+
+async def _record_agent_updated(session, entry, result):
+    agent = await session.get(AgentModel, entry.resource_id)
+    if agent is not None:
+        remember_pushed_state(agent, entry.payload)
+
+
+@outbox_handler("agent", "update", record=_record_agent_updated)
+async def _outbox_update_agent(entry):
+    async with async_db() as session:
+        agent = await session.get(AgentModel, entry.resource_id)
+        if agent is None:
+            raise OutboxDeadLetter("Agent no longer exists")
+        if not agent.elevenlabs_agent_id:
+            raise OutboxDeadLetter("Agent has no ElevenLabs id")
+        elevenlabs_agent_id = agent.elevenlabs_agent_id
+
+    el_response = await AsyncElevenLabsAgent().update_agent(agent_id=elevenlabs_agent_id, **entry.payload)
+    if not el_response.status:
+        raise RuntimeError(el_response.error_message or "Failed to update agent in ElevenLabs")
+    return {"elevenlabs_agent_id": elevenlabs_agent_id, "fields": sorted(entry.payload)}
@@ -1,21 +1,31 @@
-from fastapi import APIRouter, HTTPException, Query, Response,Depends
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi_sqlalchemy import db
 from sqlalchemy.orm import joinedload
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
 from datetime import timedelta, date
 from typing import Optional
-from app_v2.databases.models import ConversationsModel, AgentModel, UnifiedAuthModel, WebAgentLeadModel, CoinsLedgerModel
-from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
+from app_v2.databases.models import ConversationsModel, ConversationTranscriptModel, AgentModel, UnifiedAuthModel, WebAgentLeadModel, CoinsLedgerModel
+from app_v2.databases.async_db import async_db
+from app_v2.utils.elevenlabs.conversation_utils import AsyncElevenLabsConversation, ElevenLabsConversation
+from app_v2.utils.audio_cache import audio_cache
 from app_v2.utils.activity_logger import log_activity
 from app_v2.schemas.enum_types import CallStatusEnum, ChannelEnum, CoinTransactionTypeEnum
 import io
+import json
 from app_v2.utils.jwt_utils import require_active_user, HTTPBearer
+from app_v2.utils.transcript_store import build_transcript_record, iter_transcript_json
 
 
 security = HTTPBearer()
 
 router = APIRouter(prefix="/api/v2/conversation", tags=["conversation"],dependencies=[Depends(security)])
 
+# Stand-in for the transcript while the rest of the details body is serialised
+_TRANSCRIPT_PLACEHOLDER = "__transcript__"
+
 # 1. List all conversations (paginated, user-specific, latest first)
 @router.get("/user",openapi_extra={"security":[{"BearerAuth": []}]})
 def list_user_conversations(
@@ -98,25 +108,31 @@ def list_user_conversations(
 # 2. Get conversation audio (by internal id)
 
 @router.get("/{conversation_id}/audio",openapi_extra={"security":[{"BearerAuth": []}]})
-def get_conversation_audio(conversation_id: int,current_user:UnifiedAuthModel= Depends(require_active_user())):
-	with db():
-		conv = db.session.query(ConversationsModel).filter(ConversationsModel.id == conversation_id, ConversationsModel.user_id==current_user.id).first()
-		if not conv or not conv.elevenlabs_conv_id:
-			raise HTTPException(status_code=404, detail="Conversation not found")
-		elevenlabs_conv_id = conv.elevenlabs_conv_id
+async def get_conversation_audio(conversation_id: int,current_user:UnifiedAuthModel= Depends(require_active_user())):
+	async with async_db() as session:
+		elevenlabs_conv_id = await session.scalar(
+			select(ConversationsModel.elevenlabs_conv_id).where(
+				ConversationsModel.id == conversation_id,
+				ConversationsModel.user_id == current_user.id
+			)
+		)
+	if not elevenlabs_conv_id:
+		raise HTTPException(status_code=404, detail="Conversation not found")
+
+	async def fetch_audio():
+		resp = await AsyncElevenLabsConversation().get_conversation_audio(elevenlabs_conv_id)
+		if not resp.status or not resp.data:
+			return None
+		return resp.data.get("content"), resp.data.get("content_type")
 
-	el_conv = ElevenLabsConversation()
-	resp = el_conv.get_conversation_audio(elevenlabs_conv_id)
-	if not resp.status or not resp.data:
+	cached = await audio_cache.get_or_fetch(elevenlabs_conv_id, fetch_audio)
+	if not cached:
 		raise HTTPException(status_code=404, detail="Audio not found")
-	# resp.data is expected to be bytes
-	audio_content = resp.data.get("content")
-	media_type = resp.data.get("content-type","audio/mpeg")
-	if not audio_content:
-		raise HTTPException(status_code=404,detail="audio content missing")
-	return Response(content=audio_content,media_type=media_type)
-
-# 3. Get conversation details (db + 11labs transcript)
+	path, media_type, stat_result = cached
+	# FileResponse streams from disk and answers Range requests (seeking)
+	return FileResponse(path, media_type=media_type, stat_result=stat_result)
+
+# 3. Get conversation details (db + stored transcript)
 @router.get("/{conversation_id}/details",openapi_extra={"security":[{"BearerAuth": []}]})
 def get_conversation_details(conversation_id: int,current_user: UnifiedAuthModel = Depends(require_active_user())):
 	with db():
@@ -135,18 +151,30 @@ def get_conversation_details(conversation_id: int,current_user: UnifiedAuthModel
 		).first()
 		display_cost = abs(ledger_entry.coins) if ledger_entry else conv.cost
 
-	el_conv = ElevenLabsConversation()
-	transcript = []
-	if elevenlabs_conv_id:
-		meta = el_conv.extract_conversation_metadata(elevenlabs_conv_id)
-		transcript = meta.get("transcript", [])
+		stored = db.session.query(ConversationTranscriptModel.transcript).filter(
+			ConversationTranscriptModel.conversation_id == conversation_id
+		).scalar()
+
+	if stored is None and elevenlabs_conv_id:
+		# Not captured at ingest (older conversation): fetch once and keep it
+		meta = ElevenLabsConversation().extract_conversation_metadata(elevenlabs_conv_id, max_retries=1)
+		if meta:
+			record = build_transcript_record(conversation_id, elevenlabs_conv_id, meta)
+			stored = record.transcript
+			with db():
+				try:
+					db.session.add(record)
+					db.session.commit()
+				except IntegrityError:
+					# Stored concurrently by another request
+					db.session.rollback()
 
 	def seconds_to_timer(secs):
 		if not secs:
 			return "0:00"
 		return str(timedelta(seconds=secs))[:-3] if secs >= 60 else f"0:{secs:02d}"
 
-	return {
+	body = {
 		"conversation_details": {
 			"datetime": conv.created_at.isoformat(),
 			"duration": seconds_to_timer(conv.duration),
@@ -165,8 +193,19 @@ def get_conversation_details(conversation_id: int,current_user: UnifiedAuthModel
 				"created_at": conv.lead.created_at.isoformat()
 			} if conv.lead else None
 		},
-		"transcripts": transcript
+		"transcripts": _TRANSCRIPT_PLACEHOLDER
 	}
+	head, tail = json.dumps(jsonable_encoder(body)).rsplit(f'"{_TRANSCRIPT_PLACEHOLDER}"', 1)
+
+	def stream():
+		yield head.encode("utf-8")
+		if stored is None:
+			yield b"[]"
+		else:
+			yield from iter_transcript_json(stored)
+		yield tail.encode("utf-8")
+
+	return StreamingResponse(stream(), media_type="application/json")
 
 # 4. Delete conversation (atomic: 11labs + db)
 @router.delete("/{conversation_id}",openapi_extra={"security":[{"BearerAuth": []}]})
@@ -181,6 +220,7 @@ def delete_conversation(conversation_id: int,current_user= Depends(require_activ
 		resp = el_conv.delete_conversation(elevenlabs_conv_id)
 		if not resp.status:
 			raise HTTPException(status_code=500, detail="Failed to delete conversation from ElevenLabs")
+		audio_cache.evict(elevenlabs_conv_id)
 		try:
 			db.session.delete(conv)
 			db.session.commit()
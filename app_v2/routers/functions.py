@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi_sqlalchemy import db
 from typing import List
 import math
 
 from app_v2.utils.jwt_utils import require_active_user, HTTPBearer
+from app_v2.databases.async_db import async_db
 from app_v2.databases.models import (
+    AgentFunctionBridgeModel,
     FunctionModel,
     FunctionApiConfig,
     UnifiedAuthModel
@@ -18,9 +20,12 @@ from app_v2.schemas.function_schema import (
 )
 from app_v2.schemas.pagination import PaginatedResponse
 from app_v2.core.logger import setup_logger
-from app_v2.utils.elevenlabs import ElevenLabsAgent
+from app_v2.utils.elevenlabs import AsyncElevenLabsAgent
+from app_v2.utils.agent_sync import SYNC_TOOLS, schedule_agent_sync
+from app_v2.utils.outbox import OutboxDeadLetter, accepted_response, enqueue_outbox, outbox_handler
 from app_v2.utils.crypto_utils import encrypt_data
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 from app_v2.schemas.function_schema import HttpMethod
 
 logger = setup_logger(__name__)
@@ -92,6 +97,7 @@ def function_to_read(f: FunctionModel) -> FunctionRead:
 )
 async def create_function(
     function_in: FunctionCreateSchema,
+    async_mode: bool = Query(False, description="Return 202 and create the ElevenLabs tool in the background"),
     current_user: UnifiedAuthModel = Depends(require_active_user()),
 ):
     user_id = current_user.id
@@ -109,32 +115,35 @@ async def create_function(
         )
 
     # 1. Create tool in ElevenLabs
-    el_client = ElevenLabsAgent()
-    try:
-        logger.info(f"Creating ElevenLabs tool for function: {function_in.name}")
-        el_response = el_client.create_tool(
-            name=function_in.name,
-            description=function_in.description,
-            api_schema=function_in.api_config
-        )
+    el_client = AsyncElevenLabsAgent()
+    elevenlabs_tool_id = None
+    # In async mode the outbox worker creates it from the committed row
+    if not async_mode:
+        try:
+            logger.info(f"Creating ElevenLabs tool for function: {function_in.name}")
+            el_response = await el_client.create_tool(
+                name=function_in.name,
+                description=function_in.description,
+                api_schema=function_in.api_config
+            )
         
-        if not el_response.status:
+            if not el_response.status:
+                raise HTTPException(
+                    status_code=status.HTTP_424_FAILED_DEPENDENCY,
+                    detail=f"Failed to create tool in ElevenLabs: {el_response.error_message}"
+                )
+        
+            elevenlabs_tool_id = el_response.data.get("id")
+            logger.info(f"✅ ElevenLabs tool created: {elevenlabs_tool_id}")
+        
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Unexpected error creating ElevenLabs tool")
             raise HTTPException(
                 status_code=status.HTTP_424_FAILED_DEPENDENCY,
-                detail=f"Failed to create tool in ElevenLabs: {el_response.error_message}"
+                detail=f"Unexpected error while creating ElevenLabs tool: {str(e)}"
             )
-        
-        elevenlabs_tool_id = el_response.data.get("id")
-        logger.info(f"✅ ElevenLabs tool created: {elevenlabs_tool_id}")
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception("Unexpected error creating ElevenLabs tool")
-        raise HTTPException(
-            status_code=status.HTTP_424_FAILED_DEPENDENCY,
-            detail=f"Unexpected error while creating ElevenLabs tool: {str(e)}"
-        )
 
     # 2. Save to Database
     try:
@@ -171,10 +180,23 @@ async def create_function(
             speak_after_execution=True
         )
         db.session.add(api_config)
-        
+
+        outbox_entry = None
+        if async_mode:
+            # No payload: the handler rebuilds the schema from the row so
+            # auth headers are never stored in plain text in the outbox
+            outbox_entry = enqueue_outbox(db.session, "tool", new_function.id, "create", user_id=user_id)
+
         db.session.commit()
         db.session.refresh(new_function)
-        
+
+        if outbox_entry is not None:
+            return accepted_response(
+                outbox_entry,
+                "Function saved; ElevenLabs tool creation queued",
+                f"/api/v2/operations/{outbox_entry.id}",
+                {"function": function_to_read(new_function)},
+            )
         return function_to_read(new_function)
         
     except Exception as db_error:
@@ -182,7 +204,7 @@ async def create_function(
         # Cleanup ElevenLabs tool if DB fails
         if elevenlabs_tool_id:
             try:
-                el_client.delete_tool(elevenlabs_tool_id)
+                await el_client.delete_tool(elevenlabs_tool_id)
                 logger.info(f"Cleaned up orphan ElevenLabs tool: {elevenlabs_tool_id}")
             except Exception as cleanup_err:
                 logger.warning(f"Failed to cleanup orphan ElevenLabs tool {elevenlabs_tool_id}: {cleanup_err}")
@@ -383,10 +405,10 @@ async def update_function(
 
     # 2. Sync with ElevenLabs
     if function.elevenlabs_tool_id:
-        el_client = ElevenLabsAgent()
+        el_client = AsyncElevenLabsAgent()
         try:
             logger.info(f"Updating ElevenLabs tool: {function.elevenlabs_tool_id}")
-            el_response = el_client.update_tool(
+            el_response = await el_client.update_tool(
                 tool_id=function.elevenlabs_tool_id,
                 **el_params
             )
@@ -447,10 +469,10 @@ async def delete_function(
 
     # 1. Delete from ElevenLabs
     if function.elevenlabs_tool_id:
-        el_client = ElevenLabsAgent()
+        el_client = AsyncElevenLabsAgent()
         try:
             logger.info(f"Deleting ElevenLabs tool: {function.elevenlabs_tool_id}")
-            el_response = el_client.delete_tool(function.elevenlabs_tool_id)
+            el_response = await el_client.delete_tool(function.elevenlabs_tool_id)
             if not el_response.status:
                 logger.warning(f"Failed to delete ElevenLabs tool: {el_response.error_message}")
                 # We often proceed even if EL delete fails to keep DB clean, 
@@ -470,3 +492,47 @@ async def delete_function(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete function: {str(e)}"
         )
+
+
+# -------------------- OUTBOX HANDLERS --------------------
+
+async def _record_tool_created(session, entry, result):
+    function = await session.get(FunctionModel, entry.resource_id)
+    if function is None:
+        logger.warning(f"Function {entry.resource_id} was deleted while ElevenLabs created it ({result['elevenlabs_tool_id']})")
+        return
+    if function.elevenlabs_tool_id:
+        return
+    function.elevenlabs_tool_id = result["elevenlabs_tool_id"]
+
+    # Agents bound while the tool had no ElevenLabs id still need it pushed
+    agent_ids = (await session.scalars(
+        select(AgentFunctionBridgeModel.agent_id)
+        .where(AgentFunctionBridgeModel.function_id == function.id)
+    )).all()
+    for agent_id in set(agent_ids):
+        schedule_agent_sync(agent_id, SYNC_TOOLS)
+
+
+@outbox_handler("tool", "create", record=_record_tool_created)
+async def _outbox_create_tool(entry):
+    async with async_db() as session:
+        function = await session.scalar(
+            select(FunctionModel)
+            .options(selectinload(FunctionModel.api_endpoint_url))
+            .where(FunctionModel.id == entry.resource_id)
+        )
+        if function is None:
+            raise OutboxDeadLetter("Function was deleted before it reached ElevenLabs")
+        if function.elevenlabs_tool_id:
+            return {"elevenlabs_tool_id": function.elevenlabs_tool_id}
+        tool = {
+            "name": function.name,
+            "description": function.description,
+            "api_schema": function_to_read(function).api_config,
+        }
+
+    el_response = await AsyncElevenLabsAgent().create_tool(**tool)
+    if not el_response.status:
+        raise RuntimeError(el_response.error_message or "Failed to create tool in ElevenLabs")
+    return {"elevenlabs_tool_id": el_response.data.get("id")}
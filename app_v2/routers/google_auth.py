@@ -314,10 +314,11 @@ async def google_callback(code: str, http_request: Request):
             'user_id': user_id,
             'email': user_email,
             'phone': user_phone,
-            'role': 'admin' if user_is_admin else 'user'
+            'role': 'admin' if user_is_admin else 'user',
+            'gen': unified_user.token_generation or 0,
         }
         access_token_jwt = create_access_token(data=token_data)
-        refresh_token_jwt = create_refresh_token(user_id)
+        refresh_token_jwt = create_refresh_token(user_id, unified_user.token_generation or 0)
         
         # Generate one-time authorization code
         app_code = secrets.token_urlsafe(32)
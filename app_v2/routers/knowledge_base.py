@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi_sqlalchemy import db
 from sqlalchemy.orm import Session
 from typing import List
 import os
-import shutil
 import logging
-from datetime import datetime, timezone
 from app_v2.schemas.pagination import PaginatedResponse
 import math
 
-from app_v2.databases.models import KnowledgeBaseModel, AgentModel, UnifiedAuthModel, AgentKnowledgeBaseBridge
+from app_v2.constants import STATUS_SUCCESS
+from app_v2.databases.models import KnowledgeBaseModel, AgentModel, UnifiedAuthModel, AgentKnowledgeBaseBridge, KBIngestJobModel
 from app_v2.schemas.knowledge_base_schema import (
     KnowledgeBaseResponse, 
     KnowledgeBaseURLCreate, 
@@ -17,13 +18,20 @@ from app_v2.schemas.knowledge_base_schema import (
     KnowledgeBaseFileUpdate,
     KnowledgeBaseURLUpdate,
     KnowledgeBaseTextUpdate,
-    KnowledgeBaseBind
+    KnowledgeBaseBind,
+    KnowledgeBaseIndexingStatus,
+    KnowledgeBaseBulkURLCreate
 )
 from app_v2.utils.jwt_utils import HTTPBearer,require_active_user
-from app_v2.utils.feature_access import RequireFeature, get_feature_limit, get_feature_usage
+from app_v2.utils.feature_access import RequireFeature, get_feature_limit
 from app_v2.core.logger import setup_logger
-from app_v2.utils.elevenlabs import ElevenLabsKB, ElevenLabsAgent
+from app_v2.utils.elevenlabs import AsyncElevenLabsKB
 from app_v2.utils.scraping_utils import scrape_webpage_title
+from app_v2.utils.agent_sync import SYNC_KNOWLEDGE_BASE, schedule_agent_sync
+from app_v2.utils.outbox import outbox_handler
+from app_v2.utils.kb_bulk_ingest import job_status, kb_ingest_worker, new_job
+from app_v2.utils.kb_indexer import INDEX_FAILED, indexing_status, kb_indexer, mark_for_indexing
+from app_v2.utils.kb_upload import discard_uploaded, document_shared, extract_uploads, new_entry, push_to_elevenlabs, release_file, stage_uploads
 
 logger = setup_logger(__name__)
 
@@ -33,139 +41,76 @@ router = APIRouter(
     dependencies=[Depends(HTTPBearer())]
 )
 
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
 MAX_FILE_SIZE_IN_MB = 20 
 ALLOWED_EXTENSIONS = {".docx", ".pdf", ".txt"}
 
-def sync_agent_kb(agent_id: int):
-    """
-    Consolidates synchronization of an agent's knowledge base with ElevenLabs.
-    """
-    try:
-        with db():
-            agent = db.session.query(AgentModel).filter(AgentModel.id == agent_id).first()
-            if not agent or not agent.elevenlabs_agent_id:
-                return
-
-            # Fetch all KBs associated with this agent via bridge table
-            all_kb = (
-                db.session.query(KnowledgeBaseModel)
-                .join(AgentKnowledgeBaseBridge)
-                .filter(AgentKnowledgeBaseBridge.agent_id == agent_id, KnowledgeBaseModel.elevenlabs_document_id.isnot(None))
-                .all()
-            )
-
-            kb_docs = []
-            for item in all_kb:
-                doc_type = "file" if item.kb_type == "file" else "url" if item.kb_type == "url" else "text"
-                kb_docs.append({
-                    "id": item.elevenlabs_document_id,
-                    "name": item.title or "Untitled",
-                    "type": doc_type,
-                    "usage_mode": "auto"
-                })
-
-            agent_client = ElevenLabsAgent()
-            agent_client.update_agent(
-                agent_id=agent.elevenlabs_agent_id,
-                knowledge_base=kb_docs
-            )
-            logger.info(f"Successfully synced ElevenLabs agent {agent.elevenlabs_agent_id} with {len(kb_docs)} KB items")
-    except Exception as e:
-        logger.error(f"Failed to sync KB with ElevenLabs agent {agent_id}: {e}")
-
 @router.post("/upload", response_model=List[KnowledgeBaseResponse], openapi_extra={"security": [{"BearerAuth": []}]}, status_code=status.HTTP_201_CREATED)
 async def upload_files(
     files: List[UploadFile] = File(...),
     current_user: UnifiedAuthModel = Depends(RequireFeature("knowledge_base"))
 ):
+    """
+    Upload files to the knowledge base. Returns 201 with the new entries when
+    every file was synced to ElevenLabs; if only some were, those are saved
+    and a 207 lists the entries plus a per-file result for each upload.
+    """
     try:
         user_id = current_user.id
         limit = get_feature_limit(user_id, "knowledge_base") # in MB
-        current_usage = get_feature_usage(user_id, "knowledge_base") # in MB
-        
-        with db():
-            uploaded_entries = []
-            # Plan-based limit per file (in MB)
-            plan_limit_mb = limit if limit is not None else MAX_FILE_SIZE_IN_MB # Fallback to 10MB if no limit set
-            
-            for file in files:
-                # validation logic
-                _, ext = os.path.splitext(file.filename)
-                if ext.lower() not in ALLOWED_EXTENSIONS:
-                    raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}. Allowed: .docx, .pdf, .txt")
-
-                file.file.seek(0, 2)
-                file_size = file.file.tell()
-                file.file.seek(0)
-                
-                file_size_mb = file_size / (1024 * 1024)
 
-                # enforce plan limit and hard cap
-                if plan_limit_mb is not None and file_size_mb > plan_limit_mb:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail=f"Your current plan does not support files larger than {plan_limit_mb}MB."
-                    )
+        # Plan-based limit per file (in MB), capped by the system hard limit
+        plan_limit_mb = limit if limit is not None else MAX_FILE_SIZE_IN_MB
+        for file in files:
+            _, ext = os.path.splitext(file.filename)
+            if ext.lower() not in ALLOWED_EXTENSIONS:
+                raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}. Allowed: .docx, .pdf, .txt")
+
+        if plan_limit_mb < MAX_FILE_SIZE_IN_MB:
+            max_mb, too_large_status = plan_limit_mb, status.HTTP_403_FORBIDDEN
+            too_large_detail = f"Your current plan does not support files larger than {plan_limit_mb}MB."
+        else:
+            max_mb, too_large_status = MAX_FILE_SIZE_IN_MB, 400
+            too_large_detail = "File {filename} exceeds system 20MB hard limit."
+
+        staged = await stage_uploads(
+            files, int(max_mb * 1024 * 1024), too_large_status, too_large_detail
+        )
+        logger.info(f"Syncing {len(staged)} files to ElevenLabs KB for user '{current_user.email}'")
+        staged = await extract_uploads(staged)
+        results = await push_to_elevenlabs(staged, user_id)
+        uploaded = [r for r in results if r.ok]
+        if not uploaded:
+            raise HTTPException(
+                status_code=424,
+                detail={"message": "ElevenLabs KB upload failed", "files": [r.summary() for r in results]},
+            )
 
-                if file_size_mb > MAX_FILE_SIZE_IN_MB:
-                     raise HTTPException(status_code=400, detail=f"File {file.filename} exceeds system 20MB hard limit.")
-                
-                if file_size == 0:
-                    raise HTTPException(status_code=400, detail=f"File {file.filename} is empty")
-
-                file_path = os.path.join(UPLOAD_DIR, f"{current_user.id}_{datetime.now(timezone.utc).timestamp()}_{file.filename}")
-                
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                # ---- ElevenLabs KB Upload ----
-                elevenlabs_document_id = None
-                rag_index_id = None
-                try:
-                    logger.info(f"Syncing file '{file.filename}' to ElevenLabs KB for user '{current_user.email}'")
-                    kb_client = ElevenLabsKB()
-                    kb_response = kb_client.upload_document(file_path, name=file.filename)
-                    
-                    if kb_response.status:
-                        elevenlabs_document_id = kb_response.data.get("document_id")
-                        # ---- Compute RAG Index ----
-                        rag_index_id = kb_client.compute_rag_index(elevenlabs_document_id)
-                    else:
-                        logger.warning(f"Failed to upload to ElevenLabs KB: {kb_response.error_message}")
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                        raise HTTPException(status_code=424, detail=f"ElevenLabs KB upload failed: {kb_response.error_message}")
-                except HTTPException:
-                    raise
-                except Exception as e:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    logger.error(f"Error syncing with ElevenLabs: {e}")
-                    raise HTTPException(status_code=424, detail="Error syncing with ElevenLabs")
-
-                kb_entry = KnowledgeBaseModel(
-                    user_id=current_user.id,
-                    kb_type="file",
-                    title=file.filename,
-                    content_path=file_path,
-                    elevenlabs_document_id=elevenlabs_document_id,
-                    rag_index_id=rag_index_id,
-                    file_size=round((file_size /(1024)),2)    #file size in kb
-                )
-                db.session.add(kb_entry)
-                uploaded_entries.append(kb_entry)
-            
-            db.session.commit()
-            
-            for entry in uploaded_entries:
-                db.session.refresh(entry)
-            
-            logger.info(f"{len(uploaded_entries)} files uploaded successfully for user: {current_user.email}")
-            return uploaded_entries
+        try:
+            with db():
+                uploaded_entries = [
+                    new_entry(r, user_id, round((r.size_bytes /(1024)),2))  #file size in kb
+                    for r in uploaded
+                ]
+                db.session.add_all(uploaded_entries)
+                db.session.commit()
+                kb_indexer.wake()
+                response = [KnowledgeBaseResponse.model_validate(e) for e in uploaded_entries]
+        except Exception:
+            await discard_uploaded(uploaded)
+            raise
+
+        logger.info(f"{len(uploaded)}/{len(results)} files uploaded successfully for user: {current_user.email}")
+        if len(uploaded) == len(results):
+            return response
+        return JSONResponse(
+            status_code=207,
+            content=jsonable_encoder({
+                "status": STATUS_SUCCESS,
+                "status_code": 207,
+                "message": f"{len(uploaded)} of {len(results)} files uploaded",
+                "data": {"entries": response, "files": [r.summary() for r in results]},
+            }),
+        )
 
     except HTTPException as e:
         logger.error(f"HTTP Exception during file upload: {e.detail}")
@@ -178,19 +123,19 @@ async def upload_files(
 async def add_url(request: KnowledgeBaseURLCreate, current_user: UnifiedAuthModel = Depends(RequireFeature("knowledge_base"))):
     try:
         url_str = str(request.url)
+        # ---- Scrape Webpage Title (also checks the URL is reachable) ----
+        title = await scrape_webpage_title(url_str)
+
         with db():
             # ---- ElevenLabs KB Sync ----
             elevenlabs_document_id = None
-            rag_index_id = None
             try:
                 logger.info(f"Syncing URL '{url_str}' to ElevenLabs KB")
-                kb_client = ElevenLabsKB()
-                kb_response = kb_client.add_url_document(url_str)
+                kb_client = AsyncElevenLabsKB()
+                kb_response = await kb_client.add_url_document(url_str)
                 
                 if kb_response.status:
                     elevenlabs_document_id = kb_response.data.get("document_id")
-                    # ---- Compute RAG Index ----
-                    rag_index_id = kb_client.compute_rag_index(elevenlabs_document_id)
                 else:
                     raise HTTPException(status_code=424, detail=f"ElevenLabs KB URL addition failed: {kb_response.error_message}")
             except HTTPException:
@@ -198,21 +143,19 @@ async def add_url(request: KnowledgeBaseURLCreate, current_user: UnifiedAuthMode
             except Exception as e:
                 logger.error(f"Error syncing URL with ElevenLabs: {e}")
                 raise HTTPException(status_code=424, detail="Error syncing with ElevenLabs")
-            
-            # ---- Scrape Webpage Title ----
-            title = scrape_webpage_title(url_str)
-
 
             kb_entry = KnowledgeBaseModel(
                 user_id=current_user.id,
                 kb_type="url",
                 content_path=url_str,
                 elevenlabs_document_id=elevenlabs_document_id,
-                rag_index_id=rag_index_id,
                 title=title
             )
+            # ---- RAG Index (built in the background) ----
+            mark_for_indexing(kb_entry)
             db.session.add(kb_entry)
             db.session.commit()
+            kb_indexer.wake()
             
             db.session.refresh(kb_entry)
             logger.info(f"URL added successfully for user: {current_user.email}")
@@ -225,22 +168,67 @@ async def add_url(request: KnowledgeBaseURLCreate, current_user: UnifiedAuthMode
         logger.error(f"Unexpected error during URL addition: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/bulk", openapi_extra={"security": [{"BearerAuth": []}]}, status_code=status.HTTP_202_ACCEPTED)
+async def add_urls_bulk(request: KnowledgeBaseBulkURLCreate, current_user: UnifiedAuthModel = Depends(RequireFeature("knowledge_base"))):
+    """
+    Import a sitemap or a list of URLs in the background. Returns the import
+    job; poll GET /jobs/{job_id} for progress and per-URL results.
+    """
+    with db():
+        if request.agent_id is not None:
+            agent = db.session.query(AgentModel).filter(
+                AgentModel.id == request.agent_id,
+                AgentModel.user_id == current_user.id
+            ).first()
+            if not agent:
+                raise HTTPException(status_code=404, detail="Agent not found")
+
+        job = new_job(current_user.id, request, request.agent_id)
+        db.session.add(job)
+        db.session.commit()
+        kb_ingest_worker.wake()
+        logger.info(f"KB import job {job.id} queued for user: {current_user.email}")
+
+        return {
+            "status": STATUS_SUCCESS,
+            "status_code": status.HTTP_202_ACCEPTED,
+            "message": "Import queued",
+            "data": {"job": job_status(job), "status_url": f"{router.prefix}/jobs/{job.id}"},
+        }
+
+@router.get("/jobs/{job_id}", openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_import_job(
+    job_id: int,
+    current_user: UnifiedAuthModel = Depends(require_active_user())
+):
+    """Progress and per-URL results of a bulk URL import."""
+    with db():
+        job = db.session.query(KBIngestJobModel).filter(
+            KBIngestJobModel.id == job_id,
+            KBIngestJobModel.user_id == current_user.id
+        ).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Import job not found")
+        return {
+            "status": STATUS_SUCCESS,
+            "status_code": status.HTTP_200_OK,
+            "message": "Import job fetched successfully",
+            "data": job_status(job),
+        }
+
 @router.post("/text", response_model=KnowledgeBaseResponse,openapi_extra={"security": [{"BearerAuth": []}]},status_code=status.HTTP_201_CREATED)
 async def add_text(request: KnowledgeBaseTextCreate, current_user: UnifiedAuthModel = Depends(RequireFeature("knowledge_base"))):
     try:
         with db():
             # ---- ElevenLabs KB Sync ----
             elevenlabs_document_id = None
-            rag_index_id = None
             try:
                 logger.info(f"Syncing text '{request.title}' to ElevenLabs KB")
-                kb_client = ElevenLabsKB()
-                kb_response = kb_client.add_text_document(request.content, request.title)
+                kb_client = AsyncElevenLabsKB()
+                kb_response = await kb_client.add_text_document(request.content, request.title)
                 
                 if kb_response.status:
                     elevenlabs_document_id = kb_response.data.get("document_id")
-                    # ---- Compute RAG Index ----
-                    rag_index_id = kb_client.compute_rag_index(elevenlabs_document_id)
                 else:
                     raise HTTPException(status_code=424, detail=f"ElevenLabs KB text addition failed: {kb_response.error_message}")
             except HTTPException:
@@ -254,11 +242,13 @@ async def add_text(request: KnowledgeBaseTextCreate, current_user: UnifiedAuthMo
                 kb_type="text",
                 title=request.title,
                 content_text=request.content,
-                elevenlabs_document_id=elevenlabs_document_id,
-                rag_index_id=rag_index_id
+                elevenlabs_document_id=elevenlabs_document_id
             )
+            # ---- RAG Index (built in the background) ----
+            mark_for_indexing(kb_entry)
             db.session.add(kb_entry)
             db.session.commit()
+            kb_indexer.wake()
             
             db.session.refresh(kb_entry)
             logger.info(f"Text added successfully for user: {current_user.email}")
@@ -389,21 +379,16 @@ async def delete_knowledge_base_item(
             bridges = db.session.query(AgentKnowledgeBaseBridge).filter(AgentKnowledgeBaseBridge.kb_id == kb_id).all()
             agent_ids = [bridge.agent_id for bridge in bridges]
 
-            # ---- ElevenLabs KB Sync (Delete from Library FIRST) ----
-            if kb_entry.elevenlabs_document_id:
+            # ---- ElevenLabs KB Sync (Delete from Library FIRST, unless another entry shares it) ----
+            if kb_entry.elevenlabs_document_id and not document_shared(db.session, kb_entry):
                 try:
-                    kb_client = ElevenLabsKB()
+                    kb_client = AsyncElevenLabsKB()
                     logger.info(f"Deleting document {kb_entry.elevenlabs_document_id} from ElevenLabs KB")
-                    kb_client.delete_document(kb_entry.elevenlabs_document_id)
+                    await kb_client.delete_document(kb_entry.elevenlabs_document_id)
                 except Exception as e:
                     logger.error(f"Failed to delete document from ElevenLabs KB: {e}")
 
-            # Delete file if exists
-            if kb_entry.kb_type == "file" and kb_entry.content_path and os.path.exists(kb_entry.content_path):
-                try:
-                    os.remove(kb_entry.content_path)
-                except OSError as e:
-                    logger.warning(f"Failed to delete file {kb_entry.content_path}: {e}")
+            content_path = kb_entry.content_path if kb_entry.kb_type == "file" else None
 
             # Delete bridge entries first
             for bridge in bridges:
@@ -412,9 +397,12 @@ async def delete_knowledge_base_item(
             db.session.delete(kb_entry)
             db.session.commit()
 
+            # Delete the stored file once nothing references it
+            release_file(content_path)
+
             # ---- Update Agents in ElevenLabs (Sync AFTER deletion) ----
             for agent_id in agent_ids:
-                sync_agent_kb(agent_id)
+                schedule_agent_sync(agent_id, SYNC_KNOWLEDGE_BASE)
             
             logger.info(f"Deleted KB item {kb_id} and synced agents")
             return
@@ -424,6 +412,41 @@ async def delete_knowledge_base_item(
         logger.error(f"Error deleting knowledge base item: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/{kb_id}/indexing-status", response_model=KnowledgeBaseIndexingStatus, openapi_extra={"security": [{"BearerAuth": []}]})
+async def get_indexing_status(
+    kb_id: int,
+    current_user: UnifiedAuthModel = Depends(require_active_user())
+):
+    """Poll RAG indexing of a KB item: pending / indexing / ready / failed."""
+    with db():
+        kb_entry = db.session.query(KnowledgeBaseModel).filter(
+            KnowledgeBaseModel.id == kb_id,
+            KnowledgeBaseModel.user_id == current_user.id
+        ).first()
+        if not kb_entry:
+            raise HTTPException(status_code=404, detail="Knowledge base item not found")
+        return indexing_status(kb_entry)
+
+@router.post("/{kb_id}/reindex", response_model=KnowledgeBaseIndexingStatus, openapi_extra={"security": [{"BearerAuth": []}]})
+async def reindex_knowledge_base_item(
+    kb_id: int,
+    current_user: UnifiedAuthModel = Depends(require_active_user())
+):
+    """Queue a KB item whose RAG indexing failed for another round of indexing."""
+    with db():
+        kb_entry = db.session.query(KnowledgeBaseModel).filter(
+            KnowledgeBaseModel.id == kb_id,
+            KnowledgeBaseModel.user_id == current_user.id
+        ).first()
+        if not kb_entry:
+            raise HTTPException(status_code=404, detail="Knowledge base item not found")
+        if kb_entry.indexing_status != INDEX_FAILED:
+            raise HTTPException(status_code=409, detail="Only items whose indexing failed can be re-indexed")
+        mark_for_indexing(kb_entry)
+        db.session.commit()
+        kb_indexer.wake()
+        return indexing_status(kb_entry)
+
 @router.put("/{kb_id}/file", response_model=KnowledgeBaseResponse, openapi_extra={"security": [{"BearerAuth": []}]})
 async def update_file_knowledge_base(
     kb_id: int,
@@ -443,8 +466,9 @@ async def update_file_knowledge_base(
             
             if update_data.title is not None and update_data.title != kb_entry.title:
                 kb_entry.title = update_data.title
-                if kb_entry.elevenlabs_document_id:
-                    ElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
+                # A document shared with other entries keeps its original name
+                if kb_entry.elevenlabs_document_id and not document_shared(db.session, kb_entry):
+                    await AsyncElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
 
             db.session.commit()
             db.session.refresh(kb_entry)
@@ -452,7 +476,7 @@ async def update_file_knowledge_base(
             # Sync agents
             bridges = db.session.query(AgentKnowledgeBaseBridge).filter(AgentKnowledgeBaseBridge.kb_id == kb_id).all()
             for bridge in bridges:
-                sync_agent_kb(bridge.agent_id)
+                schedule_agent_sync(bridge.agent_id, SYNC_KNOWLEDGE_BASE)
 
             return kb_entry
     except HTTPException as e:
@@ -482,7 +506,7 @@ async def update_url_knowledge_base(
             if update_data.title is not None and update_data.title != kb_entry.title:
                 kb_entry.title = update_data.title
                 if kb_entry.elevenlabs_document_id:
-                    ElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
+                    await AsyncElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
 
             if update_data.url is not None and str(update_data.url) != kb_entry.content_path:
                 kb_entry.content_path = str(update_data.url)
@@ -490,25 +514,26 @@ async def update_url_knowledge_base(
 
             if needs_resync:
                 # Delete old doc and upload new URL
-                kb_client = ElevenLabsKB()
+                kb_client = AsyncElevenLabsKB()
                 if kb_entry.elevenlabs_document_id:
-                    kb_client.delete_document(kb_entry.elevenlabs_document_id)
+                    await kb_client.delete_document(kb_entry.elevenlabs_document_id)
                 
-                kb_response = kb_client.add_url_document(kb_entry.content_path, name=kb_entry.title)
+                kb_response = await kb_client.add_url_document(kb_entry.content_path, name=kb_entry.title)
                 if kb_response.status:
                     kb_entry.elevenlabs_document_id = kb_response.data.get("document_id")
-                    # Compute new RAG index
-                    kb_entry.rag_index_id = kb_client.compute_rag_index(kb_entry.elevenlabs_document_id)
+                    # New RAG index is built in the background
+                    mark_for_indexing(kb_entry)
                 else:
                     logger.error(f"Failed to re-sync URL KB: {kb_response.error_message}")
 
             db.session.commit()
             db.session.refresh(kb_entry)
+            kb_indexer.wake()
 
             # Sync agents
             bridges = db.session.query(AgentKnowledgeBaseBridge).filter(AgentKnowledgeBaseBridge.kb_id == kb_id).all()
             for bridge in bridges:
-                sync_agent_kb(bridge.agent_id)
+                schedule_agent_sync(bridge.agent_id, SYNC_KNOWLEDGE_BASE)
 
             return kb_entry
     except HTTPException as e:
@@ -538,32 +563,33 @@ async def update_text_knowledge_base(
             if update_data.title is not None and update_data.title != kb_entry.title:
                 kb_entry.title = update_data.title
                 if kb_entry.elevenlabs_document_id:
-                    ElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
+                    await AsyncElevenLabsKB().update_document_name(kb_entry.elevenlabs_document_id, kb_entry.title)
 
             if update_data.content_text is not None and update_data.content_text != kb_entry.content_text:
                 kb_entry.content_text = update_data.content_text
                 needs_resync = True
 
             if needs_resync:
-                kb_client = ElevenLabsKB()
+                kb_client = AsyncElevenLabsKB()
                 if kb_entry.elevenlabs_document_id:
-                    kb_client.delete_document(kb_entry.elevenlabs_document_id)
+                    await kb_client.delete_document(kb_entry.elevenlabs_document_id)
                 
-                kb_response = kb_client.add_text_document(kb_entry.content_text, name=kb_entry.title)
+                kb_response = await kb_client.add_text_document(kb_entry.content_text, name=kb_entry.title)
                 if kb_response.status:
                     kb_entry.elevenlabs_document_id = kb_response.data.get("document_id")
-                    # Compute new RAG index
-                    kb_entry.rag_index_id = kb_client.compute_rag_index(kb_entry.elevenlabs_document_id)
+                    # New RAG index is built in the background
+                    mark_for_indexing(kb_entry)
                 else:
                     logger.error(f"Failed to re-sync text KB: {kb_response.error_message}")
 
             db.session.commit()
             db.session.refresh(kb_entry)
+            kb_indexer.wake()
 
             # Sync agents
             bridges = db.session.query(AgentKnowledgeBaseBridge).filter(AgentKnowledgeBaseBridge.kb_id == kb_id).all()
             for bridge in bridges:
-                sync_agent_kb(bridge.agent_id)
+                schedule_agent_sync(bridge.agent_id, SYNC_KNOWLEDGE_BASE)
 
             return kb_entry
     except HTTPException as e:
@@ -613,7 +639,7 @@ async def bind_knowledge_base(
             db.session.commit()
             
             # Sync ElevenLabs
-            sync_agent_kb(request.agent_id)
+            schedule_agent_sync(request.agent_id, SYNC_KNOWLEDGE_BASE)
 
             return {"message": "Knowledge base bound successfully"}
 
@@ -651,7 +677,7 @@ async def unbind_knowledge_base(
             db.session.commit()
             
             # Sync ElevenLabs
-            sync_agent_kb(request.agent_id)
+            schedule_agent_sync(request.agent_id, SYNC_KNOWLEDGE_BASE)
 
             return {"message": "Knowledge base unbound successfully"}
 
@@ -660,3 +686,15 @@ async def unbind_knowledge_base(
     except Exception as e:
         logger.error(f"Error unbinding knowledge base: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# -------------------- OUTBOX HANDLERS --------------------
+
+@outbox_handler("kb_document", "delete")
+async def _outbox_delete_document(entry):
+    document_id = entry.payload["document_id"]
+    el_response = await AsyncElevenLabsKB().delete_document(document_id)
+    if not el_response.status:
+        # Usually still attached to an agent whose KB sync has not run yet
+        raise RuntimeError(el_response.error_message or "Failed to delete document from ElevenLabs")
+    return {"document_id": document_id}
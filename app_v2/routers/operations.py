@@ -0,0 +1,36 @@
+"""Status of ElevenLabs changes queued by async_mode requests (see app_v2/utils/outbox.py)."""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi_sqlalchemy import db
+
+from app_v2.constants import HTTP_200_OK, STATUS_SUCCESS
+from app_v2.databases.models import ElevenLabsOutboxModel, UnifiedAuthModel
+from app_v2.utils.jwt_utils import HTTPBearer, require_active_user
+from app_v2.utils.outbox import operation_status
+
+security = HTTPBearer()
+router = APIRouter(prefix="/api/v2/operations", tags=["operations"])
+
+
+@router.get(
+    "/{operation_id}",
+    summary="Get queued operation status",
+    openapi_extra={"security": [{"BearerAuth": []}]},
+)
+async def get_operation(
+    operation_id: int,
+    current_user: UnifiedAuthModel = Depends(require_active_user()),
+):
+    entry = db.session.query(ElevenLabsOutboxModel).filter(
+        ElevenLabsOutboxModel.id == operation_id,
+        ElevenLabsOutboxModel.user_id == current_user.id,
+    ).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Operation not found")
+
+    return {
+        "status": STATUS_SUCCESS,
+        "status_code": HTTP_200_OK,
+        "message": "Operation status fetched successfully",
+        "data": operation_status(entry),
+    }
@@ -8,7 +8,8 @@ This module provides endpoints for OTP-based authentication:
 from datetime import datetime, timezone, timedelta
 from typing import Union
 
-from fastapi import APIRouter, Request, HTTPException, status
+from fastapi import APIRouter, Request, HTTPException, status, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi_sqlalchemy import db
 
 from app_v2.core.logger import setup_logger
@@ -23,10 +24,16 @@ from app_v2.utils.otp_utils import (
     send_otp_sms,
 )
 from app_v2.utils.jwt_utils import (
+    HTTPBearer,
     create_access_token,
     create_refresh_token,
-    verify_refresh_token,
+    decode_refresh_token,
+    get_current_user,
+    is_token_generation_current,
+    revoke_access_token,
+    revoke_refresh_token,
 )
+from app_v2.utils.token_revocation import bump_token_generation
 
 from app_v2.constants import (
     STATUS_SUCCESS,
@@ -421,10 +428,11 @@ async def verify_otp(
             'user_id': unified_user.id,
             'email': unified_user.email,
             'phone': unified_user.phone,
-            'role': 'admin' if unified_user.is_admin else 'user'
+            'role': 'admin' if unified_user.is_admin else 'user',
+            'gen': unified_user.token_generation or 0,
         }
         access_token = create_access_token(data=token_data)
-        refresh_token = create_refresh_token(unified_user.id)
+        refresh_token = create_refresh_token(unified_user.id, unified_user.token_generation or 0)
 
         # Create session
         http_request.session['user'] = {
@@ -681,7 +689,8 @@ async def refresh_token(request: RefreshTokenRequest):
     and a new refresh token if valid.
     """
     try:
-        user_id = verify_refresh_token(request.refresh_token)
+        payload = decode_refresh_token(request.refresh_token)
+        user_id = payload.get("user_id") if payload else None
         if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -703,6 +712,16 @@ async def refresh_token(request: RefreshTokenRequest):
                 }
             )
 
+        if not is_token_generation_current(payload, unified_user):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail={
+                    "status": STATUS_FAILED,
+                    "status_code": HTTP_401_UNAUTHORIZED,
+                    "message": "Invalid or expired refresh token"
+                }
+            )
+
         if unified_user.is_suspended:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -718,7 +737,8 @@ async def refresh_token(request: RefreshTokenRequest):
             'user_id': unified_user.id,
             'email': unified_user.email,
             'phone': unified_user.phone,
-            'role': 'admin' if unified_user.is_admin else 'user'
+            'role': 'admin' if unified_user.is_admin else 'user',
+            'gen': unified_user.token_generation or 0,
         }
         access_token = create_access_token(data=token_data)
 
@@ -741,3 +761,99 @@ async def refresh_token(request: RefreshTokenRequest):
                 "message": 'Failed to refresh token'
             }
         )
+
+
+@router.post(
+    '/logout',
+    status_code=status.HTTP_200_OK,
+    summary='Logout',
+    description='Revoke the given refresh token (and the bearer access token, if sent)',
+    responses={
+        200: {
+            'description': 'Logged out successfully',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'status': 'success',
+                        'status_code': 200,
+                        'message': 'Logged out successfully'
+                    }
+                }
+            }
+        }
+    }
+)
+async def logout(
+    request: RefreshTokenRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
+):
+    """Logout the current session.
+
+    Revokes the refresh token so it can no longer be exchanged for access
+    tokens. Tokens that are already expired or invalid are ignored.
+    """
+    try:
+        revoke_refresh_token(request.refresh_token)
+        if credentials:
+            revoke_access_token(credentials.credentials)
+
+        return {
+            'status': STATUS_SUCCESS,
+            'status_code': HTTP_200_OK,
+            'message': 'Logged out successfully'
+        }
+    except Exception as e:
+        logger.error(f'Error in logout: {e}', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "status": STATUS_FAILED,
+                "status_code": HTTP_500_INTERNAL_SERVER_ERROR,
+                "message": 'Failed to logout'
+            }
+        )
+
+
+@router.post(
+    '/logout-all',
+    status_code=status.HTTP_200_OK,
+    summary='Logout Everywhere',
+    description='Invalidate every access and refresh token issued to the current user',
+    responses={
+        200: {
+            'description': 'All sessions revoked',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'status': 'success',
+                        'status_code': 200,
+                        'message': 'Logged out from all devices'
+                    }
+                }
+            }
+        }
+    }
+)
+async def logout_all(current_user: UnifiedAuthModel = Depends(get_current_user)):
+    """Logout from every device.
+
+    Bumps the user's token generation, so all previously issued tokens
+    fail verification without having to list or store them individually.
+    """
+    try:
+        bump_token_generation(current_user.id)
+        return {
+            'status': STATUS_SUCCESS,
+            'status_code': HTTP_200_OK,
+            'message': 'Logged out from all devices'
+        }
+    except Exception as e:
+        logger.error(f'Error in logout_all: {e}', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "status": STATUS_FAILED,
+                "status_code": HTTP_500_INTERNAL_SERVER_ERROR,
+                "message": 'Failed to logout from all devices'
+            }
+        )
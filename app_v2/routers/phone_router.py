@@ -4,7 +4,7 @@ from fastapi.responses import Response
 from fastapi_sqlalchemy import db
 from typing import List, Optional
 from app_v2.utils.twillio_phone_service import TwilioPhoneService
-from app_v2.utils.elevenlabs import ElevenLabsPhoneConnection
+from app_v2.utils.elevenlabs import AsyncElevenLabsPhoneConnection
 from app_v2.schemas.phone_schema import (
     PhoneNumberSearchRequest, 
     PhoneNumberBuyRequest, 
@@ -27,6 +27,8 @@ from app_v2.core.config import VoiceSettings
 from app_v2.utils.crypto_utils import encrypt_data, decrypt_data
 from twilio.base.exceptions import TwilioRestException
 from app_v2.utils.activity_logger import log_activity
+from app_v2.databases.async_db import async_db
+from app_v2.utils.async_data_access import get_agent_by_id_async, get_phone_number_async, log_activity_async
 
 logger = setup_logger(__name__)
 
@@ -368,8 +370,8 @@ async def get_elevenlabs_signed_url(
             raise HTTPException(status_code=404, detail="Agent not found or unauthorized")
         
         try:
-            el_service = ElevenLabsPhoneConnection()
-            response = el_service.get_signed_url(request.agent_id)
+            el_service = AsyncElevenLabsPhoneConnection()
+            response = await el_service.get_signed_url(request.agent_id)
             
             if not response.status:
                 raise HTTPException(status_code=500, detail=f"Failed to get signed URL: {response.error_message}")
@@ -404,10 +406,8 @@ async def handle_voice_webhook(request: Request):
         logger.info(f"Incoming call: CallSid={call_sid}, From={from_number}, To={to_number}")
         
         # Look up phone number in database
-        with db():
-            phone = db.session.query(PhoneNumberService).filter(
-                PhoneNumberService.phone_number == to_number
-            ).first()
+        async with async_db() as session:
+            phone = await get_phone_number_async(session, to_number)
             
             if not phone:
                 # Phone number not found, return default message
@@ -428,9 +428,7 @@ async def handle_voice_webhook(request: Request):
                 return Response(content=twiml, media_type="application/xml")
             
             # Get agent details
-            agent = db.session.query(AgentModel).filter(
-                AgentModel.id == phone.assigned_to
-            ).first()
+            agent = await get_agent_by_id_async(session, phone.assigned_to)
             
             if not agent or not agent.elevenlabs_agent_id:
                 logger.error(f"Agent not found or missing ElevenLabs agent ID for phone {to_number}")
@@ -442,8 +440,8 @@ async def handle_voice_webhook(request: Request):
             
             # Get ElevenLabs signed URL
             try:
-                el_service = ElevenLabsPhoneConnection()
-                el_response = el_service.get_signed_url(agent.elevenlabs_agent_id)
+                el_service = AsyncElevenLabsPhoneConnection()
+                el_response = await el_service.get_signed_url(agent.elevenlabs_agent_id)
                 
                 if not el_response.status:
                     raise Exception(f"Failed to get signed URL: {el_response.error_message}")
@@ -451,7 +449,8 @@ async def handle_voice_webhook(request: Request):
                 signed_url = el_response.data.get("signed_url")
                 logger.info(f"Connecting call {call_sid} to ElevenLabs agent {agent.agent_name}")
                 
-                log_activity(
+                await log_activity_async(
+                    session,
                     user_id=phone.user_id,
                     event_type="voice_call_initiated",
                     description=f"Incoming call from {from_number} to agent {agent.agent_name}",
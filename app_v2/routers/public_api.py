@@ -8,8 +8,6 @@ from typing import List
 import math
 import uuid
 import os
-import shutil
-from datetime import datetime, timezone
 
 from app_v2.databases.models import (
     AgentModel, 
@@ -28,7 +26,9 @@ from app_v2.databases.models import (
     AgentLanguageBridge,
     AgentKnowledgeBaseBridge,
     AgentFunctionBridgeModel,
-    FunctionApiConfig
+    FunctionApiConfig,
+    ElevenLabsOutboxModel,
+    KBIngestJobModel
 )
 from app_v2.schemas.function_schema import (
     FunctionCreateSchema,
@@ -48,7 +48,9 @@ from app_v2.schemas.knowledge_base_schema import (
     KnowledgeBaseResponse, 
     KnowledgeBaseURLCreate, 
     KnowledgeBaseTextCreate, 
-    KnowledgeBaseBind
+    KnowledgeBaseBind,
+    KnowledgeBaseIndexingStatus,
+    KnowledgeBaseBulkURLCreate
 )
 from app_v2.schemas.pagination import PaginatedResponse
 from app_v2.schemas.enum_types import PhoneNumberAssignStatus, GenderEnum, RequestMethodEnum, PlanFeatureEnum
@@ -57,10 +59,14 @@ from app_v2.utils.crypto_utils import encrypt_data, decrypt_data
 from app_v2.schemas.pagination import PaginatedResponse
 from app_v2.utils.rate_limit import track_and_limit_api, log_public_api_call
 from app_v2.utils.feature_access import RequireFeaturePublic
-from app_v2.utils.elevenlabs.agent_utils import ElevenLabsAgent
-from app_v2.utils.elevenlabs import ElevenLabsKB
+from app_v2.utils.elevenlabs import AsyncElevenLabsAgent, AsyncElevenLabsKB
 from app_v2.utils.scraping_utils import scrape_webpage_title
 from app_v2.utils.activity_logger import log_activity
+from app_v2.utils.agent_sync import SYNC_KNOWLEDGE_BASE, SYNC_TOOLS, remember_pushed_state, schedule_agent_sync
+from app_v2.utils.outbox import accepted_response, enqueue_outbox, has_unfinished_outbox, operation_status
+from app_v2.utils.kb_bulk_ingest import job_status, kb_ingest_worker, new_job
+from app_v2.utils.kb_indexer import indexing_status, kb_indexer, mark_for_indexing
+from app_v2.utils.kb_upload import discard_uploaded, document_shared, extract_uploads, new_entry, push_to_elevenlabs, release_file, stage_uploads
 from app_v2.core.logger import setup_logger
 from fastapi import UploadFile, File, Form
 import time
@@ -72,7 +78,9 @@ logger = setup_logger(__name__)
 
 from fastapi.routing import APIRoute
 from typing import Callable
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
+from app_v2.constants import STATUS_SUCCESS
 
 class PublicAPIRoute(APIRoute):
     def get_route_handler(self) -> Callable:
@@ -298,8 +306,8 @@ async def create_agent(
         transformed_built_in = transform_built_in_tools(agent_in.built_in_tools, db.session, user_id)
 
         # Create in ElevenLabs
-        el_client = ElevenLabsAgent()
-        el_response = el_client.create_agent(
+        el_client = AsyncElevenLabsAgent()
+        el_response = await el_client.create_agent(
             name=agent_in.agent_name,
             voice_id=voice.elevenlabs_voice_id,
             prompt=agent_in.system_prompt,
@@ -323,7 +331,8 @@ async def create_agent(
             user_id=user_id,
             agent_voice=voice.id,
             elevenlabs_agent_id=elevenlabs_agent_id,
-            built_in_tools=agent_in.built_in_tools.model_dump() if agent_in.built_in_tools else {}
+            built_in_tools=agent_in.built_in_tools.model_dump() if agent_in.built_in_tools else {},
+            elevenlabs_sync_state={"tool_ids": el_tool_ids, "knowledge_base": el_kb_list}
         )
         db.session.add(new_agent)
         db.session.flush()
@@ -450,10 +459,22 @@ async def update_agent_public(
                 db.session.add(VariablesModel(agent_id=agent_id, variable_name=key, variable_value=value))
 
         # ---- Sync with ElevenLabs ----
-        if el_update_params and agent.elevenlabs_agent_id:
+        outbox_entry = None
+        if el_update_params and has_unfinished_outbox(db.session, "agent", agent.id):
+            # Queued behind the agent's unfinished create/update so they apply in order
+            outbox_entry = enqueue_outbox(
+                db.session, "agent", agent.id, "update", el_update_params, user_id=current_user.id
+            )
+        elif el_update_params and not agent.elevenlabs_agent_id:
+            db.session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Agent has not been created in ElevenLabs; it cannot be updated until it is"
+            )
+        elif el_update_params:
             try:
-                el_client = ElevenLabsAgent()
-                el_response = el_client.update_agent(
+                el_client = AsyncElevenLabsAgent()
+                el_response = await el_client.update_agent(
                     agent_id=agent.elevenlabs_agent_id,
                     **el_update_params
                 )
@@ -463,6 +484,7 @@ async def update_agent_public(
                         status_code=424,
                         detail=f"Failed to update agent in ElevenLabs: {el_response.error_message}"
                     )
+                remember_pushed_state(agent, el_update_params)
             except HTTPException:
                 raise
             except Exception as e:
@@ -474,6 +496,13 @@ async def update_agent_public(
 
         db.session.commit()
         db.session.refresh(agent)
+        if outbox_entry is not None:
+            return accepted_response(
+                outbox_entry,
+                "Agent saved; ElevenLabs update queued",
+                f"/api/v2/public/operations/{outbox_entry.id}",
+                {"agent": agent_to_read(agent)},
+            )
         return agent_to_read(agent)
 
 @router.delete("/agents/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -490,7 +519,7 @@ async def delete_agent_public(
             raise HTTPException(status_code=404, detail="Agent not found")
         
         if agent.elevenlabs_agent_id:
-            ElevenLabsAgent().delete_agent(agent.elevenlabs_agent_id)
+            await AsyncElevenLabsAgent().delete_agent(agent.elevenlabs_agent_id)
             
         db.session.delete(agent)
         db.session.commit()
@@ -716,46 +745,9 @@ async def list_ai_models_public(
 # KNOWLEDGE BASE
 # -------------------------------------------------------------------
 
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
 MAX_FILE_SIZE = 10 * 1024 * 1024 # 10 MB
 ALLOWED_EXTENSIONS = {".docx", ".pdf", ".txt"}
 
-def sync_agent_kb_logic(agent_id: int):
-    """Internal helper for KB syncing with ElevenLabs"""
-    try:
-        with db():
-            agent = db.session.query(AgentModel).filter(AgentModel.id == agent_id).first()
-            if not agent or not agent.elevenlabs_agent_id:
-                return
-
-            all_kb = (
-                db.session.query(KnowledgeBaseModel)
-                .join(AgentKnowledgeBaseBridge)
-                .filter(AgentKnowledgeBaseBridge.agent_id == agent_id, KnowledgeBaseModel.elevenlabs_document_id.isnot(None))
-                .all()
-            )
-
-            kb_docs = []
-            for item in all_kb:
-                doc_type = "file" if item.kb_type == "file" else "url" if item.kb_type == "url" else "text"
-                kb_docs.append({
-                    "id": item.elevenlabs_document_id,
-                    "name": item.title or "Untitled",
-                    "type": doc_type,
-                    "usage_mode": "auto"
-                })
-
-            agent_client = ElevenLabsAgent()
-            agent_client.update_agent(
-                agent_id=agent.elevenlabs_agent_id,
-                knowledge_base=kb_docs
-            )
-    except Exception as e:
-        logger.error(f"Failed to sync KB for agent {agent_id}: {e}")
-
 @router.get("/kb", response_model=PaginatedResponse[KnowledgeBaseResponse])
 async def list_kb_public(
     page: int = 1,
@@ -784,6 +776,20 @@ async def get_kb_public(
             raise HTTPException(status_code=404, detail="Knowledge Base item not found")
         return kb_item
 
+@router.get("/kb/{id}/indexing-status", response_model=KnowledgeBaseIndexingStatus)
+async def get_kb_indexing_status_public(
+    id: int,
+    current_user: UnifiedAuthModel = Depends(get_public_api_user)
+):
+    track_and_limit_api(current_user.id)
+    with db():
+        kb_item = db.session.query(KnowledgeBaseModel).filter(
+            KnowledgeBaseModel.id == id, KnowledgeBaseModel.user_id == current_user.id
+        ).first()
+        if not kb_item:
+            raise HTTPException(status_code=404, detail="Knowledge Base item not found")
+        return indexing_status(kb_item)
+
 @router.post("/kb/url", response_model=KnowledgeBaseResponse, status_code=status.HTTP_201_CREATED)
 async def create_kb_url_public(
     request: KnowledgeBaseURLCreate,
@@ -791,29 +797,75 @@ async def create_kb_url_public(
 ):
     track_and_limit_api(current_user.id)
     url_str = str(request.url)
+    title = await scrape_webpage_title(url_str)
     with db():
-        kb_client = ElevenLabsKB()
-        kb_response = kb_client.add_url_document(url_str)
+        kb_client = AsyncElevenLabsKB()
+        kb_response = await kb_client.add_url_document(url_str)
         if not kb_response.status:
             raise HTTPException(status_code=424, detail=f"ElevenLabs failure: {kb_response.error_message}")
         
         doc_id = kb_response.data.get("document_id")
-        rag_id = kb_client.compute_rag_index(doc_id)
-        title = scrape_webpage_title(url_str)
 
         kb_entry = KnowledgeBaseModel(
             user_id=current_user.id,
             kb_type="url",
             content_path=url_str,
             elevenlabs_document_id=doc_id,
-            rag_index_id=rag_id,
             title=title
         )
+        mark_for_indexing(kb_entry)
         db.session.add(kb_entry)
         db.session.commit()
+        kb_indexer.wake()
         db.session.refresh(kb_entry)
         return kb_entry
 
+@router.post("/kb/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def create_kb_bulk_public(
+    request: KnowledgeBaseBulkURLCreate,
+    current_user: UnifiedAuthModel = Depends(get_public_api_user)
+):
+    track_and_limit_api(current_user.id)
+    with db():
+        if request.agent_id is not None:
+            agent = db.session.query(AgentModel).filter(
+                AgentModel.id == request.agent_id,
+                AgentModel.user_id == current_user.id
+            ).first()
+            if not agent:
+                raise HTTPException(status_code=404, detail="Agent not found")
+
+        job = new_job(current_user.id, request, request.agent_id)
+        db.session.add(job)
+        db.session.commit()
+        kb_ingest_worker.wake()
+        return {
+            "status": STATUS_SUCCESS,
+            "status_code": status.HTTP_202_ACCEPTED,
+            "message": "Import queued",
+            "data": {"job": job_status(job), "status_url": f"{router.prefix}/kb/jobs/{job.id}"},
+        }
+
+@router.get("/kb/jobs/{job_id}")
+async def get_kb_job_public(
+    job_id: int,
+    current_user: UnifiedAuthModel = Depends(get_public_api_user)
+):
+    track_and_limit_api(current_user.id)
+    with db():
+        job = db.session.query(KBIngestJobModel).filter(
+            KBIngestJobModel.id == job_id,
+            KBIngestJobModel.user_id == current_user.id
+        ).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Import job not found")
+        return {
+            "status": STATUS_SUCCESS,
+            "status_code": status.HTTP_200_OK,
+            "message": "Import job fetched successfully",
+            "data": job_status(job),
+        }
+
 @router.post("/kb/text", response_model=KnowledgeBaseResponse, status_code=status.HTTP_201_CREATED)
 async def create_kb_text_public(
     request: KnowledgeBaseTextCreate,
@@ -821,24 +873,24 @@ async def create_kb_text_public(
 ):
     track_and_limit_api(current_user.id)
     with db():
-        kb_client = ElevenLabsKB()
-        kb_response = kb_client.add_text_document(request.content, request.title)
+        kb_client = AsyncElevenLabsKB()
+        kb_response = await kb_client.add_text_document(request.content, request.title)
         if not kb_response.status:
             raise HTTPException(status_code=424, detail=f"ElevenLabs failure: {kb_response.error_message}")
         
         doc_id = kb_response.data.get("document_id")
-        rag_id = kb_client.compute_rag_index(doc_id)
 
         kb_entry = KnowledgeBaseModel(
             user_id=current_user.id,
             kb_type="text",
             title=request.title,
             content_text=request.content,
-            elevenlabs_document_id=doc_id,
-            rag_index_id=rag_id
+            elevenlabs_document_id=doc_id
         )
+        mark_for_indexing(kb_entry)
         db.session.add(kb_entry)
         db.session.commit()
+        kb_indexer.wake()
         db.session.refresh(kb_entry)
         return kb_entry
 
@@ -848,57 +900,53 @@ async def create_kb_file_public(
     current_user: UnifiedAuthModel = Depends(get_public_api_user)
 ):
     track_and_limit_api(current_user.id)
-    responses = []
-    
-    with db():
-        kb_client = ElevenLabsKB()
-        for file in files:
-            _, ext = os.path.splitext(file.filename)
-            if ext.lower() not in ALLOWED_EXTENSIONS:
-                raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}. Allowed: .docx, .pdf, .txt")
-
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-            if file_size > MAX_FILE_SIZE:
-                raise HTTPException(status_code=400, detail=f"File {file.filename} exceeds 10MB limit")
-
-            file_path = os.path.join(UPLOAD_DIR, f"pub_{current_user.id}_{datetime.now(timezone.utc).timestamp()}_{file.filename}")
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            kb_response = kb_client.upload_document(file_path, name=file.filename)
-            if not kb_response.status:
-                if os.path.exists(file_path): os.remove(file_path)
-                raise HTTPException(status_code=424, detail=f"ElevenLabs failure for {file.filename}: {kb_response.error_message}")
-            
-            doc_id = kb_response.data.get("document_id")
-            rag_id = kb_client.compute_rag_index(doc_id)
-
-            kb_entry = KnowledgeBaseModel(
-                user_id=current_user.id,
-                kb_type="file",
-                title=file.filename,
-                content_path=file_path,
-                elevenlabs_document_id=doc_id,
-                rag_index_id=rag_id,
-                file_size=round((file_size / (1024*1024)), 2)
-            )
-            db.session.add(kb_entry)
-            db.session.flush()
-            
-            # Reattach to session strictly just to be sure
-            responses.append(kb_entry)
+    for file in files:
+        _, ext = os.path.splitext(file.filename)
+        if ext.lower() not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}. Allowed: .docx, .pdf, .txt")
 
-        db.session.commit()
-        for entry in responses:
-            db.session.refresh(entry)
-            
-        return responses
+    staged = await stage_uploads(
+        files, MAX_FILE_SIZE, 400, "File {filename} exceeds 10MB limit"
+    )
+    staged = await extract_uploads(staged)
+    results = await push_to_elevenlabs(staged, current_user.id)
+    uploaded = [r for r in results if r.ok]
+    if not uploaded:
+        raise HTTPException(
+            status_code=424,
+            detail={"message": "ElevenLabs KB upload failed", "files": [r.summary() for r in results]},
+        )
+
+    try:
+        with db():
+            responses = [
+                new_entry(r, current_user.id, round((r.size_bytes / (1024*1024)), 2))  #file size in MB
+                for r in uploaded
+            ]
+            db.session.add_all(responses)
+            db.session.commit()
+            kb_indexer.wake()
+            entries = [KnowledgeBaseResponse.model_validate(e) for e in responses]
+    except Exception:
+        await discard_uploaded(uploaded)
+        raise
+
+    if len(uploaded) == len(results):
+        return entries
+    return JSONResponse(
+        status_code=207,
+        content=jsonable_encoder({
+            "status": STATUS_SUCCESS,
+            "status_code": 207,
+            "message": f"{len(uploaded)} of {len(results)} files uploaded",
+            "data": {"entries": entries, "files": [r.summary() for r in results]},
+        }),
+    )
 
 @router.delete("/kb/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_kb_public(
     id: int,
+    async_mode: bool = Query(False, description="Return 202 and delete the ElevenLabs document in the background"),
     current_user: UnifiedAuthModel = Depends(get_public_api_user)
 ):
     track_and_limit_api(current_user.id)
@@ -912,20 +960,33 @@ async def delete_kb_public(
         bridges = db.session.query(AgentKnowledgeBaseBridge).filter(AgentKnowledgeBaseBridge.kb_id == id).all()
         agent_ids = [b.agent_id for b in bridges]
 
-        if kb_entry.elevenlabs_document_id:
+        outbox_entry = None
+        delete_document = kb_entry.elevenlabs_document_id and not document_shared(db.session, kb_entry)
+        if delete_document and async_mode:
+            outbox_entry = enqueue_outbox(
+                db.session, "kb_document", kb_entry.id, "delete",
+                {"document_id": kb_entry.elevenlabs_document_id}, user_id=current_user.id,
+            )
+        elif delete_document:
             try:
-                ElevenLabsKB().delete_document(kb_entry.elevenlabs_document_id)
+                await AsyncElevenLabsKB().delete_document(kb_entry.elevenlabs_document_id)
             except: pass
 
-        if kb_entry.kb_type == "file" and kb_entry.content_path and os.path.exists(kb_entry.content_path):
-            try: os.remove(kb_entry.content_path)
-            except: pass
+        content_path = kb_entry.content_path if kb_entry.kb_type == "file" else None
 
         for bridge in bridges: db.session.delete(bridge)
         db.session.delete(kb_entry)
         db.session.commit()
+        release_file(content_path)
 
-        for agent_id in agent_ids: sync_agent_kb_logic(agent_id)
+        for agent_id in agent_ids: schedule_agent_sync(agent_id, SYNC_KNOWLEDGE_BASE)
+
+        if outbox_entry is not None:
+            return accepted_response(
+                outbox_entry,
+                "Knowledge base item deleted; ElevenLabs cleanup queued",
+                f"/api/v2/public/operations/{outbox_entry.id}",
+            )
     return None
 
 @router.post("/kb/bind", status_code=status.HTTP_200_OK)
@@ -952,10 +1013,25 @@ async def bind_kb_public(
         if not existing:
             db.session.add(AgentKnowledgeBaseBridge(agent_id=request.agent_id, kb_id=request.kb_id))
             db.session.commit()
-            sync_agent_kb_logic(request.agent_id)
+            schedule_agent_sync(request.agent_id, SYNC_KNOWLEDGE_BASE)
 
     return {"message": "Knowledge base bound successfully"}
 
+@router.get("/operations/{operation_id}")
+async def get_operation_public(
+    operation_id: int,
+    current_user: UnifiedAuthModel = Depends(get_public_api_user)
+):
+    """Status of an ElevenLabs change queued by an async_mode request."""
+    track_and_limit_api(current_user.id)
+    with db():
+        entry = db.session.query(ElevenLabsOutboxModel).filter(
+            ElevenLabsOutboxModel.id == operation_id, ElevenLabsOutboxModel.user_id == current_user.id
+        ).first()
+        if not entry:
+            raise HTTPException(status_code=404, detail="Operation not found")
+        return operation_status(entry)
+
 @router.get("/ai-models/{id}", response_model=AIModelRead)
 async def get_ai_model_public(
     id: int,
@@ -1068,8 +1144,8 @@ async def create_function_public(
         if existing:
             raise HTTPException(status_code=400, detail=f"Function with name '{function_in.name}' already exists")
 
-        el_client = ElevenLabsAgent()
-        el_response = el_client.create_tool(
+        el_client = AsyncElevenLabsAgent()
+        el_response = await el_client.create_tool(
             name=function_in.name,
             description=function_in.description,
             api_schema=function_in.api_config
@@ -1124,7 +1200,7 @@ async def create_function_public(
         except Exception as e:
             db.session.rollback()
             if elevenlabs_tool_id:
-                el_client.delete_tool(elevenlabs_tool_id)
+                await el_client.delete_tool(elevenlabs_tool_id)
             raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1209,8 +1285,8 @@ async def update_function_public(
             el_update = True
 
         if el_update and function.elevenlabs_tool_id:
-            el_client = ElevenLabsAgent()
-            el_res = el_client.update_tool(tool_id=function.elevenlabs_tool_id, **el_params)
+            el_client = AsyncElevenLabsAgent()
+            el_res = await el_client.update_tool(tool_id=function.elevenlabs_tool_id, **el_params)
             if not el_res.status:
                 db.session.rollback()
                 raise HTTPException(status_code=424, detail=f"ElevenLabs update failure: {el_res.error_message}")
@@ -1235,7 +1311,7 @@ async def delete_function_public(
 
         if function.elevenlabs_tool_id:
             try:
-                ElevenLabsAgent().delete_tool(function.elevenlabs_tool_id)
+                await AsyncElevenLabsAgent().delete_tool(function.elevenlabs_tool_id)
             except Exception:
                 pass
 
@@ -1265,11 +1341,7 @@ async def bind_function_public(
         if not existing:
             db.session.add(AgentFunctionBridgeModel(agent_id=agent_id, function_id=function_id))
             db.session.commit()
-            # ElevenLabs Sync
-            if agent.elevenlabs_agent_id:
-                bridges = db.session.query(AgentFunctionBridgeModel).filter(AgentFunctionBridgeModel.agent_id == agent_id).all()
-                tool_ids = [b.function.elevenlabs_tool_id for b in bridges if b.function.elevenlabs_tool_id]
-                ElevenLabsAgent().update_agent(agent_id=agent.elevenlabs_agent_id, tool_ids=tool_ids)
+            schedule_agent_sync(agent_id, SYNC_TOOLS)
                 
     return {"message": "Function bound successfully"}
 
@@ -1292,11 +1364,7 @@ async def unbind_function_public(
         if bridge:
             db.session.delete(bridge)
             db.session.commit()
-            # ElevenLabs Sync
-            if agent.elevenlabs_agent_id:
-                bridges = db.session.query(AgentFunctionBridgeModel).filter(AgentFunctionBridgeModel.agent_id == agent_id).all()
-                tool_ids = [b.function.elevenlabs_tool_id for b in bridges if b.function.elevenlabs_tool_id]
-                ElevenLabsAgent().update_agent(agent_id=agent.elevenlabs_agent_id, tool_ids=tool_ids)
+            schedule_agent_sync(agent_id, SYNC_TOOLS)
                 
     return {"message": "Function unbound successfully"}
 
@@ -9,14 +9,21 @@ from typing import Optional
 import aiohttp
 import bcrypt
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
-from fastapi_sqlalchemy import db
 
+from app_v2.core.config import VoiceSettings
 from app_v2.core.elevenlabs_config import ELEVENLABS_API_KEY
-from app_v2.databases.models import AgentModel, APIKeyModel, ConversationsModel, CallStatusEnum, ChannelEnum, CoinUsageSettingsModel
-from app_v2.utils.coin_utils import deduct_coins, get_user_coin_balance
-from app_v2.utils.activity_logger import log_activity
-from app_v2.utils.feature_access import check_feature_limit_and_usage, get_feature_limit, get_feature_usage
-from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import ChannelEnum
+from app_v2.utils.async_data_access import (
+    check_monthly_minutes_async,
+    get_active_api_key_async,
+    get_feature_limit_async,
+    get_monthly_minutes_usage_async,
+    get_user_agent_async,
+    get_user_coin_balance_async,
+    log_activity_async,
+)
+from app_v2.utils.conversation_ingest import record_conversation_end
 from app_v2.core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -58,21 +65,26 @@ async def public_websocket_agent(
     client_id = auth_msg["client_id"]
     client_secret = auth_msg["client_secret"]
 
-    with db():
-        api_key_record = db.session.query(APIKeyModel).filter(APIKeyModel.client_id == client_id, APIKeyModel.is_active == True).first()
+    async with async_db() as session:
+        api_key_record = await get_active_api_key_async(session, client_id)
         if not api_key_record:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid Client ID or inactive key")
             return
         
-        # Verify secret
-        if not bcrypt.checkpw(client_secret.encode('utf-8'), api_key_record.client_secret_hash.encode('utf-8')):
+        # Verify secret (bcrypt is deliberately slow — keep it off the event loop)
+        secret_ok = await asyncio.to_thread(
+            bcrypt.checkpw,
+            client_secret.encode('utf-8'),
+            api_key_record.client_secret_hash.encode('utf-8'),
+        )
+        if not secret_ok:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid Client Secret")
             return
         
         user_id = api_key_record.user_id
 
         # 2. Verify agent ownership and configuration
-        agent = db.session.query(AgentModel).filter(AgentModel.id == agent_id, AgentModel.user_id == user_id).first()
+        agent = await get_user_agent_async(session, user_id, agent_id)
         if not agent or not agent.elevenlabs_agent_id:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Agent not found or not configured")
             return
@@ -81,14 +93,14 @@ async def public_websocket_agent(
         agent_name = agent.agent_name
 
         # 3. Check Balance and Limits
-        user_balance = get_user_coin_balance(user_id)
+        user_balance = await get_user_coin_balance_async(session, user_id)
         if user_balance <= 0:
             await websocket.send_json({"type": "error", "message": "Insufficient coins", "code": 1008})
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Insufficient coins")
             return
         
         try:
-            check_feature_limit_and_usage(user_id, "monthly_minutes")
+            await check_monthly_minutes_async(session, user_id)
         except Exception as e:
             await websocket.send_json({"type": "error", "message": str(e), "code": 1008})
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Limit reached")
@@ -102,17 +114,19 @@ async def public_websocket_agent(
     })
     logger.info(f"Public WebSocket authenticated for user {user_id}, agent {agent_id}")
 
-    log_activity(
-        user_id=user_id,
-        event_type="public_agent_conversation_started",
-        description=f"Started public voice chat for agent: {agent_name}",
-        metadata={"agent_id": agent_id, "agent_name": agent_name, "elevenlabs_agent_id": elevenlabs_agent_id}
-    )
+    async with async_db() as session:
+        await log_activity_async(
+            session,
+            user_id=user_id,
+            event_type="public_agent_conversation_started",
+            description=f"Started public voice chat for agent: {agent_name}",
+            metadata={"agent_id": agent_id, "agent_name": agent_name, "elevenlabs_agent_id": elevenlabs_agent_id}
+        )
+        initial_usage = await get_monthly_minutes_usage_async(session, user_id)
+        minute_limit = await get_feature_limit_async(session, user_id, "monthly_minutes")
 
-    elevenlabs_ws_url = f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={elevenlabs_agent_id}"
+    elevenlabs_ws_url = f"{VoiceSettings.ELEVENLABS_WS_URL}?agent_id={elevenlabs_agent_id}"
     call_start_time = datetime.now(timezone.utc)
-    initial_usage = get_feature_usage(user_id, "monthly_minutes")
-    minute_limit = get_feature_limit(user_id, "monthly_minutes")
     conversation_id = None
 
     async with aiohttp.ClientSession() as session:
@@ -229,63 +243,24 @@ async def public_websocket_agent(
 
     # Post-conversation logic
     if conversation_id:
-        log_activity(
-            user_id=user_id,
-            event_type="public_agent_conversation_completed",
-            description=f"Completed public voice chat for agent: {agent_name}",
-            metadata={"agent_id": agent_id, "conversation_id": conversation_id}
-        )
-
-        try:
-            el_conv = ElevenLabsConversation()
-            metadata = await asyncio.to_thread(
-                el_conv.extract_conversation_metadata,
-                conversation_id
+        async with async_db() as session:
+            await log_activity_async(
+                session,
+                user_id=user_id,
+                event_type="public_agent_conversation_completed",
+                description=f"Completed public voice chat for agent: {agent_name}",
+                metadata={"agent_id": agent_id, "conversation_id": conversation_id}
             )
 
-            if not metadata:
-                logger.error(f"Metadata extraction failed for public WS conversation {conversation_id}")
-                return
-
-            call_status_enum = CallStatusEnum.success if metadata.get("call_successful") else CallStatusEnum.failed
-
-            with db():
-                cost_data = metadata.get("cost")
-                settings = CoinUsageSettingsModel.get_settings()
-                raw_el_cost = float(cost_data) if cost_data else 0
-                calculated_cost = int((raw_el_cost * settings.elevenlabs_multiplier) + settings.static_conversation_cost)
-
-                conversation_data = ConversationsModel(
-                    agent_id=agent_id,
-                    user_id=user_id,
-                    message_count=metadata.get("message_count"),
-                    duration=metadata.get("duration"),
-                    call_status=call_status_enum,
-                    channel=ChannelEnum.api,
-                    transcript_summary=metadata.get("transcript_summary"),
-                    elevenlabs_conv_id=conversation_id,
-                    cost=raw_el_cost
-                )
-
-                db.session.add(conversation_data)
-                db.session.flush()
-
-                if calculated_cost > 0:
-                    deduct_coins(
-                        user_id=user_id, 
-                        amount=calculated_cost, 
-                        reference_type="api_conversation", 
-                        reference_id=conversation_data.id, 
-                        commit=False
-                    )
-
-                db.session.commit()
-                db.session.refresh(conversation_data)
-
-            logger.info(
-                f"✅ Public Conversation {conversation_id} stored successfully "
-                f"(cost={calculated_cost})"
+        try:
+            # Persisted and billed once ElevenLabs delivers the post-call webhook
+            await record_conversation_end(
+                conversation_id,
+                user_id=user_id,
+                agent_id=agent_id,
+                channel=ChannelEnum.api,
+                reference_type="api_conversation",
+                force=False,
             )
-
         except Exception:
             logger.error(f"Error while saving public WS conversation:\n{traceback.format_exc()}")
@@ -1,7 +1,7 @@
 """
 This file has CRUD routes defined for the voice 
 """
-from fastapi import HTTPException, APIRouter, status, Depends, Form, UploadFile, File
+from fastapi import HTTPException, APIRouter, status, Depends, Form, UploadFile, File, Request
 from app_v2.utils.jwt_utils import HTTPBearer, require_active_user
 from app_v2.utils.feature_access import RequireFeature
 from app_v2.utils.downgrade_utils import _get_system_default_voice
@@ -9,9 +9,8 @@ from fastapi_sqlalchemy import db
 from typing import Optional, List
 from app_v2.schemas.voice_schema import VoiceRead, VoiceUpdate
 from app_v2.schemas.enum_types import GenderEnum
+import asyncio
 import os
-import shutil
-from datetime import datetime, timezone
 from sqlalchemy import or_, and_
 from dataclasses import dataclass
 from sqlalchemy.orm import selectinload
@@ -19,19 +18,22 @@ from sqlalchemy.orm import selectinload
 from app_v2.databases.models import VoiceModel, UnifiedAuthModel, VoiceTraitsModel,AgentModel
 from app_v2.utils.email_service import send_voice_limit_email_to_admins
 from app_v2.core.logger import setup_logger
-from app_v2.utils.elevenlabs import ElevenLabsVoice
-from fastapi.responses import Response
-from app_v2.schemas.pagination import PaginatedResponse
+from app_v2.utils.elevenlabs import AsyncElevenLabsVoice
+from app_v2.utils.file_storage import FileTooLarge, LocalStorage, discard_staged, release_file, sharded_key, storage
+from app_v2.utils.voice_catalog import voice_catalog, voice_entry
+from app_v2.utils.voice_preprocess import preprocess_upload
+from app_v2.utils.voice_previews import PREVIEW_FAILED, mark_preview_stale, preview_ready, preview_signature_valid, preview_status, preview_url, queue_preview, voice_preview_worker
+from app_v2.core.config import VoiceSettings
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from app_v2.schemas.pagination import CursorPaginatedResponse
 
 logger = setup_logger(__name__)
 
 security = HTTPBearer()
 
 router = APIRouter(prefix="/api/v2", tags=["agent"], dependencies=[Depends(security)])
-
-UPLOAD_DIR = "uploads/voices"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+# Routes authorized by a signed URL instead of a Bearer token
+public_router = APIRouter(prefix="/api/v2", tags=["agent"])
 
 MAX_FILE_SIZE = 10 * 1024 * 1024 # 10 MB
 ALLOWED_AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a"}
@@ -39,73 +41,32 @@ ALLOWED_AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a"}
 # -------------------- RESPONSE MAPPER --------------------
 
 def voice_to_read(voice: VoiceModel) -> VoiceRead:
-    gender = GenderEnum.male
-    nationality = "british"
-    
-    if voice.traits:
-        gender = voice.traits.gender.value if hasattr(voice.traits.gender, 'value') else str(voice.traits.gender)
-        nationality = voice.traits.nationality
-        agent_list = [agent.agent_name for agent in voice.agents] if voice.agents else []   
-
-    return VoiceRead(
-        id=voice.id,
-        voice_name=voice.voice_name,
-        is_custom_voice=voice.is_custom_voice,
-        elevenlabs_voice_id=voice.elevenlabs_voice_id,
-        gender=gender,
-        nationality=nationality,
-        has_sample_audio=voice.has_sample_audio,
-        sample_audio_url=voice.audio_file,
-        is_enabled=voice.is_enabled,
-        agents= agent_list
-    )
-
-@router.get("/voice", response_model=PaginatedResponse[VoiceRead], status_code=status.HTTP_200_OK, openapi_extra={"security":[{"BearerAuth":[]}]}, summary="lists available voices", description="return the list of available voices for user (both custom and predefined). Use synced_only=true to list only voices usable for agent creation (have ElevenLabs ID).")
+    agent_list = [agent.agent_name for agent in voice.agents] if voice.agents else []
+    return VoiceRead(**voice_entry(voice), agents=agent_list)
+
+@router.get("/voice", response_model=CursorPaginatedResponse[VoiceRead], status_code=status.HTTP_200_OK, openapi_extra={"security":[{"BearerAuth":[]}]}, summary="lists available voices", description="return the list of available voices for user (both custom and predefined), ordered by id. Pass next_cursor from a page as cursor to get the next one; it is null on the last page. Use synced_only=true to list only voices usable for agent creation (have ElevenLabs ID).")
 async def get_all_voices(
-    skip: int = 0,
+    cursor: Optional[int] = None,
     limit: int = 10,
     synced_only: bool = True,
     name: Optional[str] = None,
     gender: Optional[GenderEnum] = None,
     current_user: UnifiedAuthModel = Depends(require_active_user())):
     try:
-        filters = [
-            or_(
-                VoiceModel.user_id == current_user.id,
-                VoiceModel.user_id.is_(None),
-            ),
-        ]
-        if synced_only:
-            filters.append(VoiceModel.elevenlabs_voice_id.isnot(None))
-            
-        if name:
-            filters.append(VoiceModel.voice_name.ilike(f"%{name}%"))
-            
-        if gender:
-            filters.append(VoiceModel.traits.has(VoiceTraitsModel.gender == gender))
-
-        voices = (
-            db.session.query(VoiceModel)
-            .options(selectinload(VoiceModel.traits))
-            .filter(*filters)
-            .order_by(VoiceModel.id.asc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        items, next_cursor = voice_catalog.page(
+            current_user.id,
+            cursor=cursor,
+            limit=limit,
+            synced_only=synced_only,
+            name=name,
+            gender=gender,
         )
-        total = db.session.query(VoiceModel).filter(*filters).count()
-        import math
-        pages = math.ceil(total / limit) if limit > 0 else 1
-        current_page = (skip // limit) + 1 if limit > 0 else 1
-        
         logger.info("voices fetched successfully from db")
-        
-        return PaginatedResponse(
-            total=total,
-            page=current_page,
-            size=limit,
-            pages=pages,
-            items=[voice_to_read(voice) for voice in voices]
+
+        return CursorPaginatedResponse(
+            size=len(items),
+            next_cursor=next_cursor,
+            items=items
         )
     except Exception as e:
         logger.error(f"error while fetching the voices: {e}")
@@ -118,7 +79,7 @@ async def get_all_voices(
 @router.get("/voice/by-id/{id}", response_model=VoiceRead, status_code=status.HTTP_200_OK, openapi_extra={"security":[{"BearerAuth":[]}]})
 async def get_voice_by_id(id: int, current_user: UnifiedAuthModel = Depends(require_active_user())):
     try:
-        voice = db.session.query(VoiceModel).options(selectinload(VoiceModel.traits)).filter(
+        voice = db.session.query(VoiceModel).options(selectinload(VoiceModel.traits), selectinload(VoiceModel.preview)).filter(
             and_(
                 VoiceModel.id == id,
                 or_(
@@ -159,18 +120,18 @@ async def create_voice(
         if ext.lower() not in ALLOWED_AUDIO_EXTENSIONS:
             raise HTTPException(status_code=400, detail="Invalid file type. Allowed: .mp3, .wav, .m4a")
 
-        # Validate file size
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-             raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
-
-        file_path = os.path.join(UPLOAD_DIR, f"{current_user.id}_{datetime.now(timezone.utc).timestamp()}_{file.filename}")
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Stream to storage, validating the size on the way
+        try:
+            staged = await asyncio.to_thread(storage.stage, file.file, MAX_FILE_SIZE, suffix=ext.lower())
+        except FileTooLarge:
+            raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
+        # Mono, resampled, trimmed and normalized; the original if that fails
+        staged, preprocessing = await preprocess_upload(staged)
+        try:
+            file_path = await asyncio.to_thread(storage.commit, staged.path, sharded_key("voices", staged.sha256, staged.path))
+        except Exception:
+            discard_staged(staged.path)
+            raise
 
         with db():
             # Check if voice name exists for user
@@ -180,30 +141,28 @@ async def create_voice(
             ).first()
             if existing_voice:
                  # Clean up uploaded file
-                 if os.path.exists(file_path):
-                     os.remove(file_path)
+                 release_file(file_path)
                  raise HTTPException(status_code=400, detail="Voice with this name already exists")
             
             gender = gender.lower()
             if gender not in [GenderEnum.male, GenderEnum.female]:
                 # Clean up uploaded file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                release_file(file_path)
                 raise HTTPException(status_code=400, detail="Invalid gender. Must be 'male' or 'female'")
             
             # Clone voice in ElevenLabs - THIS IS REQUIRED
             logger.info(f"Cloning voice '{voice_name}' in ElevenLabs for user {current_user.id}")
-            elevenlabs_client = ElevenLabsVoice()
-            clone_response = elevenlabs_client.create_cloned_voice(
-                file_path=file_path,
-                name=voice_name,
-                description=f"Custom voice for {current_user.email or current_user.phone}"
-            )
+            elevenlabs_client = AsyncElevenLabsVoice()
+            async with storage.local_file(file_path) as local_file:
+                clone_response = await elevenlabs_client.create_cloned_voice(
+                    file_path=local_file,
+                    name=voice_name,
+                    description=f"Custom voice for {current_user.email or current_user.phone}"
+                )
             
             if not clone_response.status or not clone_response.data.get("voice_id"):
                 # Clean up uploaded file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                release_file(file_path)
                 error_msg = clone_response.error_message or "Failed to clone voice in ElevenLabs"
                 logger.error(f"❌ Voice cloning failed: {error_msg}")
                 
@@ -265,22 +224,23 @@ async def create_voice(
                 nationality=nationality
             )
             db.session.add(traits)
+            mark_preview_stale(voice)
             
             db.session.commit()
             db.session.refresh(voice)
+            voice_preview_worker.wake()
             
             logger.info(f"Custom voice created: {voice_name} (DB ID: {voice.id}, EL ID: {elevenlabs_voice_id})")
-            return voice_to_read(voice)
+            voice_read = voice_to_read(voice)
+            voice_read.preprocessing = preprocessing
+            return voice_read
 
     except HTTPException as e:
         raise e
     except Exception as e:
         # Clean up file if exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        if 'file_path' in locals():
+            release_file(file_path)
         logger.error(f"Error creating voice: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error:{str(e)}")
 
@@ -303,8 +263,8 @@ async def delete_voice(
             if voice.elevenlabs_voice_id:
                 try:
                     logger.info(f"Deleting voice from ElevenLabs: {voice.elevenlabs_voice_id}")
-                    elevenlabs_client = ElevenLabsVoice()
-                    delete_response = elevenlabs_client.delete_voice(voice.elevenlabs_voice_id)
+                    elevenlabs_client = AsyncElevenLabsVoice()
+                    delete_response = await elevenlabs_client.delete_voice(voice.elevenlabs_voice_id)
                     
                     if delete_response.status:
                         logger.info(f"✅ Voice deleted from ElevenLabs: {voice.elevenlabs_voice_id}")
@@ -316,16 +276,12 @@ async def delete_voice(
                     logger.error(f"Error deleting voice from ElevenLabs: {e}")
                     # Continue with database deletion even if ElevenLabs deletion fails
             
-            # Delete file if exists
-            if voice.audio_file and os.path.exists(voice.audio_file):
-                try:
-                    os.remove(voice.audio_file)
-                    logger.info(f"Deleted audio file: {voice.audio_file}")
-                except OSError as e:
-                    logger.warning(f"Failed to delete voice file {voice.audio_file}: {e}")
-
+            audio_file = voice.audio_file
             db.session.delete(voice)
             db.session.commit()
+
+            # Delete the file once no other voice uses the same sample
+            release_file(audio_file)
             
             logger.info(f"Deleted voice {voice_id} from database")
             return
@@ -367,7 +323,12 @@ async def update_voice(
                 logger.info(f"Voice {voice_id} is now {'enabled' if voice_update.is_enabled else 'disabled'}")
 
             
+            preview_stale = False
             if voice_update.voice_name:
+                if voice_update.voice_name != voice.voice_name:
+                    # The synthesized preview says the voice's name
+                    mark_preview_stale(voice)
+                    preview_stale = True
                 voice.voice_name = voice_update.voice_name
             
             # Handle traits update
@@ -391,6 +352,8 @@ async def update_voice(
             db.session.refresh(voice)
             if voice.traits:
                 db.session.refresh(voice.traits)
+            if preview_stale:
+                voice_preview_worker.wake()
             
             logger.info(f"Updated voice {voice_id}")
             return voice_to_read(voice)
@@ -437,14 +400,86 @@ async def preview_voice(
                 detail="This voice is not linked to ElevenLabs"
             )
         
-        if voice.has_sample_audio == True:
-            return {
-                "voice_id": voice.id,
-                "name":voice.voice_name,
-                "elevenlabs_voice_id": voice.elevenlabs_voice_id,
-                "sample_url": voice.audio_file,
-                
-            }
+        cached_url = preview_url(voice)
+        if cached_url is None and queue_preview(voice):
+            db.session.commit()
+            voice_preview_worker.wake()
+
+        # Without a sample or a cached clip yet, preview_status shows the queued generation
+        return {
+            "voice_id": voice.id,
+            "name":voice.voice_name,
+            "elevenlabs_voice_id": voice.elevenlabs_voice_id,
+            "sample_url": cached_url or (voice.audio_file if voice.has_sample_audio else None),
+            "preview_url": cached_url,
+            "preview_status": preview_status(voice),
+        }
+
+
+@public_router.get(
+    "/voice/{voice_id}/preview/audio",
+    status_code=status.HTTP_200_OK,
+    summary="cached preview clip of a voice",
+    description="Serves the voice's cached preview clip with a long-lived Cache-Control and an ETag. Linked through the signed, expiring sample_audio_url / preview_url rather than a Bearer token, so an <audio> element can play it. Returns 202 with Retry-After while the clip is being generated.",
+)
+async def get_voice_preview_audio(
+    voice_id: int,
+    request: Request,
+    v: str,
+    exp: int,
+    sig: str,
+):
+    if not preview_signature_valid(voice_id, v, exp, sig):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired preview link")
+
+    with db():
+        voice = db.session.query(VoiceModel).options(selectinload(VoiceModel.preview)).filter(
+            VoiceModel.id == voice_id
+        ).first()
+        if not voice:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Voice not found")
+        if not voice.elevenlabs_voice_id:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="This voice is not linked to ElevenLabs"
+            )
+
+        if not preview_ready(voice):
+            if queue_preview(voice):
+                db.session.commit()
+                voice_preview_worker.wake()
+            preview = voice.preview
+            if preview.status == PREVIEW_FAILED:
+                raise HTTPException(
+                    status_code=status.HTTP_424_FAILED_DEPENDENCY,
+                    detail=f"Preview generation failed: {preview.error}"
+                )
+            return Response(
+                status_code=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": str(int(VoiceSettings.VOICE_PREVIEW_POLL_INTERVAL_SECONDS) or 1)},
+            )
+
+        preview = voice.preview
+        if preview.etag[:16] != v:
+            # The clip was regenerated after this link was made
+            return RedirectResponse(preview_url(voice), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        file_path, content_type, size = preview.file_path, preview.content_type or "audio/mpeg", preview.size_bytes
+
+    etag = f'"{preview.etag}"'
+    headers = {
+        "ETag": etag,
+        # Clips are immutable per ETag and the signed URL carries it, so a new clip gets a new URL
+        "Cache-Control": f"private, max-age={VoiceSettings.VOICE_PREVIEW_CACHE_MAX_AGE}, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if isinstance(storage, LocalStorage):
+        return FileResponse(file_path, media_type=content_type, headers=headers)
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    return StreamingResponse(storage.iter_chunks(file_path), media_type=content_type, headers=headers)
 
 
 @router.post("/voice/request", status_code=status.HTTP_200_OK, openapi_extra={"security": [{"BearerAuth": []}]})
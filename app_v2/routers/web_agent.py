@@ -33,11 +33,11 @@ from app_v2.databases.models import (
     WebAgentLeadModel,
     WebAgentModel,
 )
-from app_v2.schemas.enum_types import CallStatusEnum, ChannelEnum
+from app_v2.schemas.enum_types import ChannelEnum
 from app_v2.schemas.web_agent_schema import WebAgentLeadCreate, WebAgentPublicConfig
 from app_v2.utils.activity_logger import log_activity
-from app_v2.utils.coin_utils import deduct_coins, get_user_coin_balance
-from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
+from app_v2.utils.coin_utils import get_user_coin_balance
+from app_v2.utils.conversation_ingest import record_conversation_end, register_post_ingest_hook
 from app_v2.utils.email_service import send_conversation_notification_email, send_low_coins_email
 from app_v2.utils.feature_access import (
     check_feature_limit_and_usage,
@@ -441,68 +441,6 @@ async def run_web_agent_session(
 # Post-call storage helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _calculate_cost(raw_el_cost: float) -> int:
-    """Must be called inside db() context."""
-    settings = CoinUsageSettingsModel.get_settings()
-    return int((raw_el_cost * settings.elevenlabs_multiplier) + settings.static_conversation_cost)
-
-
-def _persist_web_conversation(
-    ctx: WebAgentContext,
-    metadata: dict,
-    conv_id: str,
-    lead_id: Optional[int],
-) -> ConversationsModel:
-    """
-    Saves conversation, deducts coins, links lead if present.
-    Must be called inside db() context.
-
-    force=True is passed to deduct_coins so that if the call cost exceeded
-    the user's balance (overdraft), the full cost is still recorded and the
-    balance goes negative rather than silently skipping the deduction.
-    """
-    raw_cost = float(metadata.get("cost") or 0)
-    calculated_cost = _calculate_cost(raw_cost)
-    call_status = CallStatusEnum.success if metadata.get("call_successful") else CallStatusEnum.failed
-
-    record = ConversationsModel(
-        agent_id=ctx.agent_id,
-        user_id=ctx.user_id,
-        message_count=metadata.get("message_count"),
-        duration=metadata.get("duration"),
-        call_status=call_status,
-        channel=ChannelEnum.widget,
-        transcript_summary=metadata.get("transcript_summary"),
-        elevenlabs_conv_id=conv_id,
-        cost=raw_cost,
-    )
-    db.session.add(record)
-    db.session.flush()
-
-    if calculated_cost > 0:
-        deduct_coins(
-            user_id=ctx.user_id,
-            amount=calculated_cost,
-            reference_type="conversation",
-            reference_id=record.id,
-            commit=False,
-            force=True,  # call already happened — always deduct full cost
-        )
-
-    db.session.commit()
-    db.session.refresh(record)
-
-    if lead_id:
-        lead = db.session.query(WebAgentLeadModel).get(lead_id)
-        if lead:
-            lead.conversation_id = record.id
-            db.session.add(lead)
-            db.session.commit()
-            logger.info("Linked lead %s to conversation %s", lead_id, record.id)
-
-    return record
-
-
 def _fetch_owner_notification_settings(user_id: int, lead_id: Optional[int]) -> tuple[OwnerNotificationSettings, str]:
     """
     Fetches owner notification prefs and lead name.
@@ -529,21 +467,22 @@ def _fetch_owner_notification_settings(user_id: int, lead_id: Optional[int]) ->
 
 
 async def maybe_send_notifications(
-    ctx: WebAgentContext,
+    user_id: int,
+    web_agent_name: str,
     record: ConversationsModel,
     metadata: dict,
     lead_id: Optional[int],
 ) -> None:
     """Sends conversation notification and low-coins alert emails if enabled."""
     with db():
-        notif, lead_name = _fetch_owner_notification_settings(ctx.user_id, lead_id)
-        current_balance = get_user_coin_balance(ctx.user_id)
+        notif, lead_name = _fetch_owner_notification_settings(user_id, lead_id)
+        current_balance = get_user_coin_balance(user_id)
 
     if notif.email and notif.email_notifications:
         try:
             await send_conversation_notification_email(
                 company_email=notif.email,
-                agent_name=ctx.web_agent_name,
+                agent_name=web_agent_name,
                 conversation_id=str(record.id),
                 base_url=VoiceSettings.FRONTEND_URL,
                 user_name=lead_name,
@@ -567,33 +506,36 @@ async def maybe_send_notifications(
             logger.error("Failed to send low coins email:\n%s", traceback.format_exc())
 
 
+async def _after_widget_ingest(ingest, record: ConversationsModel, metadata: dict) -> None:
+    web_agent_name = (ingest.context or {}).get("web_agent_name", "")
+    await maybe_send_notifications(ingest.user_id, web_agent_name, record, metadata, ingest.lead_id)
+
+
+register_post_ingest_hook(ChannelEnum.widget, _after_widget_ingest)
+
+
 async def save_web_conversation(
     ctx: WebAgentContext,
     conv_id: str,
     lead_id: Optional[int],
 ) -> None:
     """
-    Fetches ElevenLabs metadata, persists record, deducts coins,
-    links lead, and dispatches notification emails.
+    Registers the finished widget conversation for post-call ingestion.
+    The record, coin deduction, lead link and notification emails follow
+    once ElevenLabs delivers the transcript (see conversation_ingest).
     """
     try:
-        el_conv = ElevenLabsConversation()
-        metadata = await asyncio.to_thread(el_conv.extract_conversation_metadata, conv_id)
-
-        if not metadata:
-            logger.error("Metadata extraction failed for conversation %s", conv_id)
-            return
-
-        with db():
-            record = _persist_web_conversation(ctx, metadata, conv_id, lead_id)
-
-        logger.info(
-            "Conversation %s saved (duration=%ss, messages=%s, cost=%s)",
-            conv_id, metadata.get("duration"), metadata.get("message_count"), record.cost,
+        # force=True: the call already happened, so an overdraft is recorded
+        # as debt rather than skipping the deduction.
+        await record_conversation_end(
+            conv_id,
+            user_id=ctx.user_id,
+            agent_id=ctx.agent_id,
+            channel=ChannelEnum.widget,
+            force=True,
+            lead_id=lead_id,
+            context={"web_agent_name": ctx.web_agent_name},
         )
-
-        await maybe_send_notifications(ctx, record, metadata, lead_id)
-
     except Exception:
         logger.error("save_web_conversation failed:\n%s", traceback.format_exc())
 
@@ -39,12 +39,18 @@ Covered events:
   Subscription: activated, charged, completed, updated, pending,
                 halted, cancelled, paused, resumed
   Order/payment: payment.captured, payment.failed, order.paid
+
+ElevenLabs post-call webhook (/elevenlabs):
+  post_call_transcription  → conversation ingested (stored, billed, lead linked)
+  call_initiation_failure  → pending ingest marked failed
 """
 
+import asyncio
 import hashlib
 import hmac
 import json
 import logging
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, Optional
 
@@ -54,6 +60,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app_v2.core.config import VoiceSettings
 from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
 from app_v2.databases.models import (
     AddOnCoinOrderModel,
     CoinsLedgerModel,
@@ -70,7 +77,9 @@ from app_v2.schemas.enum_types import (
     PaymentTypeEnum,
     SubscriptionStatusEnum,
 )
+from app_v2.utils.async_data_access import is_webhook_event_processed_async
 from app_v2.utils.coin_utils import get_user_coin_balance, reset_unused_subscription_coins
+from app_v2.utils.conversation_ingest import ingest_conversation_async, mark_ingest_failed
 
 logger = setup_logger(__name__)
 router = APIRouter(prefix="/api/v2/webhooks", tags=["Webhooks"])
@@ -269,15 +278,9 @@ async def razorpay_webhook(request: Request):
 
     # ── 2. Idempotency guard ──────────────────────────────────────────────────
     if event_id:
-        existing_log = (
-            db.session.query(WebhookEventLogModel)
-            .filter(
-                WebhookEventLogModel.event_id == event_id,
-                WebhookEventLogModel.status == "processed",
-            )
-            .first()
-        )
-        if existing_log:
+        async with async_db() as session:
+            already_processed = await is_webhook_event_processed_async(session, event_id)
+        if already_processed:
             logger.info(f"Razorpay webhook: duplicate event {event_id} – skipping")
             return {"status": "duplicate"}
 
@@ -299,19 +302,10 @@ async def razorpay_webhook(request: Request):
             raise HTTPException(status_code=400, detail="Invalid signature")
 
     # ── 4. Dispatch ───────────────────────────────────────────────────────────
+    # The subscription/order handlers are sync; run them in a worker thread so
+    # their queries and commits don't block the event loop.
     try:
-        with db():
-            log = _log_event(event_id, event_type, payload)
-            if not signature_valid:
-                log.status = "invalid_signature"
-
-            if event_type in SUBSCRIPTION_EVENTS:
-                _handle_subscription_event(event_type, payload, log)
-            elif event_type in ORDER_EVENTS:
-                _handle_order_event(event_type, payload, log)
-
-            _mark_log(log, "processed")
-            db.session.commit()
+        await asyncio.to_thread(_dispatch_event, event_id, event_type, payload, signature_valid)
 
     except Exception as exc:
         logger.exception(
@@ -322,6 +316,27 @@ async def razorpay_webhook(request: Request):
     return {"status": "ok"}
 
 
+def _dispatch_event(
+    event_id: str,
+    event_type: str,
+    payload: Dict[str, Any],
+    signature_valid: bool,
+) -> None:
+    """Logs the event and runs its handler in one transaction."""
+    with db():
+        log = _log_event(event_id, event_type, payload)
+        if not signature_valid:
+            log.status = "invalid_signature"
+
+        if event_type in SUBSCRIPTION_EVENTS:
+            _handle_subscription_event(event_type, payload, log)
+        elif event_type in ORDER_EVENTS:
+            _handle_order_event(event_type, payload, log)
+
+        _mark_log(log, "processed")
+        db.session.commit()
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Subscription event dispatcher
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1088,4 +1103,73 @@ def _credit_subscription_coins(
     logger.info(
         f"Coins credited | user={sub.user_id} | coins={plan.coins_included} | "
         f"new_balance={new_balance} | expires={period_end}"
-    )
\ No newline at end of file
+    )
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ElevenLabs post-call webhook
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _verify_elevenlabs_signature(raw_body: bytes, header: str) -> bool:
+    """
+    ElevenLabs-Signature is "t=<unix ts>,v0=<hex hmac>", the HMAC-SHA256 of
+    "<ts>.<body>" with the workspace webhook secret. Stale timestamps are
+    rejected to limit replays.
+    """
+    parts = dict(p.split("=", 1) for p in header.split(",") if "=" in p)
+    timestamp, signature = parts.get("t", ""), parts.get("v0", "")
+    if not timestamp.isdigit() or not signature:
+        return False
+    if abs(time.time() - int(timestamp)) > VoiceSettings.ELEVENLABS_WEBHOOK_TOLERANCE_SECONDS:
+        return False
+    expected = hmac.new(
+        VoiceSettings.ELEVENLABS_WEBHOOK_SECRET.encode("utf-8"),
+        f"{timestamp}.".encode("utf-8") + raw_body,
+        hashlib.sha256,
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@router.post("/elevenlabs", status_code=status.HTTP_200_OK)
+async def elevenlabs_webhook(request: Request):
+    """
+    Post-call webhook from ElevenLabs.
+
+    post_call_transcription carries the full conversation (transcript, cost,
+    analysis) and is ingested directly, so no polling is needed at hangup.
+    Duplicate deliveries are no-ops (see conversation_ingest). Returns 200
+    once the signature checks out, even if ingest fails; the fallback sweep
+    picks those conversations up by polling.
+    """
+    if not VoiceSettings.ELEVENLABS_WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail="Not configured")
+
+    raw_body: bytes = await request.body()
+    if not _verify_elevenlabs_signature(raw_body, request.headers.get("ElevenLabs-Signature", "")):
+        logger.warning("ElevenLabs webhook: invalid or stale signature")
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload: Dict[str, Any] = json.loads(raw_body)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    event_type = payload.get("type", "")
+    data = payload.get("data") or {}
+    conv_id = data.get("conversation_id")
+    logger.info(f"ElevenLabs webhook received | event={event_type} | conversation={conv_id}")
+
+    if not conv_id:
+        return {"status": "ignored"}
+
+    try:
+        if event_type == "post_call_transcription":
+            record = await ingest_conversation_async(conv_id, data, source="webhook")
+            return {"status": "ok" if record else "duplicate"}
+        if event_type == "call_initiation_failure":
+            await mark_ingest_failed(conv_id, data.get("failure_reason") or "call_initiation_failure")
+            return {"status": "ok"}
+    except Exception as exc:
+        logger.exception(f"ElevenLabs webhook handler failed | event={event_type} | conversation={conv_id} | error={exc}")
+        return {"status": "error"}
+
+    return {"status": "ignored"}
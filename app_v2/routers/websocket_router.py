@@ -22,31 +22,32 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import aiohttp
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import HTMLResponse
 from fastapi_sqlalchemy import db
-from jose import JWTError, jwt
 
 from app_v2.core.config import VoiceSettings
 from app_v2.core.elevenlabs_config import ELEVENLABS_API_KEY
 from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
 from app_v2.databases.models import (
     AgentModel,
-    CoinUsageSettingsModel,
-    ConversationsModel,
     UnifiedAuthModel,
 )
-from app_v2.schemas.enum_types import CallStatusEnum, ChannelEnum
-from app_v2.utils.activity_logger import log_activity
-from app_v2.utils.coin_utils import deduct_coins, get_user_coin_balance
-from app_v2.utils.email_service import send_low_coins_email
-from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
-from app_v2.utils.feature_access import (
-    check_feature_limit_and_usage,
-    get_feature_limit,
-    get_feature_usage,
+from app_v2.schemas.enum_types import ChannelEnum
+from app_v2.utils.async_data_access import (
+    check_monthly_minutes_async,
+    get_coin_usage_settings_async,
+    get_feature_limit_async,
+    get_monthly_minutes_usage_async,
+    get_user_agent_async,
+    get_user_coin_balance_async,
+    log_activity_async,
 )
-from app_v2.utils.jwt_utils import ALGORITHM, SECRET_KEY
+from app_v2.utils.coin_utils import get_user_coin_balance
+from app_v2.utils.conversation_ingest import record_conversation_end, register_post_ingest_hook
+from app_v2.utils.email_service import send_low_coins_email
+from app_v2.utils.jwt_utils import user_from_access_token
 
 logger = setup_logger(__name__)
 
@@ -101,26 +102,14 @@ async def _receive_auth_message(websocket: WebSocket) -> Optional[dict]:
         return None
 
 
-def _decode_jwt(token: str) -> Optional[int]:
-    """
-    Decodes JWT and returns user_id, or None if invalid.
-    """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        return int(user_id) if user_id else None
-    except JWTError:
-        return None
-
-
-def _load_and_validate_user(user_id: int) -> Optional[UnifiedAuthModel]:
+def _authenticate_token(token: str) -> Optional[UnifiedAuthModel]:
     """
-    Fetches user by ID. Returns None if not found or suspended.
+    Resolves an access token to its user with the same checks as the HTTP
+    routes (type, token generation, revocation). Returns None if invalid.
     """
     try:
-        user = UnifiedAuthModel.get_by_id(user_id)
-        return None if user.is_suspended else user
-    except Exception:
+        return user_from_access_token(token)
+    except HTTPException:
         return None
 
 
@@ -129,8 +118,8 @@ async def authenticate_websocket_user(websocket: WebSocket) -> Optional[AuthResu
     Full auth pipeline:
       1. Receive first message within timeout
       2. Validate message shape
-      3. Decode JWT → user_id
-      4. Load + validate user
+      3. Validate the access token and load its user (as get_current_user)
+      4. Reject suspended users
 
     Sends an error JSON and closes the socket on any failure.
     Returns AuthResult on success, None on failure.
@@ -149,34 +138,25 @@ async def authenticate_websocket_user(websocket: WebSocket) -> Optional[AuthResu
         await _reject("Auth required. Call disconnected.", "Auth required")
         return None
 
-    user_id = _decode_jwt(auth_msg["token"])
-    if user_id is None:
+    # Token checks hit the database (user, revocation); keep them off the loop
+    user = await asyncio.to_thread(_authenticate_token, auth_msg["token"])
+    if user is None:
         await _reject("Invalid token. Call disconnected.", "Invalid token")
-        logger.error("Invalid JWT received")
+        logger.error("Invalid, revoked or non-access JWT received")
         return None
 
-    user = _load_and_validate_user(user_id)
-    if user is None:
+    if user.is_suspended:
         await _reject("User not found or suspended. Call disconnected.", "User invalid")
-        logger.error(f"User {user_id} not found or suspended")
+        logger.error(f"User {user.id} is suspended")
         return None
 
-    return AuthResult(user_id=user_id, user=user)
+    return AuthResult(user_id=user.id, user=user)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Agent helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _query_agent(user_id: int, agent_id: int) -> Optional[AgentModel]:
-    """Fetches agent owned by user_id."""
-    return (
-        db.session.query(AgentModel)
-        .filter(AgentModel.id == agent_id, AgentModel.user_id == user_id)
-        .first()
-    )
-
-
 async def fetch_and_validate_agent(
     websocket: WebSocket,
     user_id: int,
@@ -190,8 +170,8 @@ async def fetch_and_validate_agent(
         await websocket.send_json({"type": "error", "message": message})
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
 
-    with db():
-        agent = _query_agent(user_id, agent_id)
+    async with async_db() as session:
+        agent = await get_user_agent_async(session, user_id, agent_id)
 
     if not agent:
         await _reject("Agent not found. Call disconnected.", "Agent not found")
@@ -215,16 +195,16 @@ async def fetch_and_validate_agent(
 # Limits helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _is_monthly_limit_ok(user_id: int) -> bool:
+async def _is_monthly_limit_ok(session, user_id: int) -> bool:
     """Returns True if user is within monthly minute limit."""
     try:
-        check_feature_limit_and_usage(user_id, "monthly_minutes")
+        await check_monthly_minutes_async(session, user_id)
         return True
     except Exception:
         return False
 
 
-def _get_minimum_call_balance() -> int:
+async def _get_minimum_call_balance(session) -> int:
     """
     Calculates the minimum coin balance required to start a call.
 
@@ -234,16 +214,16 @@ def _get_minimum_call_balance() -> int:
     Rationale: user must afford at least 3 minutes + the flat per-call fee
     before we even open the ElevenLabs socket.
     """
-    settings = CoinUsageSettingsModel.get_settings()
+    settings = await get_coin_usage_settings_async(session)
     return int((3 * settings.cost_per_minute_in_coins) + settings.static_conversation_cost)
 
 
-def _has_sufficient_coins(user_balance: int) -> tuple[bool, int]:
+async def _has_sufficient_coins(session, user_balance: int) -> tuple[bool, int]:
     """
     Returns (is_sufficient, minimum_required).
     Keeps the threshold calculation in one place so it can be logged clearly.
     """
-    minimum = _get_minimum_call_balance()
+    minimum = await _get_minimum_call_balance(session)
     return user_balance >= minimum, minimum
 
 
@@ -253,16 +233,16 @@ async def check_user_limits(
 ) -> Optional[LimitsResult]:
     """
     Checks coin balance (minimum 3-minute threshold) and monthly minutes limit.
-    All DB calls are wrapped in a single db() context to avoid session errors.
+    All DB calls share one async session so the event loop is never blocked.
     Rejects websocket and returns None on any failure.
     """
     async def _reject(message: str, reason: str) -> None:
         await websocket.send_json({"type": "error", "message": message})
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
 
-    with db():
-        user_balance = get_user_coin_balance(user_id)
-        sufficient, minimum_required = _has_sufficient_coins(user_balance)
+    async with async_db() as session:
+        user_balance = await get_user_coin_balance_async(session, user_id)
+        sufficient, minimum_required = await _has_sufficient_coins(session, user_balance)
 
         if not sufficient:
             await _reject(
@@ -275,7 +255,7 @@ async def check_user_limits(
             )
             return None
 
-        if not _is_monthly_limit_ok(user_id):
+        if not await _is_monthly_limit_ok(session, user_id):
             await _reject(
                 "Monthly minutes limit reached. Call disconnected.",
                 "Monthly minutes limit reached",
@@ -283,8 +263,8 @@ async def check_user_limits(
             logger.error(f"User {user_id} hit monthly minutes limit")
             return None
 
-        initial_usage = get_feature_usage(user_id, "monthly_minutes")
-        minute_limit = get_feature_limit(user_id, "monthly_minutes")
+        initial_usage = await get_monthly_minutes_usage_async(session, user_id)
+        minute_limit = await get_feature_limit_async(session, user_id, "monthly_minutes")
 
     return LimitsResult(
         user_balance=user_balance,
@@ -297,9 +277,10 @@ async def check_user_limits(
 # Activity logging helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def log_conversation_started(user_id: int, agent_id: int, agent: AgentModel, elevenlabs_agent_id: str) -> None:
-    with db():
-        log_activity(
+async def log_conversation_started(user_id: int, agent_id: int, agent: AgentModel, elevenlabs_agent_id: str) -> None:
+    async with async_db() as session:
+        await log_activity_async(
+            session,
             user_id=user_id,
             event_type="agent_conversation_started",
             description=f"Started voice chat for agent: {agent.agent_name}",
@@ -311,15 +292,16 @@ def log_conversation_started(user_id: int, agent_id: int, agent: AgentModel, ele
         )
 
 
-def log_conversation_completed(
+async def log_conversation_completed(
     user_id: int,
     agent_id: int,
     agent: AgentModel,
     elevenlabs_agent_id: str,
     conversation_id: Optional[str],
 ) -> None:
-    with db():
-        log_activity(
+    async with async_db() as session:
+        await log_activity_async(
+            session,
             user_id=user_id,
             event_type="agent_conversation_completed",
             description=f"Completed voice chat for agent: {agent.agent_name}",
@@ -456,57 +438,6 @@ async def run_bridge(
 # Post-call storage helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _calculate_cost(raw_el_cost: float) -> int:
-    settings = CoinUsageSettingsModel.get_settings()
-    return int((raw_el_cost * settings.elevenlabs_multiplier) + settings.static_conversation_cost)
-
-
-def _persist_conversation(
-    user_id: int,
-    agent_id: int,
-    metadata: dict,
-    conversation_id: str,
-) -> ConversationsModel:
-    """
-    Saves conversation record and deducts coins. Must be called inside db().
-
-    force=True is passed to deduct_coins so that if the call cost exceeded
-    the user's balance (overdraft), the full cost is still recorded and the
-    balance goes negative rather than silently skipping the deduction.
-    """
-    raw_cost = float(metadata.get("cost") or 0)
-    calculated_cost = _calculate_cost(raw_cost)
-    call_status = CallStatusEnum.success if metadata.get("call_successful") else CallStatusEnum.failed
-
-    record = ConversationsModel(
-        agent_id=agent_id,
-        user_id=user_id,
-        message_count=metadata.get("message_count"),
-        duration=metadata.get("duration"),
-        call_status=call_status,
-        channel=ChannelEnum.chat,
-        transcript_summary=metadata.get("transcript_summary"),
-        elevenlabs_conv_id=conversation_id,
-        cost=raw_cost,
-    )
-    db.session.add(record)
-    db.session.flush()
-
-    if calculated_cost > 0:
-        deduct_coins(
-            user_id=user_id,
-            amount=calculated_cost,
-            reference_type="conversation",
-            reference_id=record.id,
-            commit=False,
-            force=True,  # call already happened — always deduct full cost
-        )
-
-    db.session.commit()
-    db.session.refresh(record)
-    return record
-
-
 async def maybe_send_low_coins_alert(user_id: int) -> None:
     """Sends low-coins email if user has alerts enabled and balance ≤ 1000."""
     try:
@@ -535,35 +466,33 @@ async def maybe_send_low_coins_alert(user_id: int) -> None:
         logger.error(f"Low coins alert failed:\n{traceback.format_exc()}")
 
 
+async def _after_chat_ingest(ingest, record, metadata) -> None:
+    await maybe_send_low_coins_alert(ingest.user_id)
+
+
+register_post_ingest_hook(ChannelEnum.chat, _after_chat_ingest)
+
+
 async def save_conversation(
     user_id: int,
     agent_id: int,
     conversation_id: str,
 ) -> None:
     """
-    Fetches ElevenLabs metadata, persists the conversation record,
-    deducts coins, and triggers low-balance alert if needed.
+    Registers the finished conversation for post-call ingestion. The
+    record, coin deduction and low-balance alert follow once ElevenLabs
+    delivers the transcript (see conversation_ingest).
     """
     try:
-        el_conv = ElevenLabsConversation()
-        metadata = await asyncio.to_thread(el_conv.extract_conversation_metadata, conversation_id)
-
-        if not metadata:
-            logger.error(f"Metadata extraction failed for conversation {conversation_id}")
-            return
-
-        with db():
-            record = _persist_conversation(user_id, agent_id, metadata, conversation_id)
-
-        logger.info(
-            f"Conversation {conversation_id} saved "
-            f"(duration={metadata.get('duration')}s, "
-            f"messages={metadata.get('message_count')}, "
-            f"cost={record.cost})"
+        # force=True: the call already happened, so an overdraft is recorded
+        # as debt rather than skipping the deduction.
+        await record_conversation_end(
+            conversation_id,
+            user_id=user_id,
+            agent_id=agent_id,
+            channel=ChannelEnum.chat,
+            force=True,
         )
-
-        await maybe_send_low_coins_alert(user_id)
-
     except Exception:
         logger.error(f"save_conversation failed:\n{traceback.format_exc()}")
 
@@ -622,7 +551,7 @@ async def websocket_test_agent(websocket: WebSocket, agent_id: int):
     )
 
     # ── 5. Log start ──────────────────────────────────────────────────────────
-    log_conversation_started(auth.user_id, agent_id, agent_result.agent, agent_result.elevenlabs_agent_id)
+    await log_conversation_started(auth.user_id, agent_id, agent_result.agent, agent_result.elevenlabs_agent_id)
     logger.info(f"Bridge starting for agent {agent_id} (EL: {agent_result.elevenlabs_agent_id})")
 
     # ── 6. ElevenLabs bridge ──────────────────────────────────────────────────
@@ -632,7 +561,7 @@ async def websocket_test_agent(websocket: WebSocket, agent_id: int):
         await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="ELEVENLABS_API_KEY missing")
         return
 
-    el_url = f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={agent_result.elevenlabs_agent_id}"
+    el_url = f"{VoiceSettings.ELEVENLABS_WS_URL}?agent_id={agent_result.elevenlabs_agent_id}"
     conversation_id: Optional[str] = None
 
     async with aiohttp.ClientSession() as session:
@@ -641,7 +570,7 @@ async def websocket_test_agent(websocket: WebSocket, agent_id: int):
             conversation_id = await run_bridge(websocket, el_ws, ctx)
 
     # ── 7. Log completion ─────────────────────────────────────────────────────
-    log_conversation_completed(auth.user_id, agent_id, agent_result.agent, agent_result.elevenlabs_agent_id, conversation_id)
+    await log_conversation_completed(auth.user_id, agent_id, agent_result.agent, agent_result.elevenlabs_agent_id, conversation_id)
 
     # ── 8. Persist & alert ────────────────────────────────────────────────────
     if not conversation_id:
@@ -1,10 +1,23 @@
-from pydantic import BaseModel, HttpUrl, field_serializer
-from typing import Optional
+from pydantic import BaseModel, Field, HttpUrl, field_serializer, field_validator, model_validator
+from typing import List, Optional
 from datetime import datetime
 
+from app_v2.core.config import VoiceSettings
+
 class KnowledgeBaseURLCreate(BaseModel):
     url: HttpUrl
 
+class KnowledgeBaseBulkURLCreate(BaseModel):
+    sitemap_url: Optional[HttpUrl] = None
+    urls: Optional[List[HttpUrl]] = Field(None, min_length=1, max_length=VoiceSettings.KB_BULK_MAX_URLS)
+    agent_id: Optional[int] = Field(None, description="Agent to attach the imported entries to")
+
+    @model_validator(mode='after')
+    def one_source(self):
+        if (self.sitemap_url is None) == (self.urls is None):
+            raise ValueError("Provide either sitemap_url or urls")
+        return self
+
 class KnowledgeBaseTextCreate(BaseModel):
     title: str
     content: str
@@ -29,9 +42,18 @@ class KnowledgeBaseResponse(BaseModel):
     content_text: Optional[str] = None
     elevenlabs_document_id: Optional[str] = None
     file_size: Optional[float] = None
+    page_count: Optional[int] = None
+    token_count: Optional[int] = None
+    indexing_status: Optional[str] = None
+    indexing_error: Optional[str] = None
     created_at: datetime
     modified_at: datetime
 
+    @field_validator('indexing_status', mode='before')
+    def default_indexing_status(cls, value):
+        # Entries indexed inline before background indexing have no status
+        return value or "ready"
+
     @field_serializer('created_at', 'modified_at')
     def serialize_datetime(self, dt: datetime):
         return dt.date()
@@ -39,6 +61,14 @@ class KnowledgeBaseResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class KnowledgeBaseIndexingStatus(BaseModel):
+    id: int
+    elevenlabs_document_id: Optional[str] = None
+    indexing_status: str
+    indexing_error: Optional[str] = None
+    attempts: int
+    next_poll_at: Optional[datetime] = None
+
 class KnowledgeBaseBind(BaseModel):
     agent_id: int
     kb_id: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
 
 T = TypeVar("T")
 
@@ -9,3 +9,8 @@ class PaginatedResponse(BaseModel, Generic[T]):
     size: int
     pages: int
     items: List[T]
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    size: int
+    next_cursor: Optional[int] = None  # pass back as cursor for the next page; None on the last page
+    items: List[T]
@@ -22,6 +22,7 @@ class VoiceRead(BaseModel):
     sample_audio_url: Optional[str] = None
     is_enabled: bool
     agents: list
+    preprocessing: Optional[dict] = None  # sample before / after stats, on create only
     
 
     class Config:
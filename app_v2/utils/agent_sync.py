@@ -0,0 +1,283 @@
+"""
+Debounced, diff-based sync of agent knowledge bases and tools to ElevenLabs.
+
+Binding, unbinding, renaming or deleting KB documents and functions used to
+rebuild the agent's whole KB / tool list and PATCH it (after a GET of the
+full config) on every single change. Instead, routes now call
+schedule_agent_sync(agent_id, ...fields) after committing:
+
+  • requests for the same agent within AGENT_SYNC_DEBOUNCE_SECONDS are
+    coalesced (the window restarts on each request but never stretches past
+    AGENT_SYNC_MAX_DELAY_SECONDS), so attaching 20 documents is one push
+  • the desired remote state is rebuilt from the database at flush time and
+    diffed against the last pushed state (AgentModel.elevenlabs_sync_state);
+    only fields that changed are sent, in one partial PATCH without the
+    preceding GET. If ElevenLabs rejects the partial PATCH, the full
+    read-modify-write update_agent is used instead
+  • failed pushes are retried with backoff up to AGENT_SYNC_MAX_ATTEMPTS
+  • AgentModel.elevenlabs_sync_status shows pending / synced / failed;
+    agents left pending by a restart are re-queued at startup
+
+No lock is held across the ElevenLabs calls. The diff is computed in a
+short read, the PATCH goes out, and the pushed state is recorded only if
+AgentModel.elevenlabs_sync_version is unchanged. If another worker (or an
+agent update) recorded a state in the meantime, their PATCH may have
+landed before or after ours, so the current desired state is re-read and
+pushed in full for those fields.
+"""
+
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select, update
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import (
+    AgentFunctionBridgeModel,
+    AgentKnowledgeBaseBridge,
+    AgentModel,
+    FunctionModel,
+    KnowledgeBaseModel,
+)
+from app_v2.utils.elevenlabs.agent_utils import AsyncElevenLabsAgent
+from app_v2.utils.kb_indexer import index_ready
+
+logger = setup_logger(__name__)
+
+SYNC_KNOWLEDGE_BASE = "knowledge_base"
+SYNC_TOOLS = "tool_ids"
+SYNCED_FIELDS = (SYNC_KNOWLEDGE_BASE, SYNC_TOOLS)
+
+SYNC_PENDING = "pending"
+SYNC_DONE = "synced"
+SYNC_FAILED = "failed"
+
+# _push_once outcome when another writer recorded a sync state mid-push
+_CONFLICT = object()
+
+
+def remember_pushed_state(agent: AgentModel, pushed: Dict) -> None:
+    """
+    Record tool_ids / knowledge_base that another path (agent create or
+    update) just sent to ElevenLabs, so the next diff starts from them.
+    Call inside the caller's session, before its commit.
+    """
+    fields = {k: v for k, v in pushed.items() if k in SYNCED_FIELDS}
+    if fields:
+        agent.elevenlabs_sync_state = {**(agent.elevenlabs_sync_state or {}), **fields}
+        agent.elevenlabs_sync_version = (agent.elevenlabs_sync_version or 0) + 1
+
+
+def _kb_entry(kb: KnowledgeBaseModel) -> dict:
+    doc_type = "file" if kb.kb_type == "file" else "url" if kb.kb_type == "url" else "text"
+    return {
+        "id": kb.elevenlabs_document_id,
+        "name": kb.title or "Untitled",
+        "type": doc_type,
+        "usage_mode": "auto",
+    }
+
+
+async def _desired_state(session, agent_id: int, fields: Iterable[str]) -> Dict[str, List]:
+    """What ElevenLabs should hold for the requested fields, from the database."""
+    desired: Dict[str, List] = {}
+    if SYNC_KNOWLEDGE_BASE in fields:
+        kbs = (await session.scalars(
+            select(KnowledgeBaseModel)
+            .join(AgentKnowledgeBaseBridge, AgentKnowledgeBaseBridge.kb_id == KnowledgeBaseModel.id)
+            .where(
+                AgentKnowledgeBaseBridge.agent_id == agent_id,
+                KnowledgeBaseModel.elevenlabs_document_id.isnot(None),
+                index_ready(),  # the rest are attached once kb_indexer marks them ready
+            )
+            .order_by(AgentKnowledgeBaseBridge.id.asc())
+        )).all()
+        # Entries uploaded from identical bytes share one ElevenLabs document
+        unique = {kb.elevenlabs_document_id: kb for kb in reversed(kbs)}
+        desired[SYNC_KNOWLEDGE_BASE] = [_kb_entry(kb) for kb in kbs if unique[kb.elevenlabs_document_id] is kb]
+    if SYNC_TOOLS in fields:
+        desired[SYNC_TOOLS] = list((await session.scalars(
+            select(FunctionModel.elevenlabs_tool_id)
+            .join(AgentFunctionBridgeModel, AgentFunctionBridgeModel.function_id == FunctionModel.id)
+            .where(
+                AgentFunctionBridgeModel.agent_id == agent_id,
+                FunctionModel.elevenlabs_tool_id.isnot(None),
+            )
+            .order_by(AgentFunctionBridgeModel.id.asc())
+        )).all())
+    return desired
+
+
+class AgentSyncCoordinator:
+    def __init__(self):
+        self._dirty: Dict[int, Set[str]] = {}
+        self._first_request: Dict[int, float] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._running: Dict[int, asyncio.Task] = {}
+        self._marks: Dict[int, asyncio.Task] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.patches = 0
+        self.unchanged = 0
+        self.fallbacks = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    def request(self, agent_id: int, fields: Iterable[str] = SYNCED_FIELDS) -> None:
+        """Queue a sync of fields for agent_id. Must be called on the event loop."""
+        loop = asyncio.get_running_loop()
+        self.requests += 1
+        if agent_id in self._dirty:
+            self.coalesced += 1
+        else:
+            self._marks[agent_id] = loop.create_task(self._set_status(agent_id, SYNC_PENDING))
+        self._dirty.setdefault(agent_id, set()).update(fields)
+        self._schedule(agent_id, loop)
+
+    def _schedule(self, agent_id: int, loop: asyncio.AbstractEventLoop) -> None:
+        first = self._first_request.setdefault(agent_id, loop.time())
+        deadline = first + VoiceSettings.AGENT_SYNC_MAX_DELAY_SECONDS
+        delay = max(0.0, min(VoiceSettings.AGENT_SYNC_DEBOUNCE_SECONDS, deadline - loop.time()))
+        timer = self._timers.pop(agent_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[agent_id] = loop.call_later(delay, self._start_flush, agent_id)
+
+    def _start_flush(self, agent_id: int) -> None:
+        self._timers.pop(agent_id, None)
+        loop = asyncio.get_running_loop()
+        running = self._running.get(agent_id)
+        if running is not None and not running.done():
+            # One push per agent at a time; pick these changes up afterwards
+            self._first_request[agent_id] = loop.time()
+            self._schedule(agent_id, loop)
+            return
+        fields = self._dirty.pop(agent_id, set())
+        self._first_request.pop(agent_id, None)
+        mark = self._marks.pop(agent_id, None)
+        task = loop.create_task(self._flush(agent_id, fields, mark))
+        self._running[agent_id] = task
+        task.add_done_callback(lambda _: self._running.pop(agent_id, None))
+
+    async def _flush(self, agent_id: int, fields: Set[str], mark: Optional[asyncio.Task]) -> None:
+        if mark is not None:
+            await asyncio.gather(mark, return_exceptions=True)
+        error = None
+        for attempt in range(1, VoiceSettings.AGENT_SYNC_MAX_ATTEMPTS + 1):
+            try:
+                error = await self._push(agent_id, fields)
+            except Exception:
+                error = traceback.format_exc(limit=3)
+            if error is None:
+                return
+            logger.warning(f"Agent {agent_id} sync attempt {attempt} failed: {error}")
+            if attempt < VoiceSettings.AGENT_SYNC_MAX_ATTEMPTS:
+                await asyncio.sleep(VoiceSettings.AGENT_SYNC_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        self.failures += 1
+        logger.error(f"Agent {agent_id} sync gave up after {VoiceSettings.AGENT_SYNC_MAX_ATTEMPTS} attempts")
+        await self._set_status(agent_id, SYNC_FAILED, error)
+
+    async def _push(self, agent_id: int, fields: Set[str]) -> Optional[str]:
+        """Diff and push one agent. Returns None on success, else the error."""
+        force = False
+        for _ in range(VoiceSettings.AGENT_SYNC_MAX_ATTEMPTS):
+            outcome = await self._push_once(agent_id, fields, force)
+            if outcome is not _CONFLICT:
+                return outcome
+            # Whichever PATCH ElevenLabs applied last is unknown: resend
+            self.conflicts += 1
+            force = True
+        return "Sync state kept changing concurrently"
+
+    async def _push_once(self, agent_id: int, fields: Set[str], force: bool):
+        async with async_db() as session:
+            agent = await session.get(AgentModel, agent_id)
+            if agent is None or not agent.elevenlabs_agent_id:
+                return None
+            elevenlabs_agent_id = agent.elevenlabs_agent_id
+            version = agent.elevenlabs_sync_version
+            pushed = dict(agent.elevenlabs_sync_state or {})
+            desired = await _desired_state(session, agent_id, fields)
+        changes = {f: v for f, v in desired.items() if force or pushed.get(f) != v}
+
+        if changes:
+            el_client = AsyncElevenLabsAgent()
+            response = await el_client.patch_agent_prompt(elevenlabs_agent_id, **changes)
+            if not response.status:
+                logger.warning(f"Partial PATCH rejected for agent {agent_id}, retrying as full update")
+                self.fallbacks += 1
+                response = await el_client.update_agent(agent_id=elevenlabs_agent_id, **changes)
+            if not response.status:
+                return response.error_message or "ElevenLabs update failed"
+
+        values = {
+            "elevenlabs_sync_error": None,
+            "elevenlabs_synced_at": datetime.now(timezone.utc),
+        }
+        if agent_id not in self._dirty:
+            values["elevenlabs_sync_status"] = SYNC_DONE
+        stmt = update(AgentModel).where(AgentModel.id == agent_id)
+        if changes:
+            stmt = stmt.where(AgentModel.elevenlabs_sync_version == version)
+            values["elevenlabs_sync_state"] = {**pushed, **changes}
+            values["elevenlabs_sync_version"] = AgentModel.elevenlabs_sync_version + 1
+        async with async_db() as session:
+            result = await session.execute(stmt.values(**values))
+            await session.commit()
+
+        if changes and result.rowcount == 0:
+            logger.info(f"Agent {agent_id} sync state changed during push; resending")
+            return _CONFLICT
+        if changes:
+            self.patches += 1
+            logger.info(f"Synced agent {agent_id} ({elevenlabs_agent_id}): {sorted(changes)}")
+        else:
+            self.unchanged += 1
+        return None
+
+    async def _set_status(self, agent_id: int, status: str, error: Optional[str] = None) -> None:
+        async with async_db() as session:
+            agent = await session.get(AgentModel, agent_id)
+            if agent is not None:
+                agent.elevenlabs_sync_status = status
+                agent.elevenlabs_sync_error = error
+                await session.commit()
+
+    async def resume_pending(self) -> int:
+        """Re-queue agents whose sync was still pending when the process stopped."""
+        async with async_db() as session:
+            agent_ids = (await session.scalars(
+                select(AgentModel.id).where(AgentModel.elevenlabs_sync_status == SYNC_PENDING)
+            )).all()
+        for agent_id in agent_ids:
+            self.request(agent_id)
+        if agent_ids:
+            logger.info(f"Re-queued ElevenLabs sync for {len(agent_ids)} pending agents")
+        return len(agent_ids)
+
+    def stats(self) -> dict:
+        return {
+            "debounce_seconds": VoiceSettings.AGENT_SYNC_DEBOUNCE_SECONDS,
+            "max_delay_seconds": VoiceSettings.AGENT_SYNC_MAX_DELAY_SECONDS,
+            "queued_agents": len(self._dirty),
+            "in_flight": sum(1 for t in self._running.values() if not t.done()),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "patches": self.patches,
+            "unchanged": self.unchanged,
+            "fallbacks": self.fallbacks,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+        }
+
+
+agent_sync = AgentSyncCoordinator()
+
+
+def schedule_agent_sync(agent_id: int, *fields: str) -> None:
+    """Queue a debounced ElevenLabs sync of the agent's KB and/or tools (default both)."""
+    agent_sync.request(agent_id, fields or SYNCED_FIELDS)
@@ -0,0 +1,465 @@
+"""
+Async versions of the queries on the call hot path.
+
+Each function mirrors a sync helper (named in its docstring) and takes an
+explicit AsyncSession from app_v2.databases.async_db.async_db(). Business
+rules are kept identical to the sync originals; when changing one, change
+both.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_v2.core.logger import setup_logger
+from app_v2.databases.models import (
+    ActivityLogModel,
+    AgentModel,
+    APIKeyModel,
+    CoinsLedgerModel,
+    CoinTransactionTypeEnum,
+    CoinUsageSettingsModel,
+    ConversationsModel,
+    PhoneNumberService,
+    PlanFeatureModel,
+    PlanModel,
+    UserSubscriptionModel,
+    WebAgentLeadModel,
+    WebhookEventLogModel,
+)
+from app_v2.schemas.enum_types import CallStatusEnum, ChannelEnum
+from app_v2.utils.feature_access import _ACTIVE_LIKE
+from app_v2.utils.transcript_store import build_transcript_record
+
+logger = setup_logger(__name__)
+
+
+# ------------------------------------------------------------------
+# COINS  (mirrors app_v2.utils.coin_utils)
+# ------------------------------------------------------------------
+
+async def get_user_coin_balance_async(session: AsyncSession, user_id: int) -> int:
+    """Async get_user_coin_balance: balance_after of the latest ledger row."""
+    try:
+        balance = await session.scalar(
+            select(CoinsLedgerModel.balance_after)
+            .where(CoinsLedgerModel.user_id == user_id)
+            .order_by(CoinsLedgerModel.created_at.desc(), CoinsLedgerModel.id.desc())
+            .limit(1)
+        )
+        return balance if balance is not None else 0
+    except Exception as e:
+        logger.error(f"Failed to get coin balance for user {user_id}: {e}")
+        return 0
+
+
+async def _expire_user_coins_async(session: AsyncSession, user_id: int) -> int:
+    """
+    Async expire_user_coins. Zeros out expired credit batches and adds the
+    matching 'expired' ledger row. Flushes only; the caller commits.
+    """
+    now = datetime.now(timezone.utc)
+    expired_batches = (
+        await session.scalars(
+            select(CoinsLedgerModel)
+            .where(
+                CoinsLedgerModel.user_id == user_id,
+                CoinsLedgerModel.remaining_coins > 0,
+                CoinsLedgerModel.expiry_at != None,
+                CoinsLedgerModel.expiry_at <= now,
+            )
+            .with_for_update()
+        )
+    ).all()
+
+    total_expired = 0
+    for batch in expired_batches:
+        total_expired += batch.remaining_coins
+        batch.remaining_coins = 0
+
+    if total_expired > 0:
+        current_balance = await get_user_coin_balance_async(session, user_id)
+        session.add(
+            CoinsLedgerModel(
+                user_id=user_id,
+                transaction_type=CoinTransactionTypeEnum.expired,
+                coins=-total_expired,
+                reference_type="expiry",
+                balance_after=current_balance - total_expired,
+                remaining_coins=0,
+            )
+        )
+        await session.flush()
+        logger.info(f"Expired {total_expired} coins for user {user_id}.")
+    return total_expired
+
+
+async def deduct_coins_async(
+    session: AsyncSession,
+    user_id: int,
+    amount: float | int,
+    reference_type: str = None,
+    reference_id: int = None,
+    commit: bool = True,
+    transaction_type: CoinTransactionTypeEnum = CoinTransactionTypeEnum.debit_usage,
+    force: bool = False,
+) -> bool:
+    """
+    Async deduct_coins: FIFO drain of valid credit batches under row locks.
+
+    force=True records the full amount even past zero (post-call overdraft);
+    force=False refuses and returns False when the balance is insufficient.
+    """
+    if amount <= 0:
+        return True
+    coin_amount = math.ceil(amount)
+
+    try:
+        now = datetime.now(timezone.utc)
+        await _expire_user_coins_async(session, user_id)
+
+        batches = (
+            await session.scalars(
+                select(CoinsLedgerModel)
+                .where(
+                    CoinsLedgerModel.user_id == user_id,
+                    CoinsLedgerModel.remaining_coins > 0,
+                    or_(
+                        CoinsLedgerModel.expiry_at == None,
+                        CoinsLedgerModel.expiry_at > now,
+                    ),
+                )
+                .order_by(CoinsLedgerModel.created_at.asc())
+                .with_for_update()
+            )
+        ).all()
+
+        current_balance = await session.scalar(
+            select(CoinsLedgerModel.balance_after)
+            .where(CoinsLedgerModel.user_id == user_id)
+            .order_by(CoinsLedgerModel.created_at.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        current_balance = current_balance if current_balance is not None else 0
+
+        total_available = sum(b.remaining_coins for b in batches)
+
+        if total_available < coin_amount:
+            if not force:
+                logger.warning(
+                    f"Insufficient coins for user {user_id}. "
+                    f"Needed: {coin_amount}, Available: {total_available}"
+                )
+                return False
+            logger.warning(
+                f"Post-call overdraft for user {user_id}: "
+                f"cost={coin_amount}, available={total_available}, "
+                f"debt={coin_amount - total_available}"
+            )
+
+        remaining_to_deduct = min(total_available, coin_amount)
+        for batch in batches:
+            if remaining_to_deduct <= 0:
+                break
+            deduct_from_batch = min(batch.remaining_coins, remaining_to_deduct)
+            batch.remaining_coins -= deduct_from_batch
+            remaining_to_deduct -= deduct_from_batch
+
+        balance_after = current_balance - coin_amount
+        session.add(
+            CoinsLedgerModel(
+                user_id=user_id,
+                transaction_type=transaction_type,
+                coins=-coin_amount,
+                reference_type=reference_type,
+                reference_id=reference_id,
+                balance_after=balance_after,
+                remaining_coins=0,
+            )
+        )
+
+        if commit:
+            await session.commit()
+
+        logger.info(
+            f"Deducted {coin_amount} coins from user {user_id}. "
+            f"New balance: {balance_after}"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to deduct {coin_amount} coins from user {user_id}: {e}")
+        if commit:
+            await session.rollback()
+        return False
+
+
+async def get_coin_usage_settings_async(session: AsyncSession) -> CoinUsageSettingsModel:
+    """Async CoinUsageSettingsModel.get_settings(): the singleton settings row."""
+    settings = await session.scalar(select(CoinUsageSettingsModel).limit(1))
+    if settings:
+        return settings
+    try:
+        settings = CoinUsageSettingsModel()
+        session.add(settings)
+        await session.commit()
+        await session.refresh(settings)
+        return settings
+    except IntegrityError:
+        # Another worker created it first
+        await session.rollback()
+        return await session.scalar(select(CoinUsageSettingsModel).limit(1))
+
+
+async def calculate_call_cost_async(session: AsyncSession, raw_el_cost: float) -> int:
+    """Coins charged for a call given the raw ElevenLabs cost."""
+    settings = await get_coin_usage_settings_async(session)
+    return int((raw_el_cost * settings.elevenlabs_multiplier) + settings.static_conversation_cost)
+
+
+# ------------------------------------------------------------------
+# ENTITLEMENTS  (mirrors app_v2.utils.feature_access)
+# ------------------------------------------------------------------
+
+async def get_any_active_subscription_async(
+    session: AsyncSession,
+    user_id: int,
+) -> Optional[UserSubscriptionModel]:
+    """Async _get_any_active_subscription (the looser feature-access lookup)."""
+    return await session.scalar(
+        select(UserSubscriptionModel)
+        .where(
+            UserSubscriptionModel.user_id == user_id,
+            UserSubscriptionModel.status.in_(_ACTIVE_LIKE),
+        )
+        .order_by(
+            UserSubscriptionModel.cancel_at_period_end.asc(),
+            UserSubscriptionModel.created_at.desc(),
+        )
+        .limit(1)
+    )
+
+
+async def _get_plan_feature_async(
+    session: AsyncSession,
+    plan_id: int,
+    feature_key: str,
+) -> Optional[PlanFeatureModel]:
+    return await session.scalar(
+        select(PlanFeatureModel)
+        .where(
+            PlanFeatureModel.plan_id == plan_id,
+            PlanFeatureModel.feature_key == feature_key,
+        )
+        .limit(1)
+    )
+
+
+async def get_feature_limit_async(
+    session: AsyncSession,
+    user_id: int,
+    feature_key: str,
+) -> Optional[float]:
+    """Async get_feature_limit. None means unlimited or not in plan."""
+    subscription = await get_any_active_subscription_async(session, user_id)
+    if not subscription:
+        return None
+
+    feature = await _get_plan_feature_async(session, subscription.plan_id, feature_key)
+    if not feature:
+        return None
+    return float(feature.limit) if feature.limit is not None else None
+
+
+async def get_monthly_minutes_usage_async(session: AsyncSession, user_id: int) -> float:
+    """Async get_monthly_minutes_usage: minutes used this calendar month."""
+    now = datetime.now(timezone.utc)
+    start_of_month = datetime(now.year, now.month, 1)
+
+    total_seconds = await session.scalar(
+        select(func.coalesce(func.sum(ConversationsModel.duration), 0)).where(
+            ConversationsModel.user_id == user_id,
+            ConversationsModel.created_at >= start_of_month,
+        )
+    )
+    return float(total_seconds or 0) / 60
+
+
+async def check_monthly_minutes_async(session: AsyncSession, user_id: int) -> bool:
+    """
+    Async check_feature_limit_and_usage(user_id, "monthly_minutes").
+    Raises the same 403 HTTPExceptions as the sync version.
+    """
+    feature_key = "monthly_minutes"
+    subscription = await get_any_active_subscription_async(session, user_id)
+    if not subscription:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Active subscription required to access feature: {feature_key}",
+        )
+
+    feature = await _get_plan_feature_async(session, subscription.plan_id, feature_key)
+    if not feature:
+        plan = await session.get(PlanModel, subscription.plan_id)
+        plan_name = plan.display_name if plan else "Unknown Plan"
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Your current plan '{plan_name}' does not include access to {feature_key}.",
+        )
+
+    if feature.limit is None:
+        return True
+
+    current_usage = await get_monthly_minutes_usage_async(session, user_id)
+    logger.info(
+        f"Feature usage check | user={user_id} "
+        f"feature={feature_key} "
+        f"usage={current_usage} "
+        f"limit={feature.limit}"
+    )
+
+    if current_usage >= feature.limit:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=(
+                f"You have reached the limit of {feature.limit} for "
+                f"{feature_key} on your current plan. Please upgrade to continue."
+            ),
+        )
+    return True
+
+
+# ------------------------------------------------------------------
+# LOOKUPS
+# ------------------------------------------------------------------
+
+async def get_user_agent_async(
+    session: AsyncSession,
+    user_id: int,
+    agent_id: int,
+) -> Optional[AgentModel]:
+    """Agent by id, only if owned by user_id."""
+    return await session.scalar(
+        select(AgentModel).where(AgentModel.id == agent_id, AgentModel.user_id == user_id)
+    )
+
+
+async def get_agent_by_id_async(session: AsyncSession, agent_id: int) -> Optional[AgentModel]:
+    return await session.get(AgentModel, agent_id)
+
+
+async def get_phone_number_async(session: AsyncSession, phone_number: str) -> Optional[PhoneNumberService]:
+    return await session.scalar(
+        select(PhoneNumberService).where(PhoneNumberService.phone_number == phone_number).limit(1)
+    )
+
+
+async def get_active_api_key_async(session: AsyncSession, client_id: str) -> Optional[APIKeyModel]:
+    return await session.scalar(
+        select(APIKeyModel).where(APIKeyModel.client_id == client_id, APIKeyModel.is_active == True)
+    )
+
+
+async def is_webhook_event_processed_async(session: AsyncSession, event_id: str) -> bool:
+    """True if a webhook delivery with this id was already processed."""
+    found = await session.scalar(
+        select(WebhookEventLogModel.id)
+        .where(
+            WebhookEventLogModel.event_id == event_id,
+            WebhookEventLogModel.status == "processed",
+        )
+        .limit(1)
+    )
+    return found is not None
+
+
+# ------------------------------------------------------------------
+# WRITES
+# ------------------------------------------------------------------
+
+async def log_activity_async(
+    session: AsyncSession,
+    user_id: int,
+    event_type: str,
+    description: str,
+    metadata: dict = None,
+) -> None:
+    """Async log_activity. Never raises; failures are logged and rolled back."""
+    try:
+        session.add(
+            ActivityLogModel(
+                user_id=user_id,
+                event_type=event_type,
+                description=description,
+                metadata_json=metadata,
+            )
+        )
+        await session.commit()
+        logger.info(f"Activity logged: {event_type} for user {user_id}")
+    except Exception as e:
+        logger.error(f"Failed to log activity {event_type} for user {user_id}: {e}")
+        await session.rollback()
+
+
+async def persist_conversation_async(
+    session: AsyncSession,
+    user_id: int,
+    agent_id: int,
+    metadata: dict,
+    conversation_id: str,
+    channel: ChannelEnum,
+    reference_type: str = "conversation",
+    force: bool = True,
+    lead_id: Optional[int] = None,
+) -> ConversationsModel:
+    """
+    Adds the conversation record and its compressed transcript, deducts its
+    cost and links the web-agent lead if given. Only flushes: the caller
+    commits, so all of it lands in the caller's transaction.
+
+    force=True (default) records the full cost even past zero, since the
+    call already happened.
+    """
+    raw_cost = float(metadata.get("cost") or 0)
+    calculated_cost = await calculate_call_cost_async(session, raw_cost)
+    call_status = CallStatusEnum.success if metadata.get("call_successful") else CallStatusEnum.failed
+
+    record = ConversationsModel(
+        agent_id=agent_id,
+        user_id=user_id,
+        message_count=metadata.get("message_count"),
+        duration=metadata.get("duration"),
+        call_status=call_status,
+        channel=channel,
+        transcript_summary=metadata.get("transcript_summary"),
+        elevenlabs_conv_id=conversation_id,
+        cost=raw_cost,
+    )
+    session.add(record)
+    await session.flush()
+    session.add(build_transcript_record(record.id, conversation_id, metadata))
+
+    if calculated_cost > 0:
+        await deduct_coins_async(
+            session,
+            user_id=user_id,
+            amount=calculated_cost,
+            reference_type=reference_type,
+            reference_id=record.id,
+            commit=False,
+            force=force,
+        )
+
+    if lead_id:
+        lead = await session.get(WebAgentLeadModel, lead_id)
+        if lead:
+            lead.conversation_id = record.id
+            logger.info(f"Linking lead {lead_id} to conversation {record.id}")
+
+    await session.flush()
+    return record
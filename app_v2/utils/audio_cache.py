@@ -0,0 +1,192 @@
+"""
+Size-bounded disk cache for conversation recordings.
+
+The first playback of a conversation downloads the recording from
+ElevenLabs once and writes it to AUDIO_CACHE_DIR. Later playbacks, and
+seeks, are served straight from disk with FileResponse, which handles HTTP
+Range requests.
+
+  • writes go to a temp file in the same directory and are os.replace()d into
+    place, so a reader never sees a partial file, even from another worker
+  • concurrent requests for the same conversation on this worker share one
+    download
+  • total size is capped at AUDIO_CACHE_MAX_BYTES. The least recently played
+    files go first, and recency is the file mtime, so it survives restarts
+  • delete_conversation evicts the file explicitly
+  • disk work (index scan, stat, writes) runs in a thread, off the event loop.
+    The stat taken there is handed to FileResponse, so a file trimmed by
+    another worker is a cache miss rather than a 500
+"""
+
+import asyncio
+import glob
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Extensions for the content types ElevenLabs returns; the extension is how
+# the content type is recovered when serving from disk
+_EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/ogg": ".ogg",
+    "audio/webm": ".webm",
+}
+_DEFAULT_CONTENT_TYPE = "audio/mpeg"
+
+
+class AudioCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return hashlib.sha256(conversation_id.encode()).hexdigest()[:32]
+
+    def _load_index(self) -> None:
+        """Scan the directory once so the budget covers files from earlier runs."""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, os.path.splitext(name)[0], path, stat.st_size))
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self._total += size
+        self._loaded = True
+
+    def lookup(self, conversation_id: str) -> Optional[Tuple[str, str, os.stat_result]]:
+        """
+        Return (path, content_type, stat) if cached, marking it recently used.
+        Blocking; call it from a thread. A file another worker's trim removed
+        is dropped from the index and reported as a miss.
+        """
+        key = self._key(conversation_id)
+        with self._lock:
+            self._load_index()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            path = entry[0]
+            try:
+                os.utime(path)
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._index.pop(key, None)
+                self._total -= entry[1]
+                return None
+            self._index.move_to_end(key)
+        content_type = mimetypes.guess_type(path)[0] or _DEFAULT_CONTENT_TYPE
+        return path, content_type, stat
+
+    def _store(self, conversation_id: str, content: bytes, content_type: str) -> Tuple[str, str, os.stat_result]:
+        """Write atomically, then trim the cache back under budget."""
+        key = self._key(conversation_id)
+        content_type = (content_type or _DEFAULT_CONTENT_TYPE).split(";")[0].strip()
+        ext = _EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ".mp3"
+        path = os.path.join(self.directory, key + ext)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            stat = os.stat(path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._load_index()
+            previous = self._index.pop(key, None)
+            if previous:
+                self._total -= previous[1]
+            self._index[key] = (path, len(content))
+            self._total += len(content)
+            self._trim(keep=key)
+        return path, mimetypes.guess_type(path)[0] or content_type, stat
+
+    def _trim(self, keep: str) -> None:
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, (path, size) = next(iter(self._index.items()))
+            if key == keep:
+                break
+            self._index.pop(key)
+            self._total -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Audio cache evicted {path} ({size} bytes)")
+
+    async def get_or_fetch(
+        self,
+        conversation_id: str,
+        fetch: Callable[[], Awaitable[Optional[Tuple[bytes, str]]]],
+    ) -> Optional[Tuple[str, str, os.stat_result]]:
+        """
+        Return (path, content_type, stat) for the recording, downloading it
+        with fetch() on a miss. fetch returns (content, content_type) or None.
+        """
+        cached = await asyncio.to_thread(self.lookup, conversation_id)
+        if cached:
+            return cached
+
+        key = self._key(conversation_id)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = None
+        try:
+            fetched = await fetch()
+            if fetched and fetched[0]:
+                content, content_type = fetched
+                result = await asyncio.to_thread(self._store, conversation_id, content, content_type)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result(result)
+
+    def evict(self, conversation_id: str) -> None:
+        """Remove a recording, including copies other workers wrote."""
+        key = self._key(conversation_id)
+        with self._lock:
+            self._load_index()
+            entry = self._index.pop(key, None)
+            if entry is not None:
+                self._total -= entry[1]
+        for path in glob.glob(os.path.join(self.directory, key + ".*")):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+audio_cache = AudioCache(VoiceSettings.AUDIO_CACHE_DIR, VoiceSettings.AUDIO_CACHE_MAX_BYTES)
@@ -0,0 +1,216 @@
+"""
+Preprocessing of voice clone samples.
+
+These functions run in the "voice_preprocess" process pool (see
+process_pool), so they take every setting as an argument and only import
+NumPy.
+
+  1. decode — PCM .wav is read with the stdlib wave module; anything else
+              (.mp3, .m4a, float WAV) is decoded to 16-bit WAV by ffmpeg
+  2. mono   — channels are averaged
+  3. rate   — audio above target_rate is low-passed (moving average) and
+              linearly resampled down to it
+  4. trim   — leading / trailing audio whose 10 ms RMS stays below
+              silence_dbfs is cut, keeping pad_ms either side
+  5. level  — gain brings the RMS of the voiced frames to target_dbfs,
+              capped by max_gain_db and so that peaks stay under peak_dbfs
+  6. encode — mono MP3 at bitrate through ffmpeg, or 16-bit WAV without it
+
+Every step works on whole NumPy arrays; there is no per-sample Python loop.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+FRAME_MS = 10
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _pcm_to_float(raw: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise ValueError(f"Unsupported sample width {sample_width}")
+
+
+def _read_wav(source) -> tuple:
+    """(samples float32 of shape (n, channels), sample rate)."""
+    with wave.open(source, "rb") as w:
+        channels, rate, width = w.getnchannels(), w.getframerate(), w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+    samples = _pcm_to_float(raw, width)
+    return samples[: len(samples) - len(samples) % channels].reshape(-1, channels), rate
+
+
+def _decode(path: str, dest_dir: str, ffmpeg: str) -> tuple:
+    if path.lower().endswith(".wav"):
+        try:
+            return _read_wav(path)
+        except (wave.Error, ValueError, EOFError):
+            pass  # compressed / float WAV: let ffmpeg decode it
+    if not shutil.which(ffmpeg):
+        raise RuntimeError("ffmpeg is not installed")
+    # To a file rather than a pipe, so the WAV header has real sizes
+    fd, decoded = tempfile.mkstemp(dir=dest_dir, prefix="decode-", suffix=".wav")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [ffmpeg, "-v", "error", "-nostdin", "-y", "-i", path, "-acodec", "pcm_s16le", decoded],
+            capture_output=True,
+            check=True,
+        )
+        return _read_wav(decoded)
+    finally:
+        os.remove(decoded)
+
+
+def _downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def _resample(mono: np.ndarray, rate: int, target_rate: int) -> tuple:
+    if rate <= target_rate or mono.size == 0:
+        return mono, rate
+    width = int(np.ceil(rate / target_rate))
+    if width > 1:
+        mono = np.convolve(mono, np.full(width, 1.0 / width, dtype=np.float32), mode="same").astype(np.float32)
+    duration = mono.size / rate
+    count = int(round(duration * target_rate))
+    positions = np.arange(count, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(mono.size), mono).astype(np.float32), target_rate
+
+
+def _frame_dbfs(mono: np.ndarray, rate: int) -> tuple:
+    """(per-frame RMS in dBFS, frame length in samples)."""
+    frame = max(1, rate * FRAME_MS // 1000)
+    padded = np.pad(mono, (0, (-mono.size) % frame))
+    rms = np.sqrt(np.mean(np.square(padded.reshape(-1, frame), dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame
+
+
+def _trim(mono: np.ndarray, rate: int, silence_dbfs: float, pad_ms: int) -> tuple:
+    """(trimmed audio, dBFS of its voiced frames). Raises ValueError if nothing is above silence."""
+    levels, frame = _frame_dbfs(mono, rate)
+    voiced = np.flatnonzero(levels > silence_dbfs)
+    if voiced.size == 0:
+        raise ValueError("No speech found above the silence threshold")
+    pad = rate * pad_ms // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(mono.size, (voiced[-1] + 1) * frame + pad)
+    return mono[start:end], levels[voiced]
+
+
+def _level(mono: np.ndarray, voiced_dbfs: np.ndarray, target_dbfs: float, peak_dbfs: float, max_gain_db: float) -> tuple:
+    # Average power of the voiced frames, so pauses do not pull the level down
+    speech_dbfs = 10 * np.log10(np.mean(np.power(10.0, voiced_dbfs / 10)))
+    peak = float(np.max(np.abs(mono))) or 1e-10
+    gain_db = min(target_dbfs - speech_dbfs, max_gain_db, peak_dbfs - 20 * np.log10(peak))
+    return (mono * np.float32(10 ** (gain_db / 20))).astype(np.float32), round(float(gain_db), 2)
+
+
+def _to_pcm16(mono: np.ndarray) -> bytes:
+    return (np.clip(mono, -1.0, 1.0) * 32767.0).round().astype("<i2").tobytes()
+
+
+def _encode(mono: np.ndarray, rate: int, dest_dir: str, ffmpeg: str, bitrate: str) -> str:
+    pcm = _to_pcm16(mono)
+    if shutil.which(ffmpeg):
+        fd, path = tempfile.mkstemp(dir=dest_dir, prefix="voice-", suffix=".mp3")
+        os.close(fd)
+        subprocess.run(
+            [ffmpeg, "-v", "error", "-nostdin", "-y", "-f", "s16le", "-ar", str(rate), "-ac", "1",
+             "-i", "pipe:0", "-codec:a", "libmp3lame", "-b:a", bitrate, path],
+            input=pcm,
+            capture_output=True,
+            check=True,
+        )
+        return path
+    fd, path = tempfile.mkstemp(dir=dest_dir, prefix="voice-", suffix=".wav")
+    with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return path
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocess_voice_sample(
+    path: str,
+    dest_dir: str,
+    target_rate: int = 24000,
+    silence_dbfs: float = -45.0,
+    pad_ms: int = 150,
+    target_dbfs: float = -20.0,
+    peak_dbfs: float = -1.0,
+    max_gain_db: float = 20.0,
+    bitrate: str = "96k",
+    ffmpeg: str = "ffmpeg",
+) -> dict:
+    """
+    Normalize one voice sample into a new temp file in dest_dir.
+
+    Returns {"path", "sha256", "stats"}; path is None (and stats has error)
+    if the sample could not be processed. stats holds before / after bytes,
+    duration_s, sample_rate and channels, trimmed_s, gain_db and per-step
+    timings_ms.
+    """
+    stats = {"before": {"bytes": os.path.getsize(path)}, "timings_ms": {}}
+    started = time.perf_counter()
+    try:
+        samples, rate = _decode(path, dest_dir, ffmpeg)
+        stats["before"].update(
+            duration_s=round(samples.shape[0] / rate, 2), sample_rate=rate, channels=samples.shape[1]
+        )
+        stats["timings_ms"]["decode"] = _ms(started)
+
+        started = time.perf_counter()
+        mono, rate = _resample(_downmix(samples), rate, target_rate)
+        before_trim = mono.size / rate
+        mono, voiced_dbfs = _trim(mono, rate, silence_dbfs, pad_ms)
+        mono, stats["gain_db"] = _level(mono, voiced_dbfs, target_dbfs, peak_dbfs, max_gain_db)
+        stats["trimmed_s"] = round(before_trim - mono.size / rate, 2)
+        stats["timings_ms"]["process"] = _ms(started)
+
+        started = time.perf_counter()
+        out = _encode(mono, rate, dest_dir, ffmpeg, bitrate)
+        stats["timings_ms"]["encode"] = _ms(started)
+    except subprocess.CalledProcessError as e:
+        stats["error"] = f"ffmpeg failed: {e.stderr.decode(errors='replace').strip()[:200]}"
+        return {"path": None, "sha256": None, "stats": stats}
+    except Exception as e:
+        stats["error"] = str(e) or repr(e)
+        return {"path": None, "sha256": None, "stats": stats}
+
+    stats["after"] = {
+        "bytes": os.path.getsize(out),
+        "duration_s": round(mono.size / rate, 2),
+        "sample_rate": rate,
+        "channels": 1,
+    }
+    return {"path": out, "sha256": _sha256(out), "stats": stats}
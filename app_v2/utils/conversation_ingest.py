@@ -0,0 +1,351 @@
+"""
+Post-call conversation ingestion.
+
+When a session ends we only *register* the conversation (who pays, which
+channel, which lead). The transcript, cost and analysis arrive later in
+ElevenLabs' post-call webhook, and ingest_conversation_async() then
+persists the conversation, bills it and links the lead in one go.
+
+  • idempotent: each ConversationIngestModel row is locked while ingesting
+    and flips pending → ingested in the same commit that creates the
+    conversation, so duplicate webhooks and the fallback poller cannot
+    double-bill
+  • webhook first: a conversation nobody registered (or registered after
+    the webhook arrived) is resolved from its ElevenLabs agent id
+  • fallback: run_pending_ingest_sweep() polls ElevenLabs once per pass for
+    rows that are still pending ELEVENLABS_INGEST_FALLBACK_AFTER_SECONDS
+    after the call, in case the webhook never came
+  • without ELEVENLABS_WEBHOOK_SECRET nothing would deliver webhooks, so
+    record_conversation_end() falls back to polling right away
+
+Channel-specific follow-ups (notification emails, low-balance alerts) are
+registered by the routers with register_post_ingest_hook().
+"""
+
+import asyncio
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import (
+    AgentModel,
+    ConversationIngestModel,
+    ConversationsModel,
+    WebAgentLeadModel,
+)
+from app_v2.schemas.enum_types import ChannelEnum
+from app_v2.utils.async_data_access import persist_conversation_async
+from app_v2.utils.elevenlabs.conversation_utils import (
+    AsyncElevenLabsConversation,
+    is_conversation_complete,
+    parse_conversation_metadata,
+)
+
+logger = setup_logger(__name__)
+
+INGEST_PENDING = "pending"
+INGEST_DONE = "ingested"
+INGEST_FAILED = "failed"
+
+PostIngestHook = Callable[[ConversationIngestModel, ConversationsModel, dict], Awaitable[None]]
+_post_ingest_hooks: Dict[ChannelEnum, PostIngestHook] = {}
+
+
+def register_post_ingest_hook(channel: ChannelEnum, hook: PostIngestHook) -> None:
+    """Run hook(ingest_row, conversation, metadata) after a conversation on channel is ingested."""
+    _post_ingest_hooks[channel] = hook
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Registration (session end)
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def register_conversation_async(
+    session: AsyncSession,
+    elevenlabs_conv_id: str,
+    user_id: int,
+    agent_id: int,
+    channel: ChannelEnum,
+    reference_type: str = "conversation",
+    force: bool = True,
+    lead_id: Optional[int] = None,
+    context: Optional[dict] = None,
+) -> ConversationIngestModel:
+    """
+    Record the billing context for a conversation that just ended. If the
+    webhook already ingested it, fix up channel and lead on the stored row.
+    """
+    row = ConversationIngestModel(
+        elevenlabs_conv_id=elevenlabs_conv_id,
+        user_id=user_id,
+        agent_id=agent_id,
+        channel=channel,
+        reference_type=reference_type,
+        force_debit=force,
+        lead_id=lead_id,
+        context=context,
+        status=INGEST_PENDING,
+    )
+    session.add(row)
+    try:
+        await session.commit()
+        return row
+    except IntegrityError:
+        await session.rollback()
+
+    row = await session.scalar(
+        select(ConversationIngestModel)
+        .where(ConversationIngestModel.elevenlabs_conv_id == elevenlabs_conv_id)
+        .with_for_update()
+    )
+    row.channel = channel
+    row.reference_type = reference_type
+    row.force_debit = force
+    row.lead_id = lead_id
+    row.context = context
+    if row.status == INGEST_DONE and row.conversation_id:
+        record = await session.get(ConversationsModel, row.conversation_id)
+        if record:
+            record.channel = channel
+        if lead_id:
+            lead = await session.get(WebAgentLeadModel, lead_id)
+            if lead:
+                lead.conversation_id = row.conversation_id
+    await session.commit()
+    logger.info(f"Conversation {elevenlabs_conv_id} registered after ingest ({row.status})")
+    return row
+
+
+async def record_conversation_end(
+    elevenlabs_conv_id: str,
+    user_id: int,
+    agent_id: int,
+    channel: ChannelEnum,
+    reference_type: str = "conversation",
+    force: bool = True,
+    lead_id: Optional[int] = None,
+    context: Optional[dict] = None,
+) -> None:
+    """
+    Session-end entry point for the websocket / widget / public API paths.
+    Registers the conversation; the webhook does the rest. Without a
+    webhook secret configured, polls ElevenLabs and ingests immediately.
+    """
+    async with async_db() as session:
+        await register_conversation_async(
+            session,
+            elevenlabs_conv_id,
+            user_id=user_id,
+            agent_id=agent_id,
+            channel=channel,
+            reference_type=reference_type,
+            force=force,
+            lead_id=lead_id,
+            context=context,
+        )
+
+    if VoiceSettings.ELEVENLABS_WEBHOOK_SECRET:
+        logger.info(f"Conversation {elevenlabs_conv_id} registered; waiting for post-call webhook")
+        return
+
+    conv_data = await _poll_conversation(elevenlabs_conv_id, max_retries=5)
+    if conv_data:
+        await ingest_conversation_async(elevenlabs_conv_id, conv_data, source="poll")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ingest
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _infer_channel(conv_data: dict) -> Optional[ChannelEnum]:
+    if (conv_data.get("metadata") or {}).get("phone_call"):
+        return ChannelEnum.call
+    return None
+
+
+async def _claim_row(
+    session: AsyncSession,
+    elevenlabs_conv_id: str,
+    conv_data: dict,
+) -> Optional[ConversationIngestModel]:
+    """Lock the ingest row, creating it from the agent if nobody registered it."""
+    stmt = (
+        select(ConversationIngestModel)
+        .where(ConversationIngestModel.elevenlabs_conv_id == elevenlabs_conv_id)
+        .with_for_update()
+    )
+    row = await session.scalar(stmt)
+    if row is not None:
+        return row
+
+    elevenlabs_agent_id = conv_data.get("agent_id")
+    agent = await session.scalar(
+        select(AgentModel).where(AgentModel.elevenlabs_agent_id == elevenlabs_agent_id).limit(1)
+    ) if elevenlabs_agent_id else None
+    if agent is None:
+        logger.warning(f"Conversation {elevenlabs_conv_id}: no local agent for {elevenlabs_agent_id}; skipping")
+        return None
+
+    session.add(ConversationIngestModel(
+        elevenlabs_conv_id=elevenlabs_conv_id,
+        user_id=agent.user_id,
+        agent_id=agent.id,
+        channel=_infer_channel(conv_data),
+        status=INGEST_PENDING,
+    ))
+    try:
+        await session.commit()
+    except IntegrityError:
+        # Registered concurrently by the session or another delivery
+        await session.rollback()
+    return await session.scalar(stmt)
+
+
+async def ingest_conversation_async(
+    elevenlabs_conv_id: str,
+    conv_data: dict,
+    source: str,
+) -> Optional[ConversationsModel]:
+    """
+    Persist, bill and link a finished conversation from its ElevenLabs
+    payload (webhook ``data`` or GET conversation body). Returns the new
+    conversation, or None if it was already ingested or cannot be yet.
+    """
+    if not is_conversation_complete(conv_data):
+        logger.warning(f"Conversation {elevenlabs_conv_id} from {source} is incomplete; not ingesting")
+        return None
+
+    metadata = parse_conversation_metadata(conv_data)
+
+    async with async_db() as session:
+        row = await _claim_row(session, elevenlabs_conv_id, conv_data)
+        if row is None or row.status == INGEST_DONE:
+            await session.rollback()
+            return None
+
+        row.status = INGEST_DONE
+        row.source = source
+        row.ingested_at = datetime.now(timezone.utc)
+        row.last_error = None
+
+        # The conversation, the debit, the lead link and the status flip are
+        # committed once, together, which is also what releases the row lock
+        record = await persist_conversation_async(
+            session,
+            user_id=row.user_id,
+            agent_id=row.agent_id,
+            metadata=metadata,
+            conversation_id=elevenlabs_conv_id,
+            channel=row.channel,
+            reference_type=row.reference_type,
+            force=row.force_debit,
+            lead_id=row.lead_id,
+        )
+        row.conversation_id = record.id
+        await session.commit()
+        await session.refresh(record)
+
+    logger.info(
+        f"Conversation {elevenlabs_conv_id} ingested via {source} "
+        f"(duration={metadata.get('duration')}s, messages={metadata.get('message_count')}, cost={record.cost})"
+    )
+
+    hook = _post_ingest_hooks.get(row.channel)
+    if hook is not None:
+        try:
+            await hook(row, record, metadata)
+        except Exception:
+            logger.error(f"Post-ingest hook failed for {elevenlabs_conv_id}:\n{traceback.format_exc()}")
+    return record
+
+
+async def mark_ingest_failed(elevenlabs_conv_id: str, error: str) -> None:
+    """Record a call that ElevenLabs reports as failed so the poller skips it."""
+    async with async_db() as session:
+        row = await session.scalar(
+            select(ConversationIngestModel).where(ConversationIngestModel.elevenlabs_conv_id == elevenlabs_conv_id)
+        )
+        if row is not None and row.status == INGEST_PENDING:
+            row.status = INGEST_FAILED
+            row.last_error = error
+            await session.commit()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fallback poller
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _poll_conversation(elevenlabs_conv_id: str, max_retries: int = 1) -> Optional[dict]:
+    """Fetch the conversation body if ElevenLabs has finished assembling it."""
+    el_conv = AsyncElevenLabsConversation()
+    for attempt in range(1, max_retries + 1):
+        response = await el_conv.get_conversation(elevenlabs_conv_id)
+        if response.status and response.data and is_conversation_complete(response.data):
+            return response.data
+        if attempt < max_retries:
+            await asyncio.sleep(3.0)
+    return None
+
+
+async def sweep_pending_ingests(limit: int = 50) -> int:
+    """
+    One fallback pass: claim pending rows whose webhook is overdue and try
+    to ingest them by polling. Rows are claimed with SKIP LOCKED so several
+    workers can sweep at once. Returns the number ingested.
+    """
+    now = datetime.now(timezone.utc)
+    due_before = now - timedelta(seconds=VoiceSettings.ELEVENLABS_INGEST_FALLBACK_AFTER_SECONDS)
+    retry_before = now - timedelta(seconds=VoiceSettings.ELEVENLABS_INGEST_SWEEP_INTERVAL_SECONDS)
+
+    async with async_db() as session:
+        rows = (await session.scalars(
+            select(ConversationIngestModel)
+            .where(
+                ConversationIngestModel.status == INGEST_PENDING,
+                ConversationIngestModel.created_at <= due_before,
+                ConversationIngestModel.attempts < VoiceSettings.ELEVENLABS_INGEST_MAX_ATTEMPTS,
+                or_(
+                    ConversationIngestModel.last_attempt_at.is_(None),
+                    ConversationIngestModel.last_attempt_at <= retry_before,
+                ),
+            )
+            .order_by(ConversationIngestModel.created_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )).all()
+        claimed = [row.elevenlabs_conv_id for row in rows]
+        for row in rows:
+            row.attempts += 1
+            row.last_attempt_at = now
+            if row.attempts >= VoiceSettings.ELEVENLABS_INGEST_MAX_ATTEMPTS:
+                row.last_error = "No complete conversation after max fallback attempts"
+        await session.commit()
+
+    ingested = 0
+    for elevenlabs_conv_id in claimed:
+        try:
+            conv_data = await _poll_conversation(elevenlabs_conv_id)
+            if conv_data and await ingest_conversation_async(elevenlabs_conv_id, conv_data, source="poll"):
+                ingested += 1
+        except Exception:
+            logger.error(f"Fallback ingest failed for {elevenlabs_conv_id}:\n{traceback.format_exc()}")
+    if claimed:
+        logger.info(f"Ingest sweep: {ingested}/{len(claimed)} overdue conversations ingested")
+    return ingested
+
+
+async def run_pending_ingest_sweep(interval_seconds: int = VoiceSettings.ELEVENLABS_INGEST_SWEEP_INTERVAL_SECONDS) -> None:
+    """Background task: fallback for conversations whose webhook never arrived."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await sweep_pending_ingests()
+        except Exception:
+            logger.error(f"Ingest sweep failed:\n{traceback.format_exc()}")
@@ -0,0 +1,339 @@
+"""
+Background reconciler between ElevenLabs' conversation list and our
+conversations table.
+
+Webhooks and the pending-ingest sweep only cover conversations someone
+registered or ElevenLabs told us about. Twilio calls bridged straight to
+ElevenLabs (handle_voice_webhook) never pass through our session code, and
+a session whose registration failed leaves no trace at all. The reconciler
+closes those gaps:
+
+  • per agent, it lists GET /convai/conversations from the stored
+    high-water mark onwards (cursor pagination), so each pass only sees new
+    conversations
+  • finished conversations missing locally are fetched and ingested through
+    ingest_conversation_async(), in bounded-concurrency batches; ingest is
+    idempotent, so racing the webhook is harmless
+  • the high-water mark only advances past conversations that are finished
+    and ingested; one still in progress (or whose ingest failed) holds it
+    back until the next pass, unless it is older than
+    ELEVENLABS_RECONCILE_STALE_SECONDS
+  • agents are claimed through next_run_at with SKIP LOCKED, so several
+    workers split the agents between them
+
+Throughput and lag of recent passes are kept in reconciler_stats, which the
+admin diagnostics endpoint reports.
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import (
+    AgentModel,
+    ConversationIngestModel,
+    ConversationsModel,
+    ConversationSyncCursorModel,
+)
+from app_v2.utils.conversation_ingest import INGEST_PENDING, ingest_conversation_async
+from app_v2.utils.elevenlabs.conversation_utils import AsyncElevenLabsConversation
+
+logger = setup_logger(__name__)
+
+# Conversation statuses after which ElevenLabs will not change the record
+_TERMINAL_STATUSES = {"done", "failed"}
+# Started this recently and not listed yet is possible; don't move past it
+_LISTING_MARGIN_SECONDS = 60
+
+
+class ReconcilerStats:
+    """Counters for recent reconciler passes on this worker."""
+
+    def __init__(self, history: int = 20):
+        self._lock = threading.Lock()
+        self._passes = deque(maxlen=history)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._passes.clear()
+            self.totals = {"passes": 0, "agents": 0, "listed": 0, "ingested": 0, "errors": 0}
+            self.watermark_lag: Dict[int, float] = {}
+
+    def record_pass(self, summary: dict, watermarks: Dict[int, int]) -> None:
+        now = time.time()
+        with self._lock:
+            self._passes.append(summary)
+            self.totals["passes"] += 1
+            for field in ("agents", "listed", "ingested", "errors"):
+                self.totals[field] += summary[field]
+            for agent_id, hwm in watermarks.items():
+                self.watermark_lag[agent_id] = round(now - hwm, 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            passes = list(self._passes)
+            lag = sorted(self.watermark_lag.items(), key=lambda item: item[1], reverse=True)
+            return {
+                "interval_seconds": VoiceSettings.ELEVENLABS_RECONCILE_INTERVAL_SECONDS,
+                "concurrency": VoiceSettings.ELEVENLABS_RECONCILE_CONCURRENCY,
+                "totals": dict(self.totals),
+                "last_pass": passes[-1] if passes else None,
+                "recent_passes": passes,
+                "max_watermark_lag_seconds": lag[0][1] if lag else None,
+                "most_behind_agents": [{"agent_id": a, "lag_seconds": s} for a, s in lag[:10]],
+            }
+
+
+reconciler_stats = ReconcilerStats()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cursor bookkeeping
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _ensure_cursors() -> None:
+    """Create a cursor for every ElevenLabs-backed agent that lacks one."""
+    async with async_db() as session:
+        missing = (await session.scalars(
+            select(AgentModel.id)
+            .outerjoin(ConversationSyncCursorModel, ConversationSyncCursorModel.agent_id == AgentModel.id)
+            .where(AgentModel.elevenlabs_agent_id.isnot(None), ConversationSyncCursorModel.id.is_(None))
+        )).all()
+        if not missing:
+            return
+        start = int(time.time()) - VoiceSettings.ELEVENLABS_RECONCILE_LOOKBACK_SECONDS
+        session.add_all([ConversationSyncCursorModel(agent_id=agent_id, high_water_mark=start) for agent_id in missing])
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Another worker created them first
+            await session.rollback()
+
+
+async def _claim_agents(limit: int) -> List[Tuple[int, str, int]]:
+    """Lease up to limit due agents: (agent_id, elevenlabs_agent_id, high_water_mark)."""
+    now = datetime.now(timezone.utc)
+    async with async_db() as session:
+        rows = (await session.execute(
+            select(ConversationSyncCursorModel, AgentModel.elevenlabs_agent_id)
+            .join(AgentModel, AgentModel.id == ConversationSyncCursorModel.agent_id)
+            .where(
+                ConversationSyncCursorModel.next_run_at <= now,
+                AgentModel.elevenlabs_agent_id.isnot(None),
+            )
+            .order_by(ConversationSyncCursorModel.next_run_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=ConversationSyncCursorModel)
+        )).all()
+        lease_until = now + timedelta(seconds=VoiceSettings.ELEVENLABS_RECONCILE_INTERVAL_SECONDS)
+        claimed = []
+        for cursor, elevenlabs_agent_id in rows:
+            cursor.next_run_at = lease_until
+            claimed.append((cursor.agent_id, elevenlabs_agent_id, cursor.high_water_mark))
+        await session.commit()
+    return claimed
+
+
+async def _save_cursor(agent_id: int, high_water_mark: int, ingested: int, error: Optional[str]) -> None:
+    async with async_db() as session:
+        cursor = await session.scalar(
+            select(ConversationSyncCursorModel).where(ConversationSyncCursorModel.agent_id == agent_id)
+        )
+        if cursor is None:
+            return
+        cursor.high_water_mark = max(cursor.high_water_mark, high_water_mark)
+        cursor.last_run_at = datetime.now(timezone.utc)
+        cursor.last_ingested = ingested
+        cursor.last_error = error
+        await session.commit()
+
+
+async def _known_conversations(conv_ids: List[str]) -> Set[str]:
+    """Ids already stored, or already settled (ingested/failed) by the ingest table."""
+    if not conv_ids:
+        return set()
+    async with async_db() as session:
+        stored = (await session.scalars(
+            select(ConversationsModel.elevenlabs_conv_id).where(ConversationsModel.elevenlabs_conv_id.in_(conv_ids))
+        )).all()
+        settled = (await session.scalars(
+            select(ConversationIngestModel.elevenlabs_conv_id).where(
+                ConversationIngestModel.elevenlabs_conv_id.in_(conv_ids),
+                ConversationIngestModel.status != INGEST_PENDING,
+            )
+        )).all()
+    return set(stored) | set(settled)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-agent pass
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _ingest_one(
+    el_conv: AsyncElevenLabsConversation,
+    limit: asyncio.Semaphore,
+    summary: dict,
+) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Fetch and ingest one listed conversation. Returns (settled, ingested,
+    lag_seconds), lag being the time from call end to ingest.
+    """
+    conv_id = summary["conversation_id"]
+    async with limit:
+        response = await el_conv.get_conversation(conv_id)
+    if not response.status or not response.data:
+        return False, False, None
+    record = await ingest_conversation_async(conv_id, response.data, source="reconcile")
+    if record is None:
+        # Already ingested elsewhere, or ElevenLabs is still assembling it
+        return conv_id in await _known_conversations([conv_id]), False, None
+    ended = (summary.get("start_time_unix_secs") or 0) + (summary.get("call_duration_secs") or 0)
+    return True, True, (time.time() - ended) if ended else None
+
+
+async def reconcile_agent(
+    agent_id: int,
+    elevenlabs_agent_id: str,
+    high_water_mark: int,
+    limit: asyncio.Semaphore,
+) -> dict:
+    """List one agent's conversations since its high-water mark and ingest the missing ones."""
+    el_conv = AsyncElevenLabsConversation()
+    listed_at = int(time.time())
+    stale_before = listed_at - VoiceSettings.ELEVENLABS_RECONCILE_STALE_SECONDS
+    # Earliest start we must see again next pass (unfinished or failed ingest)
+    hold_at: Optional[int] = None
+    result = {"listed": 0, "ingested": 0, "errors": 0, "lags": []}
+
+    params = {
+        "page_size": VoiceSettings.ELEVENLABS_RECONCILE_PAGE_SIZE,
+        "call_start_after_unix": high_water_mark,
+    }
+    cursor: Optional[str] = None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        async with limit:
+            response = await el_conv.get_conversations(elevenlabs_agent_id, **params)
+        if not response.status:
+            raise RuntimeError(f"Listing conversations failed: {response.error_message}")
+
+        page = response.data.get("conversations") or []
+        result["listed"] += len(page)
+
+        candidates = []
+        for summary in page:
+            started = summary.get("start_time_unix_secs") or listed_at
+            if summary.get("status") == "done":
+                candidates.append(summary)
+            elif summary.get("status") not in _TERMINAL_STATUSES and started > stale_before:
+                hold_at = started if hold_at is None else min(hold_at, started)
+
+        known = await _known_conversations([c["conversation_id"] for c in candidates])
+        batch = [c for c in candidates if c["conversation_id"] not in known]
+        outcomes = await asyncio.gather(
+            *(_ingest_one(el_conv, limit, summary) for summary in batch),
+            return_exceptions=True,
+        )
+        for summary, outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Reconcile ingest failed for {summary['conversation_id']}: {outcome!r}")
+                result["errors"] += 1
+                settled = False
+            else:
+                settled, ingested, lag = outcome
+                result["ingested"] += ingested
+                if lag is not None:
+                    result["lags"].append(lag)
+            if not settled:
+                started = summary.get("start_time_unix_secs") or listed_at
+                hold_at = started if hold_at is None else min(hold_at, started)
+
+        cursor = response.data.get("next_cursor")
+        if not response.data.get("has_more") or not cursor:
+            break
+
+    if hold_at is not None:
+        result["high_water_mark"] = max(high_water_mark, hold_at - 1)
+    else:
+        result["high_water_mark"] = max(high_water_mark, listed_at - _LISTING_MARGIN_SECONDS)
+    return result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Passes
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def reconcile_once() -> dict:
+    """Reconcile every due agent (in leased batches) and record the pass."""
+    started = time.monotonic()
+    started_at = datetime.now(timezone.utc)
+    limit = asyncio.Semaphore(VoiceSettings.ELEVENLABS_RECONCILE_CONCURRENCY)
+    totals = {"agents": 0, "listed": 0, "ingested": 0, "errors": 0}
+    lags: List[float] = []
+    watermarks: Dict[int, int] = {}
+
+    await _ensure_cursors()
+
+    while True:
+        claimed = await _claim_agents(VoiceSettings.ELEVENLABS_RECONCILE_AGENTS_PER_BATCH)
+        if not claimed:
+            break
+        outcomes = await asyncio.gather(
+            *(reconcile_agent(agent_id, el_agent_id, hwm, limit) for agent_id, el_agent_id, hwm in claimed),
+            return_exceptions=True,
+        )
+        for (agent_id, _, hwm), outcome in zip(claimed, outcomes):
+            totals["agents"] += 1
+            if isinstance(outcome, Exception):
+                logger.error(f"Reconcile failed for agent {agent_id}: {outcome!r}")
+                totals["errors"] += 1
+                await _save_cursor(agent_id, hwm, 0, repr(outcome))
+                watermarks[agent_id] = hwm
+                continue
+            for field in ("listed", "ingested", "errors"):
+                totals[field] += outcome[field]
+            lags.extend(outcome["lags"])
+            await _save_cursor(agent_id, outcome["high_water_mark"], outcome["ingested"], None)
+            watermarks[agent_id] = outcome["high_water_mark"]
+
+    duration = time.monotonic() - started
+    summary = {
+        "started_at": started_at.isoformat(),
+        "duration_seconds": round(duration, 3),
+        **totals,
+        "listed_per_second": round(totals["listed"] / duration, 2) if duration else 0.0,
+        "ingested_per_minute": round(totals["ingested"] * 60 / duration, 2) if duration else 0.0,
+        "ingest_lag_seconds": {
+            "avg": round(sum(lags) / len(lags), 1) if lags else None,
+            "max": round(max(lags), 1) if lags else None,
+        },
+    }
+    reconciler_stats.record_pass(summary, watermarks)
+    if totals["agents"]:
+        logger.info(
+            f"Reconcile pass: {totals['agents']} agents, {totals['listed']} listed, "
+            f"{totals['ingested']} ingested, {totals['errors']} errors in {duration:.1f}s"
+        )
+    return summary
+
+
+async def run_conversation_reconciler(interval_seconds: int = VoiceSettings.ELEVENLABS_RECONCILE_INTERVAL_SECONDS) -> None:
+    """Background task: periodically ingest conversations nothing else captured."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await reconcile_once()
+        except Exception:
+            logger.error(f"Conversation reconcile failed:\n{traceback.format_exc()}")
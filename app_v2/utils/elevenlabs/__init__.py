@@ -2,12 +2,31 @@
 ElevenLabs utilities module
 
 This module contains utilities for interacting with the ElevenLabs API.
+Each client has an async variant (Async*) for code running on the event loop
+and a sync variant for scripts and sync routes; both share one pooled
+HTTP session per loop.
 """
 
-from .base import BaseElevenLabs
-from .voice_utils import ElevenLabsVoice
-from .agent_utils import ElevenLabsAgent
-from .kb_utils import ElevenLabsKB
-from .phone_connection import ElevenLabsPhoneConnection
+from .base import AsyncBaseElevenLabs, BaseElevenLabs
+from .voice_utils import AsyncElevenLabsVoice, ElevenLabsVoice
+from .agent_utils import AsyncElevenLabsAgent, ElevenLabsAgent
+from .kb_utils import AsyncElevenLabsKB, ElevenLabsKB
+from .phone_connection import AsyncElevenLabsPhoneConnection, ElevenLabsPhoneConnection
+from .conversation_utils import AsyncElevenLabsConversation, ElevenLabsConversation
+from .http_client import close_http_session
 
-__all__ = ["BaseElevenLabs", "ElevenLabsVoice", "ElevenLabsAgent", "ElevenLabsKB", "ElevenLabsPhoneConnection"]
+__all__ = [
+    "AsyncBaseElevenLabs",
+    "BaseElevenLabs",
+    "AsyncElevenLabsVoice",
+    "ElevenLabsVoice",
+    "AsyncElevenLabsAgent",
+    "ElevenLabsAgent",
+    "AsyncElevenLabsKB",
+    "ElevenLabsKB",
+    "AsyncElevenLabsPhoneConnection",
+    "ElevenLabsPhoneConnection",
+    "AsyncElevenLabsConversation",
+    "ElevenLabsConversation",
+    "close_http_session",
+]
@@ -6,7 +6,7 @@ Handles agent creation, retrieval, updating, deletion, and configuration managem
 """
 
 from typing import Optional, Dict, Any, List
-from .base import BaseElevenLabs, ElevenLabsResponse
+from .base import AsyncBaseElevenLabs, BaseElevenLabs, ElevenLabsResponse
 from app_v2.core.logger import setup_logger
 from app_v2.core.elevenlabs_config import (
     DEFAULT_LLM_ELEVENLAB,
@@ -19,13 +19,13 @@ from app_v2.schemas.function_schema import ApiSchema
 logger = setup_logger(__name__)
 
 
-class ElevenLabsAgent(BaseElevenLabs):
+class AsyncElevenLabsAgent(AsyncBaseElevenLabs):
     """
     Agent utility class for ElevenLabs API operations.
     Handles all agent-related API calls including creation, updates, and configuration.
     """
     
-    def create_agent(
+    async def create_agent(
         self,
         name: str,
         voice_id: str,
@@ -114,7 +114,7 @@ class ElevenLabsAgent(BaseElevenLabs):
             "conversation_config": conversation_config
         }
         
-        response = self._post("/convai/agents/create", data=payload)
+        response = await self._post("/convai/agents/create", data=payload)
         
         if response.status:
             agent_id = response.data.get("agent_id")
@@ -124,18 +124,22 @@ class ElevenLabsAgent(BaseElevenLabs):
         
         return response
     
-    def get_agent(self, agent_id: str) -> ElevenLabsResponse:
+    async def get_agent(self, agent_id: str, use_cache: bool = True) -> ElevenLabsResponse:
         """
         Get agent details by agent_id.
         
         Args:
             agent_id: ElevenLabs agent ID
+            use_cache: Serve from the read-through cache when possible
             
         Returns:
             ElevenLabsResponse with agent details
         """
         logger.info(f"Fetching agent: {agent_id}")
-        response = self._get(f"/convai/agents/{agent_id}")
+        if use_cache:
+            response = await self._cached_get(f"/convai/agents/{agent_id}")
+        else:
+            response = await self._get(f"/convai/agents/{agent_id}")
         
         if response.status:
             logger.info(f"✅ Agent fetched: {agent_id}")
@@ -144,7 +148,7 @@ class ElevenLabsAgent(BaseElevenLabs):
         
         return response
     
-    def update_agent(
+    async def update_agent(
         self,
         agent_id: str,
         name: Optional[str] = None,
@@ -182,8 +186,8 @@ class ElevenLabsAgent(BaseElevenLabs):
         """
         logger.info(f"Updating agent: {agent_id}")
         
-        # First, get the current agent configuration
-        current = self.get_agent(agent_id)
+        # First, get the current agent configuration (uncached: it is written back whole)
+        current = await self.get_agent(agent_id, use_cache=False)
         if not current.status:
             return ElevenLabsResponse(status=False, error_message=f"Agent not found: {agent_id}")
         
@@ -297,7 +301,8 @@ class ElevenLabsAgent(BaseElevenLabs):
         if not payload:
             return ElevenLabsResponse(status=False, error_message="No update data provided")
         
-        response = self._patch(f"/convai/agents/{agent_id}", data=payload)
+        response = await self._patch(f"/convai/agents/{agent_id}", data=payload)
+        self._evict(f"/convai/agents/{agent_id}")
         
         if response.status:
             logger.info(f"✅ Agent updated: {agent_id}")
@@ -305,8 +310,33 @@ class ElevenLabsAgent(BaseElevenLabs):
             logger.error(f"Failed to update agent: {response.error_message}")
         
         return response
-    
-    def delete_agent(self, agent_id: str) -> ElevenLabsResponse:
+
+    async def patch_agent_prompt(self, agent_id: str, **prompt_fields: Any) -> ElevenLabsResponse:
+        """
+        PATCH only the given conversation_config.agent.prompt fields
+        (e.g. tool_ids, knowledge_base). Unlike update_agent this does not
+        read the current config first, and ElevenLabs merges the rest.
+
+        Args:
+            agent_id: ElevenLabs agent ID
+            **prompt_fields: Prompt fields to replace
+
+        Returns:
+            ElevenLabsResponse with updated agent data
+        """
+        logger.info(f"Patching agent {agent_id}: {sorted(prompt_fields)}")
+        payload = {"conversation_config": {"agent": {"prompt": prompt_fields}}}
+        response = await self._patch(f"/convai/agents/{agent_id}", data=payload)
+        self._evict(f"/convai/agents/{agent_id}")
+
+        if response.status:
+            logger.info(f"✅ Agent patched: {agent_id}")
+        else:
+            logger.error(f"Failed to patch agent: {response.error_message}")
+
+        return response
+
+    async def delete_agent(self, agent_id: str) -> ElevenLabsResponse:
         """
         Delete an agent from ElevenLabs.
         
@@ -317,7 +347,8 @@ class ElevenLabsAgent(BaseElevenLabs):
             ElevenLabsResponse indicating success or failure
         """
         logger.info(f"Deleting agent: {agent_id}")
-        response = self._delete(f"/convai/agents/{agent_id}")
+        response = await self._delete(f"/convai/agents/{agent_id}")
+        self._evict(f"/convai/agents/{agent_id}")
         
         if response.status:
             logger.info(f"✅ Agent deleted: {agent_id}")
@@ -326,13 +357,13 @@ class ElevenLabsAgent(BaseElevenLabs):
         
         return response
     
-    def get_agent_tools(self, agent_id: str) -> ElevenLabsResponse:
+    async def get_agent_tools(self, agent_id: str) -> ElevenLabsResponse:
         """
         Get all tools attached to an agent.
         """
         logger.info(f"Fetching tools for agent: {agent_id}")
         
-        agent_response = self.get_agent(agent_id)
+        agent_response = await self.get_agent(agent_id)
         if not agent_response.status:
             return agent_response
         
@@ -342,12 +373,12 @@ class ElevenLabsAgent(BaseElevenLabs):
         logger.info(f"✅ Agent {agent_id} has {len(tool_ids)} tools")
         return ElevenLabsResponse(status=True, data={"tool_ids": tool_ids})
 
-    def get_tool(self, tool_id: str) -> ElevenLabsResponse:
+    async def get_tool(self, tool_id: str) -> ElevenLabsResponse:
         """
         Get tool details by tool_id.
         """
         logger.info(f"Fetching ElevenLabs tool: {tool_id}")
-        response = self._get(f"/convai/tools/{tool_id}")
+        response = await self._cached_get(f"/convai/tools/{tool_id}")
         if response.status:
             logger.info(f"✅ Tool fetched: {tool_id}")
         else:
@@ -403,7 +434,7 @@ class ElevenLabsAgent(BaseElevenLabs):
             }
         }
 
-    def create_tool(
+    async def create_tool(
         self,
         name: str,
         description: str,
@@ -415,7 +446,7 @@ class ElevenLabsAgent(BaseElevenLabs):
         logger.info(f"Creating ElevenLabs tool: {name}")
 
         payload = self._build_tool_payload(name, description, api_schema)
-        response = self._post("/convai/tools", data=payload)
+        response = await self._post("/convai/tools", data=payload)
 
         if response.status:
             tool_id = response.data.get("id")
@@ -426,7 +457,7 @@ class ElevenLabsAgent(BaseElevenLabs):
         return response
 
 
-    def delete_tool(self, tool_id: str) -> ElevenLabsResponse:
+    async def delete_tool(self, tool_id: str) -> ElevenLabsResponse:
         """
         Delete a tool from ElevenLabs ConvAI.
 
@@ -439,7 +470,8 @@ class ElevenLabsAgent(BaseElevenLabs):
 
         logger.info(f"Deleting ElevenLabs tool: {tool_id}")
 
-        response = self._delete(f"/convai/tools/{tool_id}")
+        response = await self._delete(f"/convai/tools/{tool_id}")
+        self._evict(f"/convai/tools/{tool_id}")
 
         if response.status:
             logger.info(f"✅ Tool deleted successfully: {tool_id}")
@@ -448,7 +480,7 @@ class ElevenLabsAgent(BaseElevenLabs):
 
         return response
 
-    def update_tool(
+    async def update_tool(
         self,
         tool_id: str,
         name: str,
@@ -462,7 +494,8 @@ class ElevenLabsAgent(BaseElevenLabs):
         logger.info(f"Updating ElevenLabs tool: {tool_id}")
 
         payload = self._build_tool_payload(name, description, api_schema)
-        response = self._patch(f"/convai/tools/{tool_id}", data=payload)
+        response = await self._patch(f"/convai/tools/{tool_id}", data=payload)
+        self._evict(f"/convai/tools/{tool_id}")
 
         if response.status:
             logger.info(f"✅ Tool updated successfully: {tool_id}")
@@ -470,3 +503,9 @@ class ElevenLabsAgent(BaseElevenLabs):
             logger.error(f"❌ Failed to update tool: {response.error_message}")
 
         return response
+
+
+class ElevenLabsAgent(BaseElevenLabs):
+    """Sync wrapper around AsyncElevenLabsAgent; same methods, blocking calls."""
+
+    _async_class = AsyncElevenLabsAgent
@@ -1,14 +1,37 @@
 """
 Base ElevenLabs Class
 
-This module provides a base class for all ElevenLabs API interactions using HTTP requests.
+This module provides the base classes for all ElevenLabs API interactions.
+
+AsyncBaseElevenLabs does the HTTP work over a shared keep-alive connection
+pool (see http_client). BaseElevenLabs is the sync face of the same client:
+each sync subclass names its async twin in ``_async_class`` and every
+coroutine method of the twin is exposed as a blocking call.
 """
 
-import requests
-import logging
+import asyncio
+import inspect
+import json
+import os
 from typing import Dict, Any, Optional
+
+import aiohttp
+
+from app_v2.core.config import VoiceSettings
 from app_v2.core.elevenlabs_config import ELEVENLABS_API_KEY, BASE_URL
 from app_v2.core.logger import setup_logger
+from .cache import response_cache
+from .http_client import get_http_session, request_timeout, run_sync
+from .resilience import (
+    REJECTED_STATUSES,
+    backoff_delay,
+    breakers,
+    classify_exception,
+    classify_status,
+    endpoint_key,
+    parse_retry_after,
+    request_was_not_sent,
+)
 
 logger = setup_logger(__name__)
 
@@ -35,16 +58,51 @@ class ElevenLabsResponse:
         return self.status
 
 
-class BaseElevenLabs:
+def _build_form(data: Optional[Dict], files: Dict) -> aiohttp.FormData:
     """
-    Base class for ElevenLabs API operations.
-    Provides common HTTP methods and error handling.
+    Translate requests-style ``data`` / ``files`` arguments into multipart form data.
+
+    files values may be:
+        (None, value)                      -> plain form field
+        (filename, content)                -> file part
+        (filename, content, content_type)  -> file part with explicit type
+        file object                        -> file part named after the file
     """
-    
+    form = aiohttp.FormData()
+    for key, value in (data or {}).items():
+        form.add_field(key, str(value))
+
+    for key, value in files.items():
+        if isinstance(value, tuple):
+            filename, content = value[0], value[1]
+            content_type = value[2] if len(value) > 2 else None
+        else:
+            filename, content, content_type = os.path.basename(getattr(value, "name", key)), value, None
+
+        if hasattr(content, "read"):
+            # aiohttp closes file payloads after sending; read into memory so
+            # a retry can rebuild the form from the same object
+            if hasattr(content, "seek"):
+                content.seek(0)
+            content = content.read()
+
+        if filename is None:
+            form.add_field(key, str(content))
+        else:
+            form.add_field(key, content, filename=filename, content_type=content_type)
+    return form
+
+
+class AsyncBaseElevenLabs:
+    """
+    Async base class for ElevenLabs API operations.
+    Provides common HTTP methods and error handling over a pooled session.
+    """
+
     def __init__(self, api_key: Optional[str] = None):
         """
-        Initialize BaseElevenLabs with API key and base configuration.
-        
+        Initialize AsyncBaseElevenLabs with API key and base configuration.
+
         Args:
             api_key: ElevenLabs API key. If not provided, uses config default.
         """
@@ -53,192 +111,258 @@ class BaseElevenLabs:
         self.headers = {
             "xi-api-key": self.api_key
         }
-        
+
         if not self.api_key:
             logger.warning("ElevenLabs API key not configured")
-    
-    def _get(
+
+    async def _request(
         self,
+        method: str,
         endpoint: str,
-        params: Optional[Dict] = None,
+        ok_statuses: tuple,
         retries: int = 3,
-        raw: bool = False
+        params: Optional[Dict] = None,
+        json_body: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        raw: bool = False,
+        timeout: float = VoiceSettings.ELEVENLABS_READ_TIMEOUT_SECONDS,
+        idempotent: bool = True,
     ) -> ElevenLabsResponse:
         """
-        Make a GET request to ElevenLabs API.
+        Shared request loop behind _get/_post/_patch/_delete.
 
-        Args:
-            endpoint: API endpoint (e.g., '/voices')
-            params: Query parameters
-            retries: Number of retry attempts
-            raw: Return raw response bytes (for audio, etc.)
+        Only transient failures are retried (see resilience), with jittered
+        backoff. Non-idempotent requests are retried only when ElevenLabs
+        cannot have acted on them. Calls fail fast while the endpoint's
+        circuit is open.
 
         Returns:
             ElevenLabsResponse object
         """
         url = f"{self.base_url}{endpoint}"
+        key = endpoint_key(method, endpoint)
         last_error = None
 
+        if not breakers.allow(key):
+            logger.warning(f"ElevenLabs circuit open for {key}; failing fast")
+            return ElevenLabsResponse(status=False, error_message=f"Circuit open for {key}")
+
+        session = get_http_session()
+
         for attempt in range(1, retries + 1):
+            retry_after = None
+            retryable = False
+            recorded = False
             try:
-                logger.debug(f"GET request to {url} (attempt {attempt}/{retries})")
-                response = requests.get(
+                logger.debug(f"{method} request to {url} (attempt {attempt}/{retries})")
+                async with session.request(
+                    method,
                     url,
                     headers=self.headers,
                     params=params,
-                    timeout=30
-                )
-
-                if response.status_code == 200:
-                    # ✅ RAW (audio / binary)
-                    if raw:
-                        return ElevenLabsResponse(
-                            status=True,
-                            data={
-                                "content": response.content,
-                                "content_type": response.headers.get(
-                                    "content-type", "application/octet-stream"
-                                )
-                            }
-                        )
-
-                    # ✅ JSON (default)
-                    return ElevenLabsResponse(
-                        status=True,
-                        data=response.json()
-                    )
-
-                last_error = f"Status {response.status_code}: {response.text}"
-                logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
+                    json=json_body,
+                    data=_build_form(data, files) if files else None,
+                    timeout=request_timeout(timeout),
+                ) as response:
+                    body = await response.read()
 
-            except requests.RequestException as e:
-                last_error = str(e)
+                    if response.status in ok_statuses:
+                        breakers.record(key, response.status, ok=True, transient=False)
+                        recorded = True
+                        # ✅ RAW (audio / binary)
+                        if raw:
+                            return ElevenLabsResponse(
+                                status=True,
+                                data={
+                                    "content": body,
+                                    "content_type": response.headers.get(
+                                        "content-type", "application/octet-stream"
+                                    )
+                                }
+                            )
+                        # DELETE often returns 204 No Content
+                        if not body:
+                            return ElevenLabsResponse(status=True, data={})
+                        # ✅ JSON (default)
+                        return ElevenLabsResponse(status=True, data=json.loads(body))
+
+                    transient = classify_status(response.status)
+                    breakers.record(key, response.status, ok=False, transient=transient)
+                    recorded = True
+                    retryable = transient and (idempotent or response.status in REJECTED_STATUSES)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    last_error = f"Status {response.status}: {body.decode('utf-8', errors='replace')}"
+                    logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                transient = classify_exception(e)
+                breakers.record(key, None, ok=False, transient=transient)
+                recorded = True
+                retryable = transient and (idempotent or request_was_not_sent(e))
+                last_error = str(e) or e.__class__.__name__
                 logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
 
             except Exception as e:
+                # Counted as a failure: a half-open probe must always record
+                # an outcome or the circuit never leaves HALF_OPEN
+                if not recorded:
+                    breakers.record(key, None, ok=False, transient=True)
+                    recorded = True
                 last_error = str(e)
                 logger.error(f"Unexpected error on attempt {attempt}/{retries}: {last_error}")
+                break
+
+            finally:
+                if not recorded:
+                    breakers.abandon(key)
+
+            if not retryable or attempt == retries:
+                break
+            delay = backoff_delay(attempt, retry_after)
+            if delay is None:
+                logger.warning(f"Retry-After {retry_after:.0f}s for {key} exceeds retry budget; giving up")
+                break
+            if not breakers.allow_retry(key):
+                last_error = f"{last_error} (circuit opened for {key})"
+                break
+            breakers.record_retry(key)
+            await asyncio.sleep(delay)
 
         return ElevenLabsResponse(status=False, error_message=last_error)
 
-    
-    def _post(self, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None, 
-              retries: int = 3) -> ElevenLabsResponse:
+    async def _get(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        retries: int = 3,
+        raw: bool = False
+    ) -> ElevenLabsResponse:
+        """
+        Make a GET request to ElevenLabs API.
+
+        Args:
+            endpoint: API endpoint (e.g., '/voices')
+            params: Query parameters
+            retries: Number of retry attempts
+            raw: Return raw response bytes (for audio, etc.)
+
+        Returns:
+            ElevenLabsResponse object
+        """
+        return await self._request("GET", endpoint, (200,), retries, params=params, raw=raw)
+
+    async def _post(self, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None,
+                    retries: int = 3, idempotent: bool = False) -> ElevenLabsResponse:
         """
         Make a POST request to ElevenLabs API.
-        
+
         Args:
             endpoint: API endpoint
-            data: Request body data (JSON)
+            data: Request body data (JSON, or form fields when files are given)
             files: Files to upload (for multipart/form-data)
             retries: Number of retry attempts
-            
+            idempotent: Safe to resend after an ambiguous failure (timeout,
+                5xx). Leave False for creates.
+
         Returns:
             ElevenLabsResponse object
         """
-        url = f"{self.base_url}{endpoint}"
-        last_error = None
-        
-        for attempt in range(1, retries + 1):
-            try:
-                logger.debug(f"POST request to {url} (attempt {attempt}/{retries})")
-                
-                # Use different headers for file uploads
-                headers = self.headers.copy()
-                if files:
-                    headers.pop("Content-Type", None)  # Let requests set it for multipart
-                
-                response = requests.post(
-                    url, 
-                    headers=headers, 
-                    json=data if not files else None,
-                    data=data if files else None,
-                    files=files,
-                    timeout=60
-                )
-                
-                if response.status_code in [200, 201]:
-                    return ElevenLabsResponse(status=True, data=response.json())
-                else:
-                    last_error = f"Status {response.status_code}: {response.text}"
-                    logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-                    
-            except requests.RequestException as e:
-                last_error = str(e)
-                logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Unexpected error on attempt {attempt}/{retries}: {last_error}")
-        
-        return ElevenLabsResponse(status=False, error_message=last_error)
-    
-    def _patch(self, endpoint: str, data: Dict, retries: int = 3) -> ElevenLabsResponse:
+        return await self._request(
+            "POST",
+            endpoint,
+            (200, 201),
+            retries,
+            json_body=data if not files else None,
+            data=data if files else None,
+            files=files,
+            timeout=(
+                VoiceSettings.ELEVENLABS_UPLOAD_TIMEOUT_SECONDS if files
+                else VoiceSettings.ELEVENLABS_READ_TIMEOUT_SECONDS
+            ),
+            idempotent=idempotent,
+        )
+
+    async def _patch(self, endpoint: str, data: Dict, retries: int = 3) -> ElevenLabsResponse:
         """
         Make a PATCH request to ElevenLabs API.
-        
+
         Args:
             endpoint: API endpoint
             data: Request body data
             retries: Number of retry attempts
-            
+
         Returns:
             ElevenLabsResponse object
         """
-        url = f"{self.base_url}{endpoint}"
-        last_error = None
-        
-        for attempt in range(1, retries + 1):
-            try:
-                logger.debug(f"PATCH request to {url} (attempt {attempt}/{retries})")
-                response = requests.patch(url, headers=self.headers, json=data, timeout=30)
-                
-                if response.status_code == 200:
-                    return ElevenLabsResponse(status=True, data=response.json())
-                else:
-                    last_error = f"Status {response.status_code}: {response.text}"
-                    logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-                    
-            except requests.RequestException as e:
-                last_error = str(e)
-                logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Unexpected error on attempt {attempt}/{retries}: {last_error}")
-        
-        return ElevenLabsResponse(status=False, error_message=last_error)
-    
-    def _delete(self, endpoint: str, retries: int = 3) -> ElevenLabsResponse:
+        return await self._request("PATCH", endpoint, (200,), retries, json_body=data)
+
+    async def _delete(self, endpoint: str, retries: int = 3) -> ElevenLabsResponse:
         """
         Make a DELETE request to ElevenLabs API.
-        
+
         Args:
             endpoint: API endpoint
             retries: Number of retry attempts
-            
+
         Returns:
             ElevenLabsResponse object
         """
-        url = f"{self.base_url}{endpoint}"
-        last_error = None
-        
-        for attempt in range(1, retries + 1):
-            try:
-                logger.debug(f"DELETE request to {url} (attempt {attempt}/{retries})")
-                response = requests.delete(url, headers=self.headers, timeout=30)
-                
-                if response.status_code in [200, 204]:
-                    # DELETE often returns 204 No Content
-                    response_data = response.json() if response.status_code == 200 and response.text else {}
-                    return ElevenLabsResponse(status=True, data=response_data)
-                else:
-                    last_error = f"Status {response.status_code}: {response.text}"
-                    logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-                    
-            except requests.RequestException as e:
-                last_error = str(e)
-                logger.warning(f"Attempt {attempt}/{retries} failed - {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Unexpected error on attempt {attempt}/{retries}: {last_error}")
-        
-        return ElevenLabsResponse(status=False, error_message=last_error)
+        return await self._request("DELETE", endpoint, (200, 204), retries)
+
+    async def _cached_get(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        ttl: Optional[float] = None
+    ) -> ElevenLabsResponse:
+        """
+        GET through the shared read-through cache. Successful responses are
+        kept for ``ttl`` seconds (ELEVENLABS_CACHE_TTL_SECONDS by default) and
+        concurrent misses share one request.
+        """
+        key = response_cache.key(self.api_key, endpoint, params)
+        return await response_cache.get_or_fetch(
+            key,
+            lambda: self._get(endpoint, params=params),
+            ttl=ttl,
+            cacheable=lambda response: response.status,
+        )
+
+    def _evict(self, *endpoints: str) -> None:
+        """Drop cached GETs for endpoints after a write changed them."""
+        response_cache.invalidate(self.api_key, endpoints)
+
+
+class BaseElevenLabs:
+    """
+    Sync wrapper around an AsyncBaseElevenLabs subclass.
+
+    Subclasses set ``_async_class``; every coroutine method on it becomes a
+    blocking method here (run on the shared runner loop), and plain methods
+    and attributes are passed through. Kept for scripts and sync routes;
+    async code should use the Async* classes directly.
+    """
+
+    _async_class = AsyncBaseElevenLabs
+
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        Initialize BaseElevenLabs with API key and base configuration.
+
+        Args:
+            api_key: ElevenLabs API key. If not provided, uses config default.
+        """
+        self._client = self._async_class(api_key)
+
+    def __getattr__(self, name: str):
+        if name == "_client":
+            raise AttributeError(name)
+        attr = getattr(self._client, name)
+        if inspect.iscoroutinefunction(attr):
+            def blocking(*args, **kwargs):
+                return run_sync(attr(*args, **kwargs))
+            blocking.__name__ = name
+            blocking.__doc__ = attr.__doc__
+            return blocking
+        return attr
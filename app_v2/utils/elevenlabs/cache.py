@@ -0,0 +1,167 @@
+"""
+Read-through cache for ElevenLabs metadata lookups.
+
+Agents, tools, voices and KB documents mostly change only when we change
+them, so GETs for them are cached in-process:
+
+  • entries are keyed by (API key, endpoint, params) and expire after a TTL
+    (ELEVENLABS_CACHE_TTL_SECONDS, or a shorter per-call TTL for data that
+    ElevenLabs changes on its own, such as KB indexing status)
+  • single-flight: concurrent misses for the same key on the same loop share
+    one upstream request
+  • write paths evict the affected endpoints explicitly; an eviction also
+    discards any fetch still in flight, so a read racing a write cannot put
+    the old value back
+  • only successful responses are cached, and callers always get a copy, so
+    mutating a returned config cannot corrupt the cache
+
+The cache is per process. Another worker's write is only seen here once the
+TTL expires, which is why the TTL stays short.
+"""
+
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from .resilience import endpoint_key
+
+logger = setup_logger(__name__)
+
+CacheKey = Tuple[str, str, Tuple]
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._epoch = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+            self.invalidations = 0
+            self.evictions = 0
+            self.by_endpoint: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key(api_key: Optional[str], endpoint: str, params: Optional[Dict] = None) -> CacheKey:
+        account = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+        return account, endpoint, tuple(sorted((params or {}).items()))
+
+    def _count(self, endpoint: str, field: str) -> None:
+        setattr(self, field, getattr(self, field) + 1)
+        # Group per-endpoint stats by route template, not the individual ID
+        group = endpoint_key("GET", endpoint)
+        counters = self.by_endpoint.setdefault(group, {"hits": 0, "misses": 0, "coalesced": 0})
+        counters[field] += 1
+
+    async def get_or_fetch(
+        self,
+        key: CacheKey,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        cacheable: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """
+        Return the cached value for key, or run fetch() once (shared by
+        concurrent callers) and cache the result if cacheable(result).
+        """
+        if not VoiceSettings.ELEVENLABS_CACHE_ENABLED:
+            return await fetch()
+
+        ttl = VoiceSettings.ELEVENLABS_CACHE_TTL_SECONDS if ttl is None else ttl
+        loop = asyncio.get_running_loop()
+        endpoint = key[1]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(endpoint, "hits")
+                return copy.deepcopy(entry[1])
+
+            flight = self._inflight.get(key)
+            if flight is not None and flight[0] is loop:
+                self._count(endpoint, "coalesced")
+                future, owner = flight[1], False
+            else:
+                self._count(endpoint, "misses")
+                future, owner = loop.create_future(), True
+                self._inflight[key] = (loop, future)
+                epoch = self._epoch
+
+        if not owner:
+            shared = await asyncio.shield(future)
+            if shared is None:
+                # The leading fetch failed with an exception or was cancelled
+                return await fetch()
+            return copy.deepcopy(shared)
+
+        result = None
+        snapshot = None
+        try:
+            result = await fetch()
+            return result
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is future:
+                    del self._inflight[key]
+                if result is not None and cacheable(result) and epoch == self._epoch:
+                    snapshot = copy.deepcopy(result)
+                    self._entries[key] = (time.monotonic() + ttl, snapshot)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            if not future.done():
+                future.set_result(snapshot if snapshot is not None else result)
+
+    def invalidate(self, api_key: Optional[str], endpoints: Iterable[str]) -> int:
+        """Drop every cached entry (any params) for the given endpoints."""
+        account = self.key(api_key, "")[0]
+        targets = set(endpoints)
+        with self._lock:
+            self._epoch += 1
+            stale = [k for k in self._entries if k[0] == account and k[1] in targets]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        if stale:
+            logger.debug(f"ElevenLabs cache evicted {len(stale)} entries for {sorted(targets)}")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": VoiceSettings.ELEVENLABS_CACHE_ENABLED,
+                "ttl_seconds": VoiceSettings.ELEVENLABS_CACHE_TTL_SECONDS,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "by_endpoint": {k: dict(v) for k, v in self.by_endpoint.items()},
+            }
+
+
+response_cache = ResponseCache(VoiceSettings.ELEVENLABS_CACHE_MAX_ENTRIES)
@@ -5,19 +5,66 @@ This module provides utilities for managing conversation records with the Eleven
 Handles fetching conversation lists, details, audio, and deletion.
 """
 
+import asyncio
 from typing import Optional, Dict, Any, List
-from .base import BaseElevenLabs, ElevenLabsResponse
+from .base import AsyncBaseElevenLabs, BaseElevenLabs, ElevenLabsResponse
 from app_v2.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-class ElevenLabsConversation(BaseElevenLabs):
+def is_conversation_complete(conv_data: Dict[str, Any]) -> bool:
+    """
+    True once ElevenLabs has finished assembling a conversation: metadata,
+    analysis and a non-empty transcript are all present. Works on both the
+    GET /convai/conversations/{id} body and a post-call webhook's ``data``.
+    """
+    transcript_data = conv_data.get("transcript", [])
+    return (
+        bool(conv_data.get("metadata"))
+        and bool(conv_data.get("analysis"))
+        and isinstance(transcript_data, list)
+        and len(transcript_data) > 0
+    )
+
+
+def parse_conversation_metadata(conv_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the fields we store from a complete conversation payload.
+    See AsyncElevenLabsConversation.extract_conversation_metadata for keys.
+    """
+    metadata = {
+        "agent_name": conv_data.get("agent_name"),
+        "duration": (conv_data.get("metadata") or {}).get("call_duration_secs"),
+        "call_successful": (conv_data.get("analysis") or {}).get("call_successful", True),
+        "transcript_summary": (conv_data.get("analysis") or {}).get("transcript_summary"),
+        "cost": (conv_data.get("metadata") or {}).get("cost"),
+        "analysis": conv_data.get("analysis"),
+    }
+
+    transcript_list = []
+    for msg in conv_data.get("transcript") or []:
+        transcript_list.append(
+            {
+                "role": msg.get("role", "user"),  # 'user' or 'agent'
+                "message": msg.get("message", ""),
+                "tool_calls": msg.get("tool_calls"),
+                "tool_result": msg.get("tool_results"),
+                "rag_retrieval_info": msg.get("rag_retrieval_info"),
+                "time_in_call_secs": msg.get("time_in_call_secs")
+            }
+        )
+    metadata["transcript"] = transcript_list
+    metadata["message_count"] = len(transcript_list)
+    return metadata
+
+
+class AsyncElevenLabsConversation(AsyncBaseElevenLabs):
     """
     Utility class for ElevenLabs Conversational AI conversation management.
     """
 
-    def get_conversations(self, agent_id: Optional[str] = None, **kwargs) -> ElevenLabsResponse:
+    async def get_conversations(self, agent_id: Optional[str] = None, **kwargs) -> ElevenLabsResponse:
         """
         List all conversations, optionally filtered by agent_id.
         
@@ -33,7 +80,7 @@ class ElevenLabsConversation(BaseElevenLabs):
         if agent_id:
             params["agent_id"] = agent_id
             
-        response = self._get("/convai/conversations", params=params)
+        response = await self._get("/convai/conversations", params=params)
         
         if response.status:
             logger.info("✅ Conversations fetched successfully")
@@ -42,7 +89,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             
         return response
 
-    def get_conversation(self, conversation_id: str) -> ElevenLabsResponse:
+    async def get_conversation(self, conversation_id: str) -> ElevenLabsResponse:
         """
         Get details for a specific conversation.
         
@@ -53,7 +100,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             ElevenLabsResponse with conversation details.
         """
         logger.info(f"Fetching conversation details: {conversation_id}")
-        response = self._get(f"/convai/conversations/{conversation_id}")
+        response = await self._get(f"/convai/conversations/{conversation_id}")
         
         if response.status:
             logger.info(f"✅ Conversation details fetched for {conversation_id}")
@@ -62,7 +109,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             
         return response
 
-    def delete_conversation(self, conversation_id: str) -> ElevenLabsResponse:
+    async def delete_conversation(self, conversation_id: str) -> ElevenLabsResponse:
         """
         Delete a specific conversation.
         
@@ -73,7 +120,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             ElevenLabsResponse indicating success or failure.
         """
         logger.info(f"Deleting conversation: {conversation_id}")
-        response = self._delete(f"/convai/conversations/{conversation_id}")
+        response = await self._delete(f"/convai/conversations/{conversation_id}")
         
         if response.status:
             logger.info(f"✅ Conversation {conversation_id} deleted")
@@ -82,7 +129,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             
         return response
 
-    def get_conversation_audio(self, conversation_id: str) -> ElevenLabsResponse:
+    async def get_conversation_audio(self, conversation_id: str) -> ElevenLabsResponse:
         """
         Fetch the audio recording for a conversation.
         
@@ -93,7 +140,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             ElevenLabsResponse with audio data.
         """
         logger.info(f"Fetching audio for conversation: {conversation_id}")
-        response = self._get(f"/convai/conversations/{conversation_id}/audio", raw=True)
+        response = await self._get(f"/convai/conversations/{conversation_id}/audio", raw=True)
         
         if response.status:
             logger.info(f"✅ Audio fetched for conversation {conversation_id}")
@@ -102,7 +149,7 @@ class ElevenLabsConversation(BaseElevenLabs):
             
         return response
     
-    def extract_conversation_metadata(self, conversation_id: str, max_retries: int = 5, delay_seconds: float = 3.0) -> Dict[str, Any]:
+    async def extract_conversation_metadata(self, conversation_id: str, max_retries: int = 5, delay_seconds: float = 3.0) -> Dict[str, Any]:
         """
         Fetch conversation details from ElevenLabs and extract metadata for database storage.
         Retries if data is incomplete (async assembly by ElevenLabs).
@@ -118,14 +165,14 @@ class ElevenLabsConversation(BaseElevenLabs):
             - duration: Call duration in seconds
             - call_successful: Whether the call was successful
             - transcript_summary: Summary of the conversation
+            - analysis: Full analysis block (evaluation, data collection, summary)
             - transcript: Full transcript (list of messages)
             - message_count: Total number of messages in transcript
         """
-        import time
         logger.info(f"Extracting metadata for conversation: {conversation_id}")
 
         for attempt in range(1, max_retries + 1):
-            response = self.get_conversation(conversation_id)
+            response = await self.get_conversation(conversation_id)
 
             if not response.status or not response.data:
                 logger.error(f"Failed to fetch conversation metadata: {response.error_message}")
@@ -133,36 +180,9 @@ class ElevenLabsConversation(BaseElevenLabs):
 
             conv_data = response.data
 
-            # Check if required fields are present and not empty
-            has_metadata = bool(conv_data.get("metadata"))
-            has_analysis = bool(conv_data.get("analysis"))
-            transcript_data = conv_data.get("transcript", [])
-            has_transcript = isinstance(transcript_data, list) and len(transcript_data) > 0
-
-            if has_metadata and has_analysis and has_transcript:
+            if is_conversation_complete(conv_data):
                 try:
-                    metadata = {
-                        "agent_name": conv_data.get("agent_name"),
-                        "duration": (conv_data.get("metadata") or {}).get("call_duration_secs"),
-                        "call_successful": (conv_data.get("analysis") or {}).get("call_successful", True),
-                        "transcript_summary": (conv_data.get("analysis") or {}).get("transcript_summary"),
-                        "cost": (conv_data.get("metadata") or {}).get("cost"),
-                    }
-
-                    transcript_list = []
-                    for idx, msg in enumerate(transcript_data):
-                        transcript_list.append(
-                            {
-                                "role": msg.get("role", "user"),  # 'user' or 'agent'
-                                "message": msg.get("message", ""),
-                                "tool_calls": msg.get("tool_calls"),
-                                "tool_result": msg.get("tool_results"),
-                                "rag_retrieval_info": msg.get("rag_retrieval_info")
-                            }
-                        )
-                    metadata["transcript"] = transcript_list
-                    metadata["message_count"] = len(transcript_list)
-
+                    metadata = parse_conversation_metadata(conv_data)
                     logger.info(f"✅ Extracted metadata for conversation {conversation_id}: "
                                 f"duration={metadata.get('duration')}s, messages={metadata.get('message_count')}")
                     return metadata
@@ -171,10 +191,14 @@ class ElevenLabsConversation(BaseElevenLabs):
                     return {}
             else:
                 logger.warning(f"Conversation data incomplete on attempt {attempt}/{max_retries}. "
-                               f"metadata: {has_metadata}, analysis: {has_analysis}, transcript: {has_transcript}. Retrying after {delay_seconds}s...")
+                               f"status: {conv_data.get('status')}. Retrying after {delay_seconds}s...")
                 if attempt < max_retries:
-                    time.sleep(delay_seconds)
+                    await asyncio.sleep(delay_seconds)
                 else:
                     logger.error(f"Max retries reached. Conversation data still incomplete for {conversation_id}.")
                     return {}
-    
+
+class ElevenLabsConversation(BaseElevenLabs):
+    """Sync wrapper around AsyncElevenLabsConversation; same methods, blocking calls."""
+
+    _async_class = AsyncElevenLabsConversation
@@ -0,0 +1,103 @@
+"""
+Shared HTTP plumbing for the ElevenLabs clients.
+
+  • get_http_session(): one keep-alive aiohttp session (and connection pool)
+    per event loop, reused by every AsyncBaseElevenLabs instance on that loop.
+  • run_sync(): runs a coroutine on a long-lived background loop so the sync
+    BaseElevenLabs wrappers share that loop's pool instead of opening a new
+    TCP/TLS connection for every call.
+
+aiohttp speaks HTTP/1.1 only; connection reuse is what removes the per-call
+handshake cost here.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+_runner_loop: Optional[asyncio.AbstractEventLoop] = None
+_runner_thread: Optional[threading.Thread] = None
+_runner_lock = threading.Lock()
+
+
+def request_timeout(total_seconds: float) -> aiohttp.ClientTimeout:
+    """Per-request timeout: overall budget plus the shared connect limit."""
+    return aiohttp.ClientTimeout(
+        total=total_seconds,
+        connect=VoiceSettings.ELEVENLABS_CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the pooled session for the running loop, creating it on first use.
+    Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=VoiceSettings.ELEVENLABS_MAX_CONNECTIONS,
+            limit_per_host=VoiceSettings.ELEVENLABS_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=VoiceSettings.ELEVENLABS_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=request_timeout(VoiceSettings.ELEVENLABS_READ_TIMEOUT_SECONDS),
+        )
+        _sessions[loop] = session
+        logger.info(
+            f"ElevenLabs HTTP pool opened (limit={VoiceSettings.ELEVENLABS_MAX_CONNECTIONS}, "
+            f"per_host={VoiceSettings.ELEVENLABS_MAX_CONNECTIONS_PER_HOST})"
+        )
+    return session
+
+
+async def close_http_session() -> None:
+    """Close the running loop's pooled session. Called on app shutdown."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+        logger.info("ElevenLabs HTTP pool closed")
+
+
+def _ensure_runner_loop() -> asyncio.AbstractEventLoop:
+    global _runner_loop, _runner_thread
+    if _runner_loop is None:
+        with _runner_lock:
+            if _runner_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="elevenlabs-sync-runner",
+                    daemon=True,
+                )
+                thread.start()
+                _runner_thread = thread
+                _runner_loop = loop
+    return _runner_loop
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Run an ElevenLabs coroutine from sync code and return its result.
+
+    Safe from scripts, threadpool workers and (blocking, as before) from the
+    app's own loop thread. Must not be called from the runner loop itself.
+    """
+    loop = _ensure_runner_loop()
+    if threading.current_thread() is _runner_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the ElevenLabs runner loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
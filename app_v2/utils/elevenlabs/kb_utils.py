@@ -8,19 +8,20 @@ Handles document uploading, URL addition, processing status, and deletion.
 import os
 import mimetypes
 from typing import Optional, Dict, Any, List
-from .base import BaseElevenLabs, ElevenLabsResponse
+from .base import AsyncBaseElevenLabs, BaseElevenLabs, ElevenLabsResponse
+from app_v2.core.config import VoiceSettings
 from app_v2.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-class ElevenLabsKB(BaseElevenLabs):
+class AsyncElevenLabsKB(AsyncBaseElevenLabs):
     """
     Knowledge Base utility class for ElevenLabs API operations.
     Handles all document and knowledge-related API calls.
     """
     
-    def upload_document(self, file_path: str, name: Optional[str] = None) -> ElevenLabsResponse:
+    async def upload_document(self, file_path: str, name: Optional[str] = None) -> ElevenLabsResponse:
         """
         Upload a local file to ElevenLabs Knowledge Base.
         
@@ -50,7 +51,7 @@ class ElevenLabsKB(BaseElevenLabs):
                 data = {"name": filename}
                 
                 # Updated endpoint to standardized /knowledge-base
-                response = self._post("/convai/knowledge-base", data=data, files=files)
+                response = await self._post("/convai/knowledge-base", data=data, files=files)
                 
                 if response.status:
                     doc_id = response.data.get("id")
@@ -65,7 +66,7 @@ class ElevenLabsKB(BaseElevenLabs):
             logger.error(error_msg)
             return ElevenLabsResponse(status=False, error_message=error_msg)
 
-    def add_url_document(self, url: str, name: Optional[str] = None) -> ElevenLabsResponse:
+    async def add_url_document(self, url: str, name: Optional[str] = None) -> ElevenLabsResponse:
         """
         Add a URL to ElevenLabs Knowledge Base.
         
@@ -85,7 +86,7 @@ class ElevenLabsKB(BaseElevenLabs):
             "name": (None, name or url)
         }
         
-        response = self._post("/convai/knowledge-base", files=files_payload)
+        response = await self._post("/convai/knowledge-base", files=files_payload)
         
         if response.status:
             doc_id = response.data.get("id")
@@ -95,7 +96,7 @@ class ElevenLabsKB(BaseElevenLabs):
             logger.error(f"Failed to add URL to ElevenLabs KB: {response.error_message}")
             return response
 
-    def add_text_document(self, text: str, name: str) -> ElevenLabsResponse:
+    async def add_text_document(self, text: str, name: str) -> ElevenLabsResponse:
         """
         Add plain text to ElevenLabs Knowledge Base.
         
@@ -116,7 +117,7 @@ class ElevenLabsKB(BaseElevenLabs):
             "name": name
         }
         
-        response = self._post("/convai/knowledge-base", data=data, files=files)
+        response = await self._post("/convai/knowledge-base", data=data, files=files)
         
         if response.status:
             doc_id = response.data.get("id")
@@ -126,7 +127,7 @@ class ElevenLabsKB(BaseElevenLabs):
             logger.error(f"Failed to add text document to ElevenLabs KB: {response.error_message}")
             return response
 
-    def delete_document(self, document_id: str) -> ElevenLabsResponse:
+    async def delete_document(self, document_id: str) -> ElevenLabsResponse:
         """
         Delete a document from ElevenLabs Knowledge Base.
         
@@ -138,7 +139,8 @@ class ElevenLabsKB(BaseElevenLabs):
         """
         logger.info(f"Deleting document from ElevenLabs KB: {document_id}")
         
-        response = self._delete(f"/convai/knowledge-base/{document_id}")
+        response = await self._delete(f"/convai/knowledge-base/{document_id}")
+        self._evict(f"/convai/knowledge-base/{document_id}")
         
         if response.status:
             logger.info(f"✅ Document deleted from ElevenLabs KB: {document_id}")
@@ -147,20 +149,21 @@ class ElevenLabsKB(BaseElevenLabs):
             
         return response
 
-    def update_document_name(self, document_id: str, name: str) -> ElevenLabsResponse:
+    async def update_document_name(self, document_id: str, name: str) -> ElevenLabsResponse:
         """
         Update the name of a document in ElevenLabs Knowledge Base.
         """
         logger.info(f"Updating document name in ElevenLabs KB: {document_id} -> {name}")
         data = {"name": name}
-        response = self._patch(f"/convai/knowledge-base/{document_id}", data=data)
+        response = await self._patch(f"/convai/knowledge-base/{document_id}", data=data)
+        self._evict(f"/convai/knowledge-base/{document_id}")
         if response.status:
             logger.info(f"✅ Document name updated in ElevenLabs KB: {document_id}")
         else:
             logger.error(f"Failed to update document name in ElevenLabs KB: {response.error_message}")
         return response
 
-    def get_document_status(self, document_id: str) -> ElevenLabsResponse:
+    async def get_document_status(self, document_id: str) -> ElevenLabsResponse:
         """
         Check the processing status of a document.
         
@@ -170,10 +173,35 @@ class ElevenLabsKB(BaseElevenLabs):
         Returns:
             ElevenLabsResponse with status details
         """
-        response = self._get(f"/convai/knowledge-base/{document_id}")
+        response = await self._cached_get(
+            f"/convai/knowledge-base/{document_id}",
+            ttl=VoiceSettings.ELEVENLABS_CACHE_DOC_STATUS_TTL_SECONDS,
+        )
         return response
     
-    def compute_rag_index(self, document_id: str) -> Optional[str]:
+    async def submit_rag_index(self, document_id: str) -> ElevenLabsResponse:
+        """
+        Start RAG indexing for a document, or get the state of its index.
+
+        ElevenLabs only starts one index per document and model, so this is
+        also how indexing progress is polled.
+
+        Args:
+            document_id: ElevenLabs document ID
+
+        Returns:
+            ElevenLabsResponse with the index id, status ("created",
+            "processing", "succeeded", "failed", ...) and progress_percentage
+        """
+        # Send model parameter as required by ElevenLabs API
+        payload = {
+            "model": "e5_mistral_7b_instruct"
+        }
+        response = await self._post(f"/convai/knowledge-base/{document_id}/rag-index", data=payload, idempotent=True)
+        self._evict(f"/convai/knowledge-base/{document_id}")
+        return response
+
+    async def compute_rag_index(self, document_id: str) -> Optional[str]:
         """
         Compute the RAG index for a document.
         
@@ -184,11 +212,7 @@ class ElevenLabsKB(BaseElevenLabs):
             RAG index ID if successful, None otherwise
         """
         logger.info(f"Computing RAG index for document: {document_id}")
-        # Send model parameter as required by ElevenLabs API
-        payload = {
-            "model": "e5_mistral_7b_instruct"
-        }
-        response = self._post(f"/convai/knowledge-base/{document_id}/rag-index", data=payload)
+        response = await self.submit_rag_index(document_id)
         
         if response.status and response.data:
             logger.info(f"✅ RAG index computed for document: {document_id}")
@@ -196,6 +220,9 @@ class ElevenLabsKB(BaseElevenLabs):
         else:
             logger.error(f"Failed to compute RAG index for document: {response.error_message}")
             return None
-        
 
-    
\ No newline at end of file
+
+class ElevenLabsKB(BaseElevenLabs):
+    """Sync wrapper around AsyncElevenLabsKB; same methods, blocking calls."""
+
+    _async_class = AsyncElevenLabsKB
@@ -6,19 +6,19 @@ Handles signed URL generation for WebSocket connections.
 """
 
 from typing import Optional
-from .base import BaseElevenLabs, ElevenLabsResponse
+from .base import AsyncBaseElevenLabs, BaseElevenLabs, ElevenLabsResponse
 from app_v2.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-class ElevenLabsPhoneConnection(BaseElevenLabs):
+class AsyncElevenLabsPhoneConnection(AsyncBaseElevenLabs):
     """
     Phone connection utility class for ElevenLabs API operations.
     Handles phone call connections to conversational agents.
     """
     
-    def get_signed_url(self, agent_id: str) -> ElevenLabsResponse:
+    async def get_signed_url(self, agent_id: str) -> ElevenLabsResponse:
         """
         Get a signed URL for connecting to an ElevenLabs conversational agent via WebSocket.
         
@@ -38,7 +38,7 @@ class ElevenLabsPhoneConnection(BaseElevenLabs):
         """
         logger.info(f"Getting signed URL for agent: {agent_id}")
         
-        response = self._get(f"/convai/conversation/get_signed_url?agent_id={agent_id}")
+        response = await self._get(f"/convai/conversation/get_signed_url?agent_id={agent_id}")
         
         if response.status:
             signed_url = response.data.get("signed_url")
@@ -48,3 +48,9 @@ class ElevenLabsPhoneConnection(BaseElevenLabs):
             logger.error(f"Failed to get signed URL for agent {agent_id}: {response.error_message}")
         
         return response
+
+
+class ElevenLabsPhoneConnection(BaseElevenLabs):
+    """Sync wrapper around AsyncElevenLabsPhoneConnection; same methods, blocking calls."""
+
+    _async_class = AsyncElevenLabsPhoneConnection
@@ -0,0 +1,254 @@
+"""
+Retry policy and circuit breakers for ElevenLabs REST calls.
+
+  • classify_status / classify_exception decide whether a failed attempt is
+    worth retrying (429, 408 and 5xx, timeouts, dropped connections) or final
+    (other 4xx: validation, auth, not found).
+  • backoff_delay() is capped exponential backoff with full jitter; a
+    server-sent Retry-After wins, and if it is longer than the cap the call
+    gives up instead of parking a worker.
+  • Non-idempotent POSTs are only retried when the request provably did not
+    reach ElevenLabs (connect errors) or was rejected before processing
+    (429/503), so a timed-out create does not become two agents.
+  • One CircuitBreaker per endpoint template ("POST /convai/agents/{id}"):
+    after ELEVENLABS_BREAKER_FAILURE_THRESHOLD consecutive retryable failures
+    it opens and calls fail fast for ELEVENLABS_BREAKER_RESET_SECONDS, then a
+    single half-open probe decides whether to close again.
+
+Breakers are shared by every client in the process (the app loop and the
+sync runner loop), so state is guarded by a thread lock.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import aiohttp
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Statuses that mean "not processed, try later" - safe to retry even for POST
+REJECTED_STATUSES = {429, 503}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Path segments that look like ElevenLabs IDs (agent_..., voice IDs, doc IDs)
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[A-Za-z0-9_\-]{8,}$")
+
+
+def endpoint_key(method: str, endpoint: str) -> str:
+    """Collapse IDs so all calls to the same route share one breaker."""
+    path = endpoint.split("?", 1)[0]
+    parts = ["{id}" if _ID_SEGMENT.match(part) else part for part in path.split("/")]
+    return f"{method} {'/'.join(parts)}"
+
+
+def classify_status(status: int) -> bool:
+    """True if a response with this status may succeed on retry."""
+    return status in RETRYABLE_STATUSES
+
+
+def classify_exception(exc: BaseException) -> bool:
+    """True if the error is transient (network / timeout)."""
+    return isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def request_was_not_sent(exc: BaseException) -> bool:
+    """Connect-phase failures: the request never reached the server."""
+    return isinstance(exc, aiohttp.ClientConnectorError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds (delta-seconds or HTTP date), None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds to wait before the next attempt (attempt is 1-based, the one that
+    just failed). Returns None when Retry-After asks for longer than we are
+    willing to wait.
+    """
+    cap = VoiceSettings.ELEVENLABS_RETRY_MAX_DELAY_SECONDS
+    if retry_after is not None:
+        return retry_after if retry_after <= cap else None
+    ceiling = min(cap, VoiceSettings.ELEVENLABS_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    def __init__(self, key: str):
+        self.key = key
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.opened_count = 0
+        self.statuses: Dict[str, int] = {}
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. Must be paired with record_*."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= VoiceSettings.ELEVENLABS_BREAKER_RESET_SECONDS:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"ElevenLabs circuit closed for {self.key}")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= VoiceSettings.ELEVENLABS_BREAKER_FAILURE_THRESHOLD:
+            if self.state != OPEN:
+                self.opened_count += 1
+                logger.warning(
+                    f"ElevenLabs circuit opened for {self.key} after "
+                    f"{self.consecutive_failures} consecutive failures"
+                )
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, VoiceSettings.ELEVENLABS_BREAKER_RESET_SECONDS - (time.monotonic() - self.opened_at))
+        return {
+            "endpoint": self.key,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(retry_in, 1),
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "opened_count": self.opened_count,
+            "statuses": dict(self.statuses),
+        }
+
+
+class BreakerRegistry:
+    """Per-endpoint breakers plus the counters behind the diagnostics route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(key)
+        return breaker
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            breaker = self._get(key)
+            allowed = breaker.allow()
+            if allowed:
+                breaker.requests += 1
+            return allowed
+
+    def record(self, key: str, status: Optional[int], ok: bool, transient: bool) -> None:
+        """
+        Record one attempt. Only transient failures count against the breaker;
+        a 4xx means ElevenLabs is up and answering.
+        """
+        with self._lock:
+            breaker = self._get(key)
+            label = str(status) if status is not None else "error"
+            breaker.statuses[label] = breaker.statuses.get(label, 0) + 1
+            if ok:
+                breaker.successes += 1
+            else:
+                breaker.failures += 1
+            if transient:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    def abandon(self, key: str) -> None:
+        """
+        An attempt ended without an outcome (the caller was cancelled). Frees
+        a half-open probe slot so the next call can probe instead.
+        """
+        with self._lock:
+            self._get(key)._probe_in_flight = False
+
+    def record_retry(self, key: str) -> None:
+        with self._lock:
+            breaker = self._get(key)
+            breaker.retries += 1
+            breaker.requests += 1
+
+    def allow_retry(self, key: str) -> bool:
+        with self._lock:
+            breaker = self._get(key)
+            if breaker.state == CLOSED:
+                return True
+            breaker.short_circuited += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = [b.snapshot() for b in self._breakers.values()]
+        breakers.sort(key=lambda b: (b["state"] == CLOSED, -b["failures"]))
+        return {
+            "config": {
+                "max_delay_seconds": VoiceSettings.ELEVENLABS_RETRY_MAX_DELAY_SECONDS,
+                "base_delay_seconds": VoiceSettings.ELEVENLABS_RETRY_BASE_DELAY_SECONDS,
+                "failure_threshold": VoiceSettings.ELEVENLABS_BREAKER_FAILURE_THRESHOLD,
+                "reset_seconds": VoiceSettings.ELEVENLABS_BREAKER_RESET_SECONDS,
+            },
+            "open_circuits": sum(1 for b in breakers if b["state"] != CLOSED),
+            "total_retries": sum(b["retries"] for b in breakers),
+            "total_short_circuited": sum(b["short_circuited"] for b in breakers),
+            "endpoints": breakers,
+        }
+
+    def reset(self) -> None:
+        """Zero the counters; breaker state is left as is."""
+        with self._lock:
+            for breaker in self._breakers.values():
+                breaker.reset_counters()
+
+
+breakers = BreakerRegistry()
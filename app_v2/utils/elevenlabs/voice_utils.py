@@ -6,19 +6,19 @@ Handles voice creation, retrieval, updating, and deletion.
 """
 
 from typing import Optional, Dict, Any, List
-from .base import BaseElevenLabs, ElevenLabsResponse
+from .base import AsyncBaseElevenLabs, BaseElevenLabs, ElevenLabsResponse
 from app_v2.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
-class ElevenLabsVoice(BaseElevenLabs):
+class AsyncElevenLabsVoice(AsyncBaseElevenLabs):
     """
     Voice utility class for ElevenLabs API operations.
     Handles all voice-related API calls including cloning, fetching, and managing voices.
     """
     
-    def create_cloned_voice(self, file_path: str, name: str, description: str = "", 
+    async def create_cloned_voice(self, file_path: str, name: str, description: str = "", 
                            labels: Optional[Dict[str, str]] = None) -> ElevenLabsResponse:
         """
         Clone a voice by uploading an audio file to ElevenLabs.
@@ -45,7 +45,8 @@ class ElevenLabsVoice(BaseElevenLabs):
                     import json
                     data["labels"] = json.dumps(labels)
                 
-                response = self._post("/voices/add", data=data, files=files)
+                response = await self._post("/voices/add", data=data, files=files)
+                self._evict("/voices")
                 
                 if response.status:
                     voice_id = response.data.get("voice_id")
@@ -64,7 +65,7 @@ class ElevenLabsVoice(BaseElevenLabs):
             logger.error(error_msg)
             return ElevenLabsResponse(status=False, error_message=error_msg)
     
-    def get_voice(self, voice_id: str) -> ElevenLabsResponse:
+    async def get_voice(self, voice_id: str) -> ElevenLabsResponse:
         """
         Get details of a specific voice by voice_id.
         
@@ -75,7 +76,7 @@ class ElevenLabsVoice(BaseElevenLabs):
             ElevenLabsResponse with voice details
         """
         logger.info(f"Fetching voice: {voice_id}")
-        response = self._get(f"/voices/{voice_id}")
+        response = await self._cached_get(f"/voices/{voice_id}")
         
         if response.status:
             logger.info(f"✅ Voice fetched: {voice_id}")
@@ -84,7 +85,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def get_all_voices(self) -> ElevenLabsResponse:
+    async def get_all_voices(self) -> ElevenLabsResponse:
         """
         Get all available voices from ElevenLabs account.
         
@@ -92,7 +93,7 @@ class ElevenLabsVoice(BaseElevenLabs):
             ElevenLabsResponse with list of voices
         """
         logger.info("Fetching all voices from ElevenLabs")
-        response = self._get("/voices")
+        response = await self._cached_get("/voices")
         
         if response.status:
             voices = response.data.get("voices", [])
@@ -102,7 +103,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def search_voices(self, 
+    async def search_voices(self, 
                      page_size: int = 30,
                      search: Optional[str] = None,
                      voice_type: Optional[str] = None,
@@ -134,7 +135,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         params.update({k: v for k, v in kwargs.items() if v is not None})
         
         logger.info(f"Searching voices with params: {params}")
-        response = self._get("/voices", params=params)
+        response = await self._cached_get("/voices", params=params)
         
         if response.status:
             voices = response.data.get("voices", [])
@@ -144,7 +145,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def update_voice(self, voice_id: str, name: Optional[str] = None, 
+    async def update_voice(self, voice_id: str, name: Optional[str] = None, 
                     description: Optional[str] = None,
                     labels: Optional[Dict[str, str]] = None) -> ElevenLabsResponse:
         """
@@ -160,7 +161,7 @@ class ElevenLabsVoice(BaseElevenLabs):
             ElevenLabsResponse with updated voice data
         """
         # First check if voice exists
-        check = self.get_voice(voice_id)
+        check = await self.get_voice(voice_id)
         if not check.status:
             return ElevenLabsResponse(status=False, error_message=f"Voice not found: {voice_id}")
         
@@ -176,7 +177,8 @@ class ElevenLabsVoice(BaseElevenLabs):
             return ElevenLabsResponse(status=False, error_message="No update data provided")
         
         logger.info(f"Updating voice {voice_id} with data: {data}")
-        response = self._post(f"/voices/{voice_id}/edit", data=data)
+        response = await self._post(f"/voices/{voice_id}/edit", data=data, idempotent=True)
+        self._evict(f"/voices/{voice_id}", "/voices")
         
         if response.status:
             logger.info(f"✅ Voice {voice_id} updated successfully")
@@ -185,7 +187,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def delete_voice(self, voice_id: str) -> ElevenLabsResponse:
+    async def delete_voice(self, voice_id: str) -> ElevenLabsResponse:
         """
         Delete a voice from ElevenLabs account.
         
@@ -196,12 +198,13 @@ class ElevenLabsVoice(BaseElevenLabs):
             ElevenLabsResponse indicating success or failure
         """
         # First check if voice exists
-        check = self.get_voice(voice_id)
+        check = await self.get_voice(voice_id)
         if not check.status:
             return ElevenLabsResponse(status=False, error_message=f"Voice not found: {voice_id}")
         
         logger.info(f"Deleting voice: {voice_id}")
-        response = self._delete(f"/voices/{voice_id}")
+        response = await self._delete(f"/voices/{voice_id}")
+        self._evict(f"/voices/{voice_id}", f"/voices/{voice_id}/settings", "/voices")
         
         if response.status:
             logger.info(f"✅ Voice {voice_id} deleted successfully")
@@ -210,7 +213,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def get_voice_settings(self, voice_id: str) -> ElevenLabsResponse:
+    async def get_voice_settings(self, voice_id: str) -> ElevenLabsResponse:
         """
         Get default voice settings for a voice.
         
@@ -221,7 +224,7 @@ class ElevenLabsVoice(BaseElevenLabs):
             ElevenLabsResponse with voice settings (stability, similarity_boost, etc.)
         """
         logger.info(f"Fetching settings for voice: {voice_id}")
-        response = self._get(f"/voices/{voice_id}/settings")
+        response = await self._cached_get(f"/voices/{voice_id}/settings")
         
         if response.status:
             logger.info(f"✅ Voice settings fetched for {voice_id}")
@@ -230,7 +233,7 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
     
-    def update_voice_settings(self, voice_id: str, 
+    async def update_voice_settings(self, voice_id: str, 
                             stability: Optional[float] = None,
                             similarity_boost: Optional[float] = None,
                             style: Optional[float] = None,
@@ -262,7 +265,8 @@ class ElevenLabsVoice(BaseElevenLabs):
             return ElevenLabsResponse(status=False, error_message="No settings provided")
         
         logger.info(f"Updating settings for voice {voice_id}: {data}")
-        response = self._post(f"/voices/{voice_id}/settings/edit", data=data)
+        response = await self._post(f"/voices/{voice_id}/settings/edit", data=data, idempotent=True)
+        self._evict(f"/voices/{voice_id}/settings", f"/voices/{voice_id}")
         
         if response.status:
             logger.info(f"✅ Voice settings updated for {voice_id}")
@@ -271,6 +275,37 @@ class ElevenLabsVoice(BaseElevenLabs):
         
         return response
 
+    async def text_to_speech(self, voice_id: str, text: str, model_id: Optional[str] = None,
+                             output_format: str = "mp3_22050_32") -> ElevenLabsResponse:
+        """
+        Synthesize text with a voice.
+
+        Args:
+            voice_id: ElevenLabs voice ID
+            text: Text to speak
+            model_id: TTS model; ElevenLabs' default when omitted
+            output_format: ElevenLabs output format (codec_samplerate_bitrate)
+
+        Returns:
+            ElevenLabsResponse with data {"content": bytes, "content_type": str}
+        """
+        body: Dict[str, Any] = {"text": text}
+        if model_id:
+            body["model_id"] = model_id
+        logger.info(f"Synthesizing {len(text)} characters with voice {voice_id}")
+        response = await self._request(
+            "POST",
+            f"/text-to-speech/{voice_id}",
+            (200,),
+            params={"output_format": output_format},
+            json_body=body,
+            raw=True,
+            idempotent=False,  # billed per request
+        )
+        if not response.status:
+            logger.error(f"Text to speech failed for {voice_id}: {response.error_message}")
+        return response
+
     # def get_voice_samples(self, voice_id: str) -> ElevenLabsResponse:
     #     """
     #     Fetch the first available audio sample for a given ElevenLabs voice.
@@ -321,3 +356,9 @@ class ElevenLabsVoice(BaseElevenLabs):
     #         )
 
     #     return sample_response
+
+
+class ElevenLabsVoice(BaseElevenLabs):
+    """Sync wrapper around AsyncElevenLabsVoice; same methods, blocking calls."""
+
+    _async_class = AsyncElevenLabsVoice
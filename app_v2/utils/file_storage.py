@@ -0,0 +1,487 @@
+"""
+Storage for uploaded files (knowledge base documents, voice samples).
+
+Routes used to write straight into uploads/ and uploads/voices, creating the
+directories at import time and naming files {user}_{timestamp}_{filename}.
+They now go through `storage`, selected by STORAGE_BACKEND:
+
+  • local — files under STORAGE_LOCAL_ROOT in a hash-sharded layout,
+            {namespace}/{sha[:2]}/{sha[2:4]}/{sha}{ext} (sharded_key()), so
+            no directory grows past a few hundred entries and identical
+            bytes are stored once
+  • s3    — the same keys in STORAGE_S3_BUCKET, through boto3; set
+            STORAGE_S3_ENDPOINT_URL to use MinIO or another S3-compatible
+            stand-in
+
+Uploads are streamed into a temp file (stage()), hashed and size-checked on
+the way, then committed under their key: os.replace() for local files, a
+single PUT for S3, so a reader never sees a partial file. Reads stream
+(iter_chunks()); code that needs a real path (ElevenLabs uploads, text
+extraction) uses local_path() / local_file(), which only download for S3.
+
+Rows keep a ref to their file (KnowledgeBaseModel.content_path,
+VoiceModel.audio_file, VoicePreviewModel.file_path): the path for local files, as before, or
+s3://bucket/key. A stored file may back several rows, so it is removed with
+release_file() once the last one is gone. An upload of the same bytes
+commits (and so touches) the file before inserting its row, so
+release_file() leaves files committed in the last
+STORAGE_RELEASE_GRACE_SECONDS alone; scan_orphans() reconciles the store
+with those columns later, for those and for files left behind by crashed
+requests.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple
+
+from fastapi_sqlalchemy import db
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.models import KnowledgeBaseModel, VoiceModel, VoicePreviewModel
+
+logger = setup_logger(__name__)
+
+_TMP_DIR = ".tmp"
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StagedFile:
+    path: str
+    size: int
+    sha256: str
+
+
+@dataclass
+class StoredFile:
+    key: str
+    size: int
+    modified: float
+
+
+def sharded_key(namespace: str, sha256: str, filename: str) -> str:
+    _, ext = os.path.splitext(filename)
+    return f"{namespace}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}"
+
+
+def discard_staged(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove staged file {path}: {e}")
+
+
+class FileStorage(ABC):
+    """Interface shared by the backends. Every method blocks; call them with asyncio.to_thread."""
+
+    temp_dir: str
+
+    @abstractmethod
+    def ref(self, key: str) -> str:
+        pass
+
+    @abstractmethod
+    def key(self, ref: Optional[str]) -> Optional[str]:
+        """Key of a ref, or None if the ref does not point into this store."""
+        pass
+
+    @abstractmethod
+    def commit(self, staged_path: str, key: str) -> str:
+        """
+        Move a staged file to key and return its ref. If key is already
+        there it is kept, with its modified time refreshed.
+        """
+        pass
+
+    @abstractmethod
+    def exists(self, ref: str) -> bool:
+        pass
+
+    @abstractmethod
+    def modified(self, ref: str) -> Optional[float]:
+        """Last modified (or committed) time as a unix timestamp, None if missing."""
+        pass
+
+    @abstractmethod
+    def delete(self, ref: str) -> None:
+        pass
+
+    @abstractmethod
+    def iter_chunks(self, ref: str, chunk_bytes: int = 1024 * 1024) -> Iterator[bytes]:
+        pass
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[StoredFile]:
+        pass
+
+    @abstractmethod
+    def _materialize(self, ref: str) -> Tuple[str, bool]:
+        """(local path, whether it is a temporary copy)."""
+        pass
+
+    def stage(self, src: BinaryIO, max_bytes: int, chunk_bytes: int = 1024 * 1024, suffix: str = "") -> StagedFile:
+        """Stream src to a temp file. Raises FileTooLarge (and removes it) past max_bytes."""
+        os.makedirs(self.temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.temp_dir, prefix="stage-", suffix=suffix)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = src.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise FileTooLarge()
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            discard_staged(path)
+            raise
+        return StagedFile(path=path, size=size, sha256=digest.hexdigest())
+
+    @contextmanager
+    def local_path(self, ref: str) -> Iterator[str]:
+        path, temporary = self._materialize(ref)
+        try:
+            yield path
+        finally:
+            if temporary:
+                discard_staged(path)
+
+    @asynccontextmanager
+    async def local_file(self, ref: str) -> AsyncIterator[str]:
+        """local_path() for the event loop: a remote file is downloaded in a thread."""
+        path, temporary = await asyncio.to_thread(self._materialize, ref)
+        try:
+            yield path
+        finally:
+            if temporary:
+                await asyncio.to_thread(discard_staged, path)
+
+
+class LocalStorage(FileStorage):
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        self.temp_dir = os.path.join(self.root, _TMP_DIR)
+
+    def ref(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def key(self, ref: Optional[str]) -> Optional[str]:
+        if not ref or "://" in ref:
+            return None
+        relative = os.path.relpath(os.path.normpath(ref), self.root)
+        if relative.startswith(os.pardir) or os.path.isabs(relative):
+            return None
+        return relative.replace(os.sep, "/")
+
+    def commit(self, staged_path: str, key: str) -> str:
+        path = self.ref(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        else:
+            discard_staged(staged_path)
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(staged_path, 0o644)  # mkstemp creates files 0600
+        # Staged under the same root, so this is a same-filesystem atomic rename
+        os.replace(staged_path, path)
+        return path
+
+    def exists(self, ref: str) -> bool:
+        return os.path.isfile(ref)
+
+    def modified(self, ref: str) -> Optional[float]:
+        try:
+            return os.stat(ref).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def delete(self, ref: str) -> None:
+        try:
+            os.remove(ref)
+        except FileNotFoundError:
+            pass
+
+    def iter_chunks(self, ref: str, chunk_bytes: int = 1024 * 1024) -> Iterator[bytes]:
+        with open(ref, "rb") as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                if not chunk:
+                    return
+                yield chunk
+
+    def list(self, prefix: str = "") -> Iterator[StoredFile]:
+        top = os.path.normpath(os.path.join(self.root, prefix))
+        for dirpath, dirnames, filenames in os.walk(top):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d != _TMP_DIR]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield StoredFile(key=self.key(path), size=stat.st_size, modified=stat.st_mtime)
+
+    def _materialize(self, ref: str) -> Tuple[str, bool]:
+        return ref, False
+
+
+class S3Storage(FileStorage):
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        temp_dir: Optional[str] = None,
+    ):
+        self.bucket = bucket
+        self.temp_dir = temp_dir or os.path.join(tempfile.gettempdir(), "voice-ninja-storage")
+        self._client_kwargs = {
+            "endpoint_url": endpoint_url or None,
+            "region_name": region or None,
+            "aws_access_key_id": access_key or None,
+            "aws_secret_access_key": secret_key or None,
+        }
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+            self._client = boto3.client("s3", **self._client_kwargs)
+        return self._client
+
+    def _not_found(self, error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def ref(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def key(self, ref: Optional[str]) -> Optional[str]:
+        prefix = f"s3://{self.bucket}/"
+        if not ref or not ref.startswith(prefix):
+            return None
+        return ref[len(prefix):]
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if self._not_found(e):
+                return None
+            raise
+
+    def _touch(self, key: str) -> bool:
+        """Refresh LastModified by copying the object onto itself; False if it is gone."""
+        from botocore.exceptions import ClientError
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+            )
+            return True
+        except ClientError as e:
+            if self._not_found(e):
+                return False
+            raise
+
+    def commit(self, staged_path: str, key: str) -> str:
+        try:
+            if not self._touch(key):
+                self.client.upload_file(staged_path, self.bucket, key)
+        finally:
+            discard_staged(staged_path)
+        return self.ref(key)
+
+    def exists(self, ref: str) -> bool:
+        key = self.key(ref)
+        return key is not None and self._head(key) is not None
+
+    def modified(self, ref: str) -> Optional[float]:
+        key = self.key(ref)
+        head = self._head(key) if key is not None else None
+        return head["LastModified"].timestamp() if head else None
+
+    def delete(self, ref: str) -> None:
+        key = self.key(ref)
+        if key is not None:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def iter_chunks(self, ref: str, chunk_bytes: int = 1024 * 1024) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self.key(ref))["Body"]
+        try:
+            yield from body.iter_chunks(chunk_bytes)
+        finally:
+            body.close()
+
+    def list(self, prefix: str = "") -> Iterator[StoredFile]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield StoredFile(key=obj["Key"], size=obj["Size"], modified=obj["LastModified"].timestamp())
+
+    def _materialize(self, ref: str) -> Tuple[str, bool]:
+        os.makedirs(self.temp_dir, exist_ok=True)
+        _, ext = os.path.splitext(ref)
+        fd, path = tempfile.mkstemp(dir=self.temp_dir, prefix="read-", suffix=ext)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.key(ref), path)
+        except BaseException:
+            discard_staged(path)
+            raise
+        return path, True
+
+
+def _from_settings() -> FileStorage:
+    if VoiceSettings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=VoiceSettings.STORAGE_S3_BUCKET,
+            endpoint_url=VoiceSettings.STORAGE_S3_ENDPOINT_URL,
+            region=VoiceSettings.STORAGE_S3_REGION,
+            access_key=VoiceSettings.STORAGE_S3_ACCESS_KEY_ID,
+            secret_key=VoiceSettings.STORAGE_S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorage(VoiceSettings.STORAGE_LOCAL_ROOT)
+
+
+storage = _from_settings()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# References
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _referenced(session, ref: str) -> bool:
+    return (
+        session.query(KnowledgeBaseModel.id).filter(KnowledgeBaseModel.content_path == ref).first() is not None
+        or session.query(VoiceModel.id).filter(VoiceModel.audio_file == ref).first() is not None
+        or session.query(VoicePreviewModel.voice_id).filter(VoicePreviewModel.file_path == ref).first() is not None
+    )
+
+
+def release_file(ref: Optional[str]) -> None:
+    """
+    Remove a stored file once no KB entry, voice or voice preview references
+    it. Call after commit. A file committed within
+    STORAGE_RELEASE_GRACE_SECONDS is kept for scan_orphans(), since an
+    upload of the same bytes may be about to insert its row.
+    """
+    if not ref or storage.key(ref) is None:
+        return
+    with db():
+        if _referenced(db.session, ref):
+            return
+    try:
+        modified = storage.modified(ref)
+        if modified is not None and time.time() - modified < VoiceSettings.STORAGE_RELEASE_GRACE_SECONDS:
+            logger.debug(f"Keeping recently committed file {ref} for the orphan scan")
+            return
+        storage.delete(ref)
+    except Exception as e:
+        logger.warning(f"Could not remove stored file {ref}: {e}")
+
+
+def scan_orphans(session, delete: bool = False, grace_seconds: Optional[int] = None) -> dict:
+    """
+    Reconcile the store with KnowledgeBaseModel.content_path,
+    VoiceModel.audio_file and VoicePreviewModel.file_path.
+
+    Returns {"orphans": [...], "stale_temp": [...], "missing": [...],
+    "deleted": n}: stored files no row references, leftover temp files, and
+    rows whose file is gone. Files younger than grace_seconds (default
+    STORAGE_ORPHAN_GRACE_SECONDS) are skipped, since an upload in flight has
+    its file before its row. With delete=True orphans and stale temp files
+    are removed; missing files are only reported.
+    """
+    grace = VoiceSettings.STORAGE_ORPHAN_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = time.time() - grace
+
+    referenced = {}
+    kb_rows = session.query(KnowledgeBaseModel.id, KnowledgeBaseModel.content_path).filter(
+        KnowledgeBaseModel.kb_type == "file",
+        KnowledgeBaseModel.content_path.isnot(None),
+    ).all()
+    voice_rows = session.query(VoiceModel.id, VoiceModel.audio_file).filter(VoiceModel.audio_file.isnot(None)).all()
+    preview_rows = session.query(VoicePreviewModel.voice_id, VoicePreviewModel.file_path).filter(
+        VoicePreviewModel.file_path.isnot(None)
+    ).all()
+    for table, rows in (("knowledge_base", kb_rows), ("voices", voice_rows), ("voice_previews", preview_rows)):
+        for row_id, ref in rows:
+            key = storage.key(ref)
+            if key is not None:
+                referenced.setdefault(key, []).append({"table": table, "id": row_id, "ref": ref})
+
+    # The recording cache lives under the same root locally and manages itself
+    skip_prefixes = [f"{_TMP_DIR}/"]
+    cache_key = storage.key(VoiceSettings.AUDIO_CACHE_DIR)
+    if cache_key:
+        skip_prefixes.append(cache_key.rstrip("/") + "/")
+
+    orphans: List[StoredFile] = []
+    seen = set()
+    for stored in storage.list():
+        seen.add(stored.key)
+        if stored.key in referenced or any(stored.key.startswith(p) for p in skip_prefixes):
+            continue
+        if stored.modified < cutoff:
+            orphans.append(stored)
+
+    stale_temp = []
+    if os.path.isdir(storage.temp_dir):
+        for name in os.listdir(storage.temp_dir):
+            path = os.path.join(storage.temp_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    stale_temp.append(path)
+            except FileNotFoundError:
+                continue
+
+    missing = [row for key, rows in referenced.items() if key not in seen for row in rows]
+
+    deleted = 0
+    if delete:
+        for stored in orphans:
+            try:
+                storage.delete(storage.ref(stored.key))
+                deleted += 1
+            except Exception as e:
+                logger.warning(f"Could not remove orphaned file {stored.key}: {e}")
+        for path in stale_temp:
+            discard_staged(path)
+            deleted += 1
+
+    return {
+        "orphans": [{"key": f.key, "size": f.size, "modified": f.modified} for f in orphans],
+        "orphan_bytes": sum(f.size for f in orphans),
+        "stale_temp": stale_temp,
+        "missing": missing,
+        "deleted": deleted,
+    }
@@ -4,9 +4,12 @@ from fastapi import HTTPException, Header, Depends, Request, status
 from fastapi.security import HTTPBearer as FastAPIHTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security.http import HTTPAuthorizationCredentials
 import os
+import uuid
+from typing import Optional
 
 from app_v2.core.config import VoiceSettings
 from app_v2.databases.models import UnifiedAuthModel
+from app_v2.utils.token_revocation import revocation_store
 
 
 class HTTPBearer(FastAPIHTTPBearer):
@@ -35,85 +38,110 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create access token"""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.setdefault("gen", 0)
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(user_id: int) -> str:
+def create_refresh_token(user_id: int, generation: int = 0) -> str:
     """Create refresh token as JWT"""
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode = {
         "user_id": user_id,
         "exp": expire,
-        "type": "refresh"
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "gen": generation,
     }
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Decode a refresh token and return its payload, or None if invalid or revoked"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh":
+        return None
+    if revocation_store.is_revoked(payload.get("jti")):
+        return None
+    return payload
+
 def verify_refresh_token(token: str) -> int:
     """Verify refresh token and return user_id"""
+    payload = decode_refresh_token(token)
+    return payload.get("user_id") if payload else None
+
+def is_token_generation_current(payload: dict, user: UnifiedAuthModel) -> bool:
+    """False if the token predates the user's last "logout everywhere"."""
+    return (payload.get("gen") or 0) >= (user.token_generation or 0)
+
+def _revoke_token(token: str, token_type: str) -> bool:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "refresh":
-            return None
-        return payload.get("user_id")
     except JWTError:
-        return None
+        # Expired or malformed tokens are already unusable
+        return False
+    jti = payload.get("jti")
+    if payload.get("type") != token_type or not jti:
+        return False
+    return revocation_store.revoke(
+        jti=jti,
+        expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+        user_id=payload.get("user_id"),
+        token_type=token_type,
+    )
 
-def revoke_refresh_token(token: str):
-    """Revoke a refresh token (placeholder - JWT tokens can't be revoked without blacklist)"""
-    # In production, you'd store revoked tokens in Redis/database
-    pass
+def revoke_refresh_token(token: str) -> bool:
+    """Revoke a refresh token by adding its jti to the revocation store"""
+    return _revoke_token(token, "refresh")
+
+def revoke_access_token(token: str) -> bool:
+    """Revoke an access token before it expires (e.g. on logout)"""
+    return _revoke_token(token, "access")
 
 # Security scheme
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from token"""
-    token = credentials.credentials
+def _unauthorized(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=401,
+        detail={
+            "message": message,
+            "status": "failed",
+            "status_code": 401
+        }
+    )
+
+def user_from_access_token(token: str) -> UnifiedAuthModel:
+    """
+    Resolve an access token to its user: signature and expiry, type, user,
+    token generation and revocation. Raises a 401 HTTPException otherwise.
+    Shared by get_current_user and the voice websocket.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "access":
-            raise HTTPException(
-                status_code=401,
-                detail={
-                    "message": "Invalid token type",
-                    "status": "failed",
-                    "status_code": 401
-                }
-            )
-        
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise HTTPException(
-                status_code=401,
-                detail={
-                    "message": "Invalid token",
-                    "status": "failed",
-                    "status_code": 401
-                }
-            )
-        
-        from app_v2.databases.models import UnifiedAuthModel
-        user = UnifiedAuthModel.get_by_id(user_id)
-        if not user:
-            raise HTTPException(
-                status_code=401,
-                detail={
-                    "message": "User not found",
-                    "status": "failed",
-                    "status_code": 401
-                }
-            )
-        
-        return user
     except JWTError:
-        raise HTTPException(
-            status_code=401,
-            detail={
-                "message": "Invalid or expired token",
-                "status": "failed",
-                "status_code": 401
-            }
-        )
+        raise _unauthorized("Invalid or expired token")
+
+    if payload.get("type") != "access":
+        raise _unauthorized("Invalid token type")
+
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise _unauthorized("Invalid token")
+
+    user = UnifiedAuthModel.get_by_id(user_id)
+    if not user:
+        raise _unauthorized("User not found")
+
+    if not is_token_generation_current(payload, user) or revocation_store.is_revoked(payload.get("jti")):
+        raise _unauthorized("Token has been revoked")
+
+    return user
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current user from token"""
+    return user_from_access_token(credentials.credentials)
 
 def is_admin(
     current_user: UnifiedAuthModel = Depends(get_current_user),
@@ -0,0 +1,343 @@
+"""
+Bulk URL / sitemap knowledge base imports.
+
+POST .../knowledge-base/bulk takes a sitemap URL or a list of URLs and
+returns 202 with a job (KBIngestJobModel) to poll. The ingest worker then:
+
+  1. expands the sitemap (sitemap indexes and .xml.gz included, at most
+     KB_BULK_MAX_SITEMAPS files) and normalizes / deduplicates the URLs,
+     capped at KB_BULK_MAX_URLS (a longer urls list is rejected with 422
+     up front); URLs the user already has in the KB are reused instead of
+     added again
+  2. works through the rest in batches of KB_BULK_BATCH_SIZE: pages are
+     fetched and validated concurrently (scraping_utils.fetch_many, at most
+     KB_BULK_PER_HOST_CONCURRENCY requests per host), valid ones are added
+     to ElevenLabs in parallel (KB_BULK_SUBMIT_CONCURRENCY) and the batch's
+     KB rows are inserted, queued for RAG indexing and counted in the job's
+     progress with one commit
+  3. binds every imported entry to the job's agent and requests a single
+     agent KB sync (entries join the agent as kb_indexer marks them ready)
+
+Jobs are claimed with SKIP LOCKED and leased through locked_until, renewed
+after every batch. A job whose worker died is picked up again when the
+lease expires and continues after the URLs it had already imported.
+"""
+
+import asyncio
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from xml.etree import ElementTree
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_, select
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import AgentKnowledgeBaseBridge, KBIngestJobModel, KnowledgeBaseModel
+from app_v2.utils.agent_sync import SYNC_KNOWLEDGE_BASE, schedule_agent_sync
+from app_v2.utils.elevenlabs import AsyncElevenLabsKB
+from app_v2.utils.kb_indexer import kb_indexer, mark_for_indexing
+from app_v2.utils.lease_worker import LeaseWorker
+from app_v2.utils.scraping_utils import NO_TITLE, PageMetadata, fetch_bytes, fetch_many, normalize_url
+
+logger = setup_logger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+URL_ADDED = "added"
+URL_EXISTING = "existing"
+URL_FAILED = "failed"
+
+
+def dedupe_urls(urls) -> List[str]:
+    """Normalize and deduplicate, keeping the first occurrence's position."""
+    return list(dict.fromkeys(normalize_url(str(url)) for url in urls))
+
+
+def new_job(user_id: int, request, agent_id: Optional[int] = None) -> KBIngestJobModel:
+    """Job for a KnowledgeBaseBulkURLCreate; add, commit, then kb_ingest_worker.wake()."""
+    job = KBIngestJobModel(user_id=user_id, agent_id=agent_id)
+    if request.urls is not None:
+        job.urls = dedupe_urls(request.urls)
+        job.total = len(job.urls)
+    else:
+        job.sitemap_url = str(request.sitemap_url)
+    return job
+
+
+def job_status(job: KBIngestJobModel) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "agent_id": job.agent_id,
+        "sitemap_url": job.sitemap_url,
+        "total": job.total,
+        "processed": job.processed,
+        "succeeded": job.succeeded,
+        "failed": job.failed,
+        "error": job.error,
+        "results": job.results or {},
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sitemaps
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _gunzip(body: bytes, max_bytes: int) -> bytes:
+    if not body.startswith(b"\x1f\x8b"):
+        return body
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(body, max_bytes + 1)
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=400, detail="Sitemap is too large.")
+    return data
+
+
+def _parse_sitemap(body: bytes) -> tuple:
+    """Returns (page URLs, child sitemap URLs) of a urlset or sitemapindex document."""
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        raise HTTPException(status_code=400, detail="Sitemap is not valid XML.")
+    locs = [
+        (el.text or "").strip()
+        for el in root.iter()
+        if el.tag.rsplit("}", 1)[-1] == "loc" and (el.text or "").strip()
+    ]
+    if root.tag.rsplit("}", 1)[-1] == "sitemapindex":
+        return [], locs
+    return locs, []
+
+
+async def collect_sitemap_urls(sitemap_url: str, limit: int) -> List[str]:
+    """Page URLs of a sitemap (following sitemap indexes), normalized, deduplicated and capped at limit."""
+    pending = [sitemap_url]
+    seen_sitemaps: Set[str] = set()
+    urls: Dict[str, None] = {}
+    while pending and len(urls) < limit and len(seen_sitemaps) < VoiceSettings.KB_BULK_MAX_SITEMAPS:
+        current = pending.pop(0)
+        if current in seen_sitemaps:
+            continue
+        seen_sitemaps.add(current)
+        try:
+            body = await fetch_bytes(current, VoiceSettings.KB_BULK_MAX_SITEMAP_BYTES)
+            pages, children = _parse_sitemap(_gunzip(body, VoiceSettings.KB_BULK_MAX_SITEMAP_BYTES))
+        except (HTTPException, zlib.error) as e:
+            if current == sitemap_url:
+                raise HTTPException(status_code=400, detail=f"Could not read sitemap: {getattr(e, 'detail', e)}")
+            logger.warning(f"Skipping nested sitemap {current}: {getattr(e, 'detail', e)}")
+            continue
+        pending.extend(children)
+        for page in pages:
+            urls.setdefault(normalize_url(page), None)
+    return list(urls)[:limit]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Worker
+# ─────────────────────────────────────────────────────────────────────────────
+
+class KBIngestWorker(LeaseWorker):
+    name = "kb_bulk_ingest"
+
+    @property
+    def concurrency(self) -> int:
+        return VoiceSettings.KB_BULK_JOB_CONCURRENCY
+
+    @property
+    def poll_interval(self) -> float:
+        return VoiceSettings.KB_BULK_POLL_INTERVAL_SECONDS
+
+    async def claim(self) -> List[int]:
+        now = datetime.now(timezone.utc)
+        async with async_db() as session:
+            jobs = (await session.scalars(
+                select(KBIngestJobModel)
+                .where(
+                    KBIngestJobModel.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                    or_(KBIngestJobModel.locked_until.is_(None), KBIngestJobModel.locked_until < now),
+                )
+                .order_by(KBIngestJobModel.id.asc())
+                .limit(VoiceSettings.KB_BULK_JOB_CONCURRENCY)
+                .with_for_update(skip_locked=True)
+            )).all()
+            for job in jobs:
+                job.status = JOB_RUNNING
+                job.started_at = job.started_at or now
+                job.locked_until = now + timedelta(seconds=VoiceSettings.KB_BULK_LEASE_SECONDS)
+            await session.commit()
+        return [job.id for job in jobs]
+
+    async def _load_urls(self, job_id: int) -> Optional[KBIngestJobModel]:
+        """Expand the sitemap on first run; returns the job (detached) or None if it failed."""
+        async with async_db() as session:
+            job = await session.get(KBIngestJobModel, job_id)
+            sitemap_url = job.sitemap_url if job.urls is None else None
+
+        # Fetched with no session open: a slow sitemap must not pin a connection
+        urls, error = None, None
+        if sitemap_url is not None:
+            try:
+                urls = await collect_sitemap_urls(sitemap_url, VoiceSettings.KB_BULK_MAX_URLS)
+            except HTTPException as e:
+                error = e.detail
+
+        async with async_db() as session:
+            job = await session.get(KBIngestJobModel, job_id)
+            if error is not None:
+                job.status, job.error = JOB_FAILED, error
+                job.completed_at, job.locked_until = datetime.now(timezone.utc), None
+                await session.commit()
+                return None
+            if urls is not None:
+                job.urls = urls
+                job.total = len(urls)
+            job.results = job.results or {}
+            await session.commit()
+            return job
+
+    async def _existing_entries(self, user_id: int, urls: List[str]) -> Dict[str, int]:
+        async with async_db() as session:
+            rows = (await session.execute(
+                select(KnowledgeBaseModel.content_path, KnowledgeBaseModel.id)
+                .where(
+                    KnowledgeBaseModel.user_id == user_id,
+                    KnowledgeBaseModel.kb_type == "url",
+                    KnowledgeBaseModel.content_path.in_(urls),
+                )
+            )).all()
+        return {url: kb_id for url, kb_id in rows}
+
+    async def _submit(self, urls: List[str], metadata: Dict[str, object]) -> Dict[str, dict]:
+        """Add the valid URLs to ElevenLabs in parallel. Returns url -> outcome (document_id or error)."""
+        limit = asyncio.Semaphore(VoiceSettings.KB_BULK_SUBMIT_CONCURRENCY)
+        kb_client = AsyncElevenLabsKB()
+        outcomes: Dict[str, dict] = {}
+
+        async def _one(url: str) -> None:
+            meta = metadata.get(url)
+            if not isinstance(meta, PageMetadata):
+                outcomes[url] = {"status": URL_FAILED, "error": getattr(meta, "detail", "Invalid or inaccessible URL.")}
+                return
+            async with limit:
+                try:
+                    response = await kb_client.add_url_document(url)
+                except Exception as e:
+                    logger.error(f"Error adding {url} to ElevenLabs KB: {e}")
+                    response = None
+            if response is None or not response.status:
+                error = response.error_message if response is not None else "Error syncing with ElevenLabs"
+                outcomes[url] = {"status": URL_FAILED, "error": f"ElevenLabs KB URL addition failed: {error}"}
+                return
+            outcomes[url] = {
+                "status": URL_ADDED,
+                "document_id": response.data.get("document_id"),
+                "title": meta.title or NO_TITLE,
+            }
+
+        await asyncio.gather(*(_one(url) for url in urls))
+        return outcomes
+
+    async def _record_batch(self, job_id: int, outcomes: Dict[str, dict]) -> None:
+        """Insert the batch's KB rows and progress in one transaction, renewing the lease."""
+        async with async_db() as session:
+            job = await session.get(KBIngestJobModel, job_id, with_for_update=True)
+            results = dict(job.results or {})
+            added = []
+            for url, outcome in outcomes.items():
+                if outcome["status"] == URL_ADDED:
+                    kb_entry = KnowledgeBaseModel(
+                        user_id=job.user_id,
+                        kb_type="url",
+                        content_path=url,
+                        elevenlabs_document_id=outcome["document_id"],
+                        title=outcome["title"],
+                    )
+                    mark_for_indexing(kb_entry)
+                    session.add(kb_entry)
+                    added.append((url, kb_entry))
+                else:
+                    results[url] = outcome
+            await session.flush()  # assigns the new entries' ids
+            for url, kb_entry in added:
+                results[url] = {"status": URL_ADDED, "kb_id": kb_entry.id, "title": kb_entry.title}
+            job.results = results
+            job.processed = len(results)
+            job.succeeded = sum(1 for r in results.values() if r["status"] != URL_FAILED)
+            job.failed = job.processed - job.succeeded
+            job.locked_until = datetime.now(timezone.utc) + timedelta(seconds=VoiceSettings.KB_BULK_LEASE_SECONDS)
+            await session.commit()
+        if added:
+            kb_indexer.wake()
+
+    async def _bind(self, job_id: int) -> None:
+        async with async_db() as session:
+            job = await session.get(KBIngestJobModel, job_id, with_for_update=True)
+            kb_ids = [r["kb_id"] for r in (job.results or {}).values() if r.get("kb_id")]
+            if job.agent_id is not None and kb_ids:
+                bound = set((await session.scalars(
+                    select(AgentKnowledgeBaseBridge.kb_id).where(
+                        AgentKnowledgeBaseBridge.agent_id == job.agent_id,
+                        AgentKnowledgeBaseBridge.kb_id.in_(kb_ids),
+                    )
+                )).all())
+                session.add_all(
+                    AgentKnowledgeBaseBridge(agent_id=job.agent_id, kb_id=kb_id)
+                    for kb_id in dict.fromkeys(kb_ids) if kb_id not in bound
+                )
+            job.status = JOB_DONE
+            job.completed_at = datetime.now(timezone.utc)
+            job.locked_until = None
+            agent_id = job.agent_id if kb_ids else None
+            await session.commit()
+        if agent_id is not None:
+            schedule_agent_sync(agent_id, SYNC_KNOWLEDGE_BASE)
+
+    async def process(self, job_id: int) -> None:
+        job = await self._load_urls(job_id)
+        if job is None:
+            return
+        # Resumed after a lost lease: URLs with a result were already handled
+        remaining = [url for url in job.urls if url not in job.results]
+
+        existing = await self._existing_entries(job.user_id, remaining)
+        if existing:
+            await self._record_batch(job_id, {
+                url: {"status": URL_EXISTING, "kb_id": kb_id} for url, kb_id in existing.items()
+            })
+            remaining = [url for url in remaining if url not in existing]
+
+        for start in range(0, len(remaining), VoiceSettings.KB_BULK_BATCH_SIZE):
+            batch = remaining[start:start + VoiceSettings.KB_BULK_BATCH_SIZE]
+            metadata = await fetch_many(batch, per_host=VoiceSettings.KB_BULK_PER_HOST_CONCURRENCY)
+            await self._record_batch(job_id, await self._submit(batch, metadata))
+
+        await self._bind(job_id)
+        logger.info(f"KB ingest job {job_id} finished")
+
+    async def crashed(self, job_id: int) -> None:
+        async with async_db() as session:
+            job = await session.get(KBIngestJobModel, job_id)
+            if job is not None and job.status == JOB_RUNNING:
+                job.status, job.error = JOB_FAILED, "Internal error while importing"
+                job.completed_at, job.locked_until = datetime.now(timezone.utc), None
+                await session.commit()
+
+    async def stats(self) -> dict:
+        async with async_db() as session:
+            counts = dict((await session.execute(
+                select(KBIngestJobModel.status, func.count()).group_by(KBIngestJobModel.status)
+            )).all())
+        return {"by_status": counts}
+
+
+kb_ingest_worker = KBIngestWorker()
@@ -0,0 +1,183 @@
+"""
+Background RAG indexing of knowledge base documents.
+
+Creating a KB entry used to wait for ElevenLabs to accept compute_rag_index
+inside the request, and nothing checked whether indexing ever finished.
+Routes now only upload the document, call mark_for_indexing() on the entry
+(KnowledgeBaseModel.indexing_status = "pending") and wake the indexer after
+committing. The indexer then:
+
+  • claims due entries KB_INDEX_BATCH_SIZE at a time with SKIP LOCKED and
+    leases them for KB_INDEX_LEASE_SECONDS through indexing_next_at, so
+    several workers can run it without polling the same document twice
+  • submits / polls the document's RAG index (submit_rag_index), at most
+    KB_INDEX_CONCURRENCY at a time, backing off exponentially between polls
+    up to KB_INDEX_RETRY_MAX_SECONDS
+  • marks the entry "ready" (storing rag_index_id) or "failed" (ElevenLabs
+    reported failure, or KB_INDEX_MAX_ATTEMPTS polls without an answer)
+
+Agent syncs only attach ready documents (index_ready()); when an entry turns
+ready, the agents it is bound to are re-synced. Entries created before this
+existed have no indexing_status and count as ready.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import func, or_, select
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import AgentKnowledgeBaseBridge, KnowledgeBaseModel
+from app_v2.utils.elevenlabs import AsyncElevenLabsKB
+from app_v2.utils.lease_worker import LeaseWorker
+
+logger = setup_logger(__name__)
+
+INDEX_PENDING = "pending"
+INDEX_RUNNING = "indexing"
+INDEX_READY = "ready"
+INDEX_FAILED = "failed"
+
+_IN_PROGRESS = {"created", "processing"}
+
+
+def index_ready():
+    """SQL condition: the entry's document is indexed and can be attached to agents."""
+    return or_(KnowledgeBaseModel.indexing_status.is_(None), KnowledgeBaseModel.indexing_status == INDEX_READY)
+
+
+def mark_for_indexing(kb_entry: KnowledgeBaseModel) -> None:
+    """Queue the entry's (new) ElevenLabs document for indexing. Call before commit, then wake()."""
+    kb_entry.rag_index_id = None
+    kb_entry.indexing_status = INDEX_PENDING
+    kb_entry.indexing_attempts = 0
+    kb_entry.indexing_next_at = datetime.now(timezone.utc)
+    kb_entry.indexing_error = None
+
+
+def indexing_status(kb_entry: KnowledgeBaseModel) -> dict:
+    return {
+        "id": kb_entry.id,
+        "elevenlabs_document_id": kb_entry.elevenlabs_document_id,
+        "indexing_status": kb_entry.indexing_status or INDEX_READY,
+        "indexing_error": kb_entry.indexing_error,
+        "attempts": kb_entry.indexing_attempts,
+        "next_poll_at": kb_entry.indexing_next_at if kb_entry.indexing_status in (INDEX_PENDING, INDEX_RUNNING) else None,
+    }
+
+
+class KBIndexer(LeaseWorker):
+    name = "kb_indexer"
+
+    def __init__(self):
+        super().__init__()
+        self.reset()
+
+    @property
+    def concurrency(self) -> int:
+        return VoiceSettings.KB_INDEX_CONCURRENCY
+
+    @property
+    def poll_interval(self) -> float:
+        return VoiceSettings.KB_INDEX_POLL_INTERVAL_SECONDS
+
+    def reset(self) -> None:
+        self.polls = 0
+        self.ready = 0
+        self.failed = 0
+
+    async def claim(self) -> List[int]:
+        """Lease the next batch of entries that are due for a submit / poll."""
+        now = datetime.now(timezone.utc)
+        async with async_db() as session:
+            rows = (await session.scalars(
+                select(KnowledgeBaseModel)
+                .where(
+                    KnowledgeBaseModel.indexing_status.in_([INDEX_PENDING, INDEX_RUNNING]),
+                    KnowledgeBaseModel.indexing_next_at <= now,
+                )
+                .order_by(KnowledgeBaseModel.indexing_next_at.asc())
+                .limit(VoiceSettings.KB_INDEX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            lease = now + timedelta(seconds=VoiceSettings.KB_INDEX_LEASE_SECONDS)
+            for row in rows:
+                row.indexing_next_at = lease
+            await session.commit()
+        return [row.id for row in rows]
+
+    async def process(self, kb_id: int) -> None:
+        async with async_db() as session:
+            kb_entry = await session.get(KnowledgeBaseModel, kb_id)
+            if kb_entry is None or kb_entry.indexing_status not in (INDEX_PENDING, INDEX_RUNNING):
+                return
+            document_id = kb_entry.elevenlabs_document_id
+
+        self.polls += 1
+        response = await AsyncElevenLabsKB().submit_rag_index(document_id)
+        data = response.data if response.status and isinstance(response.data, dict) else {}
+        index_status = data.get("status")
+
+        now = datetime.now(timezone.utc)
+        agent_ids: List[int] = []
+        async with async_db() as session:
+            kb_entry = await session.get(KnowledgeBaseModel, kb_id, with_for_update=True)
+            # Deleted, or re-marked for a new document while we were polling
+            if (kb_entry is None or kb_entry.elevenlabs_document_id != document_id
+                    or kb_entry.indexing_status not in (INDEX_PENDING, INDEX_RUNNING)):
+                return
+            kb_entry.indexing_attempts += 1
+
+            if index_status == "succeeded":
+                kb_entry.indexing_status = INDEX_READY
+                kb_entry.rag_index_id = data.get("id")
+                kb_entry.indexing_next_at = None
+                kb_entry.indexing_error = None
+                agent_ids = list((await session.scalars(
+                    select(AgentKnowledgeBaseBridge.agent_id).where(AgentKnowledgeBaseBridge.kb_id == kb_id)
+                )).all())
+                self.ready += 1
+            elif response.status and index_status not in _IN_PROGRESS:
+                self._fail(kb_entry, f"ElevenLabs RAG indexing {index_status or 'returned no status'}")
+            elif kb_entry.indexing_attempts >= VoiceSettings.KB_INDEX_MAX_ATTEMPTS:
+                self._fail(kb_entry, response.error_message or "RAG indexing did not finish in time")
+            else:
+                delay = min(
+                    VoiceSettings.KB_INDEX_RETRY_BASE_SECONDS * 2 ** (kb_entry.indexing_attempts - 1),
+                    VoiceSettings.KB_INDEX_RETRY_MAX_SECONDS,
+                )
+                kb_entry.indexing_next_at = now + timedelta(seconds=delay)
+                if response.status:
+                    kb_entry.indexing_status = INDEX_RUNNING
+                    kb_entry.rag_index_id = data.get("id")
+                    kb_entry.indexing_error = None
+                else:
+                    kb_entry.indexing_error = response.error_message
+            await session.commit()
+
+        if agent_ids:
+            # Circular import: agent_sync filters on index_ready()
+            from app_v2.utils.agent_sync import SYNC_KNOWLEDGE_BASE, schedule_agent_sync
+            for agent_id in agent_ids:
+                schedule_agent_sync(agent_id, SYNC_KNOWLEDGE_BASE)
+
+    def _fail(self, kb_entry: KnowledgeBaseModel, error: str) -> None:
+        kb_entry.indexing_status = INDEX_FAILED
+        kb_entry.indexing_next_at = None
+        kb_entry.indexing_error = error
+        self.failed += 1
+        logger.error(f"RAG indexing of KB entry {kb_entry.id} ({kb_entry.elevenlabs_document_id}) failed: {error}")
+
+    async def stats(self) -> dict:
+        async with async_db() as session:
+            counts = dict((await session.execute(
+                select(KnowledgeBaseModel.indexing_status, func.count())
+                .where(KnowledgeBaseModel.indexing_status.isnot(None))
+                .group_by(KnowledgeBaseModel.indexing_status)
+            )).all())
+        return {"by_status": counts, "polls": self.polls, "ready": self.ready, "failed": self.failed}
+
+
+kb_indexer = KBIndexer()
@@ -0,0 +1,327 @@
+"""
+Multi-file knowledge base upload pipeline, shared by the dashboard
+(/api/v2/knowledge-base/upload) and public (/api/v2/public/kb/file) routes.
+
+  1. stage: every file is streamed to a temp file in KB_UPLOAD_CHUNK_BYTES
+     chunks in a worker thread, hashed (sha256) and size-checked on the way,
+     so an oversized upload is rejected as soon as it crosses the limit
+     instead of being measured by seeking. Any staging failure rejects the
+     whole request and removes what was already written, as before.
+  2. store: staged files are committed to file_storage under a
+     content-addressed key, kb/{sha[:2]}/{sha[2:4]}/{sha}{ext}, so identical
+     bytes are stored once no matter how many entries (or accounts) upload
+     them.
+  3. extract: the text of every file is extracted in the "kb_extraction"
+     process pool (process_pool; text_extraction: pymupdf, docx2txt, OCR
+     for scanned PDF pages) so parsing and OCR never run on the event loop.
+     Results are cached by content hash: bytes extracted before are copied
+     from that entry. The compressed text, page and token counts are stored
+     on the KB entry, and KB_MAX_DOCUMENT_TOKENS is enforced here.
+  4. push: files whose bytes the same user already has in ElevenLabs reuse
+     that entry's document and RAG index; the rest are uploaded
+     concurrently, at most KB_UPLOAD_CONCURRENCY at a time, through the
+     pooled async client. One file failing does not stop the others. RAG
+     indexing is left to kb_indexer (see new_entry()).
+
+No database session is held across ElevenLabs calls; routes insert rows for
+the uploaded files afterwards and report the failed ones per file.
+
+A stored file or ElevenLabs document is reference-counted by the rows
+pointing at it (content_path / elevenlabs_document_id per user): deletes go
+through document_shared() and file_storage.release_file() so the shared
+copy is only removed with its last reference.
+"""
+
+import asyncio
+import time
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, UploadFile
+from fastapi_sqlalchemy import db
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.models import KnowledgeBaseModel
+from app_v2.utils.elevenlabs import AsyncElevenLabsKB
+from app_v2.utils.file_storage import FileTooLarge, discard_staged, release_file, sharded_key, storage
+from app_v2.utils.kb_indexer import INDEX_READY, mark_for_indexing
+from app_v2.utils.process_pool import run_in_process
+from app_v2.utils.text_extraction import extract_document
+
+logger = setup_logger(__name__)
+
+_POOL = "kb_extraction"
+
+
+@dataclass
+class KBFileResult:
+    filename: str
+    path: Optional[str] = None
+    size_bytes: int = 0
+    sha256: Optional[str] = None
+    elevenlabs_document_id: Optional[str] = None
+    rag_index_id: Optional[str] = None
+    reused: bool = False
+    indexed: bool = False
+    text_gz: Optional[bytes] = None
+    stats: Dict = field(default_factory=lambda: {"timings_ms": {}})
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.elevenlabs_document_id is not None
+
+    def summary(self) -> dict:
+        return {
+            "filename": self.filename,
+            "size_bytes": self.size_bytes,
+            "sha256": self.sha256,
+            "pages": self.stats.get("pages"),
+            "tokens": self.stats.get("tokens"),
+            "status": ("reused" if self.reused else "uploaded") if self.ok else "failed",
+            "error": self.error,
+        }
+
+
+def document_shared(session, kb_entry: KnowledgeBaseModel) -> bool:
+    """True if another entry of the same user still uses kb_entry's ElevenLabs document."""
+    if not kb_entry.elevenlabs_document_id:
+        return False
+    return session.query(KnowledgeBaseModel.id).filter(
+        KnowledgeBaseModel.user_id == kb_entry.user_id,
+        KnowledgeBaseModel.elevenlabs_document_id == kb_entry.elevenlabs_document_id,
+        KnowledgeBaseModel.id != kb_entry.id,
+    ).first() is not None
+
+
+async def stage_uploads(
+    files: Sequence[UploadFile],
+    max_bytes: int,
+    too_large_status: int,
+    too_large_detail: str,
+) -> List[KBFileResult]:
+    """
+    Stream every upload to a temp file and commit it to file storage.
+    Raises HTTPException (after removing anything already staged) if a file
+    is empty or larger than max_bytes; too_large_detail may use {filename}.
+    """
+    limit = asyncio.Semaphore(VoiceSettings.KB_UPLOAD_CONCURRENCY)
+    results = [KBFileResult(filename=f.filename) for f in files]
+
+    async def _stage(file: UploadFile, result: KBFileResult) -> None:
+        async with limit:
+            started = time.perf_counter()
+            try:
+                staged = await asyncio.to_thread(storage.stage, file.file, max_bytes, VoiceSettings.KB_UPLOAD_CHUNK_BYTES)
+            except FileTooLarge:
+                raise HTTPException(status_code=too_large_status, detail=too_large_detail.format(filename=file.filename))
+            result.stats["timings_ms"]["stage"] = round((time.perf_counter() - started) * 1000, 1)
+        result.path, result.size_bytes, result.sha256 = staged.path, staged.size, staged.sha256
+        if result.size_bytes == 0:
+            raise HTTPException(status_code=400, detail=f"File {file.filename} is empty")
+
+    outcomes = await asyncio.gather(*(_stage(f, r) for f, r in zip(files, results)), return_exceptions=True)
+    failure = next((o for o in outcomes if isinstance(o, BaseException)), None)
+    if failure is not None:
+        for result in results:
+            discard_staged(result.path)
+        if isinstance(failure, HTTPException):
+            raise failure
+        logger.error(f"Failed to stage knowledge base upload: {failure!r}")
+        raise HTTPException(status_code=500, detail="Failed to store uploaded files")
+
+    committed = 0
+    try:
+        for result in results:
+            key = sharded_key("kb", result.sha256, result.filename)
+            result.path = await asyncio.to_thread(storage.commit, result.path, key)
+            committed += 1
+    except Exception as e:
+        for i, result in enumerate(results):
+            await asyncio.to_thread(release_file if i < committed else discard_staged, result.path)
+        logger.error(f"Failed to store knowledge base upload: {e!r}")
+        raise HTTPException(status_code=500, detail="Failed to store uploaded files")
+    return results
+
+
+def _cached_extractions(hashes: set) -> Dict[str, tuple]:
+    """Text and stats already extracted from the same bytes, by content hash."""
+    with db():
+        rows = db.session.query(
+            KnowledgeBaseModel.content_sha256,
+            KnowledgeBaseModel.extracted_text,
+            KnowledgeBaseModel.extraction_stats,
+        ).filter(
+            KnowledgeBaseModel.content_sha256.in_(hashes),
+            KnowledgeBaseModel.extracted_text.isnot(None),
+        ).distinct(KnowledgeBaseModel.content_sha256).all()
+    return {sha: (text_gz, stats or {}) for sha, text_gz, stats in rows}
+
+
+async def _run_extraction(ref: str) -> dict:
+    async with storage.local_file(ref) as path:
+        return await run_in_process(
+            _POOL,
+            VoiceSettings.KB_EXTRACT_WORKERS,
+            VoiceSettings.KB_EXTRACT_TIMEOUT_SECONDS,
+            extract_document,
+            path,
+            VoiceSettings.KB_EXTRACT_OCR_MIN_CHARS,
+            VoiceSettings.KB_EXTRACT_OCR_DPI,
+            VoiceSettings.KB_EXTRACT_MAX_OCR_PAGES,
+        )
+
+
+async def extract_uploads(results: List[KBFileResult]) -> List[KBFileResult]:
+    """
+    Extract the text of stored files in the process pool (or copy it from an
+    entry with the same bytes). A file that cannot be parsed is still
+    uploaded, without text. Raises HTTPException (after releasing the stored
+    files) if a file has more than KB_MAX_DOCUMENT_TOKENS tokens.
+    """
+    cached = await asyncio.to_thread(_cached_extractions, {r.sha256 for r in results})
+    by_hash: Dict[str, List[KBFileResult]] = {}
+    for result in results:
+        if result.sha256 in cached:
+            result.text_gz, stats = cached[result.sha256]
+            result.stats = {**stats, "cached": True, "timings_ms": result.stats["timings_ms"]}
+        else:
+            by_hash.setdefault(result.sha256, []).append(result)
+
+    async def _extract(group: List[KBFileResult]) -> None:
+        first = group[0]
+        started = time.perf_counter()
+        try:
+            extracted = await _run_extraction(first.path)
+            stats = extracted["stats"]
+        except asyncio.TimeoutError:
+            # The worker keeps going until it finishes; it just no longer holds the request up
+            extracted, stats = {"text_gz": None}, {"error": "Text extraction timed out"}
+        except BrokenProcessPool:
+            extracted, stats = {"text_gz": None}, {"error": "Text extraction worker crashed"}
+        except Exception as e:
+            extracted, stats = {"text_gz": None}, {"error": repr(e)}
+        timings = {**stats.pop("timings_ms", {}), "queue_and_extract": round((time.perf_counter() - started) * 1000, 1)}
+        for result in group:
+            result.text_gz = extracted["text_gz"]
+            result.stats = {**stats, "timings_ms": {**result.stats["timings_ms"], **timings}}
+        if stats.get("error"):
+            logger.warning(f"Could not extract text from '{first.filename}': {stats['error']}")
+
+    await asyncio.gather(*(_extract(group) for group in by_hash.values()))
+
+    max_tokens = VoiceSettings.KB_MAX_DOCUMENT_TOKENS
+    too_long = next((r for r in results if max_tokens and (r.stats.get("tokens") or 0) > max_tokens), None)
+    if too_long is not None:
+        for path in {r.path for r in results}:
+            await asyncio.to_thread(release_file, path)
+        raise HTTPException(
+            status_code=400,
+            detail=f"File {too_long.filename} has about {too_long.stats['tokens']} tokens; the limit is {max_tokens}.",
+        )
+    return results
+
+
+def _reuse_documents(results: List[KBFileResult], user_id: int) -> None:
+    """Point results at ElevenLabs documents this user already has for the same bytes."""
+    hashes = {r.sha256 for r in results}
+    with db():
+        rows = db.session.query(
+            KnowledgeBaseModel.content_sha256,
+            KnowledgeBaseModel.elevenlabs_document_id,
+            KnowledgeBaseModel.rag_index_id,
+            KnowledgeBaseModel.indexing_status,
+        ).filter(
+            KnowledgeBaseModel.user_id == user_id,
+            KnowledgeBaseModel.content_sha256.in_(hashes),
+            KnowledgeBaseModel.elevenlabs_document_id.isnot(None),
+        ).all()
+    existing = {}
+    for sha, document_id, rag_index_id, status in rows:
+        # Prefer an entry whose index is already built
+        if sha not in existing or status in (None, INDEX_READY):
+            existing[sha] = (document_id, rag_index_id, status in (None, INDEX_READY))
+    for result in results:
+        if result.sha256 in existing:
+            result.elevenlabs_document_id, result.rag_index_id, result.indexed = existing[result.sha256]
+            result.reused = True
+
+
+async def push_to_elevenlabs(results: List[KBFileResult], user_id: int) -> List[KBFileResult]:
+    """
+    Upload staged files concurrently; failures are recorded
+    per file. Bytes the user already has in ElevenLabs, or that appear more
+    than once in this batch, are pushed at most once.
+    """
+    limit = asyncio.Semaphore(VoiceSettings.KB_UPLOAD_CONCURRENCY)
+    kb_client = AsyncElevenLabsKB()
+    await asyncio.to_thread(_reuse_documents, results, user_id)
+
+    by_hash: dict = {}
+    for result in results:
+        if not result.reused:
+            by_hash.setdefault(result.sha256, []).append(result)
+
+    async def _push(group: List[KBFileResult]) -> None:
+        first = group[0]
+        async with limit:
+            started = time.perf_counter()
+            try:
+                async with storage.local_file(first.path) as path:
+                    response = await kb_client.upload_document(path, name=first.filename)
+                if not response.status:
+                    first.error = f"ElevenLabs KB upload failed: {response.error_message}"
+                else:
+                    first.elevenlabs_document_id = response.data.get("document_id")
+            except Exception as e:
+                logger.error(f"Error syncing '{first.filename}' with ElevenLabs: {e}")
+                first.error = "Error syncing with ElevenLabs"
+            first.stats["timings_ms"]["push"] = round((time.perf_counter() - started) * 1000, 1)
+        for duplicate in group[1:]:
+            duplicate.elevenlabs_document_id, duplicate.rag_index_id = first.elevenlabs_document_id, first.rag_index_id
+            duplicate.reused, duplicate.error = first.ok, first.error
+        if not first.ok:
+            await asyncio.to_thread(release_file, first.path)
+
+    await asyncio.gather(*(_push(group) for group in by_hash.values()))
+    uploaded = sum(1 for r in results if r.ok)
+    reused = sum(1 for r in results if r.ok and r.reused)
+    logger.info(f"Knowledge base upload: {uploaded}/{len(results)} files synced to ElevenLabs ({reused} reused)")
+    return results
+
+
+def new_entry(result: KBFileResult, user_id: int, file_size: float) -> KnowledgeBaseModel:
+    """KB row for an uploaded file; queued for RAG indexing unless it reuses an indexed document."""
+    kb_entry = KnowledgeBaseModel(
+        user_id=user_id,
+        kb_type="file",
+        title=result.filename,
+        content_path=result.path,
+        content_sha256=result.sha256,
+        elevenlabs_document_id=result.elevenlabs_document_id,
+        file_size=file_size,
+        extracted_text=result.text_gz,
+        page_count=result.stats.get("pages"),
+        token_count=result.stats.get("tokens"),
+        extraction_stats=result.stats,
+    )
+    if result.indexed:
+        kb_entry.rag_index_id = result.rag_index_id
+        kb_entry.indexing_status = INDEX_READY
+    else:
+        mark_for_indexing(kb_entry)
+    return kb_entry
+
+
+async def discard_uploaded(results: List[KBFileResult]) -> None:
+    """Undo pushed files when their rows could not be saved."""
+    kb_client = AsyncElevenLabsKB()
+    for path in {r.path for r in results}:
+        await asyncio.to_thread(release_file, path)
+    for document_id in {r.elevenlabs_document_id for r in results if r.ok and not r.reused}:
+        try:
+            await kb_client.delete_document(document_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete orphan ElevenLabs document {document_id}: {e}")
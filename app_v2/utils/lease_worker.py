@@ -0,0 +1,106 @@
+"""
+Base class of the database-backed background workers (outbox, kb_indexer,
+kb_bulk_ingest, voice_previews).
+
+Each keeps its queue in a table rather than in memory, so several app
+workers can drain it together and nothing is lost on restart:
+
+  • claim() leases a batch of due rows with SELECT ... FOR UPDATE SKIP
+    LOCKED, pushing their due time (or locked_until) past a lease, and
+    returns their ids. A row whose worker died becomes due again when the
+    lease runs out
+  • process(id) handles one row, at most `concurrency` at a time. An
+    exception is logged and handed to crashed(id); the rest of the batch
+    carries on
+  • run() drains until a claim comes back empty, then waits
+    `poll_interval` seconds, or less if wake() is called after a commit
+    that queued new rows
+
+Subclasses implement claim(), process(), concurrency and poll_interval, and
+may override enabled, before_drain() and crashed().
+"""
+
+import asyncio
+import traceback
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LeaseWorker(ABC):
+    name = "worker"
+
+    def __init__(self):
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    @abstractmethod
+    def concurrency(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def poll_interval(self) -> float:
+        pass
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def wake(self) -> None:
+        """Skip the poll wait; call after committing new rows (on the event loop)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    @abstractmethod
+    async def claim(self) -> List[int]:
+        pass
+
+    @abstractmethod
+    async def process(self, item_id: int) -> None:
+        pass
+
+    async def before_drain(self) -> None:
+        """Runs before each claim, e.g. to queue rows found by a periodic sweep."""
+
+    async def crashed(self, item_id: int) -> None:
+        """Called after process(item_id) raised; the traceback is already logged."""
+
+    async def drain_once(self) -> int:
+        """Claim and process one batch. Returns the number of rows claimed."""
+        claimed = await self.claim()
+        if not claimed:
+            return 0
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def _run(item_id: int) -> None:
+            async with limit:
+                try:
+                    await self.process(item_id)
+                except Exception:
+                    logger.error(f"{self.name}: row {item_id} crashed the worker step:\n{traceback.format_exc()}")
+                    await self.crashed(item_id)
+
+        await asyncio.gather(*(_run(item_id) for item_id in claimed))
+        return len(claimed)
+
+    async def run(self) -> None:
+        """Background task: drain the queue until cancelled."""
+        if not self.enabled:
+            return
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await self.before_drain()
+                if await self.drain_once():
+                    continue
+            except Exception:
+                logger.error(f"{self.name}: drain failed:\n{traceback.format_exc()}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
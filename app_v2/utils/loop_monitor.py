@@ -0,0 +1,238 @@
+"""
+Event-loop lag monitor.
+
+Two cooperating parts:
+
+  • a heartbeat task on the loop that sleeps for LOOP_MONITOR_INTERVAL_MS and
+    measures how late it wakes up (scheduling delay = time some other code
+    held the loop without awaiting)
+  • a watchdog thread that notices when the heartbeat has stopped ticking and,
+    while the loop is still stuck, grabs the loop thread's stack with
+    sys._current_frames()
+
+The captured stack is attributed to the route or websocket whose endpoint
+frame is on it, and to the innermost frame in our own code (usually the line
+that made the blocking call: requests.*, bcrypt, sync SQLAlchemy, ...).
+Stalls are aggregated per (route, call site) so the worst offenders can be
+fixed first; see the admin diagnostics route.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_APP_ROOT = os.path.join(_PROJECT_ROOT, "app_v2")
+_THIS_FILE = os.path.abspath(__file__)
+
+# Frames kept per captured sample (innermost last)
+_STACK_DEPTH = 25
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_ms: int = VoiceSettings.LOOP_MONITOR_INTERVAL_MS,
+        threshold_ms: int = VoiceSettings.LOOP_LAG_THRESHOLD_MS,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._route_codes: Dict[object, str] = {}
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._tick = 0
+        self._tick_at = time.monotonic()
+        self._pending: Optional[dict] = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = 0
+            self.lag_total_ms = 0.0
+            self.lag_max_ms = 0.0
+            self.stalls = 0
+            self.stalled_ms = 0.0
+            self.offenders: Dict[str, dict] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, app=None) -> None:
+        """Start heartbeat + watchdog. Must be called from the running loop."""
+        if self._task is not None:
+            return
+        if app is not None:
+            self._index_routes(app)
+        self._loop_thread_id = threading.get_ident()
+        self._tick_at = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat(), name="loop_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Event loop monitor started (interval={self.interval * 1000:.0f} ms, "
+            f"threshold={self.threshold_ms} ms)"
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def _index_routes(self, app) -> None:
+        """Map endpoint code objects to "METHOD /path" labels for attribution."""
+        for route in getattr(app, "routes", []):
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is None:
+                continue
+            methods = getattr(route, "methods", None)
+            kind = ",".join(sorted(methods)) if methods else "WS"
+            self._route_codes[code] = f"{kind} {route.path}"
+
+    # ------------------------------------------------------------------
+    # Heartbeat (runs on the loop)
+    # ------------------------------------------------------------------
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - started - self.interval) * 1000)
+
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self._tick += 1
+                self._tick_at = time.monotonic()
+                self.samples += 1
+                self.lag_total_ms += lag_ms
+                self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+
+            if lag_ms >= self.threshold_ms:
+                self._record_stall(lag_ms, pending)
+
+    def _record_stall(self, lag_ms: float, pending: Optional[dict]) -> None:
+        if pending is None:
+            # Stall ended before the watchdog could sample it
+            pending = {"route": "unknown", "site": "unknown", "stack": []}
+
+        key = f"{pending['route']} @ {pending['site']}"
+        with self._lock:
+            self.stalls += 1
+            self.stalled_ms += lag_ms
+            entry = self.offenders.setdefault(key, {
+                "route": pending["route"],
+                "site": pending["site"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "stack": pending["stack"],
+            })
+            entry["count"] += 1
+            entry["total_ms"] += lag_ms
+            if lag_ms >= entry["max_ms"]:
+                entry["max_ms"] = lag_ms
+                if pending["stack"]:
+                    entry["stack"] = pending["stack"]
+
+        logger.warning(
+            f"Event loop blocked for {lag_ms:.0f} ms by {pending['route']} at {pending['site']}"
+        )
+
+    # ------------------------------------------------------------------
+    # Watchdog (separate thread)
+    # ------------------------------------------------------------------
+
+    def _watch(self) -> None:
+        poll = max(self.interval / 2, 0.01)
+        stall_after = self.interval + self.threshold_ms / 1000
+        sampled_tick = -1
+
+        while not self._stop.wait(poll):
+            with self._lock:
+                tick, tick_at = self._tick, self._tick_at
+            if tick == sampled_tick or time.monotonic() - tick_at < stall_after:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            sample = self._attribute(frame)
+            del frame
+            with self._lock:
+                # Only keep it if the loop is still on the same stalled tick
+                if self._tick == tick:
+                    self._pending = sample
+            sampled_tick = tick
+
+    def _attribute(self, frame) -> dict:
+        route = "background"
+        site = None
+        f = frame
+        while f is not None:
+            code = f.f_code
+            if route == "background" and code in self._route_codes:
+                route = self._route_codes[code]
+            if site is None:
+                filename = os.path.abspath(code.co_filename)
+                if filename.startswith(_APP_ROOT) and filename != _THIS_FILE:
+                    site = f"{os.path.relpath(filename, _PROJECT_ROOT)}:{f.f_lineno} in {code.co_name}"
+            f = f.f_back
+
+        stack = traceback.format_list(traceback.extract_stack(frame, limit=_STACK_DEPTH))
+        if site is None:
+            innermost = traceback.extract_stack(frame, limit=1)[-1]
+            site = f"{innermost.filename}:{innermost.lineno} in {innermost.name}"
+        return {"route": route, "site": site, "stack": [line.rstrip() for line in stack]}
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self, top_n: int = 10) -> dict:
+        with self._lock:
+            offenders = sorted(self.offenders.values(), key=lambda o: o["total_ms"], reverse=True)[:top_n]
+            return {
+                "running": self.running,
+                "interval_ms": round(self.interval * 1000),
+                "threshold_ms": self.threshold_ms,
+                "samples": self.samples,
+                "lag_avg_ms": round(self.lag_total_ms / self.samples, 2) if self.samples else 0.0,
+                "lag_max_ms": round(self.lag_max_ms, 2),
+                "stalls": self.stalls,
+                "stalled_ms": round(self.stalled_ms, 2),
+                "top_offenders": [
+                    {
+                        "route": o["route"],
+                        "site": o["site"],
+                        "count": o["count"],
+                        "total_ms": round(o["total_ms"], 2),
+                        "max_ms": round(o["max_ms"], 2),
+                        "stack": o["stack"],
+                    }
+                    for o in offenders
+                ],
+            }
+
+
+loop_monitor = LoopMonitor()
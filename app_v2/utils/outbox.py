@@ -0,0 +1,390 @@
+"""
+Transactional outbox for ElevenLabs mutations.
+
+Routes in async mode no longer call ElevenLabs inside the request. They
+commit their local change together with an ElevenLabsOutboxModel row
+(enqueue_outbox) and return 202 with a status URL. The outbox worker then
+applies the mutation:
+
+  • ordering: per (resource_type, resource_id) only the oldest unfinished
+    row is claimable, so e.g. an agent's create always runs before its
+    updates; different resources are processed in parallel, up to
+    OUTBOX_CONCURRENCY
+  • batching: rows are claimed OUTBOX_BATCH_SIZE at a time with SKIP
+    LOCKED (several workers can drain together), and consecutive pending
+    updates of one resource are merged into a single ElevenLabs call
+  • retries: a failed row goes back to pending with exponential backoff;
+    after OUTBOX_MAX_ATTEMPTS (or an OutboxDeadLetter from the handler) it
+    is marked dead and kept for inspection / admin retry
+  • a claimed row carries a lease (locked_until); rows left "processing" by
+    a crashed worker become claimable again when it expires
+
+Handlers are registered by the router that owns the resource:
+
+    async def _record_tool(session, entry, result): ...
+
+    @outbox_handler("tool", "create", record=_record_tool)
+    async def _create_tool(entry): ...
+
+No session or row lock is held while a handler calls ElevenLabs. The worker
+locks the row (and the updates it merges), renews its lease and commits;
+the handler reads what it needs in its own short session and makes the
+call; then the worker re-opens a session and, if the lease is still its
+own, runs record() (e.g. storing the new ElevenLabs id) and marks the row
+done in the same commit.
+"""
+
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app_v2.constants import STATUS_SUCCESS
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import ElevenLabsOutboxModel
+from app_v2.utils.lease_worker import LeaseWorker
+
+logger = setup_logger(__name__)
+
+OUTBOX_PENDING = "pending"
+OUTBOX_PROCESSING = "processing"
+OUTBOX_DONE = "done"
+OUTBOX_DEAD = "dead"
+
+OutboxHandler = Callable[[ElevenLabsOutboxModel], Awaitable[Optional[dict]]]
+OutboxRecorder = Callable[[AsyncSession, ElevenLabsOutboxModel, Optional[dict]], Awaitable[None]]
+_handlers: Dict[Tuple[str, str], Tuple[OutboxHandler, Optional[OutboxRecorder]]] = {}
+
+
+class OutboxDeadLetter(Exception):
+    """Raised by a handler when retrying cannot help."""
+
+
+def outbox_handler(resource_type: str, operation: str, record: Optional[OutboxRecorder] = None):
+    """
+    Register the coroutine that applies (resource_type, operation) rows, and
+    optionally the one that stores its result locally.
+    """
+    def decorator(handler: OutboxHandler) -> OutboxHandler:
+        _handlers[(resource_type, operation)] = (handler, record)
+        return handler
+    return decorator
+
+
+def enqueue_outbox(
+    session,
+    resource_type: str,
+    resource_id: int,
+    operation: str,
+    payload: Optional[dict] = None,
+    user_id: Optional[int] = None,
+) -> ElevenLabsOutboxModel:
+    """
+    Add an outbox row to the caller's (sync or async) session. It is only
+    visible to the worker once the caller commits its own change.
+    """
+    entry = ElevenLabsOutboxModel(
+        user_id=user_id,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        operation=operation,
+        payload=jsonable_encoder(payload) if payload is not None else None,
+        status=OUTBOX_PENDING,
+    )
+    session.add(entry)
+    return entry
+
+
+def has_unfinished_outbox(session, resource_type: str, resource_id: int) -> bool:
+    """
+    Whether the resource still has pending or processing rows (sync
+    session). A direct ElevenLabs call made meanwhile could land before
+    them, so callers must queue behind them instead.
+    """
+    return session.query(
+        exists().where(
+            ElevenLabsOutboxModel.resource_type == resource_type,
+            ElevenLabsOutboxModel.resource_id == resource_id,
+            ElevenLabsOutboxModel.status.in_([OUTBOX_PENDING, OUTBOX_PROCESSING]),
+        )
+    ).scalar()
+
+
+def operation_status(entry: ElevenLabsOutboxModel) -> dict:
+    """Public view of an outbox row, used by the operation status endpoints."""
+    return {
+        "operation_id": entry.id,
+        "resource_type": entry.resource_type,
+        "resource_id": entry.resource_id,
+        "operation": entry.operation,
+        "status": entry.status,
+        "attempts": entry.attempts,
+        "last_error": entry.last_error,
+        "result": entry.result,
+        "created_at": entry.created_at,
+        "completed_at": entry.completed_at,
+    }
+
+
+def accepted_response(entry: ElevenLabsOutboxModel, message: str, status_url: str, data: Optional[dict] = None) -> JSONResponse:
+    """202 for async-mode requests: the local change is saved, ElevenLabs follows."""
+    outbox_worker.wake()
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder({
+            "status": STATUS_SUCCESS,
+            "status_code": 202,
+            "message": message,
+            "data": {
+                **(data or {}),
+                "operation": operation_status(entry),
+                "status_url": status_url,
+            },
+        }),
+    )
+
+
+class OutboxWorker(LeaseWorker):
+    name = "outbox"
+
+    def __init__(self):
+        super().__init__()
+        self._leases: Dict[int, datetime] = {}  # row id -> locked_until this worker set
+        self.reset()
+
+    @property
+    def concurrency(self) -> int:
+        return VoiceSettings.OUTBOX_CONCURRENCY
+
+    @property
+    def poll_interval(self) -> float:
+        return VoiceSettings.OUTBOX_POLL_INTERVAL_SECONDS
+
+    def reset(self) -> None:
+        self.batches = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.coalesced = 0
+        self.lost_leases = 0
+
+    async def _release_expired(self, session: AsyncSession, now: datetime) -> None:
+        await session.execute(
+            update(ElevenLabsOutboxModel)
+            .where(
+                ElevenLabsOutboxModel.status == OUTBOX_PROCESSING,
+                ElevenLabsOutboxModel.locked_until < now,
+            )
+            .values(status=OUTBOX_PENDING, locked_until=None)
+        )
+
+    async def claim(self) -> List[int]:
+        """Lease the next batch of rows that are first in line for their resource."""
+        now = datetime.now(timezone.utc)
+        earlier = aliased(ElevenLabsOutboxModel)
+        blocked = exists().where(
+            earlier.resource_type == ElevenLabsOutboxModel.resource_type,
+            earlier.resource_id == ElevenLabsOutboxModel.resource_id,
+            earlier.id < ElevenLabsOutboxModel.id,
+            earlier.status.in_([OUTBOX_PENDING, OUTBOX_PROCESSING]),
+        )
+        async with async_db() as session:
+            await self._release_expired(session, now)
+            rows = (await session.scalars(
+                select(ElevenLabsOutboxModel)
+                .where(
+                    ElevenLabsOutboxModel.status == OUTBOX_PENDING,
+                    ElevenLabsOutboxModel.next_attempt_at <= now,
+                    ~blocked,
+                )
+                .order_by(ElevenLabsOutboxModel.id.asc())
+                .limit(VoiceSettings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True, of=ElevenLabsOutboxModel)
+            )).all()
+            lease = now + timedelta(seconds=VoiceSettings.OUTBOX_LEASE_SECONDS)
+            for row in rows:
+                row.status = OUTBOX_PROCESSING
+                row.locked_until = lease
+                self._leases[row.id] = lease
+            await session.commit()
+        return [row.id for row in rows]
+
+    async def _lock_own(self, session: AsyncSession, entry_id: int, lease: Optional[datetime]) -> Optional[ElevenLabsOutboxModel]:
+        """Lock the row if it is still leased by this worker, else None."""
+        entry = await session.scalar(
+            select(ElevenLabsOutboxModel)
+            .where(ElevenLabsOutboxModel.id == entry_id)
+            .with_for_update()
+        )
+        if entry is None or entry.status != OUTBOX_PROCESSING or lease is None or entry.locked_until != lease:
+            return None
+        return entry
+
+    async def _merge_followers(self, session: AsyncSession, entry: ElevenLabsOutboxModel) -> Tuple[dict, List[int]]:
+        """The run of pending updates queued right behind entry: (merged payload, their ids)."""
+        followers = (await session.scalars(
+            select(ElevenLabsOutboxModel)
+            .where(
+                ElevenLabsOutboxModel.resource_type == entry.resource_type,
+                ElevenLabsOutboxModel.resource_id == entry.resource_id,
+                ElevenLabsOutboxModel.id > entry.id,
+                ElevenLabsOutboxModel.status == OUTBOX_PENDING,
+            )
+            .order_by(ElevenLabsOutboxModel.id.asc())
+            .with_for_update(skip_locked=True)
+        )).all()
+        merged = []
+        payload = dict(entry.payload or {})
+        for follower in followers:
+            if follower.operation != "update":
+                break
+            payload.update(follower.payload or {})
+            merged.append(follower.id)
+        return payload, merged
+
+    async def process(self, entry_id: int) -> None:
+        # Lock the row, renew its lease and read what to send; nothing stays
+        # locked or open while ElevenLabs is called
+        async with async_db() as session:
+            entry = await self._lock_own(session, entry_id, self._leases.pop(entry_id, None))
+            if entry is None:
+                return
+            handler, record = _handlers.get((entry.resource_type, entry.operation), (None, None))
+            payload, merged = entry.payload, []
+            if handler is not None and entry.operation == "update":
+                payload, merged = await self._merge_followers(session, entry)
+            lease = datetime.now(timezone.utc) + timedelta(seconds=VoiceSettings.OUTBOX_LEASE_SECONDS)
+            entry.locked_until = lease
+            await session.commit()
+        entry.payload = payload  # detached copy handed to the handler; saved below
+
+        error: Optional[str] = None
+        dead = False
+        result = None
+        try:
+            if handler is None:
+                raise OutboxDeadLetter(f"No handler for {entry.resource_type}.{entry.operation}")
+            result = await handler(entry)
+        except OutboxDeadLetter as exc:
+            error, dead = str(exc), True
+        except Exception as exc:
+            error = f"{exc!r}"
+            logger.debug(traceback.format_exc())
+
+        async with async_db() as session:
+            entry = await self._lock_own(session, entry_id, lease)
+            if entry is None:
+                # The lease ran out mid-call and the row was reclaimed; its new
+                # owner records the outcome
+                self.lost_leases += 1
+                logger.warning(f"Outbox row {entry_id} lost its lease while calling ElevenLabs; result dropped")
+                return
+
+            now = datetime.now(timezone.utc)
+            if error is None:
+                try:
+                    if record is not None:
+                        await record(session, entry, result)
+                except Exception as exc:
+                    # Discard whatever record() changed, then fail the row below
+                    error = f"{exc!r}"
+                    logger.error(f"Outbox {entry.resource_type}.{entry.operation} #{entry_id} could not be recorded:\n{traceback.format_exc()}")
+                    await session.rollback()
+                    entry = await self._lock_own(session, entry_id, lease)
+                    if entry is None:
+                        return
+
+            if error is None:
+                entry.payload = payload
+                entry.status = OUTBOX_DONE
+                entry.result = jsonable_encoder(result) if result is not None else None
+                entry.completed_at = now
+                entry.locked_until = None
+                entry.last_error = None
+                entry.attempts += 1
+                if merged:
+                    await session.execute(
+                        update(ElevenLabsOutboxModel)
+                        .where(ElevenLabsOutboxModel.id.in_(merged), ElevenLabsOutboxModel.status == OUTBOX_PENDING)
+                        .values(status=OUTBOX_DONE, result={"coalesced_into": entry_id}, completed_at=now)
+                    )
+                await session.commit()
+                self.succeeded += 1
+                self.coalesced += len(merged)
+                return
+
+            entry.attempts += 1
+            entry.last_error = error
+            entry.locked_until = None
+            if dead or entry.attempts >= VoiceSettings.OUTBOX_MAX_ATTEMPTS:
+                entry.status = OUTBOX_DEAD
+                entry.completed_at = now
+                self.dead += 1
+                logger.error(f"Outbox {entry.resource_type}.{entry.operation} #{entry.id} dead-lettered: {error}")
+            else:
+                delay = min(
+                    VoiceSettings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1),
+                    VoiceSettings.OUTBOX_RETRY_MAX_SECONDS,
+                )
+                entry.status = OUTBOX_PENDING
+                entry.next_attempt_at = now + timedelta(seconds=delay)
+                self.retried += 1
+                logger.warning(
+                    f"Outbox {entry.resource_type}.{entry.operation} #{entry.id} failed "
+                    f"(attempt {entry.attempts}), retrying in {delay:.0f}s: {error}"
+                )
+            await session.commit()
+
+    async def drain_once(self) -> int:
+        claimed = await super().drain_once()
+        if claimed:
+            self.batches += 1
+        return claimed
+
+    async def stats(self) -> dict:
+        async with async_db() as session:
+            counts = dict((await session.execute(
+                select(ElevenLabsOutboxModel.status, func.count())
+                .group_by(ElevenLabsOutboxModel.status)
+            )).all())
+            oldest = await session.scalar(
+                select(func.min(ElevenLabsOutboxModel.created_at))
+                .where(ElevenLabsOutboxModel.status.in_([OUTBOX_PENDING, OUTBOX_PROCESSING]))
+            )
+        return {
+            "by_status": counts,
+            "oldest_pending_age_seconds": (
+                round((datetime.now(timezone.utc) - oldest).total_seconds(), 1) if oldest else None
+            ),
+            "batches": self.batches,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "coalesced": self.coalesced,
+            "lost_leases": self.lost_leases,
+        }
+
+
+outbox_worker = OutboxWorker()
+
+
+async def requeue_dead(entry_id: int) -> Optional[ElevenLabsOutboxModel]:
+    """Give a dead row a fresh set of attempts."""
+    async with async_db() as session:
+        entry = await session.get(ElevenLabsOutboxModel, entry_id)
+        if entry is None or entry.status != OUTBOX_DEAD:
+            return None
+        entry.status = OUTBOX_PENDING
+        entry.attempts = 0
+        entry.next_attempt_at = datetime.now(timezone.utc)
+        entry.completed_at = None
+        await session.commit()
+    outbox_worker.wake()
+    return entry
@@ -0,0 +1,67 @@
+"""
+Named process pools for CPU-bound work kept off the event loop (knowledge
+base text extraction, voice sample preprocessing).
+
+Workers are spawned, not forked: forking a process that runs an event loop
+and DB pools is unsafe. A spawned worker starts from a bare interpreter and
+only imports the module of the function it runs, so those functions take
+every setting as an argument and import nothing from the app (its settings,
+logger or database engines).
+
+  • process_pool(name, workers) creates the pool on first use
+  • run_in_process() submits a call with a timeout. A worker that dies
+    breaks its pool (BrokenProcessPool); the pool is then dropped, so the
+    next call starts a fresh one, and the error is re-raised
+  • shutdown_pools() runs on app shutdown
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def process_pool(name: str, workers: int) -> ProcessPoolExecutor:
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+def _discard(name: str, pool: ProcessPoolExecutor) -> None:
+    with _lock:
+        if _pools.get(name) is pool:
+            del _pools[name]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_process(name: str, workers: int, timeout: float, fn: Callable, *args) -> Any:
+    """
+    fn(*args) in the named pool. Raises asyncio.TimeoutError after timeout
+    seconds (the worker keeps going until it finishes; it just no longer
+    holds the caller up) and BrokenProcessPool if a worker died.
+    """
+    pool = process_pool(name, workers)
+    try:
+        future = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        return await asyncio.wait_for(future, timeout)
+    except BrokenProcessPool:
+        _discard(name, pool)
+        raise
+
+
+def shutdown_pools() -> None:
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,65 +1,285 @@
+"""
+Title / metadata lookups for knowledge base URLs.
+
+fetch_page_metadata() replaces the blocking requests.get that downloaded the
+whole page just to find <title>:
+
+  • one pooled aiohttp session per event loop (not the ElevenLabs one, so
+    the xi-api-key never goes to third-party hosts)
+  • the body is streamed and reading stops as soon as </title> has been seen
+    or URL_SCRAPE_MAX_BYTES have been read; non-HTML responses (PDFs, ...)
+    are not read at all
+  • redirects are followed up to URL_SCRAPE_MAX_REDIRECTS; only http(s) URLs
+    are fetched
+  • results are cached per normalized URL for URL_SCRAPE_CACHE_TTL_SECONDS
+    (failures for URL_SCRAPE_ERROR_TTL_SECONDS) and concurrent lookups of the
+    same URL share one request
+  • fetch_many() validates a batch of URLs concurrently, at most
+    URL_SCRAPE_CONCURRENCY at a time (and optionally a few per host)
+
+Errors are raised as the same HTTPExceptions the old scraper used.
+"""
+
+import asyncio
+import html
 import re
-import requests
-from app_v2.core.logger import setup_logger
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
 from fastapi import HTTPException
 
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
 logger = setup_logger(__name__)
 
-def scrape_webpage_title(url: str) -> str:
-    try:
-        response = requests.get(
-            url,
-            timeout=10,
-            headers={
-                "User-Agent": "Mozilla/5.0 (compatible; KnowledgeBot/1.0)"
-            }
-        )
-        response.raise_for_status()
-
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else 400
-
-        if status_code == 403:
-            raise HTTPException(
-                status_code=403,
-                detail="Access to this URL is forbidden (403)."
-            )
-        elif status_code == 404:
-            raise HTTPException(
-                status_code=404,
-                detail="URL not found (404)."
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to fetch URL. HTTP {status_code}. Scraping is blocked by the website."
-            )
-
-    except requests.exceptions.Timeout:
-        raise HTTPException(
-            status_code=408,
-            detail="Request to URL timed out."
+USER_AGENT = "Mozilla/5.0 (compatible; KnowledgeBot/1.0)"
+NO_TITLE = "No title found"
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_DESCRIPTION_RE = re.compile(
+    rb"<meta\s+[^>]*(?:name|property)=[\"'](?:og:)?description[\"'][^>]*content=[\"']([^\"']*)[\"']",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class PageMetadata:
+    url: str
+    final_url: str
+    status: int
+    content_type: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    bytes_read: int = 0
+
+
+def normalize_url(url: str) -> str:
+    """Cache key: lowercase scheme and host, no default port, no fragment, '/' for an empty path."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    if parts.username:
+        host = f"{parts.username}{':' + parts.password if parts.password else ''}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Session and cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def _session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=VoiceSettings.URL_SCRAPE_CONCURRENCY * 4, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=VoiceSettings.URL_SCRAPE_TIMEOUT_SECONDS),
+            headers={"User-Agent": USER_AGENT},
         )
+        _sessions[loop] = session
+    return session
+
+
+async def close_scraper_session() -> None:
+    """Close the running loop's scraper session. Called on app shutdown."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
 
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid or inaccessible URL."
+class _MetadataCache:
+    """Per-process TTL cache of PageMetadata (or the HTTPException a lookup raised)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Union[PageMetadata, HTTPException]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Union[PageMetadata, HTTPException]) -> None:
+        ttl = (
+            VoiceSettings.URL_SCRAPE_ERROR_TTL_SECONDS if isinstance(value, HTTPException)
+            else VoiceSettings.URL_SCRAPE_CACHE_TTL_SECONDS
         )
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+metadata_cache = _MetadataCache(VoiceSettings.URL_SCRAPE_CACHE_MAX_ENTRIES)
 
-    html = response.text
 
-    match = re.search(
-        r"<title[^>]*>(.*?)</title>",
-        html,
-        re.IGNORECASE | re.DOTALL
+# ─────────────────────────────────────────────────────────────────────────────
+# Fetching
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _status_error(status_code: int) -> HTTPException:
+    if status_code == 403:
+        return HTTPException(status_code=403, detail="Access to this URL is forbidden (403).")
+    if status_code == 404:
+        return HTTPException(status_code=404, detail="URL not found (404).")
+    return HTTPException(
+        status_code=400,
+        detail=f"Failed to fetch URL. HTTP {status_code}. Scraping is blocked by the website."
     )
 
-    if match:
-        return match.group(1).strip()
 
-    return "No title found"
+def _clean(raw: bytes, charset: str) -> Optional[str]:
+    try:
+        text = raw.decode(charset, errors="replace")
+    except LookupError:  # unknown charset in Content-Type
+        text = raw.decode("utf-8", errors="replace")
+    text = html.unescape(text)
+    text = " ".join(text.split())
+    return text or None
+
+
+@asynccontextmanager
+async def _get(url: str) -> AsyncIterator[aiohttp.ClientResponse]:
+    """GET url (following redirects), mapping failures to the scraper's HTTPExceptions."""
+    if urlsplit(url).scheme.lower() not in ("http", "https"):
+        raise HTTPException(status_code=400, detail="Invalid or inaccessible URL.")
+    try:
+        async with _session().get(
+            url,
+            allow_redirects=True,
+            max_redirects=VoiceSettings.URL_SCRAPE_MAX_REDIRECTS,
+        ) as response:
+            if response.status >= 400:
+                raise _status_error(response.status)
+            yield response
+    except HTTPException:
+        raise
+    except aiohttp.TooManyRedirects:
+        raise HTTPException(status_code=400, detail="URL redirects too many times.")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=408, detail="Request to URL timed out.")
+    except (aiohttp.ClientError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid or inaccessible URL.")
+
+
+async def _fetch(url: str) -> PageMetadata:
+    async with _get(url) as response:
+        metadata = PageMetadata(
+            url=url,
+            final_url=str(response.url),
+            status=response.status,
+            content_type=response.content_type,
+        )
+        if response.content_type not in HTML_TYPES:
+            return metadata
+
+        charset = response.charset or "utf-8"
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(8192):
+            body.extend(chunk)
+            # Only the tail can complete a closing tag split across chunks
+            if b"</title>" in body[-(len(chunk) + 8):].lower() or len(body) >= VoiceSettings.URL_SCRAPE_MAX_BYTES:
+                break
+        head = bytes(body[:VoiceSettings.URL_SCRAPE_MAX_BYTES])
+        metadata.bytes_read = len(head)
+        match = _TITLE_RE.search(head)
+        if match:
+            metadata.title = _clean(match.group(1), charset)
+        match = _DESCRIPTION_RE.search(head)
+        if match:
+            metadata.description = _clean(match.group(1), charset)
+        return metadata
+
+
+async def fetch_bytes(url: str, max_bytes: int) -> bytes:
+    """Body of url, uncached. Raises HTTPException if unreachable or larger than max_bytes."""
+    async with _get(url) as response:
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(65536):
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise HTTPException(status_code=400, detail=f"{url} is larger than {max_bytes} bytes.")
+        return bytes(body)
+
+
+async def fetch_page_metadata(url: str) -> PageMetadata:
+    """Title and metadata of a URL, from the cache when fresh. Raises HTTPException if unreachable."""
+    key = normalize_url(url)
+    cached = metadata_cache.get(key)
+    if cached is not None:
+        if isinstance(cached, HTTPException):
+            raise HTTPException(status_code=cached.status_code, detail=cached.detail)
+        return cached
+
+    inflight = metadata_cache._inflight.get(key)
+    if inflight is None:
+        inflight = asyncio.ensure_future(_fetch(url))
+        metadata_cache._inflight[key] = inflight
+        try:
+            metadata = await asyncio.shield(inflight)
+        except HTTPException as e:
+            metadata_cache.put(key, e)
+            raise
+        finally:
+            metadata_cache._inflight.pop(key, None)
+        metadata_cache.put(key, metadata)
+        return metadata
+    return await asyncio.shield(inflight)
+
+
+async def fetch_many(urls: Iterable[str], per_host: Optional[int] = None) -> Dict[str, Union[PageMetadata, HTTPException]]:
+    """
+    Look up many URLs concurrently; returns each URL's metadata or the
+    HTTPException it raised. per_host additionally caps requests in flight
+    to any one host, so a batch from one site does not hammer it.
+    """
+    limit = asyncio.Semaphore(VoiceSettings.URL_SCRAPE_CONCURRENCY)
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    results: Dict[str, Union[PageMetadata, HTTPException]] = {}
 
+    async def _one(url: str) -> None:
+        host = (urlsplit(url).hostname or "").lower()
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host or VoiceSettings.URL_SCRAPE_CONCURRENCY))
+        async with host_limit, limit:
+            try:
+                results[url] = await fetch_page_metadata(url)
+            except HTTPException as e:
+                results[url] = e
 
+    await asyncio.gather(*(_one(url) for url in dict.fromkeys(urls)))
+    return results
 
 
+async def scrape_webpage_title(url: str) -> str:
+    metadata = await fetch_page_metadata(url)
+    return metadata.title or NO_TITLE
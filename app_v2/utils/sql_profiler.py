@@ -0,0 +1,255 @@
+"""
+Per-request SQL profiler (opt-in via SQL_PROFILER_ENABLED).
+
+When enabled, SQLAlchemy cursor events time every statement and attribute
+it to the HTTP request currently being served (tracked in a ContextVar, so
+sync routes running in the threadpool are covered too). For each request
+we keep:
+
+  • query count and total DB time
+  • repeated statement "shapes" (SQL with literals stripped)
+  • likely N+1 patterns: the same shape run SQL_PROFILER_N_PLUS_ONE_THRESHOLD
+    or more times in one request, e.g. a lazy relationship touched per row
+
+Each response gets a ``Server-Timing: db;dur=..`` header, and the last
+SQL_PROFILER_HISTORY requests are kept in memory so the admin diagnostics
+route can report the slowest endpoints and statements.
+
+When disabled, neither the event listeners nor the middleware are installed,
+so there is no per-query or per-request overhead at all.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("sql_profile", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,?)+\)", re.IGNORECASE)
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|:\w+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Per-request shape summaries kept in history (the heaviest ones by time)
+_SHAPES_PER_REQUEST = 10
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise SQL so the same query with different values compares equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    path: str
+    query_count: int = 0
+    db_time_ms: float = 0.0
+    shape_counts: Counter = field(default_factory=Counter)
+    shape_time_ms: Dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.query_count += 1
+            self.db_time_ms += elapsed_ms
+            self.shape_counts[shape] += 1
+            self.shape_time_ms[shape] = self.shape_time_ms.get(shape, 0.0) + elapsed_ms
+
+    def n_plus_one_suspects(self, threshold: int) -> List[dict]:
+        return [
+            {"statement": shape, "count": count, "total_ms": round(self.shape_time_ms[shape], 2)}
+            for shape, count in self.shape_counts.most_common()
+            if count >= threshold
+        ]
+
+
+class SQLProfileHistory:
+    """Rolling window of finished request profiles, summarised on demand."""
+
+    def __init__(self, maxlen: int):
+        self._records: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, top_n: int) -> dict:
+        with self._lock:
+            records = list(self._records)
+
+        endpoints: Dict[str, dict] = {}
+        statements: Dict[str, dict] = {}
+        n_plus_one: Dict[str, dict] = {}
+
+        for rec in records:
+            ep = endpoints.setdefault(rec["endpoint"], {
+                "endpoint": rec["endpoint"],
+                "requests": 0,
+                "total_db_ms": 0.0,
+                "max_db_ms": 0.0,
+                "total_ms": 0.0,
+                "total_queries": 0,
+                "max_queries": 0,
+            })
+            ep["requests"] += 1
+            ep["total_db_ms"] += rec["db_time_ms"]
+            ep["max_db_ms"] = max(ep["max_db_ms"], rec["db_time_ms"])
+            ep["total_ms"] += rec["duration_ms"]
+            ep["total_queries"] += rec["query_count"]
+            ep["max_queries"] = max(ep["max_queries"], rec["query_count"])
+
+            for shape, count, total_ms in rec["shapes"]:
+                st = statements.setdefault(shape, {"statement": shape, "executions": 0, "total_ms": 0.0})
+                st["executions"] += count
+                st["total_ms"] += total_ms
+
+            for suspect in rec["n_plus_one"]:
+                key = f"{rec['endpoint']}|{suspect['statement']}"
+                np1 = n_plus_one.setdefault(key, {
+                    "endpoint": rec["endpoint"],
+                    "statement": suspect["statement"],
+                    "occurrences": 0,
+                    "max_repeats": 0,
+                })
+                np1["occurrences"] += 1
+                np1["max_repeats"] = max(np1["max_repeats"], suspect["count"])
+
+        for ep in endpoints.values():
+            ep["avg_db_ms"] = round(ep["total_db_ms"] / ep["requests"], 2)
+            ep["avg_ms"] = round(ep.pop("total_ms") / ep["requests"], 2)
+            ep["avg_queries"] = round(ep.pop("total_queries") / ep["requests"], 1)
+            ep["total_db_ms"] = round(ep["total_db_ms"], 2)
+            ep["max_db_ms"] = round(ep["max_db_ms"], 2)
+        for st in statements.values():
+            st["avg_ms"] = round(st["total_ms"] / st["executions"], 3)
+            st["total_ms"] = round(st["total_ms"], 2)
+
+        return {
+            "requests_sampled": len(records),
+            "slowest_endpoints": sorted(endpoints.values(), key=lambda e: e["total_db_ms"], reverse=True)[:top_n],
+            "slowest_statements": sorted(statements.values(), key=lambda s: s["total_ms"], reverse=True)[:top_n],
+            "n_plus_one_suspects": sorted(n_plus_one.values(), key=lambda n: n["occurrences"], reverse=True)[:top_n],
+        }
+
+
+profile_history = SQLProfileHistory(VoiceSettings.SQL_PROFILER_HISTORY)
+_installed = False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQLAlchemy cursor events
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("_sql_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    starts = conn.info.get("_sql_profiler_start")
+    if not starts:
+        return
+    profile.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def install_sql_profiler() -> bool:
+    """Attach cursor listeners to every Engine. No-op unless enabled."""
+    global _installed
+    if not VoiceSettings.SQL_PROFILER_ENABLED or _installed:
+        return _installed
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+    logger.info("SQL profiler enabled")
+    return True
+
+
+def is_sql_profiler_enabled() -> bool:
+    return _installed
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ASGI middleware
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SQLProfilerMiddleware:
+    """
+    Opens a RequestProfile for each HTTP request, adds the Server-Timing
+    header, logs N+1 suspects and stores the result in profile_history.
+    Only added to the app when SQL_PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.threshold = VoiceSettings.SQL_PROFILER_N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(method=scope["method"], path=scope["path"])
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                timing = f'db;dur={profile.db_time_ms:.1f};desc="{profile.query_count} queries"'
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self._finish(scope, profile, (time.perf_counter() - started) * 1000)
+
+    def _finish(self, scope, profile: RequestProfile, duration_ms: float) -> None:
+        route = scope.get("route")
+        endpoint = f"{profile.method} {getattr(route, 'path', profile.path)}"
+        suspects = profile.n_plus_one_suspects(self.threshold)
+
+        for suspect in suspects:
+            logger.warning(
+                f"Possible N+1 on {endpoint}: statement ran {suspect['count']} times "
+                f"({suspect['total_ms']} ms): {suspect['statement'][:200]}"
+            )
+
+        heaviest = sorted(profile.shape_time_ms.items(), key=lambda kv: kv[1], reverse=True)[:_SHAPES_PER_REQUEST]
+        profile_history.add({
+            "endpoint": endpoint,
+            "duration_ms": duration_ms,
+            "db_time_ms": profile.db_time_ms,
+            "query_count": profile.query_count,
+            "shapes": [(shape, profile.shape_counts[shape], ms) for shape, ms in heaviest],
+            "n_plus_one": suspects,
+        })
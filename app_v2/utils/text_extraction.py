@@ -0,0 +1,109 @@
+"""
+Text extraction for knowledge base documents.
+
+These functions run in the "kb_extraction" process pool (see process_pool),
+so they take every setting as an argument and only import the parsing
+libraries.
+
+  • .pdf  — pymupdf, page by page; a page with (almost) no text layer is
+            treated as scanned and OCR'd with tesseract, up to max_ocr_pages
+  • .docx — docx2txt
+  • .txt  — decoded as UTF-8 (invalid bytes replaced)
+
+The text comes back zlib-compressed, ready to be stored on the KB entry.
+"""
+
+import io
+import os
+import time
+import zlib
+
+import docx2txt
+import pymupdf
+import pytesseract
+from PIL import Image
+
+# Rough tokens-per-character ratio for English prose; good enough for limits
+# and display, and needs no tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _ocr_page(page, dpi: int) -> str:
+    pix = page.get_pixmap(dpi=dpi)
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    return pytesseract.image_to_string(image)
+
+
+def _extract_pdf(path: str, ocr_min_chars: int, ocr_dpi: int, max_ocr_pages: int, stats: dict) -> str:
+    parts = []
+    ocr_ms = 0.0
+    with pymupdf.open(path) as pdf:
+        stats["pages"] = pdf.page_count
+        for page in pdf:
+            text = page.get_text()
+            if len(text.strip()) < ocr_min_chars and page.get_images() and stats["ocr_pages"] < max_ocr_pages:
+                started = time.perf_counter()
+                try:
+                    text = _ocr_page(page, ocr_dpi)
+                    stats["ocr_pages"] += 1
+                except pytesseract.TesseractNotFoundError:
+                    stats["ocr_error"] = "tesseract is not installed"
+                    max_ocr_pages = 0
+                except Exception as e:
+                    stats["ocr_error"] = repr(e)
+                ocr_ms += (time.perf_counter() - started) * 1000
+            parts.append(text)
+    stats["timings_ms"]["ocr"] = round(ocr_ms, 1)
+    return "\n\n".join(parts)
+
+
+def extract_document(path: str, ocr_min_chars: int = 20, ocr_dpi: int = 200, max_ocr_pages: int = 50) -> dict:
+    """
+    Extract the text of one stored document.
+
+    Returns {"text_gz": bytes | None, "stats": {...}} where stats holds
+    pages, ocr_pages, chars, tokens, per-stage timings_ms and, if the file
+    could not be parsed, error.
+    """
+    stats = {"pages": None, "ocr_pages": 0, "chars": 0, "tokens": 0, "timings_ms": {}}
+    started = time.perf_counter()
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".pdf":
+            text = _extract_pdf(path, ocr_min_chars, ocr_dpi, max_ocr_pages, stats)
+        elif ext == ".docx":
+            text = docx2txt.process(path) or ""
+        elif ext == ".txt":
+            with open(path, "rb") as f:
+                text = f.read().decode("utf-8", errors="replace")
+        else:
+            stats["error"] = f"Unsupported file type {ext}"
+            return {"text_gz": None, "stats": stats}
+    except Exception as e:
+        stats["error"] = repr(e)
+        stats["timings_ms"]["extract"] = _ms(started)
+        return {"text_gz": None, "stats": stats}
+    stats["timings_ms"]["extract"] = _ms(started)
+
+    started = time.perf_counter()
+    stats["chars"] = len(text)
+    stats["tokens"] = estimate_tokens(text)
+    text_gz = compress_text(text)
+    stats["timings_ms"]["compress"] = _ms(started)
+    return {"text_gz": text_gz, "stats": stats}
@@ -0,0 +1,257 @@
+"""
+Token revocation store.
+
+Refresh (and access) tokens carry a unique ``jti`` claim. Revoking a token
+writes its jti to the ``revoked_tokens`` table and adds it to an in-process
+Bloom filter. Every verification first asks the filter:
+
+  • "definitely not revoked" → accept without touching the database
+  • "maybe revoked"          → confirm with a single indexed lookup
+
+The filter is rebuilt from the table on startup and kept in step with other
+workers by a periodic incremental sync (see run_revocation_sync). Until the
+next sync a token revoked on another worker can still pass here, so the sync
+interval bounds that window.
+
+"Logout everywhere" does not enumerate tokens at all: it bumps
+UnifiedAuthModel.token_generation, and tokens minted with an older ``gen``
+claim are rejected where the user row is already loaded.
+"""
+
+import asyncio
+import hashlib
+import math
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi_sqlalchemy import db
+from sqlalchemy.exc import IntegrityError
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.models import RevokedTokenModel, UnifiedAuthModel
+
+logger = setup_logger(__name__)
+
+# Re-read a little history on each sync so rows committed late (or stamped by
+# a worker with a slightly skewed clock) are not skipped.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over string keys.
+
+    Uses double hashing on a single blake2b digest to derive k bit positions.
+    False positives are possible (bounded by error_rate at capacity); false
+    negatives are not.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class TokenRevocationStore:
+    """
+    Process-wide revocation checker backed by the revoked_tokens table.
+    Expired rows are deleted by scripts/cron/cleanup_revoked_tokens.py and
+    skipped by load().
+    """
+
+    def __init__(
+        self,
+        capacity: int = VoiceSettings.REVOCATION_FILTER_CAPACITY,
+        error_rate: float = VoiceSettings.REVOCATION_FILTER_ERROR_RATE,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(capacity, error_rate)
+        self._loaded = False
+        self._last_synced_at: Optional[datetime] = None
+        self.stats = {
+            "checks": 0,
+            "filter_negatives": 0,
+            "db_lookups": 0,
+            "false_positives": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Filter maintenance
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """
+        Rebuild the filter from all unexpired revocations.
+        Returns the number of jtis loaded.
+        """
+        now = datetime.now(timezone.utc)
+        with db():
+            rows = (
+                db.session.query(RevokedTokenModel.jti, RevokedTokenModel.revoked_at)
+                .filter(RevokedTokenModel.expires_at > now)
+                .all()
+            )
+
+        # Size for growth so the error rate holds until the next rebuild
+        new_filter = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        last_seen = None
+        for jti, revoked_at in rows:
+            new_filter.add(jti)
+            if revoked_at and (last_seen is None or revoked_at > last_seen):
+                last_seen = revoked_at
+
+        with self._lock:
+            self._filter = new_filter
+            self._last_synced_at = last_seen or now
+            self._loaded = True
+
+        logger.info(f"Revocation filter rebuilt with {len(rows)} tokens")
+        return len(rows)
+
+    def sync(self) -> int:
+        """
+        Pull revocations written by other workers since the last sync.
+        Falls back to a full load if the filter was never built.
+        """
+        if not self._loaded:
+            return self.load()
+
+        since = self._last_synced_at - SYNC_OVERLAP
+        with db():
+            rows = (
+                db.session.query(RevokedTokenModel.jti, RevokedTokenModel.revoked_at)
+                .filter(RevokedTokenModel.revoked_at > since)
+                .all()
+            )
+
+        with self._lock:
+            for jti, revoked_at in rows:
+                if jti not in self._filter:
+                    self._filter.add(jti)
+                if revoked_at and revoked_at > self._last_synced_at:
+                    self._last_synced_at = revoked_at
+            needs_rebuild = self._filter.count > self._filter.capacity
+
+        if needs_rebuild:
+            self.load()
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Revoke / check
+    # ------------------------------------------------------------------
+
+    def revoke(
+        self,
+        jti: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None,
+        token_type: str = "refresh",
+    ) -> bool:
+        """
+        Persist a revocation and add it to the local filter.
+        Revoking an already revoked jti is a no-op that still returns True.
+        """
+        try:
+            with db():
+                db.session.add(
+                    RevokedTokenModel(
+                        jti=jti,
+                        user_id=user_id,
+                        token_type=token_type,
+                        expires_at=expires_at,
+                    )
+                )
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    db.session.rollback()
+        except Exception as e:
+            logger.error(f"Failed to revoke token {jti}: {e}")
+            return False
+
+        with self._lock:
+            self._filter.add(jti)
+        return True
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """
+        True if the jti has been revoked. Tokens minted before jti support
+        (no claim) are never considered revoked here.
+        """
+        if not jti:
+            return False
+
+        self.stats["checks"] += 1
+        if self._loaded and jti not in self._filter:
+            self.stats["filter_negatives"] += 1
+            return False
+
+        self.stats["db_lookups"] += 1
+        with db():
+            revoked = (
+                db.session.query(RevokedTokenModel.id)
+                .filter(RevokedTokenModel.jti == jti)
+                .first()
+                is not None
+            )
+        if not revoked:
+            self.stats["false_positives"] += 1
+        return revoked
+
+
+revocation_store = TokenRevocationStore()
+
+
+def bump_token_generation(user_id: int) -> int:
+    """
+    Invalidate every token issued to the user so far ("logout everywhere").
+    Returns the new generation.
+    """
+    with db():
+        db.session.query(UnifiedAuthModel).filter(UnifiedAuthModel.id == user_id).update(
+            {UnifiedAuthModel.token_generation: UnifiedAuthModel.token_generation + 1},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        generation = (
+            db.session.query(UnifiedAuthModel.token_generation)
+            .filter(UnifiedAuthModel.id == user_id)
+            .scalar()
+        )
+    logger.info(f"Token generation for user {user_id} bumped to {generation}")
+    return generation or 0
+
+
+async def run_revocation_sync(interval_seconds: int = VoiceSettings.REVOCATION_SYNC_INTERVAL_SECONDS) -> None:
+    """
+    Background task: keep this worker's filter in step with revocations
+    made by other workers. Started from the app lifespan.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(revocation_store.sync)
+        except Exception as e:
+            logger.error(f"Revocation filter sync failed: {e}")
@@ -0,0 +1,72 @@
+"""
+Compressed local store for conversation transcripts.
+
+The transcript ElevenLabs returns at hangup (messages, tool calls/results,
+RAG retrieval info, analysis) is saved next to the conversation row, so the
+details page reads it from our database instead of calling ElevenLabs (and
+possibly retrying for ~15 s) on every view.
+
+Messages are stored as gzip-compressed JSON. iter_transcript_json() inflates
+them incrementally so the details endpoint can stream a long transcript
+without building the whole decoded list in memory.
+"""
+
+import gzip
+import json
+import zlib
+from typing import Iterator, List, Optional
+
+from app_v2.databases.models import ConversationTranscriptModel
+
+TRANSCRIPT_ENCODING = "gzip"
+
+# Compressed bytes fed to the inflater per step when streaming
+_STREAM_CHUNK = 16 * 1024
+# gzip container (header + trailer) for zlib.decompressobj
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def compress_transcript(transcript: List[dict]) -> tuple:
+    """Return (compressed bytes, uncompressed size) for a message list."""
+    raw = json.dumps(transcript, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(raw, compresslevel=6), len(raw)
+
+
+def build_transcript_record(
+    conversation_id: int,
+    elevenlabs_conv_id: Optional[str],
+    metadata: dict,
+) -> ConversationTranscriptModel:
+    """
+    Build the transcript row from extract_conversation_metadata() output.
+    The caller adds it to its (sync or async) session and commits.
+    """
+    transcript = metadata.get("transcript") or []
+    payload, raw_size = compress_transcript(transcript)
+    return ConversationTranscriptModel(
+        conversation_id=conversation_id,
+        elevenlabs_conv_id=elevenlabs_conv_id,
+        encoding=TRANSCRIPT_ENCODING,
+        transcript=payload,
+        raw_size=raw_size,
+        message_count=len(transcript),
+        analysis=metadata.get("analysis"),
+    )
+
+
+def iter_transcript_json(payload: bytes) -> Iterator[bytes]:
+    """Yield the transcript's JSON text in pieces, inflating as it goes."""
+    inflater = zlib.decompressobj(_GZIP_WBITS)
+    view = memoryview(payload)
+    for start in range(0, len(view), _STREAM_CHUNK):
+        piece = inflater.decompress(view[start:start + _STREAM_CHUNK])
+        if piece:
+            yield piece
+    tail = inflater.flush()
+    if tail:
+        yield tail
+
+
+def load_transcript(payload: bytes) -> List[dict]:
+    """Decode the full message list (for callers that need Python objects)."""
+    return json.loads(gzip.decompress(payload))
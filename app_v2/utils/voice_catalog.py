@@ -0,0 +1,245 @@
+"""
+Voice catalog listing (GET /api/v2/voice).
+
+The list used to load a page of global and custom voices together with
+OFFSET, lazy-load each voice's agents while serializing it (one query per
+voice) and run a second COUNT(*) with the same filters. Now:
+
+  • global voices (user_id IS NULL) are the same for every user, so they
+    are serialized once into an in-process list sorted by id (only the
+    signed preview URL, which expires, is filled in per page). The list is
+    tagged with a version (voice count, latest modified_at, traits count
+    and content hash, ready previews and latest preview) re-read at most
+    every VOICE_CATALOG_CHECK_SECONDS, and rebuilt only when that version
+    changes
+  • the user's custom voices are one keyset query (id > cursor, with traits
+    and preview joined in), served by ix_custom_voices_user_id_id
+  • agent names for the whole page come from a single query over the
+    user's agents, so a global voice lists only the caller's agents rather
+    than every agent using it
+
+Pages are keyset-paginated on voice id: the response's next_cursor is passed
+back as cursor and there is no total. Name search is a case-insensitive
+substring match; in SQL it is an ILIKE that the trigram index
+ix_custom_voices_voice_name_trgm (pg_trgm) can serve.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi_sqlalchemy import db
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import joinedload
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.models import AgentModel, VoiceModel, VoicePreviewModel, VoiceTraitsModel
+from app_v2.schemas.enum_types import GenderEnum
+from app_v2.utils.voice_previews import PREVIEW_READY, preview_ready, preview_url, signed_preview_url
+
+logger = setup_logger(__name__)
+
+
+def voice_entry(voice: VoiceModel) -> dict:
+    """VoiceRead fields of a voice, without its agents. Needs traits and preview loaded."""
+    gender = GenderEnum.male
+    nationality = "british"
+    if voice.traits:
+        gender = voice.traits.gender.value if hasattr(voice.traits.gender, 'value') else str(voice.traits.gender)
+        nationality = voice.traits.nationality
+    return {
+        "id": voice.id,
+        "voice_name": voice.voice_name,
+        "is_custom_voice": voice.is_custom_voice,
+        "elevenlabs_voice_id": voice.elevenlabs_voice_id,
+        "gender": gender,
+        "nationality": nationality,
+        "has_sample_audio": voice.has_sample_audio,
+        # The cached clip once there is one; until then the original sample
+        "sample_audio_url": preview_url(voice) or voice.audio_file,
+        "is_enabled": voice.is_enabled,
+    }
+
+
+@dataclass
+class _CatalogVoice:
+    id: int
+    name: str  # casefolded, for search
+    gender: Optional[GenderEnum]  # traits gender; None without traits
+    synced: bool
+    entry: dict
+    preview_etag: Optional[str]  # the signed clip URL expires, so it is added per page
+
+    def page_entry(self) -> dict:
+        if self.preview_etag is None:
+            return self.entry
+        return {**self.entry, "sample_audio_url": signed_preview_url(self.id, self.preview_etag)}
+
+
+def _matches(voice: _CatalogVoice, synced_only: bool, name: Optional[str], gender: Optional[GenderEnum]) -> bool:
+    return (
+        (not synced_only or voice.synced)
+        and (not name or name.casefold() in voice.name)
+        and (gender is None or voice.gender == gender)
+    )
+
+
+class VoiceCatalog:
+    def __init__(self):
+        self._voices: List[_CatalogVoice] = []
+        self._version: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self.rebuilds = 0
+        self.hits = 0
+
+    def _current_version(self, session) -> Tuple:
+        voices = (
+            session.query(
+                func.count(VoiceModel.id),
+                func.max(VoiceModel.modified_at),
+                func.count(VoicePreviewModel.voice_id).filter(VoicePreviewModel.status == PREVIEW_READY),
+                func.max(VoicePreviewModel.generated_at),
+            )
+            .outerjoin(VoicePreviewModel, VoicePreviewModel.voice_id == VoiceModel.id)
+            .filter(VoiceModel.user_id.is_(None))
+            .one()
+        )
+        # Traits have no modified_at, so an in-place edit is caught by hashing their contents
+        traits = (
+            session.query(
+                func.count(VoiceTraitsModel.id),
+                func.md5(func.string_agg(
+                    func.concat_ws(":", VoiceTraitsModel.voice_id, VoiceTraitsModel.gender, VoiceTraitsModel.nationality),
+                    aggregate_order_by(literal(","), VoiceTraitsModel.id),
+                )),
+            )
+            .join(VoiceModel, VoiceModel.id == VoiceTraitsModel.voice_id)
+            .filter(VoiceModel.user_id.is_(None))
+            .one()
+        )
+        return tuple(voices) + tuple(traits)
+
+    def global_voices(self, session) -> List[_CatalogVoice]:
+        """The serialized global voices, rebuilt if their version changed."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VoiceSettings.VOICE_CATALOG_CHECK_SECONDS:
+            self.hits += 1
+            return self._voices
+        version = self._current_version(session)
+        self._checked_at = now
+        if version == self._version:
+            self.hits += 1
+            return self._voices
+
+        voices = (
+            session.query(VoiceModel)
+            .options(joinedload(VoiceModel.traits), joinedload(VoiceModel.preview))
+            .filter(VoiceModel.user_id.is_(None))
+            .order_by(VoiceModel.id.asc())
+            .all()
+        )
+        self._voices = [
+            _CatalogVoice(
+                id=voice.id,
+                name=(voice.voice_name or "").casefold(),
+                gender=voice.traits.gender if voice.traits else None,
+                synced=voice.elevenlabs_voice_id is not None,
+                entry=voice_entry(voice),
+                preview_etag=voice.preview.etag if preview_ready(voice) else None,
+            )
+            for voice in voices
+        ]
+        self._version = version
+        self.rebuilds += 1
+        logger.info(f"Voice catalog rebuilt: {len(self._voices)} global voices")
+        return self._voices
+
+    def _custom_voices(
+        self,
+        session,
+        user_id: int,
+        cursor: Optional[int],
+        limit: int,
+        synced_only: bool,
+        name: Optional[str],
+        gender: Optional[GenderEnum],
+    ) -> List[dict]:
+        filters = [VoiceModel.user_id == user_id]
+        if cursor is not None:
+            filters.append(VoiceModel.id > cursor)
+        if synced_only:
+            filters.append(VoiceModel.elevenlabs_voice_id.isnot(None))
+        if name:
+            filters.append(VoiceModel.voice_name.icontains(name, autoescape=True))
+        if gender:
+            filters.append(VoiceModel.traits.has(VoiceTraitsModel.gender == gender))
+        voices = (
+            session.query(VoiceModel)
+            .options(joinedload(VoiceModel.traits), joinedload(VoiceModel.preview))
+            .filter(*filters)
+            .order_by(VoiceModel.id.asc())
+            .limit(limit)
+            .all()
+        )
+        return [voice_entry(voice) for voice in voices]
+
+    def _agent_names(self, session, user_id: int, voice_ids: List[int]) -> Dict[int, List[str]]:
+        names: Dict[int, List[str]] = {}
+        if not voice_ids:
+            return names
+        rows = (
+            session.query(AgentModel.agent_voice, AgentModel.agent_name)
+            .filter(AgentModel.user_id == user_id, AgentModel.agent_voice.in_(voice_ids))
+            .order_by(AgentModel.id.asc())
+            .all()
+        )
+        for voice_id, agent_name in rows:
+            names.setdefault(voice_id, []).append(agent_name)
+        return names
+
+    def page(
+        self,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: int = 10,
+        synced_only: bool = True,
+        name: Optional[str] = None,
+        gender: Optional[GenderEnum] = None,
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        One page of the voices visible to the user, ordered by id after
+        cursor. Returns (VoiceRead dicts, next cursor or None on the last page).
+        """
+        limit = max(1, min(limit, VoiceSettings.VOICE_CATALOG_MAX_PAGE_SIZE))
+        session = db.session
+
+        # limit + 1 from each side tells whether there is a next page
+        global_items = []
+        for voice in self.global_voices(session):
+            if cursor is not None and voice.id <= cursor:
+                continue
+            if _matches(voice, synced_only, name, gender):
+                global_items.append(voice.page_entry())
+                if len(global_items) > limit:
+                    break
+        custom_items = self._custom_voices(session, user_id, cursor, limit + 1, synced_only, name, gender)
+
+        merged = sorted(global_items + custom_items, key=lambda item: item["id"])
+        items = merged[:limit]
+        next_cursor = items[-1]["id"] if len(merged) > limit else None
+
+        agents = self._agent_names(session, user_id, [item["id"] for item in items])
+        return [{**item, "agents": agents.get(item["id"], [])} for item in items], next_cursor
+
+    def stats(self) -> dict:
+        return {
+            "global_voices": len(self._voices),
+            "version": [str(part) for part in self._version] if self._version else None,
+            "rebuilds": self.rebuilds,
+            "hits": self.hits,
+        }
+
+
+voice_catalog = VoiceCatalog()
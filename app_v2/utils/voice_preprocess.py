@@ -0,0 +1,81 @@
+"""
+Voice clone sample preprocessing, run in a process pool.
+
+create_voice used to send the user's upload (up to 10 MB of stereo, 48 kHz
+audio with long silences) straight to ElevenLabs /voices/add. It now stages
+the upload and calls preprocess_upload(), which runs
+audio_processing.preprocess_voice_sample in the "voice_preprocess" process
+pool (process_pool) so decoding and the NumPy work never block the event
+loop: mono, resampled to VOICE_PREPROCESS_SAMPLE_RATE, silence trimmed,
+loudness normalized and re-encoded. The compact file replaces the staged upload; its before / after
+size and duration are logged and returned to the caller.
+
+If preprocessing is disabled, times out or fails (no ffmpeg for an .mp3,
+an unreadable file, nothing but silence) the original upload is used, as
+before.
+"""
+
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from typing import Tuple
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.utils.audio_processing import preprocess_voice_sample
+from app_v2.utils.file_storage import StagedFile, discard_staged, storage
+from app_v2.utils.process_pool import run_in_process
+
+logger = setup_logger(__name__)
+
+_POOL = "voice_preprocess"
+
+
+async def preprocess_upload(staged: StagedFile) -> Tuple[StagedFile, dict]:
+    """
+    Normalize a staged voice sample (staged with its extension as suffix).
+    Returns (staged file to store, stats); on success the original staged
+    file is removed and the new one carries the output extension.
+    """
+    if not VoiceSettings.VOICE_PREPROCESS_ENABLED:
+        return staged, {"skipped": "disabled"}
+
+    try:
+        result = await run_in_process(
+            _POOL,
+            VoiceSettings.VOICE_PREPROCESS_WORKERS,
+            VoiceSettings.VOICE_PREPROCESS_TIMEOUT_SECONDS,
+            preprocess_voice_sample,
+            staged.path,
+            storage.temp_dir,
+            VoiceSettings.VOICE_PREPROCESS_SAMPLE_RATE,
+            VoiceSettings.VOICE_PREPROCESS_SILENCE_DBFS,
+            VoiceSettings.VOICE_PREPROCESS_PAD_MS,
+            VoiceSettings.VOICE_PREPROCESS_TARGET_DBFS,
+            VoiceSettings.VOICE_PREPROCESS_PEAK_DBFS,
+            VoiceSettings.VOICE_PREPROCESS_MAX_GAIN_DB,
+            VoiceSettings.VOICE_PREPROCESS_BITRATE,
+            VoiceSettings.FFMPEG_BINARY,
+        )
+    except asyncio.TimeoutError:
+        # The worker finishes on its own; its output is left for the orphan scan
+        result = {"path": None, "stats": {"error": "Preprocessing timed out"}}
+    except BrokenProcessPool:
+        result = {"path": None, "stats": {"error": "Preprocessing worker crashed"}}
+    except Exception as e:
+        result = {"path": None, "stats": {"error": repr(e)}}
+
+    stats = result["stats"]
+    if result["path"] is None:
+        logger.warning(f"Voice sample preprocessing failed, uploading the original: {stats.get('error')}")
+        return staged, stats
+
+    discard_staged(staged.path)
+    before, after = stats["before"], stats["after"]
+    logger.info(
+        f"Voice sample preprocessed: {before['bytes']} -> {after['bytes']} bytes, "
+        f"{before['duration_s']}s -> {after['duration_s']}s, "
+        f"{before['channels']}ch {before['sample_rate']}Hz -> mono {after['sample_rate']}Hz, "
+        f"gain {stats['gain_db']} dB"
+    )
+    processed = StagedFile(path=result["path"], size=after["bytes"], sha256=result["sha256"])
+    return processed, stats
@@ -0,0 +1,399 @@
+"""
+Cached voice preview clips.
+
+The voice picker used to play VoiceModel.audio_file directly: an ElevenLabs
+preview URL for library voices (downloaded again by every browser on every
+page) and the raw clone upload for custom voices. Each voice now gets one
+short preview clip, fetched or generated once and kept in file storage
+(VoicePreviewModel, one row per voice):
+
+  • library voices: their ElevenLabs preview_url (VoiceModel.audio_file, or
+    GET /voices/{id} when the row has none) is downloaded as is
+  • cloned voices: VOICE_PREVIEW_TEXT is synthesized with the voice
+    (VOICE_PREVIEW_MODEL_ID, VOICE_PREVIEW_OUTPUT_FORMAT, a 32 kbps mono MP3
+    by default — a few seconds of speech is well under 100 KB)
+
+The clip is stored under previews/ with its sha256 as the key and the ETag,
+and served by GET /api/v2/voice/{id}/preview/audio with a far-future
+Cache-Control; preview_url() puts the ETag in the URL, so a regenerated clip
+gets a new URL rather than a stale browser cache. That route takes no Bearer
+token, since an <audio src> cannot send one: the URL is signed with
+SECRET_KEY instead and expires at the end of the next
+VOICE_PREVIEW_URL_TTL_SECONDS window, so it stays the same (and cacheable)
+for at least one window.
+
+fingerprint hashes everything the clip depends on (ElevenLabs voice, name,
+sample file and the generation settings). Routes that change a voice call
+mark_preview_stale(); a periodic sweep also queues voices that have no row or
+whose fingerprint no longer matches, so previews follow edits made elsewhere
+(populate_elevenlabs_data.py) and changes to the preview settings.
+
+The worker claims pending rows VOICE_PREVIEW_BATCH_SIZE at a time with SKIP
+LOCKED and a VOICE_PREVIEW_LEASE_SECONDS lease, handles at most
+VOICE_PREVIEW_CONCURRENCY at once, and retries failures with exponential
+backoff up to VOICE_PREVIEW_MAX_ATTEMPTS before marking the row failed.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import io
+import mimetypes
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app_v2.core.config import VoiceSettings
+from app_v2.core.logger import setup_logger
+from app_v2.databases.async_db import async_db
+from app_v2.databases.models import VoiceModel, VoicePreviewModel
+from app_v2.utils.elevenlabs import AsyncElevenLabsVoice
+from app_v2.utils.file_storage import discard_staged, release_file, sharded_key, storage
+from app_v2.utils.lease_worker import LeaseWorker
+from app_v2.utils.scraping_utils import fetch_bytes
+
+logger = setup_logger(__name__)
+
+PREVIEW_PENDING = "pending"
+PREVIEW_READY = "ready"
+PREVIEW_FAILED = "failed"
+
+SOURCE_ELEVENLABS = "elevenlabs_preview"
+SOURCE_TTS = "tts"
+
+
+def _is_url(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(("http://", "https://"))
+
+
+def preview_text(voice) -> str:
+    return VoiceSettings.VOICE_PREVIEW_TEXT.format(voice_name=voice.voice_name)
+
+
+def preview_fingerprint(voice) -> str:
+    """Hash of everything the voice's preview clip depends on (any object with the VoiceModel columns)."""
+    parts = (
+        voice.elevenlabs_voice_id or "",
+        voice.voice_name or "",
+        voice.audio_file or "",
+        preview_text(voice),
+        VoiceSettings.VOICE_PREVIEW_MODEL_ID,
+        VoiceSettings.VOICE_PREVIEW_OUTPUT_FORMAT,
+    )
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def preview_ready(voice: VoiceModel) -> bool:
+    """The voice's cached clip exists and still matches the voice."""
+    preview = voice.preview
+    return (
+        preview is not None
+        and preview.status == PREVIEW_READY
+        and preview.file_path is not None
+        and preview.fingerprint == preview_fingerprint(voice)
+    )
+
+
+def _preview_signature(voice_id: int, version: str, expires: int) -> str:
+    message = f"voice-preview:{voice_id}:{version}:{expires}".encode()
+    return hmac.new(VoiceSettings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def signed_preview_url(voice_id: int, etag: str) -> str:
+    """Signed, expiring URL of the clip with this ETag."""
+    version = etag[:16]
+    window = VoiceSettings.VOICE_PREVIEW_URL_TTL_SECONDS
+    expires = (int(time.time()) // window + 2) * window
+    signature = _preview_signature(voice_id, version, expires)
+    return f"/api/v2/voice/{voice_id}/preview/audio?v={version}&exp={expires}&sig={signature}"
+
+
+def preview_signature_valid(voice_id: int, version: str, expires: int, signature: str) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_preview_signature(voice_id, version, expires), signature)
+
+
+def preview_url(voice: VoiceModel) -> Optional[str]:
+    """Signed, versioned URL of the cached clip, or None while there is none."""
+    if not preview_ready(voice):
+        return None
+    return signed_preview_url(voice.id, voice.preview.etag)
+
+
+def preview_status(voice: VoiceModel) -> dict:
+    preview = voice.preview
+    if preview is None:
+        return {"status": None, "error": None, "attempts": 0, "source": None, "generated_at": None}
+    status = preview.status
+    if status == PREVIEW_READY and not preview_ready(voice):
+        status = PREVIEW_PENDING  # stale; the next request or sweep re-queues it
+    return {
+        "status": status,
+        "error": preview.error,
+        "attempts": preview.attempts,
+        "source": preview.source,
+        "generated_at": preview.generated_at,
+    }
+
+
+def mark_preview_stale(voice: VoiceModel) -> None:
+    """Queue a new preview clip for the voice. Call before commit, then voice_preview_worker.wake()."""
+    if voice.preview is None:
+        voice.preview = VoicePreviewModel(voice_id=voice.id)
+    preview = voice.preview
+    preview.status = PREVIEW_PENDING
+    preview.attempts = 0
+    preview.next_attempt_at = datetime.now(timezone.utc)
+    preview.error = None
+
+
+def queue_preview(voice: VoiceModel) -> bool:
+    """
+    Queue the voice's preview if it is missing or stale. Not re-queued while
+    pending, or when it failed for the voice as it is now. Returns whether it
+    was queued; the caller commits and wakes the worker.
+    """
+    preview = voice.preview
+    if preview is not None:
+        if preview.status == PREVIEW_PENDING or preview_ready(voice):
+            return False
+        if preview.status == PREVIEW_FAILED and preview.fingerprint == preview_fingerprint(voice):
+            return False
+    mark_preview_stale(voice)
+    return True
+
+
+def _mime(content_type: Optional[str]) -> str:
+    mime = (content_type or "").split(";")[0].strip().lower()
+    return "audio/mpeg" if mime in ("", "audio/mp3", "audio/mpeg") else mime
+
+
+def _extension(mime: str) -> str:
+    return ".mp3" if mime == "audio/mpeg" else mimetypes.guess_extension(mime) or ".bin"
+
+
+class VoicePreviewWorker(LeaseWorker):
+    name = "voice_previews"
+
+    def __init__(self):
+        super().__init__()
+        self._last_sweep = 0.0
+        self.reset()
+
+    @property
+    def concurrency(self) -> int:
+        return VoiceSettings.VOICE_PREVIEW_CONCURRENCY
+
+    @property
+    def poll_interval(self) -> float:
+        return VoiceSettings.VOICE_PREVIEW_POLL_INTERVAL_SECONDS
+
+    @property
+    def enabled(self) -> bool:
+        return VoiceSettings.VOICE_PREVIEW_ENABLED
+
+    def reset(self) -> None:
+        self.fetched = 0
+        self.generated = 0
+        self.failed = 0
+        self.bytes_stored = 0
+
+    async def sweep(self) -> int:
+        """Queue voices with no preview row, or whose ready / failed clip no longer matches. Returns the count."""
+        now = datetime.now(timezone.utc)
+        async with async_db() as session:
+            rows = (await session.execute(
+                select(
+                    VoiceModel.id,
+                    VoiceModel.elevenlabs_voice_id,
+                    VoiceModel.voice_name,
+                    VoiceModel.audio_file,
+                    VoicePreviewModel.status,
+                    VoicePreviewModel.fingerprint,
+                )
+                .outerjoin(VoicePreviewModel, VoicePreviewModel.voice_id == VoiceModel.id)
+                .where(VoiceModel.elevenlabs_voice_id.isnot(None))
+            )).all()
+
+            missing = [row.id for row in rows if row.status is None]
+            stale = [
+                row.id for row in rows
+                if row.status in (PREVIEW_READY, PREVIEW_FAILED) and row.fingerprint != preview_fingerprint(row)
+            ]
+            if missing:
+                await session.execute(
+                    insert(VoicePreviewModel)
+                    .values([{"voice_id": voice_id, "status": PREVIEW_PENDING, "attempts": 0, "next_attempt_at": now}
+                             for voice_id in missing])
+                    .on_conflict_do_nothing(index_elements=[VoicePreviewModel.voice_id])
+                )
+            if stale:
+                previews = (await session.scalars(
+                    select(VoicePreviewModel).where(VoicePreviewModel.voice_id.in_(stale))
+                )).all()
+                for preview in previews:
+                    preview.status = PREVIEW_PENDING
+                    preview.attempts = 0
+                    preview.next_attempt_at = now
+                    preview.error = None
+            await session.commit()
+
+        if missing or stale:
+            logger.info(f"Queued voice previews: {len(missing)} new, {len(stale)} stale")
+        return len(missing) + len(stale)
+
+    async def claim(self) -> List[int]:
+        """Lease the next batch of pending previews that are due."""
+        now = datetime.now(timezone.utc)
+        async with async_db() as session:
+            rows = (await session.scalars(
+                select(VoicePreviewModel)
+                .where(
+                    VoicePreviewModel.status == PREVIEW_PENDING,
+                    VoicePreviewModel.next_attempt_at <= now,
+                )
+                .order_by(VoicePreviewModel.next_attempt_at.asc())
+                .limit(VoiceSettings.VOICE_PREVIEW_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            lease = now + timedelta(seconds=VoiceSettings.VOICE_PREVIEW_LEASE_SECONDS)
+            for row in rows:
+                row.next_attempt_at = lease
+            await session.commit()
+        return [row.voice_id for row in rows]
+
+    async def _download(self, voice) -> Tuple[Optional[bytes], Optional[str], str]:
+        """(audio, content type, source) for the voice; audio is None with the reason as content type."""
+        url = voice.audio_file if _is_url(voice.audio_file) else None
+        if url is None and not voice.is_custom_voice:
+            response = await AsyncElevenLabsVoice().get_voice(voice.elevenlabs_voice_id)
+            if response.status and isinstance(response.data, dict):
+                url = response.data.get("preview_url")
+        if url:
+            content = await fetch_bytes(url, VoiceSettings.VOICE_PREVIEW_MAX_BYTES)
+            return content, "audio/mpeg", SOURCE_ELEVENLABS
+
+        response = await AsyncElevenLabsVoice().text_to_speech(
+            voice.elevenlabs_voice_id,
+            preview_text(voice),
+            model_id=VoiceSettings.VOICE_PREVIEW_MODEL_ID or None,
+            output_format=VoiceSettings.VOICE_PREVIEW_OUTPUT_FORMAT,
+        )
+        if not response.status:
+            return None, response.error_message or "Text to speech failed", SOURCE_TTS
+        return response.data["content"], response.data.get("content_type"), SOURCE_TTS
+
+    async def _store(self, content: bytes, mime: str) -> Tuple[str, str]:
+        """(storage ref, sha256) of the clip."""
+        staged = await asyncio.to_thread(storage.stage, io.BytesIO(content), VoiceSettings.VOICE_PREVIEW_MAX_BYTES)
+        key = sharded_key("previews", staged.sha256, _extension(mime))
+        try:
+            return await asyncio.to_thread(storage.commit, staged.path, key), staged.sha256
+        except Exception:
+            discard_staged(staged.path)
+            raise
+
+    async def process(self, voice_id: int) -> None:
+        async with async_db() as session:
+            voice = await session.get(VoiceModel, voice_id)
+            preview = await session.get(VoicePreviewModel, voice_id)
+            if voice is None or preview is None or preview.status != PREVIEW_PENDING:
+                return
+            fingerprint = preview_fingerprint(voice)
+
+        error, ref, sha256, mime, source, size = None, None, None, None, SOURCE_TTS, 0
+        if not voice.elevenlabs_voice_id:
+            error = "Voice is not linked to ElevenLabs"
+        else:
+            try:
+                content, content_type, source = await self._download(voice)
+                if content is None:
+                    error = content_type
+                elif not content:
+                    error = "Empty preview audio"
+                else:
+                    size, mime = len(content), _mime(content_type)
+                    ref, sha256 = await self._store(content, mime)
+            except Exception as e:
+                error = str(e) or repr(e)
+
+        released: Optional[str] = None
+        async with async_db() as session:
+            voice = await session.get(VoiceModel, voice_id)
+            preview = await session.get(VoicePreviewModel, voice_id, with_for_update=True)
+            # Deleted, or changed again while we were working: the clip is not for it
+            current = (
+                voice is not None and preview is not None and preview.status == PREVIEW_PENDING
+                and preview_fingerprint(voice) == fingerprint
+            )
+            if not current:
+                released = ref
+            elif error is None:
+                released = preview.file_path if preview.file_path != ref else None
+                preview.status = PREVIEW_READY
+                preview.fingerprint = fingerprint
+                preview.file_path = ref
+                preview.etag = sha256
+                preview.content_type = mime
+                preview.size_bytes = size
+                preview.source = source
+                preview.attempts += 1
+                preview.next_attempt_at = None
+                preview.error = None
+                preview.generated_at = datetime.now(timezone.utc)
+                if source == SOURCE_ELEVENLABS:
+                    self.fetched += 1
+                else:
+                    self.generated += 1
+                self.bytes_stored += size
+            else:
+                preview.attempts += 1
+                preview.error = error
+                preview.fingerprint = fingerprint
+                if preview.attempts >= VoiceSettings.VOICE_PREVIEW_MAX_ATTEMPTS:
+                    preview.status = PREVIEW_FAILED
+                    preview.next_attempt_at = None
+                    self.failed += 1
+                    logger.error(f"Preview of voice {voice_id} failed: {error}")
+                else:
+                    delay = min(
+                        VoiceSettings.VOICE_PREVIEW_RETRY_BASE_SECONDS * 2 ** (preview.attempts - 1),
+                        VoiceSettings.VOICE_PREVIEW_RETRY_MAX_SECONDS,
+                    )
+                    preview.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                    logger.warning(f"Preview of voice {voice_id} failed (attempt {preview.attempts}), retrying in {delay:.0f}s: {error}")
+            await session.commit()
+
+        if released:
+            await asyncio.to_thread(release_file, released)
+
+    async def before_drain(self) -> None:
+        if time.monotonic() - self._last_sweep >= VoiceSettings.VOICE_PREVIEW_SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = time.monotonic()
+            await self.sweep()
+
+    async def stats(self) -> dict:
+        async with async_db() as session:
+            counts = dict((await session.execute(
+                select(VoicePreviewModel.status, func.count()).group_by(VoicePreviewModel.status)
+            )).all())
+            stored = (await session.execute(
+                select(func.count(), func.coalesce(func.sum(VoicePreviewModel.size_bytes), 0))
+                .where(VoicePreviewModel.status == PREVIEW_READY)
+            )).one()
+        return {
+            "by_status": counts,
+            "ready_files": stored[0],
+            "ready_bytes": int(stored[1]),
+            "fetched": self.fetched,
+            "generated": self.generated,
+            "failed": self.failed,
+            "bytes_stored": self.bytes_stored,
+        }
+
+
+voice_preview_worker = VoicePreviewWorker()
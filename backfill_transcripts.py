@@ -0,0 +1,91 @@
+"""
+One-time script to populate conversation_transcripts for conversations
+recorded before transcripts were stored at ingest.
+
+Walks conversations that have an ElevenLabs id but no stored transcript,
+oldest first, fetches each one from ElevenLabs and saves it compressed.
+Safe to re-run: already stored conversations are skipped.
+
+Usage:
+    python backfill_transcripts.py [--batch-size 100] [--limit N] [--delay 0.2]
+"""
+
+import argparse
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app_v2.databases.engine import get_script_session_factory
+from app_v2.databases.models import ConversationsModel, ConversationTranscriptModel
+from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
+from app_v2.utils.transcript_store import build_transcript_record
+
+
+def backfill(session, batch_size=100, limit=None, delay=0.2):
+    el_conv = ElevenLabsConversation()
+    last_id = 0
+    stored = skipped = 0
+
+    while True:
+        rows = session.execute(
+            select(ConversationsModel.id, ConversationsModel.elevenlabs_conv_id)
+            .outerjoin(
+                ConversationTranscriptModel,
+                ConversationTranscriptModel.conversation_id == ConversationsModel.id
+            )
+            .where(
+                ConversationsModel.id > last_id,
+                ConversationsModel.elevenlabs_conv_id.isnot(None),
+                ConversationTranscriptModel.id.is_(None)
+            )
+            .order_by(ConversationsModel.id.asc())
+            .limit(batch_size)
+        ).all()
+
+        if not rows:
+            break
+
+        for conversation_id, elevenlabs_conv_id in rows:
+            last_id = conversation_id
+            meta = el_conv.extract_conversation_metadata(elevenlabs_conv_id, max_retries=1)
+            if not meta:
+                skipped += 1
+                print(f"⚠️  Conversation {conversation_id} ({elevenlabs_conv_id}): no transcript available")
+            else:
+                try:
+                    session.add(build_transcript_record(conversation_id, elevenlabs_conv_id, meta))
+                    session.commit()
+                    stored += 1
+                except IntegrityError:
+                    session.rollback()
+
+            if limit and stored + skipped >= limit:
+                print(f"Reached limit of {limit} conversations")
+                return stored, skipped
+            if delay:
+                time.sleep(delay)
+
+        print(f"Progress: {stored} stored, {skipped} skipped (last id {last_id})")
+
+    return stored, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill stored conversation transcripts")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many conversations")
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds between ElevenLabs calls")
+    args = parser.parse_args()
+
+    SessionLocal = get_script_session_factory()
+    session = SessionLocal()
+
+    try:
+        stored, skipped = backfill(session, args.batch_size, args.limit, args.delay)
+        print(f"✅ Backfill complete: {stored} stored, {skipped} skipped")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error: {e}")
+    finally:
+        session.close()
@@ -0,0 +1,219 @@
+"""
+Benchmarks against fake_elevenlabs_server.py.
+
+rest  — REST throughput of one worker's ElevenLabs client stack (pooled
+        session, retries, breakers, cache) at rising concurrency. Runs the
+        app's own Async* clients in this process, so ELEVENLABS_BASE_URL must
+        point at the fake server.
+
+calls — concurrent-call capacity and setup latency of a running app. Opens
+        N websocket calls to one of our voice endpoints at once, streams
+        real-time PCM for --call-seconds and measures time to the first
+        relayed event and first audio, the largest gap between audio frames,
+        and how many calls completed. Run the app with one worker (and
+        ELEVENLABS_WS_URL at the fake server) to get per-worker numbers.
+
+Usage:
+    python benchmark_elevenlabs.py rest --concurrency 1,8,32,64 --seconds 10
+    python benchmark_elevenlabs.py calls --url ws://localhost:8000/api/v2/agent/12/test-connection \\
+        --auth '{"type": "auth", "token": "<JWT>"}' --calls 10,50,100 --call-seconds 20
+    python benchmark_elevenlabs.py calls --url ws://localhost:8000/api/v2/public/ws/12 \\
+        --auth '{"type": "auth", "client_id": "...", "client_secret": "..."}' --calls 25
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_MS = 100
+CHUNK = b"\x00" * (16000 * 2 * CHUNK_MS // 1000)  # PCM16 mono 16 kHz silence
+
+
+def _percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return f"p50 {pick(0.5):7.1f}  p95 {pick(0.95):7.1f}  p99 {pick(0.99):7.1f}  max {ordered[-1]:7.1f} ms"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# REST throughput
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def run_rest(args) -> None:
+    from app_v2.core.config import VoiceSettings
+    from app_v2.utils.elevenlabs import (
+        AsyncElevenLabsAgent,
+        AsyncElevenLabsConversation,
+        AsyncElevenLabsVoice,
+        close_http_session,
+    )
+    from app_v2.schemas.function_schema import ApiSchema
+
+    if "api.elevenlabs.io" in VoiceSettings.ELEVENLABS_BASE_URL and not args.allow_real:
+        raise SystemExit("❌ ELEVENLABS_BASE_URL points at the real API; use the fake server or pass --allow-real")
+
+    agents = AsyncElevenLabsAgent()
+    conversations = AsyncElevenLabsConversation()
+    voices = AsyncElevenLabsVoice()
+
+    created = await agents.create_agent(name="bench", voice_id="bench-voice", prompt="You are a benchmark.")
+    if not created.status:
+        raise SystemExit(f"❌ Could not create the benchmark agent: {created.error_message}")
+    agent_id = created.data["agent_id"]
+    schema = ApiSchema(url="https://example.com/hook", method="POST")
+
+    async def create_delete_tool():
+        response = await agents.create_tool(name="bench_tool", description="Benchmark tool", api_schema=schema)
+        if response.status:
+            await agents.delete_tool(response.data["id"])
+        return response
+
+    operations = {
+        "get_agent": lambda: agents.get_agent(agent_id, use_cache=False),
+        "get_agent_cached": lambda: agents.get_agent(agent_id),
+        "list_conversations": lambda: conversations.get_conversations(agent_id, page_size=30),
+        "get_voices": lambda: voices.get_all_voices(),
+        "create_delete_tool": create_delete_tool,
+    }
+    selected = {name: operations[name] for name in args.ops.split(",")}
+
+    print(f"Target {VoiceSettings.ELEVENLABS_BASE_URL}, {args.seconds}s per step, ops: {', '.join(selected)}")
+    try:
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            latencies: Dict[str, List[float]] = defaultdict(list)
+            errors: Dict[str, int] = defaultdict(int)
+            deadline = time.perf_counter() + args.seconds
+            names = list(selected)
+
+            async def worker(index: int) -> None:
+                i = index
+                while time.perf_counter() < deadline:
+                    name = names[i % len(names)]
+                    i += 1
+                    started = time.perf_counter()
+                    response = await selected[name]()
+                    latencies[name].append((time.perf_counter() - started) * 1000)
+                    if not response.status:
+                        errors[name] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            total = sum(len(v) for v in latencies.values())
+            print(f"\nconcurrency {concurrency:4d}: {total / elapsed:8.1f} ops/s, {sum(errors.values())} errors")
+            for name in names:
+                print(f"  {name:20s} n={len(latencies[name]):6d} err={errors[name]:4d}  {_percentiles(latencies[name])}")
+    finally:
+        await agents.delete_agent(agent_id)
+        await close_http_session()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Concurrent calls
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _one_call(session: aiohttp.ClientSession, args, result: dict) -> None:
+    started = time.perf_counter()
+    try:
+        async with session.ws_connect(args.url, timeout=aiohttp.ClientWSTimeout(ws_close=5)) as ws:
+            result["connect_ms"] = (time.perf_counter() - started) * 1000
+            await ws.send_str(args.auth)
+
+            async def send_audio() -> None:
+                next_at = time.perf_counter()
+                end_at = next_at + args.call_seconds
+                while next_at < end_at:
+                    await ws.send_bytes(CHUNK)
+                    next_at += CHUNK_MS / 1000
+                    await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                await ws.close()
+
+            sender = asyncio.create_task(send_audio())
+            last_audio = None
+            async for msg in ws:
+                now = time.perf_counter()
+                if msg.type == aiohttp.WSMsgType.BINARY:
+                    result.setdefault("first_audio_ms", (now - started) * 1000)
+                    if last_audio is not None:
+                        result["max_audio_gap_ms"] = max(result.get("max_audio_gap_ms", 0), (now - last_audio) * 1000)
+                    last_audio = now
+                    result["audio_frames"] = result.get("audio_frames", 0) + 1
+                elif msg.type == aiohttp.WSMsgType.TEXT:
+                    event = json.loads(msg.data)
+                    if event.get("type") == "error":
+                        result["error"] = event.get("message")
+                        break
+                    result.setdefault("first_event_ms", (now - started) * 1000)
+                else:
+                    break
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            result["duration_s"] = time.perf_counter() - started
+            result.setdefault("completed", result["duration_s"] >= args.call_seconds * 0.95)
+    except Exception as e:
+        result["error"] = repr(e)
+
+
+async def run_calls(args) -> None:
+    for count in [int(c) for c in args.calls.split(",")]:
+        results = [{} for _ in range(count)]
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = []
+            for result in results:
+                tasks.append(asyncio.create_task(_one_call(session, args, result)))
+                if args.ramp_ms:
+                    await asyncio.sleep(args.ramp_ms / 1000)
+            await asyncio.gather(*tasks)
+
+        completed = [r for r in results if r.get("completed") and "error" not in r]
+        failed = [r for r in results if "error" in r]
+        print(f"\n{count} concurrent calls: {len(completed)} completed, {len(failed)} failed, "
+              f"{count - len(completed) - len(failed)} cut short")
+        print(f"  connect           {_percentiles([r['connect_ms'] for r in results if 'connect_ms' in r])}")
+        print(f"  first event       {_percentiles([r['first_event_ms'] for r in results if 'first_event_ms' in r])}")
+        print(f"  first audio       {_percentiles([r['first_audio_ms'] for r in results if 'first_audio_ms' in r])}")
+        print(f"  max audio gap*    {_percentiles([r['max_audio_gap_ms'] for r in results if 'max_audio_gap_ms' in r])}")
+        print("  (* includes the pauses between agent turns; look for growth across steps)")
+        if failed:
+            reasons = defaultdict(int)
+            for r in failed:
+                reasons[r["error"]] += 1
+            for reason, n in sorted(reasons.items(), key=lambda item: -item[1])[:5]:
+                print(f"  {n:4d} × {reason}")
+        if count != int(args.calls.split(",")[-1]):
+            await asyncio.sleep(args.pause_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ElevenLabs integration benchmarks (run against the fake server)")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    rest = sub.add_parser("rest", help="REST client throughput in this process")
+    rest.add_argument("--concurrency", default="1,8,32,64")
+    rest.add_argument("--seconds", type=float, default=10.0)
+    rest.add_argument("--ops", default="get_agent,get_agent_cached,list_conversations,get_voices,create_delete_tool")
+    rest.add_argument("--allow-real", action="store_true", help="Allow running against api.elevenlabs.io")
+
+    calls = sub.add_parser("calls", help="Concurrent websocket calls through a running app")
+    calls.add_argument("--url", required=True, help="App websocket URL, e.g. ws://localhost:8000/api/v2/agent/12/test-connection")
+    calls.add_argument("--auth", required=True, help="First (auth) message as JSON")
+    calls.add_argument("--calls", default="10", help="Comma-separated concurrency steps")
+    calls.add_argument("--call-seconds", type=float, default=20.0)
+    calls.add_argument("--ramp-ms", type=float, default=0.0, help="Delay between starting calls within a step")
+    calls.add_argument("--pause-seconds", type=float, default=5.0, help="Pause between steps")
+
+    args = parser.parse_args()
+    asyncio.run(run_rest(args) if args.mode == "rest" else run_calls(args))
@@ -0,0 +1,750 @@
+"""
+Local stand-in for the ElevenLabs API, for load tests and offline development.
+
+Serves the REST endpoints our clients in app_v2/utils/elevenlabs use (agents,
+tools, knowledge base, voices and their sample audio, conversations, signed
+URLs) from in-memory state, and the /v1/convai/conversation websocket with a
+scripted timeline of agent speech, transcripts and PCM audio. Finished calls
+are stored as "done" conversations, and (with --webhook-url) delivered as
+signed post-call webhooks, so listing, reconciliation and ingestion all work
+against it.
+
+Fault injection applies to every /v1 request: added latency with jitter, a
+share of 429s (with Retry-After) and a share of 500s. Knobs can be changed
+while running:
+
+    curl -X PATCH localhost:8765/_fake/config -d '{"throttle_rate": 0.2}'
+    curl localhost:8765/_fake/stats
+
+Point the app at it in .env:
+
+    ELEVENLABS_BASE_URL=http://localhost:8765/v1
+    ELEVENLABS_WS_URL=ws://localhost:8765/v1/convai/conversation
+    ELEVENLABS_API_KEY=fake
+
+Usage:
+    python fake_elevenlabs_server.py --port 8765 --latency-ms 80 --jitter-ms 40
+    python fake_elevenlabs_server.py --error-rate 0.02 --throttle-rate 0.05
+    python fake_elevenlabs_server.py --script call_script.json --webhook-url http://localhost:8000/api/v2/webhooks/elevenlabs
+
+A --script file is a JSON list of steps run in order after the
+conversation_initiation_metadata event, for example:
+
+    [{"type": "agent_response", "text": "Hi there"},
+     {"type": "audio", "ms": 1500},
+     {"type": "wait_user", "ms": 2000},
+     {"type": "user_transcript", "text": "I need help"},
+     {"type": "sleep", "ms": 300},
+     {"type": "end"}]
+
+Without a script the agent greets, then answers every ~2s of user audio,
+until the caller hangs up or --max-call-seconds passes.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import struct
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+
+from aiohttp import ClientSession, WSMsgType, web
+from dotenv import load_dotenv
+
+from send_elevenlabs_webhook import sign
+
+load_dotenv()
+
+SAMPLE_RATE = 16000
+STATE_KEY = web.AppKey("fake_state", object)
+
+
+@dataclass
+class FaultConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_seconds: int = 1
+    # Websocket timeline
+    audio_chunk_ms: int = 100
+    user_turn_ms: int = 2000
+    ping_interval_ms: int = 2000
+    max_call_seconds: float = 300.0
+    # RAG indexing: seconds from the first rag-index request until "succeeded"
+    rag_index_seconds: float = 0.0
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:20]}"
+
+
+def _new_sample(file_name: str) -> dict:
+    # About 8 s of 32 kbps MP3; the content is not real audio
+    return {"sample_id": _new_id("sample"), "file_name": file_name, "mime_type": "audio/mpeg", "size_bytes": 32000}
+
+
+def _tone_chunk(ms: int, freq: float = 440.0) -> str:
+    """Base64 PCM16 mono 16 kHz tone, the format our bridges forward."""
+    samples = SAMPLE_RATE * ms // 1000
+    pcm = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * i / SAMPLE_RATE)))
+        for i in range(samples)
+    )
+    return base64.b64encode(pcm).decode()
+
+
+class FakeState:
+    def __init__(self, config: FaultConfig, script: Optional[List[dict]], webhook_url: Optional[str], webhook_secret: Optional[str]):
+        self.config = config
+        self.script = script
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.agents: Dict[str, dict] = {}
+        self.tools: Dict[str, dict] = {}
+        self.documents: Dict[str, dict] = {}
+        self.rag_started: Dict[str, float] = {}
+        self.voices: Dict[str, dict] = {}
+        self.conversations: Dict[str, dict] = {}
+        self.requests: Counter = Counter()
+        self.injected: Counter = Counter()
+        self.active_calls = 0
+        self.peak_calls = 0
+        self.completed_calls = 0
+        self.started_at = time.time()
+        self._audio_cache: Dict[int, str] = {}
+        for name in ("Rachel", "Adam", "Bella"):
+            voice_id = _new_id("voice")
+            self.voices[voice_id] = {
+                "voice_id": voice_id,
+                "name": name,
+                "category": "premade",
+                "labels": {"accent": "american"},
+                "samples": [_new_sample(f"{name.lower()}.mp3")],
+                "preview_url": None,
+                "settings": {"stability": 0.5, "similarity_boost": 0.75},
+            }
+
+    def audio(self, ms: int) -> str:
+        if ms not in self._audio_cache:
+            self._audio_cache[ms] = _tone_chunk(ms)
+        return self._audio_cache[ms]
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.injected.clear()
+        self.peak_calls = self.active_calls
+        self.completed_calls = 0
+        self.started_at = time.time()
+
+
+def _state(request: web.Request) -> FakeState:
+    return request.app[STATE_KEY]
+
+
+def _not_found(kind: str, item_id: str) -> web.Response:
+    return web.json_response({"detail": {"status": "not_found", "message": f"{kind} {item_id} not found"}}, status=404)
+
+
+async def _payload(request: web.Request) -> dict:
+    """JSON or multipart/form body as a dict (file parts become their byte size)."""
+    if request.content_type == "application/json":
+        return await request.json() if request.can_read_body else {}
+    if request.content_type in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        body = {}
+        form = await request.post()
+        for key, value in form.items():
+            body[key] = len(value.file.read()) if hasattr(value, "file") else value
+        return body
+    return {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fault injection
+# ─────────────────────────────────────────────────────────────────────────────
+
+_PUBLIC_ROUTES = {"/v1/voices/{voice_id}/samples/{sample_id}/audio"}
+
+
+@web.middleware
+async def fault_middleware(request: web.Request, handler):
+    if not request.path.startswith("/v1/"):
+        return await handler(request)
+    state = _state(request)
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+    state.requests[f"{request.method} {route}"] += 1
+
+    # Sample audio doubles as the preview_url target, which on ElevenLabs is
+    # a public link fetched without a key
+    if not request.headers.get("xi-api-key") and route not in _PUBLIC_ROUTES:
+        return web.json_response({"detail": {"status": "invalid_api_key", "message": "Missing xi-api-key"}}, status=401)
+
+    config = state.config
+    delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    roll = random.random()
+    if roll < config.throttle_rate:
+        state.injected["429"] += 1
+        return web.json_response(
+            {"detail": {"status": "too_many_concurrent_requests", "message": "Injected throttle"}},
+            status=429,
+            headers={"Retry-After": str(config.retry_after_seconds)},
+        )
+    if roll < config.throttle_rate + config.error_rate:
+        state.injected["500"] += 1
+        return web.json_response({"detail": {"status": "internal_error", "message": "Injected failure"}}, status=500)
+    return await handler(request)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Agents and tools
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def create_agent(request: web.Request) -> web.Response:
+    body = await _payload(request)
+    agent_id = _new_id("agent")
+    _state(request).agents[agent_id] = {
+        "agent_id": agent_id,
+        "name": body.get("name"),
+        "conversation_config": body.get("conversation_config") or {},
+        "platform_settings": body.get("platform_settings") or {},
+        "metadata": {"created_at_unix_secs": int(time.time())},
+    }
+    return web.json_response({"agent_id": agent_id})
+
+
+async def agent_item(request: web.Request) -> web.Response:
+    state = _state(request)
+    agent_id = request.match_info["agent_id"]
+    agent = state.agents.get(agent_id)
+    if agent is None:
+        return _not_found("Agent", agent_id)
+    if request.method == "DELETE":
+        del state.agents[agent_id]
+        return web.json_response({})
+    if request.method == "PATCH":
+        body = await _payload(request)
+        if "name" in body:
+            agent["name"] = body["name"]
+        _deep_merge(agent["conversation_config"], body.get("conversation_config") or {})
+    return web.json_response(agent)
+
+
+def _deep_merge(target: dict, patch: dict) -> None:
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = value
+
+
+async def create_tool(request: web.Request) -> web.Response:
+    body = await _payload(request)
+    tool_id = _new_id("tool")
+    _state(request).tools[tool_id] = {"id": tool_id, "tool_config": body.get("tool_config") or {}}
+    return web.json_response({"id": tool_id})
+
+
+async def tool_item(request: web.Request) -> web.Response:
+    state = _state(request)
+    tool_id = request.match_info["tool_id"]
+    tool = state.tools.get(tool_id)
+    if tool is None:
+        return _not_found("Tool", tool_id)
+    if request.method == "DELETE":
+        del state.tools[tool_id]
+        return web.json_response({})
+    if request.method == "PATCH":
+        body = await _payload(request)
+        tool["tool_config"] = body.get("tool_config") or tool["tool_config"]
+    return web.json_response(tool)
+
+
+async def get_signed_url(request: web.Request) -> web.Response:
+    agent_id = request.query.get("agent_id", "")
+    ws_url = f"ws://{request.host}/v1/convai/conversation?agent_id={agent_id}&conversation_signature={uuid.uuid4().hex}"
+    return web.json_response({"signed_url": ws_url})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Knowledge base
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def create_document(request: web.Request) -> web.Response:
+    body = await _payload(request)
+    doc_id = _new_id("doc")
+    doc_type = "url" if "url" in body else "text" if "text" in body else "file"
+    size = body.get("file") if doc_type == "file" else len(str(body.get("text") or body.get("url") or ""))
+    name = body.get("name") or body.get("url") or "Untitled"
+    _state(request).documents[doc_id] = {
+        "id": doc_id,
+        "name": name,
+        "type": doc_type,
+        "metadata": {"created_at_unix_secs": int(time.time()), "size_bytes": size},
+        "status": "processed",
+    }
+    return web.json_response({"id": doc_id, "name": name})
+
+
+async def document_item(request: web.Request) -> web.Response:
+    state = _state(request)
+    doc_id = request.match_info["doc_id"]
+    doc = state.documents.get(doc_id)
+    if doc is None:
+        return _not_found("Document", doc_id)
+    if request.method == "DELETE":
+        del state.documents[doc_id]
+        return web.json_response({})
+    if request.method == "PATCH":
+        body = await _payload(request)
+        doc["name"] = body.get("name", doc["name"])
+    return web.json_response(doc)
+
+
+async def document_rag_index(request: web.Request) -> web.Response:
+    doc_id = request.match_info["doc_id"]
+    state = _state(request)
+    if doc_id not in state.documents:
+        return _not_found("Document", doc_id)
+    started = state.rag_started.setdefault(doc_id, time.time())
+    progress = 100.0
+    if state.config.rag_index_seconds > 0:
+        progress = min(100.0, (time.time() - started) / state.config.rag_index_seconds * 100)
+    return web.json_response({
+        "id": f"rag_{doc_id}",
+        "status": "succeeded" if progress >= 100 else "processing",
+        "progress_percentage": round(progress),
+    })
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Voices
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _voice_view(request: web.Request, voice: dict) -> dict:
+    """The voice as ElevenLabs returns it: premade voices link a preview clip."""
+    if voice["category"] != "premade" or not voice["samples"]:
+        return voice
+    sample_id = voice["samples"][0]["sample_id"]
+    return {
+        **voice,
+        "preview_url": f"{request.url.origin()}/v1/voices/{voice['voice_id']}/samples/{sample_id}/audio",
+    }
+
+
+async def list_voices(request: web.Request) -> web.Response:
+    return web.json_response({"voices": [_voice_view(request, v) for v in _state(request).voices.values()]})
+
+
+async def add_voice(request: web.Request) -> web.Response:
+    body = await _payload(request)
+    voice_id = _new_id("voice")
+    labels = body.get("labels")
+    _state(request).voices[voice_id] = {
+        "voice_id": voice_id,
+        "name": body.get("name"),
+        "category": "cloned",
+        "description": body.get("description"),
+        "labels": json.loads(labels) if isinstance(labels, str) else labels or {},
+        "samples": [_new_sample(f"{body.get('name') or 'sample'}.mp3")],
+        "preview_url": None,
+        "settings": {"stability": 0.5, "similarity_boost": 0.75},
+    }
+    return web.json_response({"voice_id": voice_id})
+
+
+async def voice_item(request: web.Request) -> web.Response:
+    state = _state(request)
+    voice_id = request.match_info["voice_id"]
+    voice = state.voices.get(voice_id)
+    if voice is None:
+        return _not_found("Voice", voice_id)
+    if request.method == "DELETE":
+        del state.voices[voice_id]
+        return web.json_response({"status": "ok"})
+    return web.json_response(_voice_view(request, voice))
+
+
+async def voice_sample_audio(request: web.Request) -> web.Response:
+    voice = _state(request).voices.get(request.match_info["voice_id"])
+    if voice is None:
+        return _not_found("Voice", request.match_info["voice_id"])
+    sample = next((x for x in voice["samples"] if x["sample_id"] == request.match_info["sample_id"]), None)
+    if sample is None:
+        return _not_found("Sample", request.match_info["sample_id"])
+    return web.Response(body=os.urandom(sample["size_bytes"]), content_type=sample["mime_type"])
+
+
+async def edit_voice(request: web.Request) -> web.Response:
+    voice = _state(request).voices.get(request.match_info["voice_id"])
+    if voice is None:
+        return _not_found("Voice", request.match_info["voice_id"])
+    body = await _payload(request)
+    for key in ("name", "description"):
+        if key in body:
+            voice[key] = body[key]
+    return web.json_response({"status": "ok"})
+
+
+async def voice_settings(request: web.Request) -> web.Response:
+    voice = _state(request).voices.get(request.match_info["voice_id"])
+    if voice is None:
+        return _not_found("Voice", request.match_info["voice_id"])
+    if request.method == "POST":
+        voice["settings"].update(await _payload(request))
+        return web.json_response({"status": "ok"})
+    return web.json_response(voice["settings"])
+
+
+async def text_to_speech(request: web.Request) -> web.Response:
+    if request.match_info["voice_id"] not in _state(request).voices:
+        return _not_found("Voice", request.match_info["voice_id"])
+    body = await _payload(request)
+    # Size of a 32 kbps MP3 at ~15 characters a second; the content is not real audio
+    size = max(1, len(body.get("text") or "")) * 4000 // 15
+    return web.Response(body=os.urandom(size), content_type="audio/mpeg")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Conversations
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _summary(conv: dict) -> dict:
+    return {
+        "agent_id": conv["agent_id"],
+        "conversation_id": conv["conversation_id"],
+        "status": conv["status"],
+        "start_time_unix_secs": conv["metadata"]["start_time_unix_secs"],
+        "call_duration_secs": conv["metadata"]["call_duration_secs"],
+        "message_count": len(conv["transcript"]),
+        "call_successful": conv["analysis"].get("call_successful"),
+    }
+
+
+async def list_conversations(request: web.Request) -> web.Response:
+    query = request.query
+    agent_id = query.get("agent_id")
+    after = int(query.get("call_start_after_unix") or 0)
+    page_size = min(int(query.get("page_size") or 30), 100)
+    offset = int(query.get("cursor") or 0)
+
+    matches = sorted(
+        (c for c in _state(request).conversations.values()
+         if (not agent_id or c["agent_id"] == agent_id) and c["metadata"]["start_time_unix_secs"] >= after),
+        key=lambda c: c["metadata"]["start_time_unix_secs"],
+        reverse=True,
+    )
+    page = matches[offset:offset + page_size]
+    has_more = offset + page_size < len(matches)
+    return web.json_response({
+        "conversations": [_summary(c) for c in page],
+        "has_more": has_more,
+        "next_cursor": str(offset + page_size) if has_more else None,
+    })
+
+
+async def conversation_item(request: web.Request) -> web.Response:
+    state = _state(request)
+    conv_id = request.match_info["conversation_id"]
+    conv = state.conversations.get(conv_id)
+    if conv is None:
+        return _not_found("Conversation", conv_id)
+    if request.method == "DELETE":
+        del state.conversations[conv_id]
+        return web.json_response({})
+    return web.json_response(conv)
+
+
+async def conversation_audio(request: web.Request) -> web.Response:
+    conv = _state(request).conversations.get(request.match_info["conversation_id"])
+    if conv is None:
+        return _not_found("Conversation", request.match_info["conversation_id"])
+    # Size of a 32 kbps MP3 of the call; the content is not real audio
+    size = max(1, int(conv["metadata"]["call_duration_secs"])) * 4000
+    return web.Response(body=os.urandom(min(size, 16 * 1024 * 1024)), content_type="audio/mpeg")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Conversation websocket
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Call:
+    def __init__(self, state: FakeState, ws: web.WebSocketResponse, agent_id: str):
+        self.state = state
+        self.ws = ws
+        self.agent_id = agent_id
+        self.conversation_id = _new_id("conv")
+        self.started = time.time()
+        self.transcript: List[dict] = []
+        self.user_audio_ms = 0
+        self.user_turn = asyncio.Event()
+        self.event_id = 0
+
+    def _next_event_id(self) -> int:
+        self.event_id += 1
+        return self.event_id
+
+    def _elapsed(self) -> int:
+        return int(time.time() - self.started)
+
+    async def send(self, event: dict) -> None:
+        await self.ws.send_str(json.dumps(event))
+
+    async def agent_says(self, text: str) -> None:
+        self.transcript.append({"role": "agent", "message": text, "time_in_call_secs": self._elapsed()})
+        await self.send({"type": "agent_response", "agent_response_event": {"agent_response": text}})
+
+    async def user_says(self, text: str) -> None:
+        self.transcript.append({"role": "user", "message": text, "time_in_call_secs": self._elapsed()})
+        await self.send({"type": "user_transcript", "user_transcription_event": {"user_transcript": text}})
+
+    async def speak(self, ms: int) -> None:
+        """Stream ms of agent audio in real time."""
+        chunk_ms = self.state.config.audio_chunk_ms
+        chunk = self.state.audio(chunk_ms)
+        for _ in range(max(1, ms // chunk_ms)):
+            await self.send({"type": "audio", "audio_event": {"audio_base_64": chunk, "event_id": self._next_event_id()}})
+            await asyncio.sleep(chunk_ms / 1000)
+
+    async def wait_user(self, ms: int) -> None:
+        """Block until the caller has sent ms more audio."""
+        target = self.user_audio_ms + ms
+        while self.user_audio_ms < target:
+            self.user_turn.clear()
+            await self.user_turn.wait()
+
+    async def run_script(self, steps: List[dict]) -> None:
+        for step in steps:
+            kind = step.get("type")
+            if kind == "agent_response":
+                await self.agent_says(step.get("text", ""))
+            elif kind == "user_transcript":
+                await self.user_says(step.get("text", ""))
+            elif kind == "audio":
+                await self.speak(int(step.get("ms", 1000)))
+            elif kind == "wait_user":
+                await self.wait_user(int(step.get("ms", self.state.config.user_turn_ms)))
+            elif kind == "sleep":
+                await asyncio.sleep(int(step.get("ms", 0)) / 1000)
+            elif kind == "event":
+                await self.send(step["event"])
+            elif kind == "end":
+                return
+
+    async def run_default(self) -> None:
+        await self.agent_says("Hello! How can I help you?")
+        await self.speak(1500)
+        turn = 0
+        while True:
+            await self.wait_user(self.state.config.user_turn_ms)
+            turn += 1
+            await self.user_says(f"User utterance {turn}.")
+            await self.agent_says(f"Here is answer number {turn}.")
+            await self.speak(1000)
+
+    async def pinger(self) -> None:
+        while True:
+            await asyncio.sleep(self.state.config.ping_interval_ms / 1000)
+            await self.send({"type": "ping", "ping_event": {"event_id": self._next_event_id(), "ping_ms": 0}})
+
+    async def reader(self) -> None:
+        async for msg in self.ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            data = json.loads(msg.data)
+            if "user_audio_chunk" in data:
+                # base64 PCM16 mono 16 kHz: 32 bytes per ms
+                self.user_audio_ms += len(base64.b64decode(data["user_audio_chunk"])) // 32
+                self.user_turn.set()
+
+    def record(self) -> dict:
+        duration = self._elapsed()
+        conv = {
+            "agent_id": self.agent_id,
+            "agent_name": (self.state.agents.get(self.agent_id) or {}).get("name"),
+            "conversation_id": self.conversation_id,
+            "status": "done",
+            "transcript": self.transcript or [{"role": "agent", "message": "", "time_in_call_secs": 0}],
+            "metadata": {
+                "start_time_unix_secs": int(self.started),
+                "call_duration_secs": duration,
+                "cost": duration * 10,
+            },
+            "analysis": {"call_successful": "success", "transcript_summary": f"Fake call of {duration}s."},
+        }
+        self.state.conversations[self.conversation_id] = conv
+        return conv
+
+
+async def _send_webhook(state: FakeState, conv: dict) -> None:
+    timestamp = int(time.time())
+    body = json.dumps({"type": "post_call_transcription", "event_timestamp": timestamp, "data": conv}).encode()
+    headers = {"Content-Type": "application/json", "ElevenLabs-Signature": sign(body, state.webhook_secret, timestamp)}
+    try:
+        async with ClientSession() as session:
+            async with session.post(state.webhook_url, data=body, headers=headers) as response:
+                if response.status >= 300:
+                    print(f"webhook for {conv['conversation_id']} -> {response.status}")
+    except Exception as e:
+        print(f"webhook for {conv['conversation_id']} failed: {e}")
+
+
+async def conversation_ws(request: web.Request) -> web.WebSocketResponse:
+    state = _state(request)
+    ws = web.WebSocketResponse(heartbeat=None)
+    await ws.prepare(request)
+
+    call = _Call(state, ws, request.query.get("agent_id", ""))
+    state.active_calls += 1
+    state.peak_calls = max(state.peak_calls, state.active_calls)
+    tasks = []
+    try:
+        await call.send({
+            "type": "conversation_initiation_metadata",
+            "conversation_initiation_metadata_event": {
+                "conversation_id": call.conversation_id,
+                "agent_output_audio_format": "pcm_16000",
+                "user_input_audio_format": "pcm_16000",
+            },
+        })
+        timeline = call.run_script(state.script) if state.script else call.run_default()
+        tasks = [asyncio.ensure_future(t) for t in (timeline, call.reader(), call.pinger())]
+        # The call ends when the script finishes or the caller hangs up
+        await asyncio.wait(tasks[:2], timeout=state.config.max_call_seconds, return_when=asyncio.FIRST_COMPLETED)
+    except (ConnectionResetError, RuntimeError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await ws.close()
+        state.active_calls -= 1
+        state.completed_calls += 1
+        conv = call.record()
+        if state.webhook_url and state.webhook_secret:
+            asyncio.ensure_future(_send_webhook(state, conv))
+    return ws
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Control endpoints
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def fake_config(request: web.Request) -> web.Response:
+    state = _state(request)
+    if request.method == "PATCH":
+        body = await request.json()
+        known = {f.name: f.type for f in fields(FaultConfig)}
+        for key, value in body.items():
+            if key not in known:
+                return web.json_response({"error": f"Unknown setting {key}"}, status=400)
+            setattr(state.config, key, type(getattr(state.config, key))(value))
+    return web.json_response(asdict(state.config))
+
+
+async def fake_stats(request: web.Request) -> web.Response:
+    state = _state(request)
+    elapsed = max(time.time() - state.started_at, 1e-6)
+    total = sum(state.requests.values())
+    return web.json_response({
+        "elapsed_seconds": round(elapsed, 1),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "by_route": dict(state.requests.most_common()),
+        "injected": dict(state.injected),
+        "calls": {"active": state.active_calls, "peak": state.peak_calls, "completed": state.completed_calls},
+        "objects": {
+            "agents": len(state.agents),
+            "tools": len(state.tools),
+            "documents": len(state.documents),
+            "voices": len(state.voices),
+            "conversations": len(state.conversations),
+        },
+    })
+
+
+async def fake_reset(request: web.Request) -> web.Response:
+    _state(request).reset()
+    return web.json_response({"status": "ok"})
+
+
+def build_app(state: FakeState) -> web.Application:
+    app = web.Application(middlewares=[fault_middleware], client_max_size=64 * 1024 * 1024)
+    app[STATE_KEY] = state
+    app.add_routes([
+        web.post("/v1/convai/agents/create", create_agent),
+        web.route("*", "/v1/convai/agents/{agent_id}", agent_item),
+        web.post("/v1/convai/tools", create_tool),
+        web.route("*", "/v1/convai/tools/{tool_id}", tool_item),
+        web.get("/v1/convai/conversation/get_signed_url", get_signed_url),
+        web.get("/v1/convai/conversation", conversation_ws),
+        web.post("/v1/convai/knowledge-base", create_document),
+        web.post("/v1/convai/knowledge-base/{doc_id}/rag-index", document_rag_index),
+        web.route("*", "/v1/convai/knowledge-base/{doc_id}", document_item),
+        web.get("/v1/convai/conversations", list_conversations),
+        web.get("/v1/convai/conversations/{conversation_id}/audio", conversation_audio),
+        web.route("*", "/v1/convai/conversations/{conversation_id}", conversation_item),
+        web.get("/v1/voices", list_voices),
+        web.post("/v1/voices/add", add_voice),
+        web.post("/v1/voices/{voice_id}/edit", edit_voice),
+        web.route("*", "/v1/voices/{voice_id}/settings", voice_settings),
+        web.post("/v1/voices/{voice_id}/settings/edit", voice_settings),
+        web.get("/v1/voices/{voice_id}/samples/{sample_id}/audio", voice_sample_audio),
+        web.route("*", "/v1/voices/{voice_id}", voice_item),
+        web.post("/v1/text-to-speech/{voice_id}", text_to_speech),
+        web.route("*", "/_fake/config", fake_config),
+        web.get("/_fake/stats", fake_stats),
+        web.post("/_fake/reset", fake_reset),
+    ])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake ElevenLabs API for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of /v1 requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of /v1 requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--audio-chunk-ms", type=int, default=100)
+    parser.add_argument("--user-turn-ms", type=int, default=2000)
+    parser.add_argument("--max-call-seconds", type=float, default=300.0)
+    parser.add_argument("--rag-index-seconds", type=float, default=0.0, help="Time until a document's RAG index succeeds")
+    parser.add_argument("--script", help="JSON file with the websocket timeline")
+    parser.add_argument("--webhook-url", help="POST a signed post_call_transcription here after each call")
+    parser.add_argument("--webhook-secret", default=os.getenv("ELEVENLABS_WEBHOOK_SECRET"))
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    config = FaultConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_seconds=args.retry_after,
+        audio_chunk_ms=args.audio_chunk_ms,
+        user_turn_ms=args.user_turn_ms,
+        max_call_seconds=args.max_call_seconds,
+        rag_index_seconds=args.rag_index_seconds,
+    )
+    if args.webhook_url and not args.webhook_secret:
+        raise SystemExit("❌ --webhook-url needs ELEVENLABS_WEBHOOK_SECRET (or --webhook-secret)")
+
+    state = FakeState(config, script, args.webhook_url, args.webhook_secret)
+    print(f"Fake ElevenLabs on http://{args.host}:{args.port}/v1 (ws://{args.host}:{args.port}/v1/convai/conversation)")
+    web.run_app(build_app(state), host=args.host, port=args.port, print=None)
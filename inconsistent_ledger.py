@@ -4,11 +4,10 @@ One-time script to fully rebuild coins_ledger consistency:
 - Recomputes remaining_coins using FIFO logic
 """
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 from collections import deque
 from datetime import datetime
-from app_v2.core.config import VoiceSettings
+from app_v2.databases.engine import get_script_session_factory
 from app_v2.databases.models import CoinsLedgerModel
 
 
@@ -132,8 +131,7 @@ def rebuild_all_users(session):
 
 
 if __name__ == "__main__":
-    engine = create_engine(VoiceSettings.DB_URL)
-    SessionLocal = sessionmaker(bind=engine)
+    SessionLocal = get_script_session_factory()
 
     session = SessionLocal()
 
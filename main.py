@@ -15,7 +15,7 @@ from app_v2.core.config import VoiceSettings
 from starlette.middleware.sessions import SessionMiddleware
 from app_v2.databases.models import AdminTokenModel, TokensToConsume, VoiceModel
 from app_v2.core.exceptions import get_readable_message
-from app_v2.routers import otp_router, health_router, google_auth_router, profile_router, lang_router, ai_model_router, agent_router, voice_router, function_router, knowledge_base_router,  web_agent_router,websocket_router,conversation_router,web_agent_config_router, user_dashboard_router,admin_dashboard_router, coin_purchase_router, admin_plans, subscription_router, admin_user_management, payment_insights_router, api_key_management, public_api,public_websocket_router,webhooks
+from app_v2.routers import otp_router, health_router, google_auth_router, profile_router, lang_router, ai_model_router, agent_router, voice_router, voice_public_router, function_router, knowledge_base_router,  web_agent_router,websocket_router,conversation_router,web_agent_config_router, user_dashboard_router,admin_dashboard_router, coin_purchase_router, admin_plans, subscription_router, admin_user_management, payment_insights_router, api_key_management, public_api,public_websocket_router,webhooks,admin_diagnostics,operations
 from app_v2.routers.email_subscription import public_router as email_subscription_public_router, admin_router as email_subscription_admin_router
 from app_v2.utils.jwt_utils import HTTPBearer
 from fastapi.responses import HTMLResponse
@@ -24,9 +24,67 @@ from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.responses import HTMLResponse
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+import asyncio
+from app_v2.core.logger import setup_logger
+from app_v2.utils.token_revocation import revocation_store, run_revocation_sync
+from app_v2.databases.async_db import init_async_engine, dispose_async_engine
+from app_v2.utils.elevenlabs import close_http_session
+from app_v2.databases.engine import get_engine
+from app_v2.utils.sql_profiler import SQLProfilerMiddleware, install_sql_profiler
+from app_v2.utils.loop_monitor import loop_monitor
+from app_v2.utils.conversation_ingest import run_pending_ingest_sweep
+from app_v2.utils.conversation_reconciler import run_conversation_reconciler
+from app_v2.utils.agent_sync import agent_sync
+from app_v2.utils.outbox import outbox_worker
+from app_v2.utils.kb_indexer import kb_indexer
+from app_v2.utils.kb_bulk_ingest import kb_ingest_worker
+from app_v2.utils.voice_previews import voice_preview_worker
+from app_v2.utils.process_pool import shutdown_pools
+from app_v2.utils.scraping_utils import close_scraper_session
+
+logger = setup_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_async_engine()
+    # Startup: build the in-process revocation filter before serving auth traffic
+    try:
+        await asyncio.to_thread(revocation_store.load)
+    except Exception as e:
+        logger.error(f"Failed to load revocation filter, falling back to DB checks: {e}")
+    try:
+        await agent_sync.resume_pending()
+    except Exception as e:
+        logger.error(f"Failed to re-queue pending agent syncs: {e}")
+    background_tasks = [
+        asyncio.create_task(run_revocation_sync()),
+        asyncio.create_task(run_pending_ingest_sweep()),
+        asyncio.create_task(run_conversation_reconciler()),
+        asyncio.create_task(outbox_worker.run()),
+        asyncio.create_task(kb_indexer.run()),
+        asyncio.create_task(kb_ingest_worker.run()),
+        asyncio.create_task(voice_preview_worker.run()),
+    ]
+    if VoiceSettings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start(app)
+
+    yield
+
+    # Shutdown
+    await loop_monitor.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await dispose_async_engine()
+    await close_http_session()
+    await close_scraper_session()
+    shutdown_pools()
+
 
 app = FastAPI(title="Voice Ninja V2 API", version="2.0.0",docs_url=None,
-    redoc_url=None)
+    redoc_url=None, lifespan=lifespan)
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -145,11 +203,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(
-    DBSessionMiddleware,
-    db_url=VoiceSettings.DB_URL,
-    engine_args={"pool_pre_ping": True, "pool_size": 5, "max_overflow": 10}
-)
+app.add_middleware(DBSessionMiddleware, custom_engine=get_engine())
+
+# Opt-in SQL profiler; installs nothing unless SQL_PROFILER_ENABLED is set
+if install_sql_profiler():
+    app.add_middleware(SQLProfilerMiddleware)
 
 app.add_middleware(SessionMiddleware, secret_key=VoiceSettings.SECRET_KEY)
 
@@ -163,6 +221,7 @@ app.include_router(lang_router)
 app.include_router(ai_model_router)
 app.include_router(agent_router)
 app.include_router(voice_router)
+app.include_router(voice_public_router)
 app.include_router(function_router)
 app.include_router(knowledge_base_router)
 app.include_router(web_agent_router)
@@ -180,6 +239,8 @@ app.include_router(api_key_management.router)
 app.include_router(public_api.router)
 app.include_router(public_websocket_router.router)
 app.include_router(webhooks.router)
+app.include_router(admin_diagnostics.router)
+app.include_router(operations.router)
 app.include_router(email_subscription_public_router)
 app.include_router(email_subscription_admin_router)
 
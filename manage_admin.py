@@ -1,12 +1,12 @@
 import argparse
 import sys
-from sqlalchemy import create_engine, select
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
 from app_v2.databases.models import UnifiedAuthModel, Base
-from app_v2.core.config import VoiceSettings
+from app_v2.databases.engine import get_script_engine
 
 # Setup Database Session
-engine = create_engine(VoiceSettings.DB_URL)
+engine = get_script_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -35,6 +35,16 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Extensions the models rely on (gin_trgm_ops on
+# ix_custom_voices_voice_name_trgm needs pg_trgm). Created before every run
+# so an autogenerated migration can build those indexes on a fresh database.
+REQUIRED_EXTENSIONS = ("pg_trgm",)
+
+
+def create_extensions() -> None:
+    for extension in REQUIRED_EXTENSIONS:
+        context.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -57,6 +67,7 @@ def run_migrations_offline() -> None:
     )
 
     with context.begin_transaction():
+        create_extensions()
         context.run_migrations()
 
 
@@ -79,6 +90,7 @@ def run_migrations_online() -> None:
         )
 
         with context.begin_transaction():
+            create_extensions()
             context.run_migrations()
 
 
@@ -20,13 +20,10 @@ async def run_expiry_alert():
     """
     print(f"[{datetime.utcnow()}] Starting coin expiry alert process...")
     
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    from app_v2.core.config import VoiceSettings
+    from app_v2.databases.engine import get_script_session_factory
     from app_v2.utils.email_service import send_coin_expiry_alert_email
     
-    engine = create_engine(VoiceSettings.DB_URL)
-    Session = sessionmaker(bind=engine)
+    Session = get_script_session_factory()
     session = Session()
 
     try:
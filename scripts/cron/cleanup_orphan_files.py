@@ -0,0 +1,51 @@
+import sys
+import os
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env')))
+
+
+def run_cleanup(delete: bool):
+    """
+    Cron job script to reconcile stored uploads with the knowledge base and
+    voice rows that reference them. Files no row points at (left behind when
+    a request failed between storing the file and saving its row) and stale
+    temp files are reported, and removed with --delete. Rows whose file is
+    missing are only reported.
+    """
+    print(f"[{datetime.utcnow()}] Starting orphaned file scan (delete={delete})...")
+
+    from app_v2.databases.engine import get_script_session_factory
+    from app_v2.utils.file_storage import scan_orphans
+
+    Session = get_script_session_factory()
+    session = Session()
+
+    try:
+        report = scan_orphans(session, delete=delete)
+        for orphan in report["orphans"]:
+            print(f"  orphan: {orphan['key']} ({orphan['size']} bytes)")
+        for path in report["stale_temp"]:
+            print(f"  stale temp file: {path}")
+        for row in report["missing"]:
+            print(f"  missing file for {row['table']} #{row['id']}: {row['ref']}")
+        print(
+            f"[{datetime.utcnow()}] {len(report['orphans'])} orphaned files ({report['orphan_bytes']} bytes), "
+            f"{len(report['stale_temp'])} stale temp files, {len(report['missing'])} rows with missing files; "
+            f"deleted {report['deleted']}."
+        )
+    except Exception as e:
+        print(f"Error during orphaned file scan: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find (and optionally delete) orphaned upload files")
+    parser.add_argument("--delete", action="store_true", help="remove orphaned and stale temp files")
+    run_cleanup(parser.parse_args().delete)
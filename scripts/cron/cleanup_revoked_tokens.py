@@ -0,0 +1,41 @@
+import sys
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env')))
+
+
+def run_cleanup():
+    """
+    Cron job script to delete revoked-token rows whose tokens have expired.
+    Once a token is past its exp claim it fails verification on its own, so
+    keeping its jti only grows the table and every worker's revocation filter.
+    """
+    print(f"[{datetime.utcnow()}] Starting revoked token cleanup...")
+
+    from sqlalchemy import text
+    from app_v2.databases.engine import get_script_session_factory
+
+    Session = get_script_session_factory()
+    session = Session()
+
+    try:
+        result = session.execute(text("""
+            DELETE FROM revoked_tokens
+            WHERE expires_at <= CURRENT_TIMESTAMP;
+        """))
+        session.commit()
+        print(f"[{datetime.utcnow()}] Deleted {result.rowcount} expired revoked tokens.")
+    except Exception as e:
+        session.rollback()
+        print(f"Error during revoked token cleanup: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    run_cleanup()
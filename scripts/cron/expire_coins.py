@@ -17,12 +17,9 @@ def run_expiry():
     """
     print(f"[{datetime.utcnow()}] Starting coin expiry process...")
     
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    from app_v2.core.config import VoiceSettings
+    from app_v2.databases.engine import get_script_session_factory
     
-    engine = create_engine(VoiceSettings.DB_URL)
-    Session = sessionmaker(bind=engine)
+    Session = get_script_session_factory()
     session = Session()
 
     try:
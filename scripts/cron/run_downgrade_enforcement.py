@@ -13,16 +13,13 @@ def run_downgrade_enforcement():
     """
     print(f"[{datetime.utcnow()}] Starting scheduled downgrade enforcement...")
     
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    from app_v2.core.config import VoiceSettings
+    from app_v2.databases.engine import get_script_session_factory
     from app_v2.databases.models import ScheduledDowngradeModel, ActivityLogModel, AgentModel, KnowledgeBaseModel, AgentKnowledgeBaseBridge
     from app_v2.schemas.enum_types import ScheduledDowngradeStatusEnum
     from app_v2.utils.downgrade_utils import enforce_downgrade_for_user
     from app_v2.utils.elevenlabs import ElevenLabsAgent
     
-    engine = create_engine(VoiceSettings.DB_URL)
-    Session = sessionmaker(bind=engine)
+    Session = get_script_session_factory()
     session = Session()
 
     try:
@@ -0,0 +1,102 @@
+"""
+Local stand-in for ElevenLabs' post-call webhook sender.
+
+Builds a post_call_transcription (or call_initiation_failure) event, signs
+it the way ElevenLabs does (ElevenLabs-Signature: t=<ts>,v0=<hmac>) with
+ELEVENLABS_WEBHOOK_SECRET and POSTs it to the server, so the ingest path
+can be exercised without a public URL.
+
+By default the conversation body is synthetic; --from-api fetches the real
+one from ElevenLabs instead. Run it twice to check duplicates are ignored.
+
+Usage:
+    python send_elevenlabs_webhook.py --conversation-id conv_123 --agent-id agent_abc
+    python send_elevenlabs_webhook.py --conversation-id conv_123 --from-api
+    python send_elevenlabs_webhook.py --conversation-id conv_123 --event call_initiation_failure
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def build_transcription_data(conversation_id, agent_id, duration, cost):
+    return {
+        "agent_id": agent_id,
+        "conversation_id": conversation_id,
+        "status": "done",
+        "transcript": [
+            {"role": "agent", "message": "Hello! How can I help you today?", "time_in_call_secs": 0},
+            {"role": "user", "message": "Just testing the webhook.", "time_in_call_secs": 3},
+            {"role": "agent", "message": "Got it, thanks for calling.", "time_in_call_secs": 6},
+        ],
+        "metadata": {
+            "start_time_unix_secs": int(time.time()) - duration,
+            "call_duration_secs": duration,
+            "cost": cost,
+        },
+        "analysis": {
+            "call_successful": "success",
+            "transcript_summary": "Test conversation sent by send_elevenlabs_webhook.py.",
+        },
+    }
+
+
+def fetch_transcription_data(conversation_id):
+    from app_v2.utils.elevenlabs.conversation_utils import ElevenLabsConversation
+
+    response = ElevenLabsConversation().get_conversation(conversation_id)
+    if not response.status:
+        raise SystemExit(f"❌ Could not fetch {conversation_id}: {response.error_message}")
+    return response.data
+
+
+def sign(body, secret, timestamp):
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v0={digest}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a signed ElevenLabs post-call webhook to a local server")
+    parser.add_argument("--url", default="http://localhost:8000/api/v2/webhooks/elevenlabs")
+    parser.add_argument("--conversation-id", required=True)
+    parser.add_argument("--agent-id", help="ElevenLabs agent id (synthetic payloads)")
+    parser.add_argument("--event", default="post_call_transcription",
+                        choices=["post_call_transcription", "call_initiation_failure"])
+    parser.add_argument("--from-api", action="store_true", help="Use the real conversation body from ElevenLabs")
+    parser.add_argument("--duration", type=int, default=42)
+    parser.add_argument("--cost", type=int, default=300)
+    parser.add_argument("--secret", default=os.getenv("ELEVENLABS_WEBHOOK_SECRET"))
+    parser.add_argument("--skew", type=int, default=0, help="Shift the signed timestamp (seconds) to test rejection")
+    args = parser.parse_args()
+
+    if not args.secret:
+        raise SystemExit("❌ ELEVENLABS_WEBHOOK_SECRET not set (or pass --secret)")
+
+    if args.event == "call_initiation_failure":
+        data = {"agent_id": args.agent_id, "conversation_id": args.conversation_id, "failure_reason": "busy"}
+    elif args.from_api:
+        data = fetch_transcription_data(args.conversation_id)
+    else:
+        if not args.agent_id:
+            raise SystemExit("❌ --agent-id is required for synthetic payloads")
+        data = build_transcription_data(args.conversation_id, args.agent_id, args.duration, args.cost)
+
+    timestamp = int(time.time()) + args.skew
+    body = json.dumps({"type": args.event, "event_timestamp": timestamp, "data": data}).encode("utf-8")
+
+    response = requests.post(
+        args.url,
+        data=body,
+        headers={"Content-Type": "application/json", "ElevenLabs-Signature": sign(body, args.secret, timestamp)},
+        timeout=30,
+    )
+    print(f"{response.status_code} {response.text}")